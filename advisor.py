@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : advisor.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译建议: 以采样分析器运行workload, 按各模块的耗时排序, 生成只编译热点模块的保留编译规则, 并可对比编译前后workload的耗时
+"""
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import click
+
+from constants import BASE_DIR, OUTPUT_DIR, PROJECT_CONFIG_DIR, ADVISOR_DIR, DEFAULT_IGNORED_FILES
+from preflight import SEVERITY_ERROR, check_file
+from sampler import DEFAULT_INTERVAL
+from scanner import DirectoryEntry, ProjectInventory
+
+SAMPLER_PATH = os.path.join(BASE_DIR, 'sampler.py')
+
+DEFAULT_COVERAGE = 0.9  # 选中的模块累计覆盖可编译模块耗时的比例
+DEFAULT_MIN_SHARE = 0.01  # 模块自身耗时占全部采样的最低比例, 低于时不编译
+DEFAULT_MIN_SPEEDUP = 0.05  # 编译后workload加速低于该比例时, 提示编译收益不明显
+
+
+class ModuleHotness(NamedTuple):
+    """模块的采样统计"""
+    name: str  # 相对路径(以项目名称开头)
+    own: float  # 栈顶位于该模块的采样数(按CPU时间占比计数)
+    total: float  # 调用栈中包含该模块的采样数
+
+
+def run_workload(workload: str, tree_dir: str, interval: float = 0.0) -> dict:
+    """
+    在子进程中运行workload, 以tree_dir为首个导入路径(同时加入PYTHONPATH, workload的子进程同样生效)
+
+    Args:
+        workload (str): workload脚本路径
+        tree_dir (str): 项目所在文件夹, 源码时为源项目的上级文件夹, 编译后为输出目录
+        interval (float): 采样间隔(秒), 为0时只计时
+
+    Returns:
+        result (dict): 见sampler.run_workload
+    """
+    if not os.path.exists(workload):
+        raise FileNotFoundError(workload)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path for path in (tree_dir, env.get('PYTHONPATH')) if path)
+    fd, result_path = tempfile.mkstemp(prefix='advisor_', suffix='.json')
+    os.close(fd)
+    try:
+        completed = subprocess.run([sys.executable, SAMPLER_PATH, os.path.abspath(workload), tree_dir, result_path,
+                                    str(interval)], env=env)
+        if completed.returncode != 0:
+            raise RuntimeError("workload执行失败, 退出码: {}".format(completed.returncode))
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+#######################################################
+#                     热点模块                         #
+#######################################################
+def rank_modules(result: dict, project_name: str) -> List[ModuleHotness]:
+    """项目中的模块(不含workload脚本等同一文件夹下的其他文件), 按自身采样数排序, 相同时按调用栈采样数"""
+    prefix = '{}/'.format(project_name)
+    ranking = [ModuleHotness(name, own, total) for name, (own, total) in result.get('modules', dict()).items()
+               if name.startswith(prefix)]
+    return sorted(ranking, key=lambda item: (-item.own, -item.total, item.name))
+
+
+def get_compilable_modules(inventory: ProjectInventory) -> Dict[str, str]:
+    """
+    项目中会被编译的模块: 除__init__.py外的.py文件
+
+    Returns:
+        modules (dict): 相对路径 -> 绝对路径
+    """
+    return {path: file.abs_path for path, file in inventory.files.items()
+            if file.name.endswith('.py') and file.name != '__init__.py'}
+
+
+def select_hot_modules(ranking: List[ModuleHotness], samples: int, compilable: Dict[str, str],
+                       coverage: float = DEFAULT_COVERAGE, min_share: float = DEFAULT_MIN_SHARE,
+                       top: int = None) -> Tuple[List[str], Dict[str, str]]:
+    """
+    选择热点模块: 按自身耗时从高到低选择, 直到累计覆盖可编译模块耗时的coverage比例
+
+    Args:
+        ranking (list): 见rank_modules
+        samples (int): 全部线程的采样数
+        compilable (dict): 项目中会被编译的模块, 见get_compilable_modules
+        coverage (float): 累计覆盖比例
+        min_share (float): 模块自身耗时占全部采样的最低比例
+        top (int): 最多选择的模块数, 为空时不限制
+
+    Returns:
+        selected (list): 选中的模块, 按耗时排序
+        skipped (dict): 有耗时但未选中的模块 -> 原因
+    """
+    candidates, skipped = list(), dict()
+    for item in ranking:
+        if not item.own:
+            continue
+        if item.name not in compilable:
+            skipped[item.name] = '__init__.py不编译' if item.name.endswith('__init__.py') else '不在项目文件中'
+            continue
+        errors = [issue for issue in check_file(item.name, compilable[item.name]) if issue.severity == SEVERITY_ERROR]
+        if errors:
+            skipped[item.name] = '预检错误: {}'.format(errors[0])
+            continue
+        candidates.append(item)
+
+    target = coverage * sum(item.own for item in candidates)
+    selected, covered = list(), 0
+    for item in candidates:
+        if covered >= target:
+            skipped[item.name] = '已覆盖{:.0%}的耗时'.format(coverage)
+        elif samples and item.own / samples < min_share:
+            skipped[item.name] = '耗时占比低于{:.1%}'.format(min_share)
+        elif top is not None and len(selected) >= top:
+            skipped[item.name] = '超出模块数上限{}'.format(top)
+        else:
+            selected.append(item.name)
+            covered += item.own
+    return selected, skipped
+
+
+def make_reserved_rules(selected: List[str], inventory: ProjectInventory) -> dict:
+    """
+    生成保留编译规则: 文件夹(含子文件夹)中会被编译的模块全部选中且不少于2个时合并为文件夹规则, 其余为文件规则
+
+    Args:
+        selected (list): 选中的模块
+        inventory (ProjectInventory): 源项目文件清单
+
+    Returns:
+        reserved_rules (dict):
+    """
+    selected = set(selected)
+    files, packages = list(), list()
+
+    def visit(directory: DirectoryEntry) -> None:
+        modules = [file.path for file in directory.iter_files()
+                   if file.name.endswith('.py') and file.name != '__init__.py']
+        if len(modules) >= 2 and selected.issuperset(modules):
+            packages.append('/{}'.format(directory.path))
+            return None
+        files.extend('/{}'.format(file.path) for file in directory.files if file.path in selected)
+        for sub_dir in directory.dirs:
+            visit(sub_dir)
+        return None
+
+    visit(inventory.root)
+    return dict(type='reserved', reserved_files=sorted(files), reserved_packages=sorted(packages))
+
+
+def write_project_config(reserved_rules: dict, output_config: str, base_config: str = None) -> str:
+    """
+    写入项目配置: 以base_config为基础(保留合并编译, 编译指令, 编译配置等), 替换编译规则为保留编译规则
+
+    Args:
+        reserved_rules (dict): 见make_reserved_rules
+        output_config (str): 输出的项目配置文件名称
+        base_config (str): 作为基础的项目配置文件名称
+
+    Returns:
+        config_path (str):
+    """
+    config = dict()
+    if base_config:
+        with open(os.path.join(PROJECT_CONFIG_DIR, base_config)) as f:
+            config = json.load(f)
+        if config.pop('ignored_rules', None):
+            print("忽略编译规则优先于保留编译规则, 已从生成的项目配置中移除")
+    config['reserved_rules'] = reserved_rules
+    config_path = os.path.join(PROJECT_CONFIG_DIR, output_config)
+    os.makedirs(PROJECT_CONFIG_DIR, exist_ok=True)
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    return config_path
+
+
+def print_ranking(ranking: List[ModuleHotness], samples: int, selected: List[str], skipped: Dict[str, str],
+                  functions: list, top: int = 20) -> None:
+    """输出各模块耗时排名, 选中的模块以*标记"""
+    project_own = sum(item.own for item in ranking)
+    print("采样{}次, 执行项目代码占{:.1%}, 其余为标准库, 第三方库, 解释器或等待".format(
+        samples, project_own / samples if samples else 0))
+    for item in ranking[:top]:
+        print("  {} {:6.1%} {:6.1%}  {}{}".format(
+            '*' if item.name in selected else ' ', item.own / samples, item.total / samples, item.name,
+            '  ({})'.format(skipped[item.name]) if item.name in skipped else ''))
+        for name, function, line, count in functions:
+            if name == item.name and count * 10 >= item.own:
+                print("             {:6.1%}  {}:{}".format(count / samples, function, line))
+    if len(ranking) > top:
+        print("  ... 共{}个模块".format(len(ranking)))
+
+
+#######################################################
+#                     编译前后对比                      #
+#######################################################
+def benchmark_workload(workload: str, dir_path: str, project_config: str, repeat: int = 3, jobs: int = None) -> dict:
+    """
+    以生成的项目配置编译, 交替运行源码及编译后的workload, 对比耗时(各运行一次预热, 生成.pyc及页缓存)
+
+    Args:
+        workload (str): workload脚本路径
+        dir_path (str): 源项目文件夹
+        project_config (str): 项目配置文件名称
+        repeat (int): 重复次数, 结果取中位数
+        jobs (int): C编译的进程数
+
+    Returns:
+        result (dict):
+    """
+    from base import PythonCodeCompilingBase
+
+    time_start = time.time()
+    PythonCodeCompilingBase(project_config, dir_path, jobs=jobs).run()
+    compile_seconds = time.time() - time_start
+
+    trees = dict(source=os.path.dirname(os.path.abspath(dir_path)), compiled=OUTPUT_DIR)
+    seconds = dict(source=list(), compiled=list())
+    loaded = dict()
+    for i in range(repeat + 1):
+        for variant, tree_dir in trees.items():
+            result = run_workload(workload, tree_dir)
+            loaded[variant] = result['loaded']
+            if i:
+                seconds[variant].append(result['seconds'])
+    source, compiled = statistics.median(seconds['source']), statistics.median(seconds['compiled'])
+    return dict(
+        compile_seconds=round(compile_seconds, 4),
+        source_seconds=round(source, 4),
+        compiled_seconds=round(compiled, 4),
+        speedup=round(source / compiled, 4) if compiled else 0,
+        loaded=loaded,
+        runs=seconds,
+    )
+
+
+@click.command()
+@click.argument('dir_path', nargs=1, type=click.Path(exists=True, file_okay=False))
+@click.option('--workload', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="workload脚本, 以源项目的上级文件夹为PYTHONPATH运行, 默认使用--config中的pgo_workload")
+@click.option('--config', 'base_config', default=None,
+              help="作为基础的项目配置, 保留其中的合并编译, 编译指令及编译配置")
+@click.option('--output-config', default=None, help="生成的项目配置文件名称, 默认为<项目>_advised.json")
+@click.option('--interval', type=click.FloatRange(min=0.0005), default=DEFAULT_INTERVAL, help="采样间隔(秒)")
+@click.option('--coverage', type=click.FloatRange(min=0, max=1, min_open=True), default=DEFAULT_COVERAGE,
+              help="选中的模块累计覆盖可编译模块耗时的比例")
+@click.option('--min-share', type=click.FloatRange(min=0, max=1), default=DEFAULT_MIN_SHARE,
+              help="模块自身耗时占全部采样的最低比例")
+@click.option('--max-modules', type=click.IntRange(min=1), default=None, help="最多选择的模块数")
+@click.option('--benchmark', 'run_benchmark', is_flag=True, default=False,
+              help="以生成的项目配置编译, 对比源码及编译后workload的耗时")
+@click.option('--repeat', type=click.IntRange(min=1), default=3, help="对比时workload的重复次数, 结果取中位数")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="C编译的进程数, 默认为CPU核数")
+@click.option('--top', type=click.IntRange(min=0), default=20, help="输出的模块数")
+def advise(dir_path: str, workload: str, base_config: str, output_config: str, interval: float, coverage: float,
+           min_share: float, max_modules: int, run_benchmark: bool, repeat: int, jobs: int, top: int):
+    """
+    编译建议
+
+        以采样分析器运行workload(源码), 按各模块自身耗时排序, 选择累计覆盖coverage比例耗时的热点模块,
+        生成保留编译规则的项目配置(projects_config/<项目>_advised.json), 可直接用于run.py;
+        --benchmark时以生成的项目配置编译, 对比源码及编译后workload的耗时\n
+    """
+    dir_path = os.path.abspath(dir_path).rstrip('/\\')
+    project_name = os.path.basename(dir_path)
+    tree_dir = os.path.dirname(dir_path)
+    if not workload and base_config:
+        with open(os.path.join(PROJECT_CONFIG_DIR, base_config)) as f:
+            pgo_workload = json.load(f).get('pgo_workload')
+        workload = os.path.join(dir_path, pgo_workload) if pgo_workload else None
+    if not workload:
+        raise click.UsageError("需要指定--workload, 或--config中配置pgo_workload")
+
+    # 1.采样运行workload
+    print("采样运行workload: [{}], 间隔{}秒".format(workload, interval))
+    result = run_workload(workload, tree_dir, interval)
+    print("workload耗时{:.3f}秒".format(result['seconds']))
+
+    # 2.选择热点模块
+    inventory = ProjectInventory(dir_path, abandoned_files=DEFAULT_IGNORED_FILES, base_dir=tree_dir)
+    ranking = rank_modules(result, project_name)
+    samples = result['samples']
+    selected, skipped = select_hot_modules(ranking, samples, get_compilable_modules(inventory), coverage=coverage,
+                                           min_share=min_share, top=max_modules)
+    print_ranking(ranking, samples, selected, skipped, result['functions'], top=top)
+
+    report = dict(project=project_name, workload=os.path.abspath(workload), time=time.time(),
+                  samples=samples, interval=interval, seconds=result['seconds'],
+                  modules=[item._asdict() for item in ranking], selected=selected, skipped=skipped)
+    if not selected:
+        print("没有选中的模块(workload未执行项目代码或耗时占比过低), 不生成项目配置")
+    else:
+        # 3.生成项目配置
+        reserved_rules = make_reserved_rules(selected, inventory)
+        output_config = output_config or '{}_advised.json'.format(project_name)
+        config_path = write_project_config(reserved_rules, output_config, base_config)
+        report['reserved_rules'] = reserved_rules
+        print("选中{}个模块, 文件规则{}条, 文件夹规则{}条, 项目配置已生成: [{}]".format(
+            len(selected), len(reserved_rules['reserved_files']), len(reserved_rules['reserved_packages']),
+            config_path))
+
+        # 4.编译前后对比
+        if run_benchmark:
+            benchmark = benchmark_workload(workload, dir_path, output_config, repeat=repeat, jobs=jobs)
+            report['benchmark'] = benchmark
+            print("workload耗时(中位数): 源码{:.3f}秒, 编译后{:.3f}秒, 加速{:.2f}倍; 编译耗时{:.1f}秒, "
+                  "导入扩展模块{}个".format(benchmark['source_seconds'], benchmark['compiled_seconds'],
+                                      benchmark['speedup'], benchmark['compile_seconds'],
+                                      benchmark['loaded']['compiled']['extension']))
+            if not benchmark['loaded']['compiled']['extension']:
+                print("编译后的workload没有导入扩展模块, 请检查workload是否导入了其他位置的项目")
+            elif benchmark['speedup'] < 1 + DEFAULT_MIN_SPEEDUP:
+                print("编译后加速不明显, 这些模块的耗时可能主要在标准库, 第三方库或等待中, 编译收益有限")
+
+    report_path = os.path.join(ADVISOR_DIR, '{}.json'.format(project_name))
+    os.makedirs(ADVISOR_DIR, exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print("分析结果已保存: [{}]".format(report_path))
+
+
+if __name__ == '__main__':
+    advise()
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : archive.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 将编译结果直接写入可复现的归档文件(wheel/tar.zst/zip), 无需再次读取输出目录
+"""
+import base64
+import hashlib
+import os.path
+import re
+import struct
+import sys
+import sysconfig
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖, 只有tar.zst格式需要
+    zstandard = None
+
+ARCHIVE_WHEEL = 'wheel'
+ARCHIVE_TAR_ZST = 'tar.zst'
+ARCHIVE_ZIP = 'zip'
+ARCHIVE_FORMATS = (ARCHIVE_WHEEL, ARCHIVE_TAR_ZST, ARCHIVE_ZIP)
+
+# 归档文件中全部条目的修改时间: 环境变量SOURCE_DATE_EPOCH, 默认为zip格式支持的最早时间(1980-01-01 00:00:00 UTC)
+DEFAULT_ARCHIVE_MTIME = 315532800
+DEFAULT_ZIP_LEVEL = 6  # deflate压缩级别
+DEFAULT_ZSTD_LEVEL = 10  # zstd压缩级别
+
+WHEEL_GENERATOR = 'PythonCodeCompiling'
+DEFAULT_WHEEL_VERSION = '0.0.0'
+
+# zip格式(不含ZIP64)
+_ZIP_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_ZIP_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_ZIP_END_RECORD = struct.Struct('<IHHHHIIH')
+_ZIP_LOCAL_SIGNATURE = 0x04034b50
+_ZIP_CENTRAL_SIGNATURE = 0x02014b50
+_ZIP_END_SIGNATURE = 0x06054b50
+_ZIP_VERSION = 20  # 2.0: deflate, 文件夹
+_ZIP_MADE_BY_UNIX = 3 << 8
+_ZIP_FLAG_UTF8 = 0x800
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+_ZIP_MAX_SIZE = 0xFFFFFFFF
+_ZIP_MAX_ENTRIES = 0xFFFF
+
+_FILE_MODE = 0o644
+_EXECUTABLE_MODE = 0o755
+
+
+class ArchiveEntry(NamedTuple):
+    """归档文件中的条目"""
+    name: str  # 归档文件中的路径, 例如demo_proj/pkg/mod.so; 文件夹以'/'结尾
+    mode: int  # 权限位
+    source_file: Optional[str] = None  # 文件内容来源
+    data: Optional[bytes] = None  # 文件内容, 生成的文件(导入钩子模块等)
+
+
+class TarMember(NamedTuple):
+    """压缩后的tar条目: 条目头及内容(按512字节补齐)压缩为一个独立的zstd帧, 位于暂存文件中"""
+    size: int  # 文件大小
+    length: int  # 未压缩的tar流长度
+    offset: int  # 压缩内容在暂存文件中的位置
+    compressed_size: int
+
+
+class ZipMember(NamedTuple):
+    """压缩后的zip条目, 压缩内容位于暂存文件中"""
+    crc: int
+    size: int
+    method: int
+    offset: int  # 压缩内容在暂存文件中的位置
+    compressed_size: int
+    digest: bytes  # 未压缩内容的sha256, 用于wheel的RECORD
+
+
+class MemberSpool(object):
+    """
+    压缩内容的暂存文件
+
+        各条目压缩后立即写入暂存文件, 内存中只保留位置及大小, 关闭归档文件时按路径排序从暂存文件拷贝;
+        暂存文件位于归档文件所在文件夹, 创建后即删除(不残留), 多个压缩线程加锁写入
+    """
+
+    def __init__(self, dir_path: str):
+        """
+        Args:
+            dir_path (str): 暂存文件所在文件夹
+        """
+        self._file: BinaryIO = tempfile.TemporaryFile(prefix='.archive-', dir=dir_path)
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def write(self, data: bytes) -> Tuple[int, int]:
+        """
+        追加压缩内容
+
+        Args:
+            data (bytes): 压缩内容
+
+        Returns:
+            offset (int): 在暂存文件中的位置
+            length (int): 长度
+        """
+        with self._lock:
+            offset = self.size
+            self._file.seek(offset)
+            self._file.write(data)
+            self.size += len(data)
+        return offset, len(data)
+
+    def copy_to(self, f: BinaryIO, offset: int, length: int, chunk_size: int = 1024 * 1024) -> None:
+        """将暂存文件中的压缩内容分块拷贝至归档文件"""
+        with self._lock:
+            self._file.seek(offset)
+            while length > 0:
+                chunk = self._file.read(min(chunk_size, length))
+                if not chunk:
+                    raise EOFError("归档暂存文件不完整")
+                f.write(chunk)
+                length -= len(chunk)
+        return None
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def get_archive_mtime() -> int:
+    """归档文件中条目的修改时间, 见DEFAULT_ARCHIVE_MTIME"""
+    try:
+        return max(int(os.environ['SOURCE_DATE_EPOCH']), DEFAULT_ARCHIVE_MTIME)
+    except (KeyError, ValueError):
+        return DEFAULT_ARCHIVE_MTIME
+
+
+def get_wheel_tag() -> str:
+    """
+    当前解释器编译的扩展模块的wheel标签, 例如cp311-cp311-linux_x86_64
+
+    Returns:
+        tag (str):
+    """
+    implementation = {'cpython': 'cp', 'pypy': 'pp'}.get(sys.implementation.name, sys.implementation.name)
+    python_tag = '{}{}{}'.format(implementation, *sys.version_info[:2])
+    abi_tag = python_tag
+    if sysconfig.get_config_var('Py_GIL_DISABLED'):
+        abi_tag += 't'
+    if hasattr(sys, 'gettotalrefcount'):
+        abi_tag += 'd'
+    platform_tag = re.sub(r'[-.]', '_', sysconfig.get_platform())
+    return '{}-{}-{}'.format(python_tag, abi_tag, platform_tag)
+
+
+def get_archive_name(project_name: str, archive_format: str, version: str = None) -> str:
+    """
+    归档文件名称
+
+    Args:
+        project_name (str): 项目名称
+        archive_format (str): 归档格式, 见ARCHIVE_FORMATS
+        version (str): wheel的版本号
+
+    Returns:
+        name (str): 例如demo_proj-0.0.0-cp311-cp311-linux_x86_64.whl, demo_proj.tar.zst
+    """
+    if archive_format == ARCHIVE_WHEEL:
+        return '{}-{}-{}.whl'.format(_normalize_wheel_name(project_name),
+                                     _normalize_wheel_name(version or DEFAULT_WHEEL_VERSION), get_wheel_tag())
+    return '{}.{}'.format(project_name, archive_format)
+
+
+def _normalize_wheel_name(name: str) -> str:
+    return re.sub(r'[^\w.]+', '_', name)
+
+
+def _get_mode(source_file: str) -> int:
+    """按源文件是否可执行, 统一为0o755/0o644, 不保留umask等本地差异"""
+    return _EXECUTABLE_MODE if os.stat(source_file).st_mode & 0o111 else _FILE_MODE
+
+
+def _dos_datetime(mtime: int) -> (int, int):
+    """zip格式的修改时间(UTC, 不受本地时区影响)"""
+    t = time.gmtime(mtime)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _read_entry(entry: ArchiveEntry) -> bytes:
+    if entry.data is not None:
+        return entry.data
+    if entry.source_file is None:
+        return b''
+    with open(entry.source_file, 'rb') as f:
+        return f.read()
+
+
+def _compress_tar_member(entry: ArchiveEntry, mtime: int, level: int, spool: MemberSpool) -> TarMember:
+    """
+    读取tar条目并压缩为独立的zstd帧, 写入暂存文件(在线程池中执行, zstd压缩时释放GIL)
+
+        多个zstd帧依次解压的结果即为拼接后的内容, 各帧按路径排序拼接即为完整的tar流
+
+    Args:
+        entry (ArchiveEntry): 条目
+        mtime (int): 修改时间
+        level (int): zstd压缩级别
+        spool (MemberSpool): 暂存文件
+
+    Returns:
+        member (TarMember):
+    """
+    data = _read_entry(entry)
+    info = tarfile.TarInfo(entry.name.rstrip('/'))
+    info.mtime, info.mode = mtime, entry.mode
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    if entry.name.endswith('/'):
+        info.type = tarfile.DIRTYPE
+    else:
+        info.size = len(data)
+    buf = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape') + data
+    buf += tarfile.NUL * (-len(buf) % tarfile.BLOCKSIZE)
+    offset, compressed_size = spool.write(zstandard.ZstdCompressor(level=level).compress(buf))
+    return TarMember(size=info.size, length=len(buf), offset=offset, compressed_size=compressed_size)
+
+
+def _compress_member(entry: ArchiveEntry, level: int, spool: MemberSpool) -> ZipMember:
+    """
+    读取并压缩zip条目, 写入暂存文件(在线程池中执行, zlib及hashlib计算时释放GIL)
+
+    Args:
+        entry (ArchiveEntry): 条目
+        level (int): deflate压缩级别
+        spool (MemberSpool): 暂存文件
+
+    Returns:
+        member (ZipMember):
+    """
+    data = _read_entry(entry)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = compressor.compress(data) + compressor.flush()
+    method = _ZIP_DEFLATED
+    if len(compressed) >= len(data):
+        compressed, method = data, _ZIP_STORED
+    offset, compressed_size = spool.write(compressed)
+    return ZipMember(crc=zlib.crc32(data), size=len(data), method=method, offset=offset,
+                     compressed_size=compressed_size, digest=hashlib.sha256(data).digest())
+
+
+class ArchiveWriter(object):
+    """
+    可复现的归档文件
+
+        编译/拷贝的文件生成后即加入归档文件, 从input及build目录直接读取, 不经过输出目录;
+        zip/wheel: 各条目加入后立即在线程池中并行压缩, 关闭时按路径排序写入;
+        tar.zst: 各条目加入后立即在线程池中并行压缩为独立的zstd帧, 关闭时按路径排序拼接;
+        压缩内容写入暂存文件(见MemberSpool), 内存占用不随条目数增长;
+        条目的修改时间, 属主及权限统一, 相同的输入生成完全相同的归档文件
+    """
+
+    def __init__(self, path: str, archive_format: str, jobs: int = 1, project_name: str = None, version: str = None):
+        """
+        Args:
+            path (str): 归档文件路径
+            archive_format (str): 归档格式, 见ARCHIVE_FORMATS
+            jobs (int): 压缩线程数
+            project_name (str): wheel的分发名称
+            version (str): wheel的版本号
+        """
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError("不支持的归档格式: {}".format(archive_format))
+        if archive_format == ARCHIVE_TAR_ZST and zstandard is None:
+            raise ValueError("tar.zst格式需要安装zstandard: pip install zstandard")
+        self.path = path
+        self.archive_format = archive_format
+        self.jobs = max(jobs, 1)
+        self.project_name = project_name
+        self.version = version or DEFAULT_WHEEL_VERSION
+        self.mtime = get_archive_mtime()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.spool = MemberSpool(os.path.dirname(os.path.abspath(path)))
+        self.entries: Dict[str, ArchiveEntry] = dict()
+        self.members: Dict[str, Future] = dict()  # 条目 -> 压缩结果(暂存文件中的位置), zip/wheel中不含文件夹
+        self.size = 0  # 未压缩大小
+        self._executor: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=self.jobs,
+                                                                         thread_name_prefix='archive')
+
+    def add_file(self, name: str, source_file: str) -> None:
+        """
+        加入文件, 同名条目已存在时替换
+
+        Args:
+            name (str): 归档文件中的路径
+            source_file (str): 源文件
+
+        Returns:
+
+        """
+        self._add(ArchiveEntry(name=name, mode=_get_mode(source_file), source_file=source_file))
+
+    def add_bytes(self, name: str, data: Union[bytes, str], mode: int = _FILE_MODE) -> None:
+        """
+        加入生成的文件内容, 同名条目已存在时替换
+
+        Args:
+            name (str): 归档文件中的路径
+            data (bytes|str): 文件内容
+            mode (int): 权限位
+
+        Returns:
+
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._add(ArchiveEntry(name=name, mode=mode, data=data))
+
+    def add_dir(self, name: str) -> None:
+        """加入文件夹(保留空文件夹), wheel中不记录文件夹"""
+        if self.archive_format == ARCHIVE_WHEEL:
+            return None
+        self._add(ArchiveEntry(name=name.rstrip('/') + '/', mode=_EXECUTABLE_MODE))
+        return None
+
+    def _add(self, entry: ArchiveEntry) -> None:
+        self.entries[entry.name] = entry
+        if self.archive_format == ARCHIVE_TAR_ZST:
+            self.members[entry.name] = self._executor.submit(_compress_tar_member, entry, self.mtime,
+                                                             DEFAULT_ZSTD_LEVEL, self.spool)
+        elif not entry.name.endswith('/'):
+            self.members[entry.name] = self._executor.submit(_compress_member, entry, DEFAULT_ZIP_LEVEL, self.spool)
+        return None
+
+    def close(self) -> str:
+        """
+        按路径排序写入归档文件(先写入临时文件, 完成后替换)
+
+        Returns:
+            path (str): 归档文件路径
+        """
+        tmp_path = self.path + '.tmp'
+        try:
+            if self.archive_format == ARCHIVE_TAR_ZST:
+                self._write_tar_zst(tmp_path)
+            else:
+                self._write_zip(tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            self.discard()
+        return self.path
+
+    def discard(self) -> None:
+        """放弃写入, 取消未开始的压缩任务, 删除暂存文件"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self.spool.close()
+        return None
+
+    def _write_tar_zst(self, path: str) -> None:
+        length = 0
+        with open(path, 'wb') as f:
+            for name in sorted(self.entries):
+                member = self.members[name].result()
+                self.spool.copy_to(f, member.offset, member.compressed_size)
+                length += member.length
+                self.size += member.size
+            # tar流结尾: 2个空块, 按RECORDSIZE补齐(与tarfile一致)
+            length += tarfile.BLOCKSIZE * 2
+            end = tarfile.NUL * (tarfile.BLOCKSIZE * 2 + -length % tarfile.RECORDSIZE)
+            f.write(zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compress(end))
+        return None
+
+    def _write_zip(self, path: str) -> None:
+        names = sorted(self.entries)
+        members = {name: self.members[name].result() for name in names if name in self.members}
+        if self.archive_format == ARCHIVE_WHEEL:
+            dist_info = '{}-{}.dist-info'.format(_normalize_wheel_name(self.project_name),
+                                                 _normalize_wheel_name(self.version))
+            metadata = {
+                '{}/METADATA'.format(dist_info): 'Metadata-Version: 2.1\nName: {}\nVersion: {}\n'.format(
+                    self.project_name, self.version),
+                '{}/WHEEL'.format(dist_info): 'Wheel-Version: 1.0\nGenerator: {}\nRoot-Is-Purelib: false\n'
+                                              'Tag: {}\n'.format(WHEEL_GENERATOR, get_wheel_tag()),
+            }
+            for name, data in metadata.items():
+                names.append(name)
+                members[name] = _compress_member(ArchiveEntry(name, _FILE_MODE, data=data.encode()), DEFAULT_ZIP_LEVEL,
+                                                 self.spool)
+                self.entries[name] = ArchiveEntry(name, _FILE_MODE)
+            record_name = '{}/RECORD'.format(dist_info)
+            record = ''.join('{},sha256={},{}\n'.format(
+                name, base64.urlsafe_b64encode(members[name].digest).rstrip(b'=').decode(), members[name].size)
+                for name in names) + '{},,\n'.format(record_name)
+            names.append(record_name)
+            members[record_name] = _compress_member(ArchiveEntry(record_name, _FILE_MODE, data=record.encode()),
+                                                    DEFAULT_ZIP_LEVEL, self.spool)
+            self.entries[record_name] = ArchiveEntry(record_name, _FILE_MODE)
+        if len(names) > _ZIP_MAX_ENTRIES:
+            raise ValueError("zip格式最多{}个条目, 请使用tar.zst格式".format(_ZIP_MAX_ENTRIES))
+
+        dos_time, dos_date = _dos_datetime(self.mtime)
+        central_directory = list()
+        offset = 0
+        with open(path, 'wb') as f:
+            for name in names:
+                encoded_name = name.encode('utf-8')
+                flags = 0 if encoded_name.isascii() else _ZIP_FLAG_UTF8
+                member = members.get(name) or ZipMember(crc=0, size=0, method=_ZIP_STORED, offset=0, compressed_size=0,
+                                                        digest=b'')
+                if offset > _ZIP_MAX_SIZE or member.size > _ZIP_MAX_SIZE:
+                    raise ValueError("zip格式的文件大小上限为4GB, 请使用tar.zst格式")
+                f.write(_ZIP_LOCAL_HEADER.pack(
+                    _ZIP_LOCAL_SIGNATURE, _ZIP_VERSION, flags, member.method, dos_time, dos_date, member.crc,
+                    member.compressed_size, member.size, len(encoded_name), 0))
+                f.write(encoded_name)
+                self.spool.copy_to(f, member.offset, member.compressed_size)
+                if name.endswith('/'):
+                    external_attr = ((0o040000 | self.entries[name].mode) << 16) | 0x10  # S_IFDIR, MS-DOS目录属性
+                else:
+                    external_attr = (0o100000 | self.entries[name].mode) << 16  # S_IFREG
+                central_directory.append(_ZIP_CENTRAL_HEADER.pack(
+                    _ZIP_CENTRAL_SIGNATURE, _ZIP_MADE_BY_UNIX | _ZIP_VERSION, _ZIP_VERSION, flags, member.method,
+                    dos_time, dos_date, member.crc, member.compressed_size, member.size, len(encoded_name), 0, 0, 0,
+                    0, external_attr, offset) + encoded_name)
+                offset += _ZIP_LOCAL_HEADER.size + len(encoded_name) + member.compressed_size
+                self.size += member.size
+            central_directory = b''.join(central_directory)
+            if offset > _ZIP_MAX_SIZE:
+                raise ValueError("zip格式的文件大小上限为4GB, 请使用tar.zst格式")
+            f.write(central_directory)
+            f.write(_ZIP_END_RECORD.pack(_ZIP_END_SIGNATURE, 0, 0, len(names), len(names), len(central_directory),
+                                         offset, 0))
+        return None
+
+    def report(self) -> None:
+        """输出归档文件的条目数及大小"""
+        files = sum(1 for name in self.entries if not name.endswith('/'))
+        print("归档文件已生成: [{}], {}个文件, 原始大小{:.1f}MB, 压缩后{:.1f}MB".format(
+            self.path, files, self.size / 1024 / 1024, os.path.getsize(self.path) / 1024 / 1024))
+        return None
+
+
+def create_archive_writer(out_dir: str, project_name: str, archive_format: str, jobs: int = 1,
+                          version: str = None) -> ArchiveWriter:
+    """
+    在输出目录下创建项目的归档文件
+
+    Args:
+        out_dir (str): 输出目录
+        project_name (str): 项目名称
+        archive_format (str): 归档格式, 见ARCHIVE_FORMATS
+        jobs (int): 压缩线程数
+        version (str): wheel的版本号
+
+    Returns:
+        writer (ArchiveWriter):
+    """
+    path = os.path.join(out_dir, get_archive_name(project_name, archive_format, version))
+    return ArchiveWriter(path, archive_format, jobs=jobs, project_name=project_name, version=version)
+
@@ -5,24 +5,46 @@
 @Date  : 2022/12/21
 @Desc  : 
 """
+import hashlib
 import json
 import os.path
-import re
 import shutil
 import time
-from distutils.core import setup
-from typing import Optional, Callable
+from concurrent.futures import ProcessPoolExecutor
+from importlib.machinery import EXTENSION_SUFFIXES
+from typing import Optional, Callable, Dict, List, NamedTuple, Set
 
-# cythonize的导入必须为以下三行的末尾, 否则编译会出错
+from Cython.Compiler.Options import directive_types
 from setuptools.dist import Distribution
 from setuptools.extension import Extension
-from Cython.Build import cythonize
 
-from constants import INPUT_DIR, BUILD_DIR, OUTPUT_DIR, BASE_DIR, DEFAULT_IGNORED_FILES, PROJECT_CONFIG_DIR
+from archive import ArchiveWriter, create_archive_writer
+from build_cache import BuildCache, ObjectCache, get_compiler_fingerprint
+from bundle import BUNDLE_MODULE_NAME, BUNDLE_IMPORTER_NAME, compile_bundle, get_bundle_modules, group_bundle_members, \
+    inject_bundle_installer, render_bundle_importer, split_bundle_members
+from constants import INPUT_DIR, BUILD_DIR, OUTPUT_DIR, BASE_DIR, DEFAULT_IGNORED_FILES, PROJECT_CONFIG_DIR, \
+    DEFAULT_COMPILER_DIRECTIVES, DEFAULT_BUILD_CACHE_SIZE, OBJECT_CACHE_DIR, DEFAULT_OBJECT_CACHE_SIZE, PGO_DIR, \
+    PASS_THROUGH_IGNORED_FILES
+from depgraph import DependencyGraph
+from journal import BuildJournal
+from materialize import MATERIALIZE_COPY, Materializer
+from pipeline import BuildPipeline, CompileExecutor, CompileResult, compile_py_file, reset_dependency_tree
+from preflight import PREFLIGHT_DEMOTE, PREFLIGHT_OFF, PREFLIGHT_REPORT, SEVERITY_ERROR, Preflight
+from plan import ACTION_COMPILE, ACTION_COPY_FILE, ACTION_COPY_DIR, BuildAction, BuildHistory, BuildPlan
+from profiles import PGO_STAGE_GENERATE, PGO_STAGE_USE, BuildProfile, resolve_build_profile, run_pgo_workload
+from remote import RemoteCompileExecutor
+from rule_index import PathSegmentTrie, PrefixRuleIndex, SubstringRuleIndex, SuffixRuleIndex, \
+    split_rule_path
+from scanner import ProjectInventory, DirectoryEntry
+from shared_utility import SHARED_UTILITY_MODULE_NAME, ExtensionSizes, compile_shared_utility, \
+    get_baseline_variant, get_shared_utility_name, get_size_variant
+from sync import SYNC_MODE_COPY, SYNC_MODE_CHECKSUM, sync_tree
+from tracing import Tracer
 
 
 def get_files_of_directory(dir_abs_path: str, file_handler: Callable, package_handler: Callable,
-                           ignore: dict = None, abandoned_files: list = None) -> str:
+                           ignore: dict = None, abandoned_files: list = None,
+                           inventory: ProjectInventory = None) -> str:
     """
     获取文件夹下的文件
 
@@ -33,42 +55,62 @@ def get_files_of_directory(dir_abs_path: str, file_handler: Callable, package_ha
         package_handler (callable): python包处理方法
         ignore (dict): 文件/文件夹忽略规则
         abandoned_files (list): 不遍历的文件夹
+        inventory (ProjectInventory): 项目文件清单, 为空时遍历dir_abs_path生成
 
     Returns:
         file_abs_path (str): 遍历的文件
     """
-    if not os.path.exists(dir_abs_path):
-        raise FileNotFoundError(dir_abs_path)
+    if inventory is None:
+        inventory = ProjectInventory(dir_abs_path, abandoned_files=abandoned_files)
+        directory = inventory.root
+    else:
+        directory = inventory.get_dir(dir_abs_path.split(INPUT_DIR)[-1])
+        if directory is None:
+            raise FileNotFoundError(dir_abs_path)
 
-    for root, dirs, files in list(os.walk(dir_abs_path))[:1]:  # 只遍历顶级目录
+    for file_abs_path in _get_files_of_inventory_dir(directory, file_handler, package_handler):
+        yield file_abs_path
 
-        # 处理文件
-        for file in files:
-            if file.endswith('.c') or (file in abandoned_files):
-                # 忽略.c文件以及隐藏文件
-                continue
 
-            file_abs_path = os.path.join(root, file)  # 绝对路径
-            file_retrieve_path = file_abs_path.split(INPUT_DIR)[1]  # 相对路径(待编译项目的根目录)
-            file_handler(file_retrieve_path)
-            yield file_abs_path
+def _get_files_of_inventory_dir(directory: DirectoryEntry, file_handler: Callable,
+                                package_handler: Callable) -> str:
+    """
+    获取清单中文件夹下的文件
 
-        # 处理子目录
-        for dir_ in dirs:
-            if dir_ in abandoned_files:
-                # 忽略文件夹
-                continue
+    Args:
+        directory (DirectoryEntry): 待遍历文件夹
+        file_handler (callable): python文件处理方法
+        package_handler (callable): python包处理方法
 
-            dir_abs_path_ = os.path.join(root, dir_)  # 绝对路径
-            dir_retrieve_path_ = dir_abs_path_.split(INPUT_DIR)[1]  # 相对路径(待编译项目的根目录)
+    Returns:
+        file_abs_path (str): 遍历的文件
+    """
+    # 处理文件
+    for file in directory.files:
+        if file.name.endswith('.c'):
+            # 忽略.c文件
+            continue
+        file_handler(file.path)
+        yield file.abs_path
+
+    # 处理子目录
+    for dir_ in directory.dirs:
+        if package_handler(dir_.path):
+            for file_abs_path in _get_files_of_inventory_dir(dir_, file_handler, package_handler):
+                yield file_abs_path
+
+
+def get_build_lib() -> str:
+    """
+    获取build/lib.xxx-cpython-xxx文件夹名称, 无需执行编译
 
-            if package_handler(dir_retrieve_path_):
-                results = get_files_of_directory(
-                    dir_abs_path=dir_abs_path_, ignore=ignore,
-                    abandoned_files=abandoned_files, file_handler=file_handler,
-                    package_handler=package_handler)
-                for file_abs_path in results:
-                    yield file_abs_path
+    Returns:
+        build_lib (str):
+    """
+    dist_obj = Distribution(dict(ext_modules=[Extension('_', ['_.c'])]))
+    build_ext_obj = dist_obj.get_command_obj(command='build_ext')
+    build_ext_obj.ensure_finalized()
+    return getattr(build_ext_obj, 'build_lib')
 
 
 class FileCompilingFilterRulesParser(object):
@@ -105,6 +147,27 @@ class FileCompilingFilterRulesParser(object):
                             ]
                     )
 
+    # 合并编译的python包(含子包), 相对于项目根目录, 与编译规则同时生效
+    amalgamated_packages = [
+                            '/xxx',
+                            '/xxx/xxx',
+                            ...
+                        ]
+
+    # Cython编译指令, 按 全局 -> 文件夹 -> 文件 的顺序合并, 后者覆盖前者;
+    # 文件夹及文件规则按路径分段匹配(在'/'处对齐, 不是忽略编译规则的子串匹配), 命中多个规则时按由宽泛到具体的顺序合并
+    compiler_directives = dict(
+                            global=dict(language_level=3),
+                            packages={
+                                '/xxx': dict(boundscheck=False),
+                                ...
+                            },
+                            files={
+                                '/xxx/xxx.py': dict(cdivision=True),
+                                ...
+                            }
+                        )
+
     """
     RULE_TYPE_MAPPINGS = {
         'ignored': 'IGNORED',  # 不编译
@@ -151,6 +214,47 @@ class FileCompilingFilterRulesParser(object):
                                                                                          self.rules[self.type][
                                                                                              'reserved_files'])
 
+        self.amalgamated_packages = self._preprocess_amalgamated_packages(
+            self.project_config.get('amalgamated_packages'))
+        self._load_compiler_directives(self.project_config.get('compiler_directives') or dict())
+
+        self._build_rule_index()
+
+    def _build_rule_index(self) -> None:
+        """
+        构建规则索引, 只在加载规则时执行一次
+
+            规则按字面匹配('.'不是通配符), 其余与逐条re.search及字符串前缀比较的结果相同;
+            文件规则及忽略编译的文件夹规则包含其他正则表达式元字符时, 仍按re.search匹配, 见SubstringRuleIndex:
+            files_rule_index: 文件规则, 路径中包含规则时命中, 例如'a.py'命中'x/a.py'及'x/data.py'
+            packages_rule_index: 忽略编译的文件夹规则, 以'/'结尾的文件夹路径中包含以'/'结尾的规则时命中;
+                                 保留编译的文件夹规则, 文件路径以规则开头时命中
+            parent_packages_rule_index: 保留编译的文件夹规则及保留编译文件的上级文件夹(以'/'结尾),
+                                        文件夹与规则相同, 位于规则之下或为规则的上级文件夹时命中
+            amalgamated_packages_index: 合并编译的python包, 路径位于其下时命中
+
+        Returns:
+
+        """
+        self.files_rule_index = SubstringRuleIndex()
+        self.packages_rule_index = SubstringRuleIndex()
+        self.parent_packages_rule_index = PrefixRuleIndex()
+        self.amalgamated_packages_index = PathSegmentTrie()
+        for package in self.amalgamated_packages:
+            self.amalgamated_packages_index.insert(package.split('/'), package)
+
+        if self.is_ignored_rules():
+            self.files_rule_index = SubstringRuleIndex(self.rules[self.type]['ignored_files'])
+            self.packages_rule_index = SubstringRuleIndex(
+                rule if rule.endswith('/') else rule + '/' for rule in self.rules[self.type]['ignored_packages'])
+
+        elif self.is_reserved_rules():
+            self.files_rule_index = SubstringRuleIndex(self.rules[self.type]['reserved_files'])
+            self.packages_rule_index = PrefixRuleIndex(self.rules[self.type]['reserved_packages'])
+            self.parent_packages_rule_index = PrefixRuleIndex(
+                rule + '/' for rule in self.rules[self.type]['reserved_packages'] + self.reserved_package_rules_extend)
+        return None
+
     def is_ignored_rules(self) -> bool:
         """是否为忽略编译类型"""
         return self.type == self.RULE_TYPE_MAPPINGS['ignored']
@@ -177,7 +281,7 @@ class FileCompilingFilterRulesParser(object):
             rules (list):
         """
         results = list()
-        for rule in rules:
+        for rule in rules or list():
             if rule.startswith('/{}'.format(self.project_name)):
                 rule = rule[1:]
             results.append(rule)
@@ -185,37 +289,29 @@ class FileCompilingFilterRulesParser(object):
 
     def is_ignored_file(self, name: str) -> bool:
         """是否为编译忽略的文件"""
-        is_ignored = False
+        return self.match_ignored_file(name) is not None
+
+    def match_ignored_file(self, name: str) -> Optional[str]:
+        """命中的文件忽略规则, 未命中时为None"""
         if (not self.type) or (self.type != self.RULE_TYPE_MAPPINGS['ignored']):
-            return is_ignored
-        rules = self.rules[self.type]['ignored_files']
-        for rule in rules:
-            if re.search(rule, name):
-                is_ignored = True
-                break
-        return is_ignored
+            return None
+        return self.files_rule_index.match(name)
 
     def is_reserved_file(self, name: str) -> bool:
         """是否为保留编译文件"""
-        is_reserved = False
+        return self.match_reserved_file(name) is not None
+
+    def match_reserved_file(self, name: str) -> Optional[str]:
+        """命中的文件或文件夹保留规则, 未命中时为None"""
         if (not self.type) or (self.type != self.RULE_TYPE_MAPPINGS['reserved']):
-            return is_reserved
+            return None
         # 1.文件保留规则
-        rules = self.rules[self.type]['reserved_files']
-        for rule in rules:
-            if re.search(rule, name):
-                is_reserved = True
-                break
+        rule = self.files_rule_index.match(name)
+        if rule is not None:
+            return rule
 
         # 2.文件夹保留规则
-        if not is_reserved:
-            rules = self.rules[self.type]['reserved_packages']
-            for rule in rules:
-                if name.startswith(rule):
-                    is_reserved = True
-                    break
-
-        return is_reserved
+        return self.packages_rule_index.match(name)
 
     #########################################################
     #                     python包处理                       #
@@ -235,7 +331,7 @@ class FileCompilingFilterRulesParser(object):
             rules (list):
         """
         results = list()
-        for rule in rules:
+        for rule in rules or list():
             if rule.startswith('/{}'.format(self.project_name)):
                 rule = rule[1:]
             results.append(rule)
@@ -252,41 +348,128 @@ class FileCompilingFilterRulesParser(object):
 
     def is_ignored_package(self, name: str) -> bool:
         """是否为编译忽略的文件夹"""
-        is_ignored = False
+        return self.match_ignored_package(name) is not None
+
+    def match_ignored_package(self, name: str) -> Optional[str]:
+        """命中的文件夹忽略规则, 未命中时为None"""
         if (not self.type) or (self.type != self.RULE_TYPE_MAPPINGS['ignored']):
-            return is_ignored
-        name = name if name.endswith('/') else name + '/'
-        rules = self.rules[self.type]['ignored_packages']
-        for rule in rules:
-            rule = rule if rule.endswith('/') else rule + '/'
-            if re.search(rule, name):
-                is_ignored = True
-                break
-        return is_ignored
+            return None
+        return self.packages_rule_index.match(name if name.endswith('/') else name + '/')
+
+    def _preprocess_amalgamated_packages(self, packages: list) -> list:
+        """
+        对合并编译的python包进行预处理, 统一为以项目名称开头的相对路径
+
+            待处理项目名称为django_server, '/django_server/xxx', '/xxx', 'xxx'均转为'django_server/xxx'
+
+        Args:
+            packages (list):
+
+        Returns:
+            packages (list):
+        """
+        results = list()
+        for package in packages or list():
+            package = package.strip('/')
+            if package != self.project_name and not package.startswith('{}/'.format(self.project_name)):
+                package = '{}/{}'.format(self.project_name, package)
+            results.append(package)
+        return results
+
+    #########################################################
+    #                    Cython编译指令                       #
+    #########################################################
+    @staticmethod
+    def _validate_compiler_directives(directives: dict, where: str) -> dict:
+        """
+        校验Cython编译指令名称
+
+        Args:
+            directives (dict): Cython编译指令
+            where (str): 所在的配置项, 用于报错
+
+        Returns:
+            directives (dict):
+        """
+        if not isinstance(directives, dict):
+            raise ValueError("Cython编译指令必须为字典: {}".format(where))
+        for directive in directives:
+            if directive not in directive_types:
+                raise ValueError("不支持的Cython编译指令: {} ({})".format(directive, where))
+        return dict(directives)
+
+    def _load_compiler_directives(self, config: dict) -> None:
+        """
+        加载Cython编译指令并构建索引
+
+        Args:
+            config (dict): 项目配置中的compiler_directives
+
+        Returns:
+
+        """
+        self.global_compiler_directives = self._validate_compiler_directives(config.get('global') or dict(),
+                                                                             'global')
+        self.package_compiler_directives = dict()
+        self.package_directives_index = PathSegmentTrie()
+        for rule, directives in (config.get('packages') or dict()).items():
+            preprocessed_rule = self._preprocess_files_rules([rule])[0]
+            self.package_compiler_directives[preprocessed_rule] = self._validate_compiler_directives(
+                directives, 'packages: {}'.format(rule))
+            self.package_directives_index.insert(split_rule_path(preprocessed_rule), preprocessed_rule)
+
+        self.file_compiler_directives = dict()
+        for rule, directives in (config.get('files') or dict()).items():
+            preprocessed_rule = self._preprocess_files_rules([rule])[0]
+            self.file_compiler_directives[preprocessed_rule] = self._validate_compiler_directives(
+                directives, 'files: {}'.format(rule))
+        self.file_directives_index = SuffixRuleIndex(self.file_compiler_directives)
+        return None
+
+    def get_compiler_directives(self, name: str) -> dict:
+        """
+        文件的Cython编译指令(不含默认编译指令)
+
+        Args:
+            name (str): 文件相对路径
+
+        Returns:
+            directives (dict):
+        """
+        directives = dict(self.global_compiler_directives)
+        # 文件夹规则: 在路径中的位置越深越具体, 位置相同时规则越短越宽泛
+        matches = sorted(self.package_directives_index.iter_contains(split_rule_path(name)[:-1]),
+                         key=lambda match: (match[1], match[1] - match[0]))
+        for _, _, rule in matches:
+            directives.update(self.package_compiler_directives[rule])
+        for rule in self.file_directives_index.match_all(name):
+            directives.update(self.file_compiler_directives[rule])
+        return directives
+
+    def match_amalgamated_package(self, name: str) -> Optional[str]:
+        """文件所属的合并编译python包, 不属于时为None; 配置了嵌套的python包时, 以上级python包为准"""
+        return self.amalgamated_packages_index.match_prefix(name.split('/')[:-1])
 
     def is_reserved_package(self, name: str) -> bool:
-        """是否为保留编译文件夹"""
-        is_reserved = False
-        if (not self.type) or (self.type != self.RULE_TYPE_MAPPINGS['reserved']):
-            return is_reserved
-        rules = self.rules[self.type]['reserved_packages'] + self.reserved_package_rules_extend
+        """是否为保留编译文件夹: 保留编译的父文件夹, 待保留编译的文件夹及其子文件夹"""
+        return self.match_reserved_package(name) is not None
 
-        for rule in rules:
+    def match_reserved_package(self, name: str) -> Optional[str]:
+        """命中的文件夹保留规则, 未命中时为None"""
+        if (not self.type) or (self.type != self.RULE_TYPE_MAPPINGS['reserved']):
+            return None
+        return self.parent_packages_rule_index.match_prefix_or_extension(name + '/')
 
-            if rule.startswith('{}/'.format(name)):
-                # 保留编译的父文件夹
-                is_reserved = True
-                break
-            elif rule == name:
-                # 待保留编译的文件夹
-                is_reserved = True
-                break
-            elif name.startswith('{}/'.format(rule)):
-                # 待保留编译文件夹的子文件夹
-                is_reserved = True
-                break
 
-        return is_reserved
+class PendingCompile(NamedTuple):
+    """待编译文件的编译状态, 见compile_pending_files"""
+    pending_files: List[str]  # 单独编译的文件, 按遍历顺序
+    bundles: Dict[str, List[str]]  # 合并编译的python包 -> 其中的文件
+    names: List[str]  # 未命中编译缓存及编译日志, 需要编译的文件, 按预计耗时由长到短排序
+    bundles_to_compile: Dict[str, List[str]]  # 需要编译的合并编译python包
+    so_files: Dict[str, str]  # 文件(合并编译时为python包) -> 编译文件的相对路径
+    cache_keys: Dict[str, str]  # 未命中编译缓存的文件 -> 编译缓存键
+    signatures: Dict[str, str]  # 文件(合并编译时为python包) -> 编译日志中的签名
 
 
 class PythonCodeCompilingBase(object):
@@ -294,18 +477,110 @@ class PythonCodeCompilingBase(object):
     # 默认忽略的文件/文件夹
     DEFAULT_IGNORED_FILES = DEFAULT_IGNORED_FILES
 
-    def __init__(self, project_config: str, dir_path: str, no_cache: bool = False):
+    def __init__(self, project_config: str, dir_path: str, no_cache: bool = False, jobs: int = None,
+                 build_cache: bool = True, build_cache_size: int = DEFAULT_BUILD_CACHE_SIZE,
+                 translate_jobs: int = None, queue_size: int = None, object_cache: bool = True,
+                 object_cache_dir: str = OBJECT_CACHE_DIR, object_cache_size: int = DEFAULT_OBJECT_CACHE_SIZE,
+                 sync_mode: str = SYNC_MODE_COPY, materialize: str = MATERIALIZE_COPY, dry_run: bool = False,
+                 trace_path: str = None, top: int = 10, profile: str = None, pgo_workload: str = None,
+                 mem_budget: int = None, workers: List[str] = None, archive_format: str = None, output_tree: bool = True,
+                 shared_utility: bool = False, strip: bool = False, preflight: str = PREFLIGHT_REPORT,
+                 keep_going: bool = False, resume: bool = False, compile_executor: CompileExecutor = None,
+                 clean_build: bool = True):
         """
         Args:
             dir_path (str):
             no_cache (bool): input目录是否保留上次拷贝的项目
+            jobs (int): C编译的进程数, 默认为CPU核数; 与translate_jobs均为1时串行编译
+            build_cache (bool): 是否复用未变更模块上次编译的.so文件
+            build_cache_size (int): 编译缓存总大小上限(字节)
+            translate_jobs (int): cythonize的进程数, 默认与jobs相同
+            queue_size (int): 已生成.c文件但未开始C编译的模块数上限, 默认为jobs的2倍
+            object_cache (bool): 是否使用C编译缓存, 预处理后的C文件相同时跳过C编译
+            object_cache_dir (str): C编译缓存文件夹, 可在多个项目之间共享
+            object_cache_size (int): C编译缓存总大小上限(字节)
+            sync_mode (str): 源项目同步至input目录的方式
+                             copy: 由no_cache决定是否删除后整体拷贝;
+                             mtime/checksum: 按文件大小及修改时间/内容哈希增量同步
+            materialize (str): 输出文件的生成方式: copy/hardlink/reflink/copy_file_range, 不支持时回退为拷贝
+            dry_run (bool): 只输出编译计划, 不清空build/输出目录, 不执行编译及拷贝
+            trace_path (str): 各阶段及各模块耗时的导出文件(Chrome trace-event格式), 为空时不导出
+            top (int): 编译结束后输出的最慢模块数
+            profile (str): 编译配置名称(debug/release/lto/pgo或项目配置中的自定义编译配置), 默认使用项目配置中的build_profile
+            pgo_workload (str): PGO编译时运行的workload脚本, 默认使用项目配置中的pgo_workload(相对于源项目文件夹)
+            mem_budget (int): 并行C编译的内存预算(字节), 按预计峰值内存暂缓提交编译, 为空时不限制
+            workers (list): 编译节点地址(host:port), C编译同时分发至编译节点, 为空时只在本机编译
+            archive_format (str): 编译结果直接写入的归档文件格式(wheel/tar.zst/zip), 位于输出目录, 为空时不生成
+            output_tree (bool): 是否生成输出目录下的项目文件夹, 为False时只生成归档文件
+            shared_utility (bool): 是否将Cython的工具代码编译为项目共享的扩展模块(<项目>._cyutility), 各模块不再内嵌
+            strip (bool): 是否在链接时去除扩展模块的符号表及调试信息
+            preflight (str): 编译前预检: off不检查; report输出已知无法编译的写法; demote同时将存在错误的模块改为拷贝源文件
+            keep_going (bool): 模块编译失败时是否继续编译其他模块, 失败的模块不输出, 编译结束后汇总
+            resume (bool): 是否按编译日志续编: 保留build文件夹, 跳过上次已完成且未变更的模块
+            compile_executor (CompileExecutor): 调用方持有的C编译执行器(批量编译时各项目共享), 指定时使用两阶段流水线,
+                                                编译结束时不关闭; 为空时按jobs及workers创建
+            clean_build (bool): 是否清空build文件夹, 批量编译时由调用方在开始时统一清空
         """
+        self.tracer = Tracer()
+        self.trace_path = trace_path
+        self.top = top
         self.source_dir = self._validate_dir(dir_path)
         self.no_cache = no_cache
-        self.input_dir, self.out_dir, self.project_name = self._prepare_dirs()
+        self.sync_mode = sync_mode
+        self.changed_files: Optional[Set[str]] = None  # 增量同步时变更的文件, 为None时视为全部变更
+        self.materializer = Materializer(materialize)
+        self.dry_run = dry_run
+        self.keep_going = keep_going
+        self.resume = resume
+        self.failures: Dict[str, str] = dict()  # 编译失败的模块(合并编译时为python包) -> 错误信息
+        self.journal: Optional[BuildJournal] = None  # 本次编译的编译日志, 见run
+        self.time_start = time.time()  # 本次编译的开始时间, 见start
+        self.archive_path: Optional[str] = None  # 本次编译生成的归档文件, 见complete
+        self.jobs = jobs or os.cpu_count() or 1
+        self.translate_jobs = translate_jobs or self.jobs
+        self.queue_size = queue_size
+        self.mem_budget = mem_budget
+        self.workers = list(workers or list())
+        self.compile_executor = compile_executor
+        self.clean_build = clean_build
+        self.archive_format = archive_format
+        self.output_tree = output_tree
+        if not output_tree and not archive_format:
+            raise ValueError("不生成输出文件夹时需要指定归档格式")
+        self.archive: Optional[ArchiveWriter] = None  # 本次编译的归档文件, 见run
+        with self.tracer.span('prepare'):
+            self.input_dir, self.out_dir, self.project_name = self._prepare_dirs()
         self.file_rule_parser: FileCompilingFilterRulesParser = FileCompilingFilterRulesParser(self.project_name,
                                                                                                project_config)
         self.build_lib_path = None
+        self.inventory: Optional[ProjectInventory] = None  # 项目文件清单, 见make_plan
+        self.plan: Optional[BuildPlan] = None  # 编译计划, 见make_plan
+        self.history = BuildHistory(self.project_name)  # 历史编译耗时, 用于调度编译顺序
+        self.depgraph = DependencyGraph(self.project_name)  # 模块依赖关系图, 用于按编译依赖判断需要重新编译的模块
+        self.preflight_mode = preflight
+        self.preflight = Preflight(self.project_name) if preflight != PREFLIGHT_OFF else None  # 编译前预检
+        self.pending_files: List[str] = list()  # 遍历时收集的待编译文件, 遍历结束后统一编译
+        # 全局Cython编译指令, 各文件的编译指令见get_compiler_directives
+        self.compiler_directives = dict(DEFAULT_COMPILER_DIRECTIVES,
+                                        **self.file_rule_parser.global_compiler_directives)
+        project_config_data = self.file_rule_parser.project_config
+        self.profile: BuildProfile = resolve_build_profile(profile or project_config_data.get('build_profile'),
+                                                           project_config_data.get('build_profiles'))
+        if strip:
+            self.profile = self.profile.with_strip()
+        if resume and self.profile.pgo:
+            raise ValueError("PGO编译不支持续编")
+        self.shared_utility: Optional[str] = None  # 共享工具模块的完整模块名称
+        if shared_utility:
+            self.shared_utility = self._validate_shared_utility()
+        self._shared_utility_builds: Dict[str, str] = dict()  # 本进程已编译的共享工具模块: 编译配置名称 -> 编译文件
+        self.extension_sizes = ExtensionSizes(self.project_name)  # 各扩展模块在不同变体下的大小
+        self.pgo_workload = pgo_workload
+        if not self.pgo_workload and project_config_data.get('pgo_workload'):
+            self.pgo_workload = os.path.join(self.source_dir, project_config_data['pgo_workload'])
+        self.build_cache: Optional[BuildCache] = BuildCache(max_size=build_cache_size) if build_cache else None
+        self.object_cache: Optional[ObjectCache] = ObjectCache(
+            cache_dir=object_cache_dir, max_size=object_cache_size) if object_cache else None
 
     def _validate_dir(self, dir_path: str) -> str:
         """
@@ -323,6 +598,20 @@ class PythonCodeCompilingBase(object):
             return dir_path
         raise FileNotFoundError(dir_path)
 
+    def _validate_shared_utility(self) -> str:
+        """
+        校验共享工具模块: 位于项目根目录的python包中, 不能与项目中的文件重名
+
+        Returns:
+            name (str): 共享工具模块的完整模块名称
+        """
+        if not os.path.exists(os.path.join(self.input_dir, '__init__.py')):
+            raise ValueError("共享工具模块需要项目根目录为python包: {}".format(self.input_dir))
+        for file_name in os.listdir(self.input_dir):
+            if file_name.split('.')[0] == SHARED_UTILITY_MODULE_NAME:
+                raise ValueError("项目中已存在与共享工具模块重名的文件: {}".format(file_name))
+        return get_shared_utility_name(self.project_name)
+
     def _prepare_dirs(self) -> (str, str):
         """
         准备文件夹
@@ -335,7 +624,15 @@ class PythonCodeCompilingBase(object):
 
         # 1.复制源文件夹至输入目录下
         input_dir = os.path.join(INPUT_DIR, dirname)
-        if not os.path.exists(input_dir):
+        if self.sync_mode != SYNC_MODE_COPY:
+            if os.path.abspath(self.source_dir) != os.path.abspath(input_dir):
+                result = sync_tree(self.source_dir, input_dir, abandoned_files=PASS_THROUGH_IGNORED_FILES,
+                                   checksum=self.sync_mode == SYNC_MODE_CHECKSUM)
+                self.changed_files = result.changed_files
+                print("待编译文件夹已同步: [{}], {}".format(input_dir, result))
+            else:
+                print("待编译文件夹已存在: [{}]".format(input_dir))
+        elif not os.path.exists(input_dir):
             shutil.copytree(self.source_dir, input_dir)
             print("待编译文件夹已拷贝: [{}]".format(input_dir))
         else:
@@ -346,36 +643,386 @@ class PythonCodeCompilingBase(object):
             else:
                 print("待编译文件夹已存在: [{}]".format(input_dir))
 
-        # 2.清空整个编译文件夹
-        if os.path.exists(BUILD_DIR):
+        output_dir = os.path.join(OUTPUT_DIR, dirname)
+        if self.dry_run:
+            return input_dir, output_dir, dirname
+
+        # 续编时保留上次编译的.so文件
+        self._clean_build_dirs(output_dir, keep_build=self.resume or not self.clean_build, output_tree=self.output_tree)
+        return input_dir, output_dir, dirname
+
+    @staticmethod
+    def _clean_build_dirs(output_dir: str, keep_build: bool = False, output_tree: bool = True) -> None:
+        """
+        清空编译文件夹及输出目录下该项目的文件夹
+
+        Args:
+            output_dir (str): 输出目录下该项目的文件夹
+            keep_build (bool): 是否保留编译文件夹
+            output_tree (bool): 是否生成输出目录下的项目文件夹, 为False时不删除及创建
+
+        Returns:
+
+        """
+        # 1.清空整个编译文件夹
+        if os.path.exists(BUILD_DIR) and not keep_build:
             shutil.rmtree(BUILD_DIR)
             print("build文件夹已删除: [{}]".format(BUILD_DIR))
 
-        # 3.删除并重新创建输出目录下该文件夹
-        output_dir = os.path.join(OUTPUT_DIR, dirname)
+        # 2.删除并重新创建输出目录下该文件夹
+        if not output_tree:
+            return None
         if os.path.exists(output_dir):
             shutil.rmtree(output_dir)
         os.mkdir(output_dir)
         print("编译后的输出文件夹已创建: [{}]".format(output_dir))
-
-        return input_dir, output_dir, dirname
+        return None
 
     def run(self):
+        if not self.start():
+            return None
+        try:
+            if self.profile.pgo:
+                self.execute_pgo_plan()
+            else:
+                self.execute_plan()
+            self.complete()
+        finally:
+            self.close()
+        self.summary()
+
+    def start(self) -> bool:
+        """
+        开始编译: 生成编译计划, 打开编译日志及归档文件
+
+        Returns:
+            result (bool): 是否继续编译, dry_run时输出编译计划后为False
+        """
         print()
         print(">" * 50)
-        time_start = time.time()
-        [file_abs_path for file_abs_path in get_files_of_directory(
-            dir_abs_path=self.input_dir,
-            abandoned_files=self.DEFAULT_IGNORED_FILES,
-            file_handler=self.handle_file,
-            package_handler=self.handle_package
-        )]
+        self.time_start = time.time()
+        self.archive_path = None
+        # 同一进程中多次编译(批量编译, 测试)时, cythonize不能沿用上次编译缓存的修改时间
+        reset_dependency_tree()
+        self.make_plan()
+        if self.dry_run:
+            self.plan.show(self.history)
+            return False
+
+        self.failures = dict()
+        if not self.profile.pgo:
+            self.journal = BuildJournal(self.project_name, self._journal_fingerprint, resume=self.resume)
+        if self.archive_format:
+            self.archive = create_archive_writer(OUTPUT_DIR, self.project_name, self.archive_format, jobs=self.jobs,
+                                                 version=self.file_rule_parser.project_config.get('version'))
+        return True
+
+    def complete(self) -> None:
+        """编译计划执行完成: 记录编译日志, 生成归档文件"""
+        if self.journal is not None:
+            self.journal.finish(len(self.failures))
+        if self.archive is not None and self.failures:
+            print("存在编译失败的模块, 不生成归档文件")
+        elif self.archive is not None:
+            with self.tracer.span('archive'):
+                self.archive_path = self.archive.close()
+            self.archive.report()
+        return None
+
+    def close(self) -> None:
+        """关闭编译日志, 丢弃未完成的归档文件, 无论编译是否成功都需要调用"""
+        if self.archive is not None:
+            self.archive.discard()
+        # 归档文件只记录完整编译的结果, watch模式的增量编译只更新输出文件夹
+        self.archive = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        return None
+
+    def summary(self) -> None:
+        """输出各阶段耗时, 输出位置及编译失败的模块"""
+        self.materializer.report()
         time_end = time.time()
-        seconds_cost = time_end - time_start
+        seconds_cost = time_end - self.time_start
         print()
+        self.tracer.summary(self.top)
+        if self.trace_path:
+            self.tracer.export(self.trace_path)
         print(">" * 50)
         print("本次编译共耗时: {}".format(seconds_cost))
-        print("结果输出文件夹: {}".format(os.path.join(self.out_dir)))
+        if self.output_tree:
+            print("结果输出文件夹: {}".format(os.path.join(self.out_dir)))
+        if self.archive_path:
+            print("结果归档文件: {}".format(self.archive_path))
+        if self.failures:
+            print("编译失败{}个模块, 未输出, 修复后可使用--resume只重新编译失败及未完成的模块:".format(len(self.failures)))
+            for name, error in sorted(self.failures.items()):
+                print("  {}: {}".format(name, error))
+
+    def make_plan(self) -> BuildPlan:
+        """
+        遍历项目, 生成编译计划
+
+        Returns:
+            plan (BuildPlan):
+        """
+        with self.tracer.span('scan'):
+            self.inventory = ProjectInventory(self.input_dir, abandoned_files=self.DEFAULT_IGNORED_FILES)
+        with self.tracer.span('depgraph'):
+            parsed = self.depgraph.update(self.inventory)
+            if parsed and not self.dry_run:
+                self.depgraph.save()
+            if self.changed_files is not None:
+                self.changed_files = self.expand_changed_files(self.changed_files)
+        with self.tracer.span('plan'):
+            self.plan = BuildPlan()
+            [file_abs_path for file_abs_path in get_files_of_directory(
+                dir_abs_path=self.input_dir,
+                abandoned_files=self.DEFAULT_IGNORED_FILES,
+                file_handler=self.handle_file,
+                package_handler=self.handle_package,
+                inventory=self.inventory
+            )]
+        if self.preflight is not None:
+            with self.tracer.span('preflight'):
+                self.preflight_plan()
+        return self.plan
+
+    def preflight_plan(self) -> None:
+        """
+        编译前预检: 检查编译计划中待编译的模块, demote模式时将存在错误的模块改为拷贝源文件
+
+        Returns:
+
+        """
+        actions = self.plan.get_actions(ACTION_COMPILE)
+        if not actions:
+            return None
+        files = list()
+        for action in actions:
+            file = self.inventory.get_file(action.name)
+            files.append((action.name, file.abs_path, file.size, file.mtime_ns,
+                          self.get_compiler_directives(action.name).get('annotation_typing', True)))
+        issues = self.preflight.scan(files, jobs=max(self.jobs, self.translate_jobs))
+        if not self.dry_run:
+            self.preflight.save([action.name for action in actions])
+
+        demoted = list()
+        if self.preflight_mode == PREFLIGHT_DEMOTE:
+            for action in actions:
+                errors = [issue for issue in issues.get(action.name, ()) if issue.severity == SEVERITY_ERROR]
+                if errors:
+                    action.kind = ACTION_COPY_FILE
+                    action.reason = '预检错误, 改为拷贝源文件: {}:{} [{}]'.format(
+                        errors[0].line, errors[0].col, errors[0].check)
+                    demoted.append(action.name)
+        if issues:
+            self.preflight.report(issues, len(actions), demoted)
+        return None
+
+    def execute_plan(self) -> None:
+        """
+        执行编译计划: 按遍历顺序拷贝源文件/文件夹, 按预计耗时由长到短编译python文件
+
+        Returns:
+
+        """
+        self.copy_plan_files()
+        self.compile_pending_files()
+        return None
+
+    def copy_plan_files(self) -> None:
+        """按遍历顺序拷贝源文件/文件夹, 收集待编译的python文件"""
+        with self.tracer.span('copy'):
+            for action in self.plan.actions:
+                if action.kind == ACTION_COPY_FILE:
+                    self.copy_source_file(action.name)
+                elif action.kind == ACTION_COPY_DIR:
+                    self.copy_source_dir(action.name)
+                elif action.kind == ACTION_COMPILE:
+                    self.pending_files.append(action.name)
+        return None
+
+    def execute_pgo_plan(self) -> None:
+        """
+        PGO编译: 插桩编译 -> 以输出目录运行workload生成profile数据 -> 清空编译结果, 使用profile数据重新编译
+
+            profile数据不在缓存键中, PGO编译不使用编译缓存及C编译缓存
+
+        Returns:
+
+        """
+        if not self.pgo_workload:
+            raise ValueError("PGO编译需要指定workload脚本(pgo_workload)")
+        profile, build_cache, object_cache = self.profile, self.build_cache, self.object_cache
+        profile_dir = os.path.join(PGO_DIR, self.project_name)
+        if os.path.exists(profile_dir):
+            shutil.rmtree(profile_dir)
+        os.makedirs(profile_dir)
+
+        self.build_cache, self.object_cache = None, None
+        archive, output_tree = self.archive, self.output_tree
+        try:
+            # 1.插桩编译, workload以输出文件夹运行, 插桩编译的结果不写入归档文件
+            with self.tracer.span('pgo_generate'):
+                self.profile = profile.with_pgo_stage(PGO_STAGE_GENERATE, profile_dir)
+                self.archive, self.output_tree = None, True
+                self.execute_plan()
+
+            # 2.运行workload
+            with self.tracer.span('pgo_workload'):
+                count = run_pgo_workload(self.pgo_workload, OUTPUT_DIR, profile_dir)
+            print("PGO profile数据已生成: [{}], {}个文件".format(profile_dir, count))
+
+            # 3.使用profile数据重新编译; 编译文件夹路径不变, .gcda文件按目标文件路径匹配
+            self._clean_build_dirs(self.out_dir, output_tree=output_tree)
+            if not output_tree:
+                # 插桩编译的输出文件夹只用于运行workload
+                shutil.rmtree(self.out_dir)
+            with self.tracer.span('pgo_use'):
+                self.profile = profile.with_pgo_stage(PGO_STAGE_USE, profile_dir)
+                self.archive, self.output_tree = archive, output_tree
+                self.execute_plan()
+        finally:
+            self.profile, self.build_cache, self.object_cache = profile, build_cache, object_cache
+            self.archive, self.output_tree = archive, output_tree
+        return None
+
+    def rebuild(self, changed_files: Optional[Set[str]] = None) -> None:
+        """
+        增量编译(watch模式): 同步变更的文件, 重新生成编译计划, 只编译/拷贝/删除变更的文件, 不清空build及输出目录
+
+            合并编译的python包中任一模块或__init__.py变更时, 重新编译整个python包;
+            编译依赖(.pxd/.pxi文件)变更时重新编译依赖其的模块(见DependencyGraph)
+
+        Args:
+            changed_files (set): 变更的文件(相对于input目录), 以'/'结尾的为文件夹;
+                                 源项目不在input目录时以同步结果为准; 为None时视为全部变更
+
+        Returns:
+
+        """
+        time_start = time.time()
+        self.tracer = Tracer()
+        self.failures = dict()
+        reset_dependency_tree()
+        previous_files = set(self.inventory.files) if self.inventory is not None else set()
+        self.changed_files = None
+        if os.path.abspath(self.source_dir) != os.path.abspath(self.input_dir):
+            with self.tracer.span('sync'):
+                result = sync_tree(self.source_dir, self.input_dir, abandoned_files=PASS_THROUGH_IGNORED_FILES,
+                                   checksum=self.sync_mode == SYNC_MODE_CHECKSUM)
+            print("待编译文件夹已同步: [{}], {}".format(self.input_dir, result))
+            changed_files = result.changed_files
+        self.make_plan()
+        if changed_files is None:
+            changed_files = previous_files | set(self.inventory.files)
+        else:
+            # 删除或移动的文件夹: 按上次的文件清单展开
+            changed_dirs = tuple(name for name in changed_files if name.endswith('/'))
+            changed_files = {name for name in changed_files if not name.endswith('/')}
+            if changed_dirs:
+                changed_files |= {name for name in previous_files | set(self.inventory.files)
+                                  if name.startswith(changed_dirs)}
+            changed_files = self.expand_changed_files(changed_files)
+        self.changed_files = changed_files
+
+        actions = {action.name: action for action in self.plan.actions}
+        copy_dirs = tuple(action.name + '/' for action in self.plan.get_actions(ACTION_COPY_DIR))
+        compiling, packages = set(), set()
+        with self.tracer.span('copy'):
+            for name in sorted(changed_files):
+                package = self.file_rule_parser.match_amalgamated_package(name)
+                action = actions.get(name)
+                if action is None:
+                    if self.inventory.get_file(name) is None:
+                        self.remove_output_file(name)
+                        if package is not None:
+                            packages.add(package)
+                    elif name.startswith(copy_dirs):
+                        self.copy_source_file(name)
+                elif action.kind == ACTION_COMPILE:
+                    compiling.add(name)
+                    self.remove_output_file(name, extension=False)
+                    if package is not None:
+                        packages.add(package)
+                else:
+                    self.copy_source_file(name)
+                    self.remove_output_file(name, source=False)
+                    if package is not None and name == '{}/__init__.py'.format(package):
+                        packages.add(package)
+
+        for action in self.plan.get_actions(ACTION_COMPILE):
+            if action.name not in compiling and \
+                    self.file_rule_parser.match_amalgamated_package(action.name) in packages:
+                compiling.add(action.name)
+        self.pending_files = [action.name for action in self.plan.get_actions(ACTION_COMPILE)
+                              if action.name in compiling]
+        self.compile_pending_files()
+
+        print()
+        self.tracer.summary(self.top)
+        print("增量编译: 变更{}个文件, 编译{}个模块, 耗时: {:.3f}秒".format(
+            len(changed_files), len(compiling), time.time() - time_start))
+        return None
+
+    def remove_output_file(self, name: str, source: bool = True, extension: bool = True) -> None:
+        """
+        删除输出目录中文件的拷贝及编译文件, 用于删除的文件及编译/拷贝方式变化的文件
+
+        Args:
+            name (str): 文件相对路径
+            source (bool): 是否删除拷贝的源文件
+            extension (bool): 是否删除python文件的编译文件
+
+        Returns:
+
+        """
+        target_files = [os.path.join(OUTPUT_DIR, name)] if source else list()
+        if extension and name.endswith('.py'):
+            target_files.extend(os.path.join(OUTPUT_DIR, name[:-3] + suffix) for suffix in EXTENSION_SUFFIXES)
+        for target_file in target_files:
+            if os.path.isfile(target_file):
+                os.remove(target_file)
+                print("已删除输出文件: [{}]".format(target_file))
+        return None
+
+    def expand_changed_files(self, changed_files: Set[str]) -> Set[str]:
+        """
+        将编译依赖变更的模块加入变更的文件, 并删除其.c文件(cythonize按修改时间判断时不一定能识别依赖变更)
+
+        Args:
+            changed_files (set): 新增, 变更或删除的文件
+
+        Returns:
+            changed_files (set): 含编译依赖变更的模块
+        """
+        affected = {name for name in self.depgraph.affected(changed_files) if self.is_python_file(name)}
+        if not affected:
+            return changed_files
+        print("编译依赖变更, 需要重新编译的模块: {}".format(', '.join(sorted(affected))))
+        if not self.dry_run:
+            for name in affected:
+                c_file = os.path.join(INPUT_DIR, name[:-3] + '.c')
+                if os.path.exists(c_file):
+                    os.remove(c_file)
+        return changed_files | affected
+
+    def get_dependency_hashes(self, name: str) -> Dict[str, str]:
+        """
+        模块编译依赖的内容哈希, 加入编译缓存键
+
+        Args:
+            name (str): 文件相对路径
+
+        Returns:
+            hashes (dict): 编译依赖的相对路径 -> 内容哈希
+        """
+        return {dependency: self.build_cache.get_source_hash(
+            dependency, os.path.join(INPUT_DIR, dependency),
+            unchanged=self.changed_files is not None and dependency not in self.changed_files)
+            for dependency in self.depgraph.get_compile_dependencies(name)}
 
     ########################################
     #                文件处理               #
@@ -383,7 +1030,7 @@ class PythonCodeCompilingBase(object):
 
     def handle_file(self, name: str) -> None:
         """
-        处理文件
+        处理文件: 判断是否编译, 并记录至编译计划
 
         Args:
             name (str): 待处理文件
@@ -391,33 +1038,52 @@ class PythonCodeCompilingBase(object):
         Returns:
 
         """
-        source_file = name
-        so_file = None
-
-        if (not self.is_python_file(name)) or name.endswith('__init__.py'):
-            # 非python文件或者__init__.py文件, 跳过编译
-            pass
+        compiling = False
+
+        if not self.is_python_file(name):
+            # 非python文件, 跳过编译
+            reason = '非python文件'
+        elif name.endswith('__init__.py'):
+            # __init__.py文件, 跳过编译
+            reason = '__init__.py不编译'
         else:
             # python文件
             if self.file_rule_parser.is_ignored_rules():
                 # 忽略编译
-                if not self.is_ignored_file(name=name):
+                rule = self.file_rule_parser.match_ignored_file(name)
+                if rule is None:
                     # 非忽略编译文件
-                    so_file = self.py2so(name=name)
+                    compiling = True
+                    reason = '未命中忽略编译规则'
+                else:
+                    reason = '命中忽略编译规则: {}'.format(rule)
             elif self.file_rule_parser.is_reserved_rules():
                 # 保留编译
-                if self.is_reserved_file(name=name):
+                rule = self.file_rule_parser.match_reserved_file(name)
+                if rule is not None:
                     # 保留编译文件
-                    so_file = self.py2so(name=name)
+                    compiling = True
+                    reason = '命中保留编译规则: {}'.format(rule)
+                else:
+                    reason = '未命中保留编译规则'
             else:
                 # 直接编译
-                so_file = self.py2so(name=name)
-
-        if so_file:
-            self.copy_so_file(so_file)
-        elif source_file:
-            self.copy_source_file(source_file)
-
+                compiling = True
+                reason = '未配置编译规则'
+
+        if compiling:
+            package = self.file_rule_parser.match_amalgamated_package(name)
+            if package is not None:
+                reason = '{}, 合并编译: {}'.format(reason, package)
+            directives = self.get_compiler_directives(name)
+            overrides = ['{}={}'.format(key, value) for key, value in sorted(directives.items())
+                         if key not in self.compiler_directives or self.compiler_directives[key] != value]
+            if overrides:
+                reason = '{}, Cython编译指令: {}'.format(reason, ', '.join(overrides))
+
+        file = self.inventory.get_file(name) if self.inventory is not None else None
+        self.plan.add(ACTION_COMPILE if compiling else ACTION_COPY_FILE, name, reason,
+                      size=file.size if file else 0)
         return None
 
     def is_ignored_file(self, name: str) -> bool:
@@ -447,6 +1113,300 @@ class PythonCodeCompilingBase(object):
         """
         return name.endswith('.py')
 
+    def compile_pending_files(self) -> None:
+        """
+        编译遍历时收集的python文件, 并按遍历顺序拷贝编译文件
+
+            合并编译的python包中的文件编译为一个扩展模块, 不使用编译缓存;
+            命中编译缓存的文件直接复用上次编译的.so文件;
+            jobs与translate_jobs均为1且未指定编译节点时在当前进程中串行编译; 否则使用两阶段流水线并行编译(见BuildPipeline),
+            编译文件按遍历顺序拷贝, 保证输出与串行编译一致;
+            每个模块编译完成后写入编译日志, 续编时跳过日志中已完成且未变更的模块; keep_going时编译失败的模块不输出
+
+        Returns:
+
+        """
+        pending = self.lookup_pending_files()
+        if pending is None:
+            return None
+        with self.tracer.span('compile', modules=len(pending.names)):
+            self.compile_modules(pending)
+        self.store_pending_files(pending)
+        return None
+
+    def lookup_pending_files(self) -> Optional[PendingCompile]:
+        """
+        查找待编译文件的编译缓存及编译日志, 按预计耗时排序需要编译的文件
+
+        Returns:
+            pending (PendingCompile): 没有待编译文件时为None
+        """
+        if not self.pending_files:
+            return None
+
+        bundles = self._group_bundles(self.pending_files)
+        bundled_files = {name for names in bundles.values() for name in names}
+        pending_files = [name for name in self.pending_files if name not in bundled_files]
+
+        # 1.查找编译缓存
+        so_files = dict()
+        cache_keys = dict()
+        if self.build_cache:
+            with self.tracer.span('build_cache'):
+                if not self.build_lib_path:
+                    self.build_lib_path = os.path.join(BASE_DIR, get_build_lib())
+                for name in pending_files:
+                    unchanged = self.changed_files is not None and name not in self.changed_files
+                    key = self.build_cache.make_key(name, os.path.join(INPUT_DIR, name),
+                                                    self.get_compiler_directives(name),
+                                                    unchanged=unchanged, build_flags=self._build_flags,
+                                                    depends=self.get_dependency_hashes(name))
+                    so_file = self.build_cache.lookup(key, self.build_lib_path)
+                    if so_file:
+                        so_files[name] = so_file
+                    else:
+                        cache_keys[name] = key
+
+        # 2.续编: 跳过编译日志中已完成的模块
+        signatures = dict()
+        if self.journal is not None:
+            if not self.build_lib_path:
+                self.build_lib_path = os.path.join(BASE_DIR, get_build_lib())
+            signatures = {name: self._journal_signature(name) for name in pending_files}
+            signatures.update({package: self._journal_signature(package, bundled_names)
+                               for package, bundled_names in bundles.items()})
+            for name in list(pending_files) + list(bundles):
+                if name in so_files:
+                    self.journal.record_done(name, signatures[name], so_files[name])
+                    continue
+                so_file = self.journal.lookup(name, signatures[name], self.build_lib_path)
+                if so_file:
+                    so_files[name] = so_file
+            if self.journal.resumed:
+                print("续编: 跳过{}个已完成的模块".format(self.journal.resumed))
+        names = [name for name in pending_files if name not in so_files]
+        bundles_to_compile = {package: bundled_names for package, bundled_names in bundles.items()
+                              if package not in so_files}
+        return PendingCompile(pending_files, bundles, self._schedule(names), bundles_to_compile, so_files, cache_keys,
+                              signatures)
+
+    def compile_modules(self, pending: PendingCompile, pipeline_results: tuple = None) -> None:
+        """
+        编译未命中缓存的文件, 结果写入pending.so_files; 共享工具模块的.c文件最大, 在单独的进程中与其他模块同时编译
+
+        Args:
+            pending (PendingCompile): 见lookup_pending_files
+            pipeline_results (tuple): 已由调用方的流水线编译pending.names时(批量编译), 为(编译结果, 编译失败)
+
+        Returns:
+
+        """
+        names, so_files, signatures = pending.names, pending.so_files, pending.signatures
+        shared_utility_so, shared_utility_future = self._shared_utility_builds.get(self.profile.name), None
+        if shared_utility_so and not os.path.exists(os.path.join(self.build_lib_path or '', shared_utility_so)):
+            shared_utility_so = None
+        shared_utility_executor, compile_executor = None, None
+        if self.shared_utility and not shared_utility_so and pipeline_results is None and \
+                (self.jobs > 1 or self.translate_jobs > 1):
+            shared_utility_executor = ProcessPoolExecutor(max_workers=1)
+            shared_utility_future = shared_utility_executor.submit(
+                compile_shared_utility, self.shared_utility, self._object_cache_dir, self.profile)
+        try:
+            if pipeline_results is not None:
+                self.collect_pipeline_results(pending, *pipeline_results)
+            elif (self.jobs <= 1 and self.translate_jobs <= 1 and not self.workers and
+                  self.compile_executor is None) or len(names) <= 1:
+                for name in names:
+                    try:
+                        so_files[name] = self.py2so(name=name)
+                    except (Exception, SystemExit) as e:
+                        self._record_failure(name, signatures.get(name), e)
+                        continue
+                    if self.journal is not None:
+                        self.journal.record_done(name, signatures[name], so_files[name])
+            else:
+                compile_executor = self.compile_executor
+                if compile_executor is None and self.workers:
+                    compile_executor = RemoteCompileExecutor(self.workers, local_jobs=self.jobs)
+                pipeline = BuildPipeline(translate_jobs=self.translate_jobs, compile_jobs=self.jobs,
+                                         queue_size=self.queue_size, object_cache_dir=self._object_cache_dir,
+                                         profile=self.profile, mem_budget=self.mem_budget,
+                                         memory_estimator=self._estimate_memory,
+                                         shared_utility=self.shared_utility,
+                                         compile_executor=compile_executor, keep_going=self.keep_going,
+                                         on_compiled=self._journal_compiled(signatures))
+                results = pipeline.run([os.path.join(INPUT_DIR, name) for name in names],
+                                       {os.path.join(INPUT_DIR, name): self.get_compiler_directives(name)
+                                        for name in names})
+                self.collect_pipeline_results(pending, results, pipeline.failures)
+            for package, bundled_names in pending.bundles_to_compile.items():
+                try:
+                    so_files[package] = self.bundle2so(package, bundled_names)
+                except (Exception, SystemExit) as e:
+                    self._record_failure(package, signatures.get(package), e)
+                    continue
+                if self.journal is not None:
+                    self.journal.record_done(package, signatures[package], so_files[package])
+            if self.shared_utility and not shared_utility_so:
+                result = shared_utility_future.result() if shared_utility_future else compile_shared_utility(
+                    self.shared_utility, self._object_cache_dir, self.profile)
+                shared_utility_so = self._register_build_result(
+                    result, name='{}/{}'.format(self.project_name, SHARED_UTILITY_MODULE_NAME), size=0)
+                self._shared_utility_builds[self.profile.name] = shared_utility_so
+        finally:
+            if shared_utility_executor is not None:
+                shared_utility_executor.shutdown(wait=True, cancel_futures=True)
+            if compile_executor is not None and compile_executor is not self.compile_executor:
+                compile_executor.shutdown()
+                compile_executor.report()
+        if self.object_cache and (names or pending.bundles_to_compile):
+            self.object_cache.report()
+        if names or pending.bundles_to_compile:
+            self.history.save()
+        return None
+
+    def collect_pipeline_results(self, pending: PendingCompile, results: Dict[str, CompileResult],
+                                 failures: Dict[str, BaseException]) -> None:
+        """
+        记录流水线的编译结果及编译失败的模块
+
+        Args:
+            pending (PendingCompile): 见lookup_pending_files
+            results (dict): 文件绝对路径 -> 编译结果, 可包含其他项目的文件
+            failures (dict): 文件绝对路径 -> 异常, 可包含其他项目的文件
+
+        Returns:
+
+        """
+        for name in pending.names:
+            py_file_path = os.path.join(INPUT_DIR, name)
+            if py_file_path in failures:
+                self._record_failure(name, pending.signatures.get(name), failures[py_file_path])
+                continue
+            pending.so_files[name] = self._register_build_result(results[py_file_path], name=name)
+        return None
+
+    def store_pending_files(self, pending: PendingCompile) -> None:
+        """
+        写入编译缓存, 按遍历顺序拷贝编译文件, 输出扩展模块大小
+
+        Args:
+            pending (PendingCompile): 见lookup_pending_files
+
+        Returns:
+
+        """
+        so_files = pending.so_files
+        # 4.写入编译缓存
+        if self.build_cache:
+            for name, key in pending.cache_keys.items():
+                if name in so_files:
+                    self.build_cache.store(key, name, self.build_lib_path, so_files[name])
+            self.build_cache.save()
+
+        # 编译失败的模块不输出
+        pending_files = [name for name in pending.pending_files if name in so_files]
+        bundles = {package: bundled_names for package, bundled_names in pending.bundles.items()
+                   if package in so_files}
+        shared_utility_so = self._shared_utility_builds.get(self.profile.name) if self.shared_utility else None
+        with self.tracer.span('copy_so'):
+            for name in pending_files:
+                self.copy_so_file(so_files[name])
+            for package, bundled_names in bundles.items():
+                self.copy_bundle(package, so_files[package], bundled_names)
+            if shared_utility_so:
+                self.copy_so_file(shared_utility_so)
+        extensions = {name: so_files[name] for name in pending_files}
+        extensions.update({'{}/{}'.format(package, BUNDLE_MODULE_NAME): so_files[package] for package in bundles})
+        self.report_extension_sizes(extensions, shared_utility_so)
+        self.pending_files = list()
+        return None
+
+    def _record_failure(self, name: str, signature: Optional[str], error: BaseException) -> None:
+        """
+        记录编译失败的模块, 未指定keep_going时重新抛出异常
+
+        Args:
+            name (str): 模块相对路径(合并编译时为python包)
+            signature (str): 模块的签名, 未使用编译日志时为None
+            error (BaseException): cythonize的CompileError或setuptools的SystemExit等
+
+        Returns:
+
+        """
+        message = '{}: {}'.format(type(error).__name__, error)
+        if self.journal is not None and signature is not None:
+            self.journal.record_failed(name, signature, message)
+        if not self.keep_going:
+            raise error
+        self.failures[name] = message
+        print("编译失败, 继续编译其他模块: {}, {}".format(name, message))
+        return None
+
+    @property
+    def _journal_fingerprint(self) -> str:
+        """编译日志的编译配置指纹: 编译环境及编译参数, 不一致时不续编"""
+        return hashlib.sha256(json.dumps(dict(get_compiler_fingerprint(), build_flags=self._build_flags),
+                                         sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _journal_signature(self, name: str, bundled_names: List[str] = None) -> str:
+        """
+        编译日志中模块的签名: 源文件及编译依赖的大小, 修改时间及Cython编译指令
+
+        Args:
+            name (str): 模块相对路径, 合并编译时为python包
+            bundled_names (list): 合并编译的文件
+
+        Returns:
+            signature (str):
+        """
+        def stat(path: str) -> list:
+            file = self.inventory.get_file(path) if self.inventory is not None else None
+            if file is not None:
+                return [path, file.size, file.mtime_ns]
+            st = os.stat(os.path.join(INPUT_DIR, path))
+            return [path, st.st_size, st.st_mtime_ns]
+
+        if bundled_names is not None:
+            items = [stat('{}/__init__.py'.format(name))] + [self._journal_signature(member)
+                                                            for member in sorted(bundled_names)]
+        else:
+            items = [stat(name), self.get_compiler_directives(name)] + \
+                    [stat(dependency) for dependency in self.depgraph.get_compile_dependencies(name)]
+        return hashlib.sha256(json.dumps(items, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _journal_compiled(self, signatures: Dict[str, str]) -> Optional[Callable[[str, CompileResult], None]]:
+        """流水线中每个模块编译完成后写入编译日志"""
+        if self.journal is None:
+            return None
+        journal = self.journal
+
+        def on_compiled(py_file_path: str, result: CompileResult) -> None:
+            name = os.path.relpath(py_file_path, INPUT_DIR).replace(os.sep, '/')
+            journal.record_done(name, signatures[name], result.so_file_name)
+        return on_compiled
+
+    def report_extension_sizes(self, so_files: Dict[str, str], shared_utility_so: str = None) -> None:
+        """
+        记录本次编译的扩展模块大小; 使用共享工具模块或strip时, 输出与不使用时(同一编译配置)的对比
+
+        Args:
+            so_files (dict): 模块 -> 编译文件的相对路径
+            shared_utility_so (str): 共享工具模块的编译文件
+
+        Returns:
+
+        """
+        variant = get_size_variant(self.profile, bool(self.shared_utility))
+        for name, so_file in so_files.items():
+            self.extension_sizes.record(name, variant, os.path.getsize(os.path.join(self.build_lib_path, so_file)))
+        self.extension_sizes.save()
+        if variant != get_baseline_variant(variant):
+            shared_utility_size = os.path.getsize(os.path.join(self.build_lib_path, shared_utility_so)) \
+                if shared_utility_so else 0
+            self.extension_sizes.report(sorted(so_files), variant, shared_utility_size, top=self.top)
+        return None
+
     def py2so(self, name: str) -> str:
         """
         Python文件编译
@@ -457,28 +1417,125 @@ class PythonCodeCompilingBase(object):
         Returns:
             so_file_name (str): 编译文件的相对路径
         """
-        # 1.编译
         py_file_path = os.path.join(INPUT_DIR, name)
-        dist_obj: Distribution = setup(
-            script_args=['build_ext'],
-            ext_modules=cythonize(
-                py_file_path,
-                compiler_directives={'always_allow_keywords': True}
-            )
-        )
-        build_ext_obj = dist_obj.get_command_obj(command='build_ext')
+        result = compile_py_file(py_file_path, self.get_compiler_directives(name), self._object_cache_dir,
+                                 self.profile, self.shared_utility)
+        return self._register_build_result(result, name=name)
 
-        # 2.获取build/lib.xxx-cpython-xxx文件夹名称
-        if not self.build_lib_path:
-            build_lib = getattr(build_ext_obj, "build_lib")
-            build_lib_path = os.path.join(BASE_DIR, build_lib)
-            self.build_lib_path = build_lib_path
+    def get_compiler_directives(self, name: str) -> dict:
+        """
+        文件的Cython编译指令: 默认编译指令 -> 全局 -> 文件夹 -> 文件
+
+        Args:
+            name (str): 文件相对路径
+
+        Returns:
+            directives (dict):
+        """
+        return dict(DEFAULT_COMPILER_DIRECTIVES, **self.file_rule_parser.get_compiler_directives(name))
+
+    def _group_bundles(self, names: List[str]) -> Dict[str, List[str]]:
+        """
+        按合并编译的python包对待编译文件分组, 模块名称重复或只有一个模块时单独编译
 
-        # 3.获取编译后的so文件的相对路径
-        extension_obj: Extension = getattr(build_ext_obj, 'extensions')[0]
-        so_file_name = getattr(extension_obj, '_file_name')
+        Args:
+            names (list): 待编译文件
+
+        Returns:
+            bundles (dict): python包相对路径 -> 合并编译的文件
+        """
+        bundles = dict()
+        for package, package_names in group_bundle_members(
+                names, self.file_rule_parser.match_amalgamated_package).items():
+            bundled_names, other_names = split_bundle_members(package_names)
+            if other_names:
+                print("合并编译[{}]: 模块名称重复, 单独编译: {}".format(package, ', '.join(other_names)))
+            if len(bundled_names) < 2:
+                continue
+            bundles[package] = bundled_names
+        return bundles
+
+    def bundle2so(self, package: str, names: List[str]) -> str:
+        """
+        将python包中的文件合并编译为一个扩展模块
+
+        Args:
+            package (str): python包相对路径
+            names (list): 合并编译的文件
+
+        Returns:
+            so_file_name (str): 编译文件的相对路径
+        """
+        result = compile_bundle(package, [os.path.join(INPUT_DIR, name) for name in names],
+                                {os.path.join(INPUT_DIR, name): self.get_compiler_directives(name) for name in names},
+                                self._object_cache_dir, jobs=self.translate_jobs,
+                                profile=self.profile, shared_utility=self.shared_utility)
+        size = sum(os.path.getsize(os.path.join(INPUT_DIR, name)) for name in names)
+        return self._register_build_result(result, name='{}/{}'.format(package, BUNDLE_MODULE_NAME), size=size)
+
+    def _schedule(self, names: List[str]) -> List[str]:
+        """
+        按预计耗时由长到短排序待编译文件
+
+        Args:
+            names (list): 待编译文件
 
-        return so_file_name
+        Returns:
+            names (list):
+        """
+        actions = list()
+        for name in names:
+            file = self.inventory.get_file(name) if self.inventory is not None else None
+            actions.append(BuildAction(ACTION_COMPILE, name, '', size=file.size if file else 0))
+        return [action.name for action in BuildPlan.schedule(actions, self.history)]
+
+    def estimate_compile_seconds(self, name: str) -> float:
+        """按历史编译耗时估算文件的编译耗时, 见BuildHistory.estimate"""
+        file = self.inventory.get_file(name) if self.inventory is not None else None
+        return self.history.estimate(name, file.size if file else 0)
+
+    def _estimate_memory(self, py_file_path: str, c_size: int) -> int:
+        """按历史记录估算模块C编译的峰值内存, 见BuildHistory.estimate_memory"""
+        return self.history.estimate_memory(os.path.relpath(py_file_path, INPUT_DIR).replace(os.sep, '/'), c_size)
+
+    @property
+    def _build_flags(self) -> dict:
+        """编译缓存键中的编译参数: 编译配置及共享工具模块"""
+        if not self.shared_utility:
+            return self.profile.to_dict()
+        return dict(self.profile.to_dict(), shared_utility=self.shared_utility)
+
+    @property
+    def _object_cache_dir(self) -> Optional[str]:
+        return self.object_cache.cache_dir if self.object_cache else None
+
+    def _register_build_result(self, result: CompileResult, name: str, size: int = None) -> str:
+        """
+        记录build/lib.xxx-cpython-xxx文件夹, C编译缓存命中情况, 编译耗时及各阶段耗时
+
+        Args:
+            result (CompileResult): 编译结果
+            name (str): 编译的文件
+            size (int): 源文件大小, 默认从文件清单中获取
+
+        Returns:
+            so_file_name (str): 编译文件的相对路径
+        """
+        self.tracer.add(*(span._replace(args=dict(span.args, module=name)) for span in result.spans))
+        if not result.cache_hit:
+            if size is None:
+                file = self.inventory.get_file(name) if self.inventory is not None else None
+                size = file.size if file else os.path.getsize(os.path.join(INPUT_DIR, name))
+            self.history.record(name, result.translate_seconds + result.compile_seconds, size,
+                                c_size=result.c_size, peak_rss=result.peak_rss)
+        if not self.build_lib_path:
+            self.build_lib_path = os.path.join(BASE_DIR, result.build_lib)
+        if self.object_cache and result.cache_hit is not None:
+            if result.cache_hit:
+                self.object_cache.hits += 1
+            else:
+                self.object_cache.misses += 1
+        return result.so_file_name
 
     def copy_source_file(self, name: str) -> None:
         """
@@ -490,12 +1547,7 @@ class PythonCodeCompilingBase(object):
         Returns:
 
         """
-        source_file = os.path.join(INPUT_DIR, name)
-        target_file = os.path.join(OUTPUT_DIR, name)
-        target_dir = os.path.dirname(target_file)
-        if not os.path.exists(target_dir):
-            os.mkdir(target_dir)
-        shutil.copyfile(source_file, target_file)
+        self.output_file(os.path.join(INPUT_DIR, name), name)
 
     def copy_so_file(self, name: str) -> None:
         """
@@ -507,53 +1559,112 @@ class PythonCodeCompilingBase(object):
         Returns:
 
         """
-        source_file = os.path.join(self.build_lib_path, name)
-        target_file = os.path.join(OUTPUT_DIR, name)
-        target_dir = os.path.dirname(target_file)
-        if not os.path.exists(target_dir):
-            os.mkdir(target_dir)
-        shutil.copyfile(source_file, target_file)
+        self.output_file(os.path.join(self.build_lib_path, name), name)
+
+    def output_file(self, source_file: str, name: str, copy_stat: bool = False) -> None:
+        """
+        生成输出文件: 输出文件夹中的文件, 及归档文件中的条目(直接读取源文件, 不经过输出文件夹)
+
+        Args:
+            source_file (str): 源文件
+            name (str): 输出文件的相对路径
+            copy_stat (bool): 是否保留文件元数据
+
+        Returns:
+
+        """
+        if self.output_tree:
+            target_file = os.path.join(OUTPUT_DIR, name)
+            target_dir = os.path.dirname(target_file)
+            if not os.path.exists(target_dir):
+                os.makedirs(target_dir)
+            if copy_stat:
+                self.materializer.copy2(source_file, target_file)
+            else:
+                self.materializer.materialize(source_file, target_file)
+        if self.archive is not None:
+            self.archive.add_file(name, source_file)
+
+    def output_content(self, name: str, content: str) -> None:
+        """
+        生成内容为指定文本的输出文件
+
+            输出文件夹中的同名文件可能为input目录中源文件的硬链接, 写入新文件后替换, 不能原地修改
+
+        Args:
+            name (str): 输出文件的相对路径
+            content (str): 文件内容
+
+        Returns:
+
+        """
+        if self.output_tree:
+            target_file = os.path.join(OUTPUT_DIR, name)
+            tmp_file = target_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_file, target_file)
+        if self.archive is not None:
+            self.archive.add_bytes(name, content)
+
+    def copy_bundle(self, package: str, so_file_name: str, names: List[str]) -> None:
+        """
+        拷贝合并编译的扩展模块, 生成导入钩子模块, 并在python包的__init__.py中安装导入钩子
+
+        Args:
+            package (str): python包相对路径
+            so_file_name (str): 合并编译的扩展模块
+            names (list): 合并编译的文件
+
+        Returns:
+
+        """
+        self.copy_so_file(so_file_name)
+        self.output_content('{}/{}.py'.format(package, BUNDLE_IMPORTER_NAME),
+                            render_bundle_importer(get_bundle_modules(package, names)))
+
+        # 从input目录读取__init__.py, 输出文件夹中的文件可能已插入安装语句(增量编译)或未生成(不生成输出文件夹)
+        with open(os.path.join(INPUT_DIR, package, '__init__.py'), encoding='utf-8') as f:
+            source = f.read()
+        self.output_content('{}/__init__.py'.format(package), inject_bundle_installer(source))
+        print("合并编译[{}]: {}个模块 -> {}".format(package, len(names), so_file_name))
 
     ####################################################
     #                   python包处理                    #
     ####################################################
     def handle_package(self, name: str) -> Optional[str]:
         """
-        处理python包
+        处理python包: 需要编译时继续遍历, 否则将整个文件夹的拷贝记录至编译计划
 
         Args:
             name (str): 待处理文件夹
 
         Returns:
-
+            name (str): 需要继续遍历的python包, 否则为None
         """
-        source_dir = name
-        package_dir = None
-
         if not self.is_python_package(name):
             # 非python包,跳过编译
-            pass
+            reason = '非python包'
         else:
             # python包
             if self.file_rule_parser.is_ignored_rules():
                 # 忽略编译类型
-                if not self.is_ignored_package(name=name):
+                rule = self.file_rule_parser.match_ignored_package(name)
+                if rule is None:
                     # 非忽略编译python包
-                    package_dir = name
+                    return name
+                reason = '命中忽略编译规则: {}'.format(rule)
             elif self.file_rule_parser.is_reserved_rules():
                 # 保留编译类型
                 if self.is_reserved_package(name=name):
                     # 保留编译python包
-                    package_dir = name
+                    return name
+                reason = '未命中保留编译规则'
             else:
                 # 需要编译的python包
-                package_dir = name
+                return name
 
-        if package_dir:
-            return name
-        elif source_dir:
-            self.copy_source_dir(source_dir)
-            return None
+        self.plan.add(ACTION_COPY_DIR, name, reason)
         return None
 
     def is_python_package(self, name: str) -> bool:
@@ -566,6 +1677,8 @@ class PythonCodeCompilingBase(object):
         Returns:
             result (bool):
         """
+        if self.inventory is not None:
+            return self.inventory.is_python_package(name)
         files = os.listdir(os.path.join(INPUT_DIR, name))
         return '__init__.py' in files
 
@@ -587,7 +1700,33 @@ class PythonCodeCompilingBase(object):
         """
         source_dir_abs_path = os.path.join(INPUT_DIR, source_dir)
         target_dir = os.path.join(OUTPUT_DIR, source_dir)
-        target_parent_dir = os.path.dirname(target_dir)
-        if not os.path.exists(target_parent_dir):
-            os.mkdir(target_parent_dir)
-        shutil.copytree(source_dir_abs_path, target_dir)
+        directory = self.inventory.get_dir(source_dir) if self.inventory is not None else None
+        if directory is None:
+            if self.output_tree:
+                target_parent_dir = os.path.dirname(target_dir)
+                if not os.path.exists(target_parent_dir):
+                    os.makedirs(target_parent_dir)
+                shutil.copytree(source_dir_abs_path, target_dir, copy_function=self.materializer.copy2)
+            if self.archive is not None:
+                for root, _, file_names in os.walk(source_dir_abs_path):
+                    self.archive.add_dir(os.path.relpath(root, INPUT_DIR).replace(os.sep, '/'))
+                    for file_name in file_names:
+                        file_abs_path = os.path.join(root, file_name)
+                        self.archive.add_file(os.path.relpath(file_abs_path, INPUT_DIR).replace(os.sep, '/'),
+                                              file_abs_path)
+            return None
+
+        if any(set(dir_.abandoned) - set(PASS_THROUGH_IGNORED_FILES) for dir_ in directory.iter_dirs()):
+            # 清单遍历时忽略了默认忽略的文件/文件夹(例如migrations), 拷贝的文件夹与源项目一致, 需重新遍历
+            directory = ProjectInventory(source_dir_abs_path, abandoned_files=PASS_THROUGH_IGNORED_FILES,
+                                         base_dir=INPUT_DIR).root
+
+        # 按清单拷贝, 无需再次遍历源文件夹
+        for dir_ in directory.iter_dirs():
+            if self.output_tree:
+                os.makedirs(os.path.join(OUTPUT_DIR, dir_.path), exist_ok=True)
+            if self.archive is not None:
+                self.archive.add_dir(dir_.path)
+            for file in dir_.files:
+                self.output_file(file.abs_path, file.path, copy_stat=True)
+        return None
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : batch.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 批量编译: 按清单在一个进程中编译多个项目, 共享C编译进程池(或编译节点), 编译缓存及全局编译调度
+"""
+import inspect
+import json
+import os.path
+import shutil
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+import click
+
+from base import PendingCompile, PythonCodeCompilingBase
+from cli_options import parse_mem_budget_option, parse_workers_option
+from constants import BATCH_DIR, BUILD_DIR, INPUT_DIR
+from pipeline import BuildPipeline, CompileExecutor, CompileResult, LocalCompileExecutor
+from remote import RemoteCompileExecutor
+
+STATUS_OK = 'ok'  # 编译成功
+STATUS_MODULE_FAILURES = 'module_failures'  # keep_going时部分模块编译失败
+STATUS_FAILED = 'failed'  # 编译中断
+
+# 批量编译中所有项目共用的参数, 由命令行指定, 不能在清单中按项目设置
+SHARED_OPTIONS = ('jobs', 'translate_jobs', 'queue_size', 'mem_budget', 'workers', 'compile_executor',
+                  'clean_build', 'dry_run')
+
+
+def load_manifest(manifest_path: str) -> List[dict]:
+    """
+    读取批量编译清单, defaults为各项目的默认参数, 项目中的参数与run.py的选项同名(dest)
+
+        {
+            "defaults": {"profile": "release", "keep_going": true},
+            "projects": [
+                {"dir_path": "/srv/service_a", "project_config": "service_a.json"},
+                {"dir_path": "service_b", "project_config": "service_b.json", "archive_format": "wheel"}
+            ]
+        }
+
+        dir_path为相对路径且相对于清单所在文件夹存在时, 按清单所在文件夹解析
+
+    Args:
+        manifest_path (str): 清单json文件
+
+    Returns:
+        projects (list): 各项目的PythonCodeCompilingBase参数
+    """
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    defaults = manifest.get('defaults') or dict()
+    if not manifest.get('projects'):
+        raise ValueError("清单中没有项目: [{}]".format(manifest_path))
+
+    parameters = set(inspect.signature(PythonCodeCompilingBase.__init__).parameters) - {'self'}
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    projects = list()
+    names = dict()
+    for index, item in enumerate(manifest['projects']):
+        options = dict(defaults, **item)
+        where = "清单第{}个项目".format(index + 1)
+        unknown = sorted(set(options) - parameters)
+        if unknown:
+            raise ValueError("{}包含未知参数: {}".format(where, ', '.join(unknown)))
+        shared = sorted(set(options) & set(SHARED_OPTIONS))
+        if shared:
+            raise ValueError("{}包含所有项目共用的参数, 需在命令行中指定: {}".format(where, ', '.join(shared)))
+        for key in ('dir_path', 'project_config'):
+            if not options.get(key):
+                raise ValueError("{}缺少参数: {}".format(where, key))
+        dir_path = options['dir_path']
+        if not os.path.isabs(dir_path) and os.path.isdir(os.path.join(manifest_dir, dir_path)):
+            options['dir_path'] = os.path.join(manifest_dir, dir_path)
+        # 项目名称为项目文件夹名称, 编译输出, 编译日志等均按项目名称存放
+        name = os.path.basename(os.path.abspath(options['dir_path']).rstrip('/\\'))
+        if name in names:
+            raise ValueError("{}与第{}个项目的项目名称相同: {}".format(where, names[name] + 1, name))
+        names[name] = index
+        projects.append(options)
+    return projects
+
+
+class BatchProject(object):
+    """批量编译中的一个项目及其编译状态"""
+
+    def __init__(self, options: dict):
+        """
+        Args:
+            options (dict): PythonCodeCompilingBase参数, 见load_manifest
+        """
+        self.options = options
+        self.name = os.path.basename(os.path.abspath(options['dir_path']).rstrip('/\\'))
+        self.compiler: Optional[PythonCodeCompilingBase] = None
+        self.pending: Optional[PendingCompile] = None  # 待编译文件, 见lookup_pending_files
+        self.pipeline_results: Optional[tuple] = None  # 全局流水线的(编译结果, 编译失败)
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None  # 编译中断时的异常
+        self.seconds = 0.0  # 项目自身的耗时, 不含全局流水线
+
+
+class BatchBuild(object):
+    """
+    批量编译
+
+        1.依次准备各项目: 生成编译计划, 拷贝不编译的文件, 查找编译缓存及编译日志;
+        2.按编译配置分组, 每组所有项目的待编译文件按预计耗时由长到短排序, 在一个流水线中编译, 共享C编译执行器;
+        3.依次收集各项目的编译结果, 写入编译缓存, 拷贝编译文件, 生成归档文件;
+        4.PGO编译需要分阶段运行workload, 最后逐个编译, 不共享C编译执行器
+
+        单个项目失败不影响其他项目, 结束后输出汇总并保存至cache/batch
+    """
+
+    def __init__(self, manifest_path: str, jobs: int = None, translate_jobs: int = None, queue_size: int = None,
+                 mem_budget: int = None, workers: List[str] = None):
+        """
+        Args:
+            manifest_path (str): 清单json文件, 见load_manifest
+            jobs (int): C编译的进程数, 默认为CPU核数; 指定编译节点时为本机编译进程数
+            translate_jobs (int): cythonize的进程数, 默认与jobs相同
+            queue_size (int): 已转换但未开始C编译的模块数上限
+            mem_budget (int): C编译的内存预算(字节)
+            workers (list): 编译节点地址
+        """
+        self.manifest_path = manifest_path
+        self.projects = [BatchProject(options) for options in load_manifest(manifest_path)]
+        self.jobs = jobs or os.cpu_count() or 1
+        self.translate_jobs = translate_jobs or self.jobs
+        self.queue_size = queue_size
+        self.mem_budget = mem_budget
+        self.workers = list(workers or list())
+        self.compile_seconds = 0.0  # 全局流水线耗时
+        self.compile_modules = 0  # 全局流水线编译的模块数
+        name = os.path.splitext(os.path.basename(manifest_path))[0]
+        self.report_path = os.path.join(BATCH_DIR, '{}.json'.format(name))
+
+    def run(self) -> bool:
+        """
+        批量编译
+
+        Returns:
+            result (bool): 是否所有项目都编译成功
+        """
+        time_start = time.time()
+        # 各项目共用build目录, 只在开始时清空一次; 续编的项目需要保留上次的编译文件
+        if os.path.exists(BUILD_DIR) and not any(project.options.get('resume') for project in self.projects):
+            shutil.rmtree(BUILD_DIR)
+            print("build文件夹已删除: [{}]".format(BUILD_DIR))
+        compile_executor: CompileExecutor = RemoteCompileExecutor(self.workers, local_jobs=self.jobs) \
+            if self.workers else LocalCompileExecutor(self.jobs)
+        try:
+            for index, project in enumerate(self.projects):
+                print("[{}/{}] 准备项目: {}".format(index + 1, len(self.projects), project.name))
+                self._prepare(project, compile_executor)
+            self._compile(compile_executor)
+            for project in self.projects:
+                if project.status is None and not project.compiler.profile.pgo:
+                    self._finish(project)
+            for project in self.projects:
+                if project.status is None:
+                    self._run_pgo(project)
+        finally:
+            compile_executor.shutdown()
+            compile_executor.report()
+        report = self.report(time.time() - time_start)
+        self.print_report(report)
+        self.save(report)
+        return all(project.status == STATUS_OK for project in self.projects)
+
+    def _prepare(self, project: BatchProject, compile_executor: CompileExecutor) -> None:
+        """生成编译计划, 拷贝不编译的文件, 查找待编译文件的编译缓存及编译日志; PGO项目只创建编译器, 见_run_pgo"""
+        time_start = time.time()
+        try:
+            project.compiler = PythonCodeCompilingBase(
+                jobs=self.jobs, translate_jobs=self.translate_jobs, queue_size=self.queue_size,
+                mem_budget=self.mem_budget, workers=self.workers, compile_executor=compile_executor,
+                clean_build=False, **project.options)
+            if not project.compiler.profile.pgo:
+                project.compiler.start()
+                project.compiler.copy_plan_files()
+                project.pending = project.compiler.lookup_pending_files()
+        except (Exception, SystemExit) as e:
+            self._fail(project, e)
+        project.seconds += time.time() - time_start
+
+    def _compile(self, compile_executor: CompileExecutor) -> None:
+        """按编译配置, 共享工具模块及C编译缓存文件夹分组, 每组在一个流水线中编译"""
+        groups: Dict[tuple, List[BatchProject]] = dict()
+        for project in self.projects:
+            if project.status is not None or project.pending is None:
+                continue
+            compiler = project.compiler
+            key = (json.dumps(compiler.profile.to_dict(), sort_keys=True), compiler.shared_utility,
+                   compiler._object_cache_dir)
+            groups.setdefault(key, list()).append(project)
+        for projects in groups.values():
+            self._compile_group(projects, compile_executor)
+
+    def _compile_group(self, projects: List[BatchProject], compile_executor: CompileExecutor) -> None:
+        """
+        在一个流水线中编译多个项目的待编译文件, 按预计耗时由长到短排序, 不区分项目
+
+            流水线使用keep_going, 编译失败的模块在收集结果时按各项目的keep_going处理(见_finish)
+        """
+        owners: Dict[str, BatchProject] = {project.name: project for project in projects}
+        estimates = list()
+        directives = dict()
+        for project in projects:
+            for name in project.pending.names:
+                py_file_path = os.path.join(INPUT_DIR, name)
+                estimates.append((project.compiler.estimate_compile_seconds(name), py_file_path))
+                directives[py_file_path] = project.compiler.get_compiler_directives(name)
+        py_file_paths = [py_file_path for _, py_file_path in sorted(estimates, key=lambda item: -item[0])]
+        callbacks = {project.name: project.compiler._journal_compiled(project.pending.signatures)
+                     for project in projects}
+
+        def get_owner(py_file_path: str) -> BatchProject:
+            return owners[os.path.relpath(py_file_path, INPUT_DIR).replace(os.sep, '/').split('/')[0]]
+
+        def estimate_memory(py_file_path: str, c_size: int) -> int:
+            return get_owner(py_file_path).compiler._estimate_memory(py_file_path, c_size)
+
+        def on_compiled(py_file_path: str, result: CompileResult) -> None:
+            callback = callbacks[get_owner(py_file_path).name]
+            if callback is not None:
+                callback(py_file_path, result)
+
+        compiler = projects[0].compiler
+        pipeline = BuildPipeline(translate_jobs=self.translate_jobs, compile_jobs=self.jobs,
+                                 queue_size=self.queue_size, object_cache_dir=compiler._object_cache_dir,
+                                 profile=compiler.profile, mem_budget=self.mem_budget,
+                                 memory_estimator=estimate_memory, shared_utility=compiler.shared_utility,
+                                 compile_executor=compile_executor, keep_going=True, on_compiled=on_compiled)
+        if py_file_paths:
+            print("全局编译: {}个项目, {}个模块, 编译配置: {}".format(len(projects), len(py_file_paths),
+                                                              compiler.profile.name))
+        time_start = time.time()
+        try:
+            results = pipeline.run(py_file_paths, directives)
+        except (Exception, SystemExit) as e:
+            for project in projects:
+                self._fail(project, e)
+            return None
+        self.compile_seconds += time.time() - time_start
+        self.compile_modules += len(py_file_paths)
+        for project in projects:
+            project.pipeline_results = (results, pipeline.failures)
+        return None
+
+    def _finish(self, project: BatchProject) -> None:
+        """收集项目的编译结果, 编译合并编译的python包及共享工具模块, 拷贝编译文件, 生成归档文件"""
+        time_start = time.time()
+        compiler = project.compiler
+        try:
+            if project.pending is not None:
+                with compiler.tracer.span('compile', modules=len(project.pending.names)):
+                    compiler.compile_modules(project.pending, project.pipeline_results)
+                compiler.store_pending_files(project.pending)
+            compiler.complete()
+        except (Exception, SystemExit) as e:
+            self._fail(project, e)
+        else:
+            compiler.close()
+            compiler.summary()
+            project.status = STATUS_MODULE_FAILURES if compiler.failures else STATUS_OK
+        project.seconds += time.time() - time_start
+
+    def _run_pgo(self, project: BatchProject) -> None:
+        """PGO编译: 分阶段编译并运行workload, 不参与全局流水线"""
+        print("PGO编译项目: {}".format(project.name))
+        time_start = time.time()
+        try:
+            project.compiler.run()
+        except (Exception, SystemExit) as e:
+            self._fail(project, e)
+        else:
+            project.status = STATUS_MODULE_FAILURES if project.compiler.failures else STATUS_OK
+        project.seconds += time.time() - time_start
+
+    @staticmethod
+    def _fail(project: BatchProject, error: BaseException) -> None:
+        """记录编译中断的项目, 关闭其编译日志及未完成的归档文件"""
+        traceback.print_exc()
+        project.status = STATUS_FAILED
+        project.error = '{}: {}'.format(type(error).__name__, error)
+        if project.compiler is not None:
+            project.compiler.close()
+        print("项目编译失败: {}, {}".format(project.name, project.error))
+
+    def report(self, seconds: float) -> dict:
+        """
+        汇总各项目的编译结果
+
+        Returns:
+            report (dict): {
+                'manifest': 'xxx.json',
+                'seconds': 12.3,
+                'pipeline': {'seconds': 10.2, 'modules': 80},
+                'projects': [{'name': 'xxx', 'status': 'ok', 'seconds': 1.2, 'modules': 40, 'compiled': 12,
+                              'failures': {}, 'output': 'output/xxx', 'archive': None, 'error': None}, ...]
+            }
+        """
+        projects = list()
+        for project in self.projects:
+            compiler, pending = project.compiler, project.pending
+            item = dict(name=project.name, status=project.status, seconds=round(project.seconds, 3), modules=0,
+                        compiled=0, failures=dict(), output=None, archive=None, error=project.error)
+            if pending is not None:
+                item['modules'] = len(pending.pending_files) + len(pending.bundles)
+                item['compiled'] = len(pending.names) + len(pending.bundles_to_compile)
+            if compiler is not None:
+                item['failures'] = dict(compiler.failures)
+                if project.status != STATUS_FAILED:
+                    item['output'] = compiler.out_dir if compiler.output_tree else None
+                    item['archive'] = compiler.archive_path
+            projects.append(item)
+        return dict(manifest=os.path.abspath(self.manifest_path), seconds=round(seconds, 3),
+                    pipeline=dict(seconds=round(self.compile_seconds, 3), modules=self.compile_modules),
+                    projects=projects)
+
+    @staticmethod
+    def print_report(report: dict) -> None:
+        print()
+        print("=" * 50)
+        print("批量编译: {}个项目, 共耗时{:.1f}秒, 全局流水线编译{}个模块, 耗时{:.1f}秒".format(
+            len(report['projects']), report['seconds'], report['pipeline']['modules'],
+            report['pipeline']['seconds']))
+        print("{:<16}{:<24}{:>8}{:>8}{:>8}{:>10}  {}".format('状态', '项目', '模块', '编译', '失败', '耗时', '输出'))
+        for item in report['projects']:
+            output = item['error'] or ', '.join(path for path in (item['output'], item['archive']) if path)
+            print("{:<16}{:<24}{:>8}{:>8}{:>8}{:>10.1f}  {}".format(
+                item['status'], item['name'], item['modules'], item['compiled'], len(item['failures']),
+                item['seconds'], output))
+            for name, error in sorted(item['failures'].items()):
+                print("    {}: {}".format(name, error))
+
+    def save(self, report: dict) -> None:
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print("批量编译结果已保存: [{}]".format(self.report_path))
+
+
+@click.command()
+@click.argument('manifest_path', nargs=1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="C编译的进程数, 默认为CPU核数")
+@click.option('--translate-jobs', type=click.IntRange(min=1), default=None, help="cythonize的进程数, 默认与jobs相同")
+@click.option('--queue-size', type=click.IntRange(min=1), default=None,
+              help="已生成.c文件但未开始C编译的模块数上限, 默认为jobs的2倍")
+@click.option('--mem-budget', default=None, callback=parse_mem_budget_option,
+              help="并行C编译的内存预算, 例如4G, 512M(无单位时为MB), auto为可用内存的80%")
+@click.option('--worker', '-w', 'workers', multiple=True, callback=parse_workers_option,
+              help="编译节点地址host:port, 可多次指定, 编译节点见remote.py")
+def batch(manifest_path: str, jobs: int, translate_jobs: int, queue_size: int, mem_budget: int, workers: list):
+    """
+    批量编译
+
+        按清单在一个进程中编译多个项目, 共享C编译进程池(或编译节点)及编译缓存,
+        所有项目的待编译模块按预计耗时统一调度; 结束后输出汇总, 有项目或模块编译失败时退出码为1\n
+    """
+    builder = BatchBuild(manifest_path, jobs=jobs, translate_jobs=translate_jobs, queue_size=queue_size,
+                         mem_budget=mem_budget, workers=workers)
+    if not builder.run():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    batch()
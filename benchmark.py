@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : benchmark.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译性能基准测试: 生成合成python项目, 分别以串行/并行/缓存模式编译, 记录耗时及资源占用
+"""
+import json
+import multiprocessing
+import os.path
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+import click
+
+from constants import BASE_DIR, INPUT_DIR, OUTPUT_DIR, BUILD_DIR, PROJECT_CONFIG_DIR, BENCHMARK_DIR
+from tracing import CATEGORY_PHASE
+
+MODE_SERIAL = 'serial'  # 串行编译, 不使用缓存
+MODE_PARALLEL = 'parallel'  # 两阶段流水线并行编译, 不使用缓存
+MODE_BUILD_CACHE = 'cached'  # 编译缓存已预热, 全部命中
+MODE_OBJECT_CACHE = 'object_cache'  # C编译缓存已预热, 只执行cythonize
+BENCHMARK_MODES = (MODE_SERIAL, MODE_PARALLEL, MODE_BUILD_CACHE, MODE_OBJECT_CACHE)
+
+
+#######################################################
+#                     合成项目                         #
+#######################################################
+def generate_module(rnd: random.Random, lines: int) -> str:
+    """
+    生成单个模块的源码
+
+    Args:
+        rnd (random.Random): 随机数生成器, 固定种子保证可复现
+        lines (int): 模块大致行数
+
+    Returns:
+        source (str):
+    """
+    blocks = ['# -*- coding: utf-8 -*-', 'import math', '']
+    i = 0
+    while sum(block.count('\n') + 1 for block in blocks) < lines:
+        if i % 4 == 3:
+            blocks.append(
+                'class Model{i}(object):\n'
+                '    def __init__(self, value={a}):\n'
+                '        self.value = value\n'
+                '\n'
+                '    def scale(self, factor: float) -> float:\n'
+                '        return math.sqrt(abs(self.value * factor + {b}))\n'.format(i=i, a=rnd.randint(1, 100),
+                                                                                   b=rnd.randint(1, 100)))
+        else:
+            blocks.append(
+                'def func_{i}(x: int, y: int = {a}) -> int:\n'
+                '    total = 0\n'
+                '    for k in range(x):\n'
+                '        if k % {b} == 0:\n'
+                '            total += k * y\n'
+                '        else:\n'
+                '            total -= {c}\n'
+                '    return total\n'.format(i=i, a=rnd.randint(1, 9), b=rnd.randint(2, 7), c=rnd.randint(1, 50)))
+        blocks.append('')
+        i += 1
+    return '\n'.join(blocks)
+
+
+def generate_project(project_dir: str, packages: int, modules: int, depth: int, module_lines: int,
+                     seed: int = 0) -> List[str]:
+    """
+    生成合成python项目
+
+        project/
+            __init__.py
+            pkg_0/
+                __init__.py
+                mod_0.py
+                sub_1/
+                    __init__.py
+                    mod_1.py
+                    ...
+            ...
+
+    Args:
+        project_dir (str): 项目文件夹, 已存在时删除后重新生成
+        packages (int): 顶层python包数
+        modules (int): 每个顶层python包(含子包)的模块数, 按嵌套层级轮流放置
+        depth (int): 子包嵌套层数
+        module_lines (int): 每个模块的大致行数
+        seed (int): 随机种子
+
+    Returns:
+        modules (list): 生成的模块相对路径(相对于项目文件夹)
+    """
+    rnd = random.Random(seed)
+    if os.path.exists(project_dir):
+        shutil.rmtree(project_dir)
+    os.makedirs(project_dir)
+    open(os.path.join(project_dir, '__init__.py'), 'w').close()
+
+    results = list()
+    for i in range(packages):
+        package_dirs = ['pkg_{}'.format(i)]
+        for level in range(1, depth + 1):
+            package_dirs.append(os.path.join(package_dirs[-1], 'sub_{}'.format(level)))
+        for package_dir in package_dirs:
+            os.makedirs(os.path.join(project_dir, package_dir))
+            open(os.path.join(project_dir, package_dir, '__init__.py'), 'w').close()
+        for j in range(modules):
+            module = os.path.join(package_dirs[j % len(package_dirs)], 'mod_{}.py'.format(j))
+            with open(os.path.join(project_dir, module), 'w') as f:
+                f.write(generate_module(rnd, module_lines))
+            results.append(module)
+
+        # 非python文件, 直接拷贝
+        with open(os.path.join(project_dir, package_dirs[0], 'data.json'), 'w') as f:
+            json.dump(dict(package=i, values=[rnd.random() for _ in range(64)]), f)
+    return results
+
+
+def generate_project_config(project_name: str, rules: int, config_dir: str = PROJECT_CONFIG_DIR) -> str:
+    """
+    生成编译规则, 规则均不命中合成项目中的文件, 只用于衡量规则数对遍历耗时的影响
+
+    Args:
+        project_name (str): 项目名称
+        rules (int): 文件及文件夹忽略规则总数, 为0时不配置规则
+        config_dir (str): 编译规则文件夹
+
+    Returns:
+        project_config (str): 编译规则文件名称
+    """
+    project_config = '{}.json'.format(project_name)
+    config = dict()
+    if rules:
+        config['ignored_rules'] = dict(
+            ignored_files=['/missing_{}/mod_{}.py'.format(i % 97, i) for i in range(rules - rules // 2)],
+            ignored_packages=['/missing_{}/sub_{}'.format(i % 89, i) for i in range(rules // 2)],
+        )
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, project_config), 'w') as f:
+        json.dump(config, f, indent=2)
+    return project_config
+
+
+#######################################################
+#                       测量                           #
+#######################################################
+def get_written_bytes(dirs: List[str], since: float) -> int:
+    """
+    统计文件夹中since之后写入的文件大小(近似的磁盘写入量)
+
+    Args:
+        dirs (list): 文件夹
+        since (float): 开始时间
+
+    Returns:
+        size (int):
+    """
+    total = 0
+    for dir_ in dirs:
+        for root, _, files in os.walk(dir_):
+            for file in files:
+                try:
+                    stat = os.stat(os.path.join(root, file))
+                except OSError:
+                    continue
+                if stat.st_mtime >= since:
+                    total += stat.st_size
+    return total
+
+
+def make_compiler_kwargs(mode: str, jobs: int, work_dir: str) -> dict:
+    """
+    各模式的PythonCodeCompilingBase参数
+
+    Args:
+        mode (str): 测试模式, 见BENCHMARK_MODES
+        jobs (int): 并行模式的进程数
+        work_dir (str): 基准测试工作目录, C编译缓存位于其中
+
+    Returns:
+        kwargs (dict):
+    """
+    kwargs = dict(no_cache=True, build_cache=False, object_cache=False, top=0,
+                  object_cache_dir=os.path.join(work_dir, 'objects'))
+    if mode == MODE_SERIAL:
+        kwargs.update(jobs=1, translate_jobs=1)
+    elif mode == MODE_PARALLEL:
+        kwargs.update(jobs=jobs)
+    elif mode == MODE_BUILD_CACHE:
+        kwargs.update(jobs=jobs, build_cache=True)
+    elif mode == MODE_OBJECT_CACHE:
+        kwargs.update(jobs=jobs, object_cache=True)
+    return kwargs
+
+
+def _run_compiler(project_dir: str, project_config: str, kwargs: dict, work_dir: str, verbose: bool) -> dict:
+    """
+    在子进程中执行一次完整编译, 返回测量结果; 每次编译使用新的子进程, 峰值内存互不影响
+
+    Args:
+        project_dir (str): 合成项目文件夹
+        project_config (str): 编译规则文件名称
+        kwargs (dict): PythonCodeCompilingBase参数
+        work_dir (str): 基准测试工作目录
+        verbose (bool): 是否输出编译日志
+
+    Returns:
+        result (dict):
+    """
+    if not verbose:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.dup2(devnull, sys.stderr.fileno())
+
+    from base import PythonCodeCompilingBase
+    from build_cache import BuildCache
+    from plan import BuildHistory
+
+    time_start = time.time()
+    compiler = PythonCodeCompilingBase(project_config, project_dir, **kwargs)
+    if compiler.build_cache:
+        # 编译缓存及历史耗时写入工作目录, 不影响实际项目
+        compiler.build_cache = BuildCache(cache_dir=os.path.join(work_dir, 'build'))
+    compiler.history = BuildHistory(compiler.project_name, history_dir=os.path.join(work_dir, 'history'))
+    compiler.run()
+    wall_seconds = time.time() - time_start
+
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    phases = dict()
+    for span in compiler.tracer.spans:
+        if span.cat == CATEGORY_PHASE:
+            phases[span.name] = round(phases.get(span.name, 0.0) + span.seconds, 4)
+    return dict(
+        wall_seconds=round(wall_seconds, 4),
+        cpu_seconds=round(usage_self.ru_utime + usage_self.ru_stime +
+                          usage_children.ru_utime + usage_children.ru_stime, 4),
+        # ru_maxrss单位为KB; 子进程为其中最大的单个子进程(C编译器, 编译进程池)
+        peak_rss_kb=usage_self.ru_maxrss,
+        peak_rss_children_kb=usage_children.ru_maxrss,
+        bytes_written=get_written_bytes([os.path.join(INPUT_DIR, compiler.project_name),
+                                         os.path.join(OUTPUT_DIR, compiler.project_name), BUILD_DIR, work_dir],
+                                        since=time_start - 1),
+        phases=phases,
+    )
+
+
+def _run_compiler_process(conn, *args) -> None:
+    try:
+        conn.send(_run_compiler(*args))
+    except BaseException as e:
+        conn.send(dict(error='{}: {}'.format(type(e).__name__, e)))
+    finally:
+        conn.close()
+
+
+def measure(project_dir: str, project_config: str, kwargs: dict, work_dir: str, verbose: bool = False) -> dict:
+    """
+    在新的子进程(spawn)中执行一次完整编译
+
+    Args:
+        project_dir (str): 合成项目文件夹
+        project_config (str): 编译规则文件名称
+        kwargs (dict): PythonCodeCompilingBase参数
+        work_dir (str): 基准测试工作目录
+        verbose (bool): 是否输出编译日志
+
+    Returns:
+        result (dict):
+    """
+    context = multiprocessing.get_context('spawn')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_run_compiler_process,
+                              args=(child_conn, project_dir, project_config, kwargs, work_dir, verbose))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = dict(error='编译进程异常退出')
+    process.join()
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def get_environment() -> dict:
+    """测试环境: 提交, python/Cython版本, CPU核数"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    try:
+        import Cython
+        cython_version = Cython.__version__
+    except ImportError:
+        cython_version = ''
+    return dict(commit=commit, python=sys.version.split()[0], cython=cython_version, platform=platform.platform(),
+                cpu_count=os.cpu_count())
+
+
+def run_benchmark(modes: List[str], packages: int, modules: int, depth: int, module_lines: int, rules: int,
+                  jobs: int = None, repeat: int = 1, seed: int = 0, project_name: str = 'benchmark_project',
+                  work_dir: str = BENCHMARK_DIR, keep: bool = False, verbose: bool = False) -> dict:
+    """
+    基准测试
+
+    Args:
+        modes (list): 测试模式, 见BENCHMARK_MODES
+        packages (int): 顶层python包数
+        modules (int): 每个顶层python包的模块数
+        depth (int): 子包嵌套层数
+        module_lines (int): 每个模块的大致行数
+        rules (int): 编译规则数
+        jobs (int): 并行模式的进程数, 默认为CPU核数
+        repeat (int): 每个模式的重复次数
+        seed (int): 随机种子
+        project_name (str): 合成项目名称
+        work_dir (str): 基准测试工作目录
+        keep (bool): 是否保留合成项目, 编译规则及input/output目录中的项目
+        verbose (bool): 是否输出编译日志
+
+    Returns:
+        report (dict):
+    """
+    jobs = jobs or os.cpu_count() or 1
+    work_dir = os.path.abspath(work_dir)
+    project_dir = os.path.join(work_dir, 'projects', project_name)
+    names = generate_project(project_dir, packages, modules, depth, module_lines, seed=seed)
+    project_config = generate_project_config(project_name, rules)
+    source_bytes = sum(os.path.getsize(os.path.join(project_dir, name)) for name in names)
+    print("合成项目已生成: [{}], 模块{}个, 源码{}字节".format(project_dir, len(names), source_bytes))
+
+    report = dict(
+        environment=get_environment(),
+        parameters=dict(packages=packages, modules=modules, depth=depth, module_lines=module_lines, rules=rules,
+                        jobs=jobs, repeat=repeat, seed=seed),
+        created=time.strftime('%Y-%m-%d %H:%M:%S'),
+        results=dict(),
+    )
+    try:
+        for mode in modes:
+            cache_dir = os.path.join(work_dir, 'caches', mode)
+            if os.path.exists(cache_dir):
+                shutil.rmtree(cache_dir)
+            kwargs = make_compiler_kwargs(mode, jobs, cache_dir)
+            if mode in (MODE_BUILD_CACHE, MODE_OBJECT_CACHE):
+                # 预热缓存
+                measure(project_dir, project_config, kwargs, cache_dir, verbose)
+
+            runs = [measure(project_dir, project_config, kwargs, cache_dir, verbose) for _ in range(repeat)]
+            wall_seconds = statistics.median(run['wall_seconds'] for run in runs)
+            report['results'][mode] = dict(
+                wall_seconds=wall_seconds,
+                modules_per_second=round(len(names) / wall_seconds, 3) if wall_seconds else None,
+                source_bytes_per_second=round(source_bytes / wall_seconds, 1) if wall_seconds else None,
+                peak_rss_kb=max(run['peak_rss_kb'] for run in runs),
+                peak_rss_children_kb=max(run['peak_rss_children_kb'] for run in runs),
+                bytes_written=int(statistics.median(run['bytes_written'] for run in runs)),
+                runs=runs,
+            )
+            print("[{}] 耗时{:.3f}秒, {:.2f}模块/秒, 峰值内存{}KB(子进程{}KB), 写入{}字节".format(
+                mode, wall_seconds, report['results'][mode]['modules_per_second'] or 0,
+                report['results'][mode]['peak_rss_kb'], report['results'][mode]['peak_rss_children_kb'],
+                report['results'][mode]['bytes_written']))
+    finally:
+        if not keep:
+            for dir_ in (project_dir, os.path.join(INPUT_DIR, project_name), os.path.join(OUTPUT_DIR, project_name),
+                         os.path.join(work_dir, 'caches')):
+                if os.path.exists(dir_):
+                    shutil.rmtree(dir_)
+            os.remove(os.path.join(PROJECT_CONFIG_DIR, project_config))
+    return report
+
+
+def compare_reports(baseline: dict, report: dict) -> None:
+    """
+    输出与基准结果的对比
+
+    Args:
+        baseline (dict): 基准结果, 例如上一次提交的测试结果
+        report (dict): 本次测试结果
+
+    Returns:
+
+    """
+    if baseline.get('parameters') != report.get('parameters'):
+        print("注意: 两次测试的参数不同, 结果仅供参考")
+    print("与基准结果({})对比:".format(baseline.get('environment', dict()).get('commit', '')[:10]))
+    for mode, result in report['results'].items():
+        base_result = baseline.get('results', dict()).get(mode)
+        if not base_result:
+            continue
+        ratio = result['wall_seconds'] / base_result['wall_seconds'] if base_result['wall_seconds'] else 0
+        print("  [{}] {:.3f}秒 -> {:.3f}秒 ({:+.1f}%), 峰值内存{}KB -> {}KB".format(
+            mode, base_result['wall_seconds'], result['wall_seconds'], (ratio - 1) * 100,
+            base_result['peak_rss_children_kb'], result['peak_rss_children_kb']))
+
+
+@click.command()
+@click.option('--mode', 'modes', type=click.Choice(BENCHMARK_MODES), multiple=True,
+              help="测试模式, 可重复指定, 默认全部")
+@click.option('--packages', type=click.IntRange(min=1), default=4, help="顶层python包数")
+@click.option('--modules', type=click.IntRange(min=1), default=5, help="每个顶层python包的模块数")
+@click.option('--depth', type=click.IntRange(min=0), default=2, help="子包嵌套层数")
+@click.option('--module-lines', type=click.IntRange(min=1), default=200, help="每个模块的大致行数")
+@click.option('--rules', type=click.IntRange(min=0), default=100, help="编译规则数")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="并行模式的进程数, 默认为CPU核数")
+@click.option('--repeat', type=click.IntRange(min=1), default=1, help="每个模式的重复次数, 结果取中位数")
+@click.option('--seed', type=int, default=0, help="随机种子")
+@click.option('--output', 'output_path', type=click.Path(dir_okay=False), default=None,
+              help="结果json文件, 默认为cache/benchmark/results/<时间>.json")
+@click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="与之对比的基准结果json文件")
+@click.option('--keep', is_flag=True, default=False, help="保留合成项目及编译结果")
+@click.option('--verbose', is_flag=True, default=False, help="输出编译日志")
+def benchmark(modes: tuple, packages: int, modules: int, depth: int, module_lines: int, rules: int, jobs: int,
+              repeat: int, seed: int, output_path: str, compare_path: str, keep: bool, verbose: bool):
+    """
+    编译性能基准测试
+
+        生成合成python项目(packages * modules个模块), 分别以串行/并行/编译缓存/C编译缓存模式完整编译,
+        记录耗时, 模块吞吐量, 峰值内存及磁盘写入量, 结果保存为json, 可在不同提交之间对比\n
+    """
+    report = run_benchmark(list(modes or BENCHMARK_MODES), packages, modules, depth, module_lines, rules,
+                           jobs=jobs, repeat=repeat, seed=seed, keep=keep, verbose=verbose)
+    output_path = output_path or os.path.join(BENCHMARK_DIR, 'results', '{}.json'.format(
+        time.strftime('%Y%m%d%H%M%S')))
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print("测试结果已保存: [{}]".format(output_path))
+
+    if compare_path:
+        with open(compare_path) as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : build_cache.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 跨次运行的增量编译缓存
+"""
+import hashlib
+import json
+import os.path
+import shlex
+import shutil
+import subprocess
+import sys
+import sysconfig
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import Cython
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from constants import BUILD_CACHE_DIR, DEFAULT_BUILD_CACHE_SIZE, OBJECT_CACHE_DIR, DEFAULT_OBJECT_CACHE_SIZE
+
+
+def hash_file(file_path: str) -> str:
+    """
+    计算文件内容的sha256
+
+    Args:
+        file_path (str): 文件绝对路径
+
+    Returns:
+        digest (str):
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def replace_file(source_file: str, target_file: str) -> None:
+    """
+    拷贝文件: 先写入同一文件夹下的临时文件再替换, 不原地修改target_file
+
+        target_file可能与其他文件共享inode(例如--link-mode hardlink时输出目录中的.so文件), 原地写入会改写已加载的模块
+
+    Args:
+        source_file (str): 源文件
+        target_file (str): 目标文件
+
+    Returns:
+
+    """
+    tmp_path = '{}.{}.tmp'.format(target_file, os.getpid())
+    shutil.copyfile(source_file, tmp_path)
+    os.replace(tmp_path, target_file)
+
+
+def get_compiler_fingerprint() -> dict:
+    """
+    影响编译结果的环境信息: Cython版本, Python ABI标签, 编译器及编译参数
+
+    Returns:
+        fingerprint (dict):
+    """
+    fingerprint = dict(
+        cython=Cython.__version__,
+        python=sys.version,
+        abi=sysconfig.get_config_var('EXT_SUFFIX'),
+    )
+    for key in ('CC', 'CFLAGS', 'CCSHARED', 'LDSHARED'):
+        fingerprint[key] = sysconfig.get_config_var(key)
+    for key in ('CC', 'CFLAGS', 'CPPFLAGS', 'LDFLAGS', 'LDSHARED'):
+        fingerprint['env_' + key] = os.environ.get(key)
+    return fingerprint
+
+
+def preprocess_c_file(c_file_path: str, include_dirs: list = None, macros: list = None, extra_args: list = None,
+                      line_markers: bool = False) -> Optional[bytes]:
+    """
+    预处理C文件
+
+        以相对路径预处理, __FILE__展开结果与检出目录无关
+
+    Args:
+        c_file_path (str): C文件绝对路径
+        include_dirs (list): 头文件目录
+        macros (list): 宏定义, 格式同Extension.define_macros
+        extra_args (list): 追加的编译参数(例如编译配置中的-DNDEBUG)
+        line_markers (bool): 是否保留行号标记(#line), 用于编译错误定位至原文件
+
+    Returns:
+        output (bytes): 预处理失败时为None
+    """
+    include_dirs = list(include_dirs or list())
+    for key in ('include', 'platinclude'):
+        include_dir = sysconfig.get_paths()[key]
+        if include_dir not in include_dirs:
+            include_dirs.append(include_dir)
+
+    command = shlex.split(sysconfig.get_config_var('CC') or 'cc')
+    command += shlex.split(sysconfig.get_config_var('CFLAGS') or '')
+    command += shlex.split(os.environ.get('CFLAGS', ''))
+    command += shlex.split(os.environ.get('CPPFLAGS', ''))
+    command += list(extra_args or list())
+    command += ['-E'] if line_markers else ['-E', '-P']
+    command += ['-I{}'.format(include_dir) for include_dir in include_dirs]
+    for macro in macros or list():
+        name, value = macro[0], macro[1] if len(macro) > 1 else None
+        command.append('-D{}'.format(name) if value is None else '-D{}={}'.format(name, value))
+    command.append(os.path.basename(c_file_path))
+
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+                                 cwd=os.path.dirname(os.path.abspath(c_file_path)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout
+
+
+def hash_preprocessed_c_file(c_file_path: str, include_dirs: list = None, macros: list = None) -> Optional[str]:
+    """
+    计算预处理后的C文件的sha256
+
+        使用-P去除行号标记, 注释由预处理器去除, 并以相对路径预处理, 因此结果与项目所在路径无关
+
+    Args:
+        c_file_path (str): C文件绝对路径
+        include_dirs (list): 头文件目录
+        macros (list): 宏定义, 格式同Extension.define_macros
+
+    Returns:
+        digest (str): 预处理失败时为None
+    """
+    output = preprocess_c_file(c_file_path, include_dirs=include_dirs, macros=macros)
+    if output is None:
+        return None
+    return hashlib.sha256(output).hexdigest()
+
+
+class BuildCache(object):
+    """
+    编译结果缓存
+
+        以模块相对路径, 源文件内容哈希, Cython版本, 编译指令, Python ABI标签及编译参数生成缓存键,
+        命中时直接复用上次编译的.so文件, 跳过cythonize及C编译;
+        缓存总大小超过上限时, 按最近使用时间(LRU)淘汰;
+        多个编译器(批量编译的各项目或同时运行的多个进程)共用缓存文件夹, 写回清单时合并其他编译器写入的条目
+
+    manifest = dict(
+                    entries={
+                        '<key>': dict(
+                            name='xxx/xxx.py',  # 模块相对路径
+                            so_file_name='xxx/xxx.cpython-xxx.so',  # 编译文件的相对路径
+                            size=1024,  # 编译文件大小
+                            last_used=1671600000.0,  # 最近使用时间
+                        ),
+                        ...
+                    },
+                    sources={
+                        # 模块相对路径 -> 上次计算的源文件内容哈希, 及计算时input目录中文件的大小与修改时间
+                        'xxx/xxx.py': dict(sha256='<sha256>', size=1024, mtime_ns=1671600000000000000),
+                        ...
+                    }
+                )
+    """
+    MANIFEST_FILE = 'manifest.json'
+    LOCK_FILE = 'manifest.lock'
+    OBJECTS_DIR = 'objects'
+
+    def __init__(self, cache_dir: str = BUILD_CACHE_DIR, max_size: int = DEFAULT_BUILD_CACHE_SIZE):
+        """
+        Args:
+            cache_dir (str): 缓存文件夹
+            max_size (int): 缓存总大小上限(字节)
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, self.OBJECTS_DIR)
+        self.manifest_path = os.path.join(cache_dir, self.MANIFEST_FILE)
+        self.max_size = max_size
+        self.fingerprint = json.dumps(get_compiler_fingerprint(), sort_keys=True)
+        self.manifest = self._load_manifest()
+        self.removed = set()  # 本编译器删除的条目(缓存文件不存在或已淘汰), 写回清单时不再合并
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.objects_dir):
+            os.makedirs(self.objects_dir)
+
+    def _load_manifest(self) -> dict:
+        """
+        加载缓存清单, 清单损坏时视为空缓存
+
+        Returns:
+            manifest (dict):
+        """
+        if not os.path.exists(self.manifest_path):
+            return dict(entries=dict(), sources=dict())
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (ValueError, OSError):
+            print("编译缓存清单已损坏, 忽略: [{}]".format(self.manifest_path))
+            return dict(entries=dict(), sources=dict())
+        manifest.setdefault('entries', dict())
+        manifest.setdefault('sources', dict())
+        return manifest
+
+    def get_source_hash(self, name: str, py_file_path: str, unchanged: bool = False) -> str:
+        """
+        获取源文件内容哈希
+
+            unchanged为True(同步时已确认文件未变更)且文件大小及修改时间与记录一致时, 直接复用上次记录的哈希, 无需读取文件;
+            清单只在编译成功后写回, 编译失败时input目录已同步而清单未更新, 只按同步结果判断会复用变更前的哈希
+
+        Args:
+            name (str): 模块相对路径
+            py_file_path (str): 源文件绝对路径
+            unchanged (bool): 文件是否未变更
+
+        Returns:
+            digest (str):
+        """
+        sources = self.manifest['sources']
+        stat = os.stat(py_file_path)
+        record = sources.get(name)
+        # 旧版本清单中只记录了哈希(str), 重新计算
+        if unchanged and isinstance(record, dict) and record.get('size') == stat.st_size and \
+                record.get('mtime_ns') == stat.st_mtime_ns:
+            return record['sha256']
+        # 先取文件状态再计算哈希, 计算期间文件被修改时, 下次因修改时间不一致重新计算
+        sources[name] = dict(sha256=hash_file(py_file_path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return sources[name]['sha256']
+
+    def make_key(self, name: str, py_file_path: str, compiler_directives: dict, unchanged: bool = False,
+                 build_flags: dict = None, depends: Dict[str, str] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            name (str): 模块相对路径, 决定编译后的模块名称
+            py_file_path (str): 源文件绝对路径
+            compiler_directives (dict): Cython编译指令
+            unchanged (bool): 同步时是否已确认文件未变更
+            build_flags (dict): 编译配置中的编译及链接参数
+            depends (dict): 编译依赖(.pxd/.pxi文件)的相对路径 -> 内容哈希
+
+        Returns:
+            key (str):
+        """
+        sha = hashlib.sha256()
+        sha.update(name.encode('utf-8'))
+        sha.update(self.get_source_hash(name, py_file_path, unchanged=unchanged).encode('utf-8'))
+        sha.update(json.dumps(compiler_directives, sort_keys=True).encode('utf-8'))
+        sha.update(self.fingerprint.encode('utf-8'))
+        if build_flags:
+            sha.update(json.dumps(build_flags, sort_keys=True).encode('utf-8'))
+        if depends:
+            sha.update(json.dumps(depends, sort_keys=True).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.objects_dir, key)
+
+    def lookup(self, key: str, build_lib_path: str) -> Optional[str]:
+        """
+        查找缓存, 命中时将缓存的.so文件放回build/lib.xxx-cpython-xxx文件夹
+
+        Args:
+            key (str): 缓存键
+            build_lib_path (str): build/lib.xxx-cpython-xxx文件夹绝对路径
+
+        Returns:
+            so_file_name (str): 编译文件的相对路径, 未命中时为None
+        """
+        entry = self.manifest['entries'].get(key)
+        object_path = self._object_path(key)
+        if (not entry) or (not os.path.exists(object_path)):
+            if self.manifest['entries'].pop(key, None):
+                self.removed.add(key)
+            self.misses += 1
+            return None
+
+        target_file = os.path.join(build_lib_path, entry['so_file_name'])
+        target_dir = os.path.dirname(target_file)
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        replace_file(object_path, target_file)
+        entry['last_used'] = time.time()
+        self.hits += 1
+        return entry['so_file_name']
+
+    def store(self, key: str, name: str, build_lib_path: str, so_file_name: str) -> None:
+        """
+        缓存编译结果
+
+        Args:
+            key (str): 缓存键
+            name (str): 模块相对路径
+            build_lib_path (str): build/lib.xxx-cpython-xxx文件夹绝对路径
+            so_file_name (str): 编译文件的相对路径
+
+        Returns:
+
+        """
+        object_path = self._object_path(key)
+        replace_file(os.path.join(build_lib_path, so_file_name), object_path)
+        self.manifest['entries'][key] = dict(
+            name=name,
+            so_file_name=so_file_name,
+            size=os.path.getsize(object_path),
+            last_used=time.time(),
+        )
+
+    def evict(self) -> None:
+        """按最近使用时间淘汰缓存, 直至总大小不超过上限"""
+        entries = self.manifest['entries']
+        total_size = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total_size <= self.max_size:
+                break
+            total_size -= entries[key]['size']
+            entries.pop(key)
+            self.removed.add(key)
+            if os.path.exists(self._object_path(key)):
+                os.remove(self._object_path(key))
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """缓存清单的文件锁(进程间互斥), 不支持fcntl时不加锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.cache_dir, self.LOCK_FILE), 'w') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _merge_manifest(self) -> None:
+        """
+        合并缓存清单文件中其他编译器写入的条目, 本编译器的条目优先, 最近使用时间取较晚者
+
+            本编译器创建后, 其他编译器可能已写回清单, 直接覆盖会丢失其条目, 对应的缓存文件不再被引用
+        """
+        manifest = self._load_manifest()
+        for key in self.removed:
+            manifest['entries'].pop(key, None)
+        for key, entry in self.manifest['entries'].items():
+            other = manifest['entries'].get(key)
+            if other is not None:
+                entry['last_used'] = max(entry['last_used'], other.get('last_used', 0))
+        manifest['entries'].update(self.manifest['entries'])
+        manifest['sources'].update(self.manifest['sources'])
+        self.manifest = manifest
+
+    def save(self) -> None:
+        """合并其他编译器写入的条目, 淘汰超出上限的缓存并写回缓存清单"""
+        with self._lock():
+            self._merge_manifest()
+            self.evict()
+            tmp_path = '{}.{}.tmp'.format(self.manifest_path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        print("编译缓存: 命中{}个, 未命中{}个, 缓存文件夹: [{}]".format(self.hits, self.misses, self.cache_dir))
+
+
+class ObjectCache(object):
+    """
+    内容寻址的编译结果缓存(类似ccache)
+
+        以预处理后的C文件内容, 编译参数及Python ABI标签生成缓存键, 与项目路径及模块所在目录无关,
+        可在不同项目及不同检出目录之间共享; 命中时直接复用.so文件, 跳过C编译;
+        缓存文件按键分目录存放, 无需清单文件, 多个进程可同时读写; 总大小超过上限时按最近使用时间淘汰
+    """
+    OBJECT_SUFFIX = '.so'
+
+    def __init__(self, cache_dir: str = OBJECT_CACHE_DIR, max_size: int = DEFAULT_OBJECT_CACHE_SIZE):
+        """
+        Args:
+            cache_dir (str): 缓存文件夹
+            max_size (int): 缓存总大小上限(字节)
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, sources: list, include_dirs: list = None, macros: list = None,
+                 extra_args: list = None) -> Optional[str]:
+        """
+        生成缓存键
+
+        Args:
+            sources (list): C文件绝对路径
+            include_dirs (list): 头文件目录
+            macros (list): 宏定义
+            extra_args (list): 其他编译及链接参数
+
+        Returns:
+            key (str): 预处理失败时为None, 即不使用缓存
+        """
+        sha = hashlib.sha256()
+        for source in sources:
+            digest = hash_preprocessed_c_file(source, include_dirs=include_dirs, macros=macros)
+            if digest is None:
+                return None
+            sha.update(digest.encode('utf-8'))
+        sha.update(json.dumps(get_compiler_fingerprint(), sort_keys=True).encode('utf-8'))
+        sha.update(json.dumps(extra_args or list()).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.OBJECT_SUFFIX)
+
+    def lookup(self, key: str, target_file: str) -> bool:
+        """
+        查找缓存, 命中时将缓存的.so文件拷贝至target_file
+
+        Args:
+            key (str): 缓存键
+            target_file (str): 编译文件的绝对路径
+
+        Returns:
+            result (bool): 是否命中
+        """
+        object_path = self._object_path(key)
+        try:
+            os.utime(object_path)  # 更新最近使用时间
+        except OSError:
+            self.misses += 1
+            return False
+
+        target_dir = os.path.dirname(target_file)
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir, exist_ok=True)
+        replace_file(object_path, target_file)
+        self.hits += 1
+        return True
+
+    def store(self, key: str, source_file: str) -> None:
+        """
+        缓存编译结果
+
+        Args:
+            key (str): 缓存键
+            source_file (str): 编译文件的绝对路径
+
+        Returns:
+
+        """
+        object_path = self._object_path(key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        replace_file(source_file, object_path)
+
+    def evict(self) -> None:
+        """按最近使用时间淘汰缓存, 直至总大小不超过上限"""
+        if not os.path.exists(self.cache_dir):
+            return None
+        objects = list()
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if not file.endswith(self.OBJECT_SUFFIX):
+                    continue
+                stat = os.stat(os.path.join(root, file))
+                objects.append((stat.st_mtime, stat.st_size, os.path.join(root, file)))
+
+        total_size = sum(size for _, size, _ in objects)
+        for _, size, object_path in sorted(objects):
+            if total_size <= self.max_size:
+                break
+            total_size -= size
+            try:
+                os.remove(object_path)
+            except OSError:
+                pass
+        return None
+
+    def report(self) -> None:
+        """淘汰超出上限的缓存并输出命中统计"""
+        self.evict()
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        print("C编译缓存: 命中{}个, 未命中{}个, 命中率{:.1f}%, 缓存文件夹: [{}]".format(
+            self.hits, self.misses, ratio, self.cache_dir))
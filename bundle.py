@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : bundle.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 将整个python包合并编译为一个扩展模块, 并生成从中加载子模块的导入钩子
+"""
+import ast
+import os.path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from setuptools.extension import Extension
+
+from pipeline import CompileResult, compile_extension, translate_py_file
+from profiles import BuildProfile
+
+BUNDLE_MODULE_NAME = '_bundle'  # 合并编译的扩展模块名称
+BUNDLE_IMPORTER_NAME = '_bundle_importer'  # 导入钩子模块名称
+
+# 导入钩子模块, 位于合并编译的python包中, 由__init__.py导入并安装
+BUNDLE_IMPORTER_TEMPLATE = '''# -*- coding: utf-8 -*-
+"""由PythonCodeCompiling生成: 从合并编译的扩展模块({bundle_name})中加载子模块"""
+import importlib.machinery
+import importlib.util
+import os.path
+import sys
+
+BUNDLE_NAME = {bundle_name!r}
+MODULES = {modules!r}
+
+
+class BundleFinder(object):
+    """子模块的查找器, 以子模块名称(PyInit_<名称>)从同一个扩展模块中加载"""
+
+    def __init__(self, package, bundle_file):
+        self.bundle_file = bundle_file
+        self.modules = set('{{}}.{{}}'.format(package, module) for module in MODULES)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in self.modules:
+            return None
+        loader = importlib.machinery.ExtensionFileLoader(fullname, self.bundle_file)
+        return importlib.util.spec_from_file_location(fullname, self.bundle_file, loader=loader)
+
+
+def install(package, package_dir):
+    for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+        bundle_file = os.path.join(package_dir, BUNDLE_NAME + suffix)
+        if os.path.exists(bundle_file):
+            break
+    else:
+        return None
+    for finder in sys.meta_path:
+        if isinstance(finder, BundleFinder) and finder.bundle_file == bundle_file:
+            return finder
+    finder = BundleFinder(package, bundle_file)
+    sys.meta_path.insert(0, finder)
+    return finder
+'''
+
+# 插入__init__.py的导入钩子安装语句
+BUNDLE_INSTALL_STATEMENT = ('from .{0} import install as _install_bundle; '
+                            '_install_bundle(__name__, __path__[0]); del _install_bundle  '
+                            '# PythonCodeCompiling\n').format(BUNDLE_IMPORTER_NAME)
+
+
+def split_bundle_members(names: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    划分合并编译的模块
+
+        同一个扩展模块中每个子模块的初始化函数为PyInit_<模块名称>, 模块名称(不含包名)重复时,
+        只合并第一个(按路径排序), 其余模块单独编译
+
+    Args:
+        names (list): python包(含子包)中待编译的文件
+
+    Returns:
+        members (list): 合并编译的文件
+        others (list): 单独编译的文件
+    """
+    members, others = list(), list()
+    module_names = set()
+    for name in sorted(names):
+        module_name = os.path.basename(name)[:-3]
+        if module_name in module_names or module_name in (BUNDLE_MODULE_NAME, BUNDLE_IMPORTER_NAME):
+            others.append(name)
+            continue
+        module_names.add(module_name)
+        members.append(name)
+    return members, others
+
+
+def get_bundle_modules(package: str, names: List[str]) -> List[str]:
+    """
+    合并编译的子模块名称(相对于python包)
+
+    Args:
+        package (str): python包相对路径, 例如demo_proj/pkg
+        names (list): 合并编译的文件, 例如demo_proj/pkg/sub/mod.py
+
+    Returns:
+        modules (list): 例如sub.mod
+    """
+    return [name[len(package) + 1:-3].replace('/', '.') for name in names]
+
+
+def make_bundle_extension(package: str, extensions: List[Extension]) -> Extension:
+    """
+    以各模块的.c文件为源文件, 生成合并编译的扩展模块
+
+    Args:
+        package (str): python包相对路径, 例如demo_proj/pkg
+        extensions (list): 各模块cythonize后的扩展模块
+
+    Returns:
+        extension (Extension):
+    """
+    def merge(attr: str) -> list:
+        results = list()
+        for extension in extensions:
+            for item in getattr(extension, attr) or list():
+                if item not in results:
+                    results.append(item)
+        return results
+
+    return Extension(
+        '{}.{}'.format(package.strip('/').replace('/', '.'), BUNDLE_MODULE_NAME),
+        sources=[source for extension in extensions for source in extension.sources],
+        include_dirs=merge('include_dirs'),
+        define_macros=merge('define_macros'),
+        extra_compile_args=merge('extra_compile_args'),
+        extra_link_args=merge('extra_link_args'),
+        libraries=merge('libraries'),
+        library_dirs=merge('library_dirs'),
+    )
+
+
+def compile_bundle(package: str, py_file_paths: List[str], compiler_directives: Dict[str, dict],
+                   object_cache_dir: str = None, jobs: int = 1, profile: BuildProfile = None,
+                   shared_utility: str = None) -> CompileResult:
+    """
+    合并编译: 分别cythonize各模块, 再将全部.c文件编译链接为一个扩展模块
+
+    Args:
+        package (str): python包相对路径, 例如demo_proj/pkg
+        py_file_paths (list): 合并编译文件的绝对路径
+        compiler_directives (dict): 文件绝对路径 -> Cython编译指令
+        object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+        jobs (int): cythonize的进程数
+        profile (BuildProfile): 编译配置
+        shared_utility (str): 共享工具模块的完整模块名称
+
+    Returns:
+        result (CompileResult):
+    """
+    if jobs > 1 and len(py_file_paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(py_file_paths))) as executor:
+            translated = list(executor.map(translate_py_file, py_file_paths,
+                                           [compiler_directives[path] for path in py_file_paths],
+                                           [shared_utility] * len(py_file_paths)))
+    else:
+        translated = [translate_py_file(path, compiler_directives[path], shared_utility) for path in py_file_paths]
+
+    extension = make_bundle_extension(package, [extension for extension, _ in translated])
+    result = compile_extension(extension, object_cache_dir, profile)
+    spans = tuple(span for _, span in translated)
+    return result._replace(translate_seconds=sum(span.seconds for span in spans), spans=spans + result.spans)
+
+
+def render_bundle_importer(modules: List[str]) -> str:
+    """
+    生成导入钩子模块的源码
+
+    Args:
+        modules (list): 合并编译的子模块名称(相对于python包)
+
+    Returns:
+        source (str):
+    """
+    return BUNDLE_IMPORTER_TEMPLATE.format(bundle_name=BUNDLE_MODULE_NAME, modules=sorted(modules))
+
+
+def inject_bundle_installer(source: str) -> str:
+    """
+    在__init__.py中插入导入钩子安装语句: 位于文档字符串及from __future__ import之后, 其余代码之前
+
+    Args:
+        source (str): __init__.py源码
+
+    Returns:
+        source (str):
+    """
+    lines = source.splitlines(keepends=True)
+    if lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+
+    # 保留开头的注释(#!, 编码声明)
+    position = 0
+    while position < len(lines) and lines[position].lstrip().startswith('#'):
+        position += 1
+    try:
+        body = ast.parse(source).body
+    except SyntaxError:
+        body = list()
+    for i, node in enumerate(body):
+        is_docstring = i == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+            and isinstance(node.value.value, str)
+        is_future = isinstance(node, ast.ImportFrom) and node.module == '__future__'
+        if not (is_docstring or is_future):
+            break
+        position = max(position, node.end_lineno)
+
+    return ''.join(lines[:position] + [BUNDLE_INSTALL_STATEMENT] + lines[position:])
+
+
+def group_bundle_members(names: List[str], match_package) -> Dict[str, List[str]]:
+    """
+    按合并编译的python包对待编译文件分组
+
+    Args:
+        names (list): 待编译文件
+        match_package (callable): 查找文件所属的合并编译python包, 不属于时返回None
+
+    Returns:
+        bundles (dict): python包相对路径 -> 待编译文件
+    """
+    bundles = dict()
+    for name in names:
+        package = match_package(name)
+        if package is not None:
+            bundles.setdefault(package, list()).append(name)
+    return bundles
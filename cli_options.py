@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : cli_options.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : run.py及batch.py共用的命令行选项解析
+"""
+import click
+
+from memory import parse_memory_size
+from remote import parse_worker_address
+
+
+def parse_workers_option(ctx, param, value):
+    """校验--worker选项的编译节点地址(host:port)"""
+    for address in value:
+        try:
+            parse_worker_address(address)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+    return list(value)
+
+
+def parse_mem_budget_option(ctx, param, value):
+    """解析--mem-budget选项的内存大小(例如8G, 512M)"""
+    try:
+        return parse_memory_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
@@ -12,6 +12,29 @@ INPUT_DIR = os.path.join(BASE_DIR, 'input/')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'output/')
 BUILD_DIR = os.path.join(BASE_DIR, 'build/')
 PROJECT_CONFIG_DIR = os.path.join(BASE_DIR, 'projects_config/')
+CACHE_DIR = os.path.join(BASE_DIR, 'cache/')
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, 'build/')
+OBJECT_CACHE_DIR = os.path.join(CACHE_DIR, 'objects/')
+HISTORY_DIR = os.path.join(CACHE_DIR, 'history/')
+BENCHMARK_DIR = os.path.join(CACHE_DIR, 'benchmark/')
+PGO_DIR = os.path.join(CACHE_DIR, 'pgo/')
+DEPGRAPH_DIR = os.path.join(CACHE_DIR, 'depgraph/')
+PREFLIGHT_DIR = os.path.join(CACHE_DIR, 'preflight/')
+ADVISOR_DIR = os.path.join(CACHE_DIR, 'advisor/')
+JOURNAL_DIR = os.path.join(CACHE_DIR, 'journal/')
+VERIFY_DIR = os.path.join(CACHE_DIR, 'verify/')
+BATCH_DIR = os.path.join(CACHE_DIR, 'batch/')
+SHARED_UTILITY_DIR = os.path.join(CACHE_DIR, 'shared_utility/')
+
+# 编译缓存总大小上限(字节), 超出后按最近使用时间淘汰
+DEFAULT_BUILD_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+# C编译缓存总大小上限(字节), 超出后按最近使用时间淘汰
+DEFAULT_OBJECT_CACHE_SIZE = 5 * 1024 * 1024 * 1024
+
+# 默认的Cython编译指令
+DEFAULT_COMPILER_DIRECTIVES = {
+    'always_allow_keywords': True,
+}
 
 # 默认忽略的文件/文件夹
 DEFAULT_IGNORED_FILES = [
@@ -21,3 +44,7 @@ DEFAULT_IGNORED_FILES = [
     '.DS_Store',
     'migrations',  # django数据库迁移文件, 无法编译
 ]
+# 直接拷贝的文件夹(非python包)及同步至input目录时忽略的文件/文件夹, 其余与源项目一致
+PASS_THROUGH_IGNORED_FILES = [
+    '__pycache__',
+]
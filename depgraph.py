@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : depgraph.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 项目内模块的依赖关系图(import, cimport, include), 用于按依赖判断需要重新编译的模块
+"""
+import ast
+import json
+import os.path
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from constants import DEPGRAPH_DIR
+from scanner import ProjectInventory
+
+DEP_IMPORT = 'imports'  # python导入, 只影响运行时, 不影响编译结果
+DEP_CIMPORT = 'cimports'  # cimport的.pxd文件, 影响编译结果
+DEP_INCLUDE = 'includes'  # include的.pxi/.pxd文件, 影响编译结果
+
+# 参与依赖分析的文件类型
+SOURCE_SUFFIXES = ('.py', '.pyx', '.pxd', '.pxi')
+# 纯python模式中cimport的模块前缀: from cython.cimports.xxx import yyy
+CYTHON_CIMPORTS_PREFIX = 'cython.cimports.'
+
+_CIMPORT_PATTERN = re.compile(r'^\s*cimport\s+([\w. ,]+)', re.M)
+_FROM_CIMPORT_PATTERN = re.compile(r'^\s*from\s+(\.*[\w.]*)\s+cimport\s+\(?\s*([\w, ]+)', re.M)
+_INCLUDE_PATTERN = re.compile(r'''^\s*include\s+['"]([^'"]+)['"]''', re.M)
+
+
+def get_module_name(path: str) -> str:
+    """
+    文件相对路径对应的模块名称, 例如demo_proj/pkg/__init__.py -> demo_proj.pkg
+
+    Args:
+        path (str): 相对路径
+
+    Returns:
+        module (str):
+    """
+    module = os.path.splitext(path)[0].replace('/', '.')
+    if module.endswith('.__init__'):
+        module = module[:-len('.__init__')]
+    return module
+
+
+def _resolve_relative(module: str, level: int, path: str) -> str:
+    """
+    将相对导入转换为绝对模块名称
+
+    Args:
+        module (str): 导入的模块, from . import x时为空
+        level (int): 相对层级, 0为绝对导入
+        path (str): 导入所在文件的相对路径
+
+    Returns:
+        module (str):
+    """
+    if not level:
+        return module
+    package = path.split('/')[:-1]
+    if level > 1:
+        package = package[:-(level - 1)]
+    return '.'.join(package + ([module] if module else list()))
+
+
+def _candidates(module: str, names: Iterable[str]) -> List[str]:
+    """from module import names: 导入的可能是子模块, 也可能是模块中的对象"""
+    return ['{}.{}'.format(module, name) if module else name for name in names if name != '*'] + \
+        ([module] if module else list())
+
+
+def parse_python_source(source: str, path: str) -> Dict[str, List[List[str]]]:
+    """
+    解析python文件的导入, 语法错误时视为没有依赖
+
+    Args:
+        source (str): 源码
+        path (str): 文件相对路径, 用于转换相对导入
+
+    Returns:
+        references (dict): imports/cimports -> 每个导入语句的候选模块名称(按优先级排列)
+    """
+    references = {DEP_IMPORT: list(), DEP_CIMPORT: list(), DEP_INCLUDE: list()}
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return references
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.startswith(CYTHON_CIMPORTS_PREFIX):
+                    references[DEP_CIMPORT].append([alias.name[len(CYTHON_CIMPORTS_PREFIX):]])
+                else:
+                    references[DEP_IMPORT].append([alias.name])
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ''
+            names = [alias.name for alias in node.names]
+            if not node.level and module.startswith(CYTHON_CIMPORTS_PREFIX):
+                references[DEP_CIMPORT].append(_candidates(module[len(CYTHON_CIMPORTS_PREFIX):], names))
+            elif not node.level and module == 'cython.cimports':
+                references[DEP_CIMPORT].append(_candidates('', names))
+            else:
+                references[DEP_IMPORT].append(_candidates(_resolve_relative(module, node.level, path), names))
+    return references
+
+
+def parse_cython_source(source: str, path: str) -> Dict[str, List[List[str]]]:
+    """
+    解析Cython文件(.pyx/.pxd/.pxi)的cimport及include, 按行匹配, 不解析完整语法
+
+    Args:
+        source (str): 源码
+        path (str): 文件相对路径
+
+    Returns:
+        references (dict): cimports -> 候选模块名称; includes -> 相对于文件所在文件夹的路径
+    """
+    references = {DEP_IMPORT: list(), DEP_CIMPORT: list(), DEP_INCLUDE: list()}
+    for match in _CIMPORT_PATTERN.finditer(source):
+        for item in match.group(1).split(','):
+            module = item.strip().split(' ')[0]
+            if module:
+                references[DEP_CIMPORT].append([module])
+    for match in _FROM_CIMPORT_PATTERN.finditer(source):
+        module = match.group(1)
+        level = len(module) - len(module.lstrip('.'))
+        module = _resolve_relative(module.lstrip('.'), level, path)
+        names = [name.strip().split(' ')[0] for name in match.group(2).split(',') if name.strip()]
+        references[DEP_CIMPORT].append(_candidates(module, names))
+    for match in _INCLUDE_PATTERN.finditer(source):
+        references[DEP_INCLUDE].append([match.group(1)])
+    return references
+
+
+class DependencyGraph(object):
+    """
+    项目内模块的依赖关系图
+
+        按文件大小及修改时间缓存各文件的解析结果, 只重新解析变更的文件;
+        编译依赖: python文件同名的.pxd文件(augmenting .pxd), cimport的.pxd文件, include的文件, 及其传递依赖;
+        python导入只影响运行时, 只记录, 不用于判断是否重新编译
+
+    graph = {
+        'xxx/xxx.py': dict(
+            size=1024,
+            mtime_ns=1671600000000000000,
+            imports=[['xxx.yyy', 'xxx'], ...],  # 每个导入语句的候选模块名称
+            cimports=[['xxx.yyy'], ...],
+            includes=[['xxx.pxi'], ...],
+        ),
+        ...
+    }
+    """
+
+    def __init__(self, project_name: str, cache_dir: str = DEPGRAPH_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            cache_dir (str): 缓存文件夹
+        """
+        self.project_name = project_name
+        self.cache_path = os.path.join(cache_dir, '{}.json'.format(project_name))
+        self.graph: Dict[str, dict] = dict()
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    self.graph = json.load(f)
+            except (ValueError, OSError):
+                self.graph = dict()
+        self.modules: Dict[str, str] = dict()  # 模块名称 -> .py文件
+        self.headers: Dict[str, str] = dict()  # 模块名称 -> .pxd文件
+        self.edges: Dict[str, Set[str]] = dict()  # 文件 -> 直接编译依赖
+        self.reverse_edges: Dict[str, Set[str]] = dict()  # 文件 -> 直接依赖该文件的文件
+        self.previous_reverse_edges: Dict[str, Set[str]] = dict()  # 更新前的反向依赖, 用于查找删除的文件的依赖
+        self.parsed = 0  # 本次重新解析的文件数
+        self._resolve()
+
+    def update(self, inventory: ProjectInventory) -> int:
+        """
+        按项目文件清单更新依赖关系图
+
+        Args:
+            inventory (ProjectInventory): 项目文件清单
+
+        Returns:
+            parsed (int): 重新解析的文件数
+        """
+        graph = dict()
+        self.parsed = 0
+        for path, file in inventory.files.items():
+            if not path.endswith(SOURCE_SUFFIXES):
+                continue
+            node = self.graph.get(path)
+            if node is None or node['size'] != file.size or node['mtime_ns'] != file.mtime_ns:
+                node = self._parse(path, file.abs_path)
+                node.update(size=file.size, mtime_ns=file.mtime_ns)
+                self.parsed += 1
+            graph[path] = node
+        self.graph = graph
+        self.previous_reverse_edges = self.reverse_edges
+        self._resolve()
+        return self.parsed
+
+    @staticmethod
+    def _parse(path: str, abs_path: str) -> dict:
+        try:
+            with open(abs_path, encoding='utf-8') as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            return {DEP_IMPORT: list(), DEP_CIMPORT: list(), DEP_INCLUDE: list()}
+        if path.endswith('.py'):
+            return parse_python_source(source, path)
+        return parse_cython_source(source, path)
+
+    def _find_module(self, candidates: List[str], modules: Dict[str, str]) -> Optional[str]:
+        """
+        按候选模块名称查找项目内的文件, 依次尝试原名称及加上项目名称前缀(项目根目录在sys.path中时)
+
+        Args:
+            candidates (list): 候选模块名称
+            modules (dict): 模块名称 -> 文件
+
+        Returns:
+            path (str): 项目外的模块为None
+        """
+        for module in candidates:
+            for name in (module, '{}.{}'.format(self.project_name, module)):
+                if name in modules:
+                    return modules[name]
+        return None
+
+    def _resolve(self) -> None:
+        """将解析结果中的模块名称转换为项目内的文件, 生成编译依赖及反向依赖"""
+        self.modules, self.headers = dict(), dict()
+        for path in self.graph:
+            if path.endswith('.py'):
+                self.modules[get_module_name(path)] = path
+            elif path.endswith('.pxd'):
+                self.headers[get_module_name(path)] = path
+
+        self.edges, self.reverse_edges = dict(), dict()
+        for path, node in self.graph.items():
+            edges = set()
+            if path.endswith(('.py', '.pyx')):
+                header = os.path.splitext(path)[0] + '.pxd'
+                if header in self.graph:
+                    edges.add(header)
+            for candidates in node[DEP_CIMPORT]:
+                header = self._find_module(candidates, self.headers)
+                if header is not None and header != path:
+                    edges.add(header)
+            for (include,) in node[DEP_INCLUDE]:
+                for include_path in (os.path.normpath(os.path.join(os.path.dirname(path), include)).replace(os.sep, '/'),
+                                     '{}/{}'.format(self.project_name, include)):
+                    if include_path in self.graph:
+                        edges.add(include_path)
+                        break
+            self.edges[path] = edges
+            for dependency in edges:
+                self.reverse_edges.setdefault(dependency, set()).add(path)
+        return None
+
+    def get_imports(self, name: str) -> List[str]:
+        """
+        模块直接导入的项目内python文件
+
+        Args:
+            name (str): 文件相对路径
+
+        Returns:
+            paths (list):
+        """
+        node = self.graph.get(name)
+        if node is None:
+            return list()
+        paths = {self._find_module(candidates, self.modules) for candidates in node[DEP_IMPORT]}
+        return sorted(path for path in paths if path is not None and path != name)
+
+    def get_compile_dependencies(self, name: str) -> List[str]:
+        """
+        模块的全部编译依赖(含传递依赖), 不含模块本身
+
+        Args:
+            name (str): 文件相对路径
+
+        Returns:
+            paths (list):
+        """
+        visited, stack = set(), [name]
+        while stack:
+            for dependency in self.edges.get(stack.pop(), ()):
+                if dependency not in visited and dependency != name:
+                    visited.add(dependency)
+                    stack.append(dependency)
+        return sorted(visited)
+
+    def affected(self, changed_files: Iterable[str]) -> Set[str]:
+        """
+        编译依赖变更的文件(含传递依赖), 不含变更的文件本身
+
+            删除的文件已不在依赖关系图中, 同时按更新前的反向依赖查找
+
+        Args:
+            changed_files (iterable): 新增, 变更或删除的文件
+
+        Returns:
+            paths (set):
+        """
+        changed_files = set(changed_files)
+        visited, stack = set(), list(changed_files)
+        while stack:
+            path = stack.pop()
+            for dependent in self.reverse_edges.get(path, set()) | self.previous_reverse_edges.get(path, set()):
+                if dependent not in visited:
+                    visited.add(dependent)
+                    stack.append(dependent)
+        return visited - changed_files
+
+    def save(self) -> None:
+        """写回缓存"""
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.graph, f, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : journal.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译日志: 逐条追加记录各模块的编译结果, 中断或部分失败的编译可以续编, 只重新编译未完成及失败的模块
+"""
+import json
+import os.path
+import threading
+import time
+from typing import Dict, Optional
+
+from constants import JOURNAL_DIR
+
+EVENT_START = 'start'  # 开始编译, 记录编译配置指纹
+EVENT_RESUME = 'resume'  # 续编
+EVENT_DONE = 'done'  # 模块编译完成, 编译文件位于build目录
+EVENT_FAILED = 'failed'  # 模块编译失败
+EVENT_FINISH = 'finish'  # 编译结束
+
+MAX_ERROR_LENGTH = 1000  # 记录的错误信息长度上限
+
+
+class BuildJournal(object):
+    """
+    编译日志(jsonl), 只追加写入, 每条记录写入后立即落盘, 进程中断时最多丢失最后一条记录
+
+        续编时读取最近一次开始编译之后的记录, 编译配置指纹不一致时不续编;
+        模块的签名(源文件及编译依赖的大小, 修改时间, 编译指令)不变且编译文件仍在build目录中时跳过编译
+
+    {"event": "start", "time": 1671600000.0, "fingerprint": "..."}
+    {"event": "done", "name": "xxx/xxx.py", "signature": "...", "so_file": "xxx/xxx.cpython-xxx.so"}
+    {"event": "failed", "name": "xxx/yyy.py", "signature": "...", "error": "..."}
+    {"event": "resume", "time": 1671600100.0, "fingerprint": "..."}
+    {"event": "finish", "time": 1671600200.0, "failed": 0}
+    """
+
+    def __init__(self, project_name: str, fingerprint: str, resume: bool = False, journal_dir: str = JOURNAL_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            fingerprint (str): 编译配置指纹
+            resume (bool): 是否续编, 为False时清空上次的记录
+            journal_dir (str): 编译日志文件夹
+        """
+        self.journal_path = os.path.join(journal_dir, '{}.jsonl'.format(project_name))
+        self.fingerprint = fingerprint
+        self.done: Dict[str, dict] = dict()  # 已完成的模块 -> 最后一条done记录
+        self.failed: Dict[str, str] = dict()  # 上次失败的模块 -> 错误信息
+        self.resumed = 0  # 本次跳过编译的模块数
+        self._lock = threading.Lock()
+        resume = resume and self._load()
+        os.makedirs(journal_dir, exist_ok=True)
+        self._file = open(self.journal_path, 'a' if resume else 'w', encoding='utf-8')
+        self._append(event=EVENT_RESUME if resume else EVENT_START, time=time.time(), fingerprint=fingerprint)
+
+    def _load(self) -> bool:
+        """
+        读取上次的记录
+
+        Returns:
+            result (bool): 是否可以续编
+        """
+        if not os.path.exists(self.journal_path):
+            print("编译日志不存在, 重新编译: [{}]".format(self.journal_path))
+            return False
+        valid = False  # 当前记录是否属于与本次编译配置一致的编译
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时未写完的记录
+                    continue
+                event = record.get('event')
+                if event in (EVENT_START, EVENT_RESUME):
+                    valid = record.get('fingerprint') == self.fingerprint
+                    if event == EVENT_START or not valid:
+                        self.done, self.failed = dict(), dict()
+                elif not valid:
+                    continue
+                elif event == EVENT_DONE:
+                    self.done[record['name']] = record
+                    self.failed.pop(record['name'], None)
+                elif event == EVENT_FAILED:
+                    self.done.pop(record['name'], None)
+                    self.failed[record['name']] = record.get('error', '')
+        if not self.done and not self.failed:
+            print("编译日志中没有与当前编译配置一致的记录, 重新编译: [{}]".format(self.journal_path))
+            return False
+        print("续编: 上次已完成{}个模块, 失败{}个".format(len(self.done), len(self.failed)))
+        return True
+
+    def _append(self, **record) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def lookup(self, name: str, signature: str, build_lib_path: str) -> Optional[str]:
+        """
+        查找已完成的模块
+
+        Args:
+            name (str): 模块相对路径(合并编译时为python包)
+            signature (str): 模块的签名
+            build_lib_path (str): build/lib.xxx-cpython-xxx文件夹绝对路径
+
+        Returns:
+            so_file_name (str): 编译文件的相对路径, 未完成, 签名变化或编译文件不存在时为None
+        """
+        record = self.done.get(name)
+        if record is None or record['signature'] != signature or \
+                not os.path.exists(os.path.join(build_lib_path, record['so_file'])):
+            return None
+        self.resumed += 1
+        return record['so_file']
+
+    def record_done(self, name: str, signature: str, so_file_name: str) -> None:
+        """记录编译完成的模块, 可在其他线程中调用"""
+        self._append(event=EVENT_DONE, name=name, signature=signature, so_file=so_file_name)
+
+    def record_failed(self, name: str, signature: str, error: str) -> None:
+        """记录编译失败的模块"""
+        self._append(event=EVENT_FAILED, name=name, signature=signature, error=error[-MAX_ERROR_LENGTH:])
+
+    def finish(self, failed: int) -> None:
+        """记录编译结束"""
+        self._append(event=EVENT_FINISH, time=time.time(), failed=failed)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
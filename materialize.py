@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : materialize.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 输出文件的生成方式: 硬链接/reflink/copy_file_range/拷贝
+"""
+import errno
+import os.path
+import shutil
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MATERIALIZE_COPY = 'copy'  # 拷贝文件内容
+MATERIALIZE_HARDLINK = 'hardlink'  # 硬链接, 与源文件共享inode
+MATERIALIZE_REFLINK = 'reflink'  # 写时复制(ioctl FICLONE), 需文件系统支持, 如btrfs/xfs
+MATERIALIZE_COPY_FILE_RANGE = 'copy_file_range'  # 由内核完成拷贝, 无需经过用户态
+MATERIALIZE_STRATEGIES = (MATERIALIZE_COPY, MATERIALIZE_HARDLINK, MATERIALIZE_REFLINK, MATERIALIZE_COPY_FILE_RANGE)
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+# 跨文件系统或文件系统不支持时的错误码, 出现后回退为拷贝
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL,
+                    errno.ENOSYS, errno.ENOTTY, errno.EBADF}
+
+
+class Materializer(object):
+    """
+    按指定方式生成输出文件, 不支持时自动回退为拷贝
+
+        同一对(源设备, 目标设备)回退过一次后, 后续文件直接拷贝, 不再尝试
+    """
+
+    def __init__(self, strategy: str = MATERIALIZE_COPY):
+        """
+        Args:
+            strategy (str): 生成方式, 见MATERIALIZE_STRATEGIES
+        """
+        if strategy not in MATERIALIZE_STRATEGIES:
+            raise ValueError("不支持的输出文件生成方式: {}".format(strategy))
+        if strategy == MATERIALIZE_REFLINK and fcntl is None:
+            strategy = MATERIALIZE_COPY
+        if strategy == MATERIALIZE_COPY_FILE_RANGE and not hasattr(os, 'copy_file_range'):
+            strategy = MATERIALIZE_COPY
+        self.strategy = strategy
+        self.stats = Counter()  # 生成方式 -> 文件数
+        self._unsupported = set()  # 已回退的(源设备, 目标设备)
+
+    def materialize(self, source_file: str, target_file: str) -> str:
+        """
+        生成输出文件, 目标文件已存在时覆盖
+
+        Args:
+            source_file (str): 源文件
+            target_file (str): 目标文件
+
+        Returns:
+            strategy (str): 实际使用的生成方式
+        """
+        strategy = self.strategy
+        if strategy != MATERIALIZE_COPY:
+            devices = (os.stat(source_file).st_dev, os.stat(os.path.dirname(target_file) or '.').st_dev)
+            if devices in self._unsupported:
+                strategy = MATERIALIZE_COPY
+            else:
+                try:
+                    self._materialize(strategy, source_file, target_file)
+                except OSError as e:
+                    if e.errno not in _FALLBACK_ERRNOS:
+                        raise
+                    self._unsupported.add(devices)
+                    strategy = MATERIALIZE_COPY
+
+        if strategy == MATERIALIZE_COPY:
+            shutil.copyfile(source_file, target_file)
+        self.stats[strategy] += 1
+        return strategy
+
+    def copy2(self, source_file: str, target_file: str) -> str:
+        """shutil.copytree的copy_function, 拷贝时保留文件元数据"""
+        if self.strategy == MATERIALIZE_COPY:
+            shutil.copy2(source_file, target_file)
+            self.stats[MATERIALIZE_COPY] += 1
+            return target_file
+        if self.materialize(source_file, target_file) != MATERIALIZE_HARDLINK:
+            shutil.copystat(source_file, target_file)
+        return target_file
+
+    @staticmethod
+    def _materialize(strategy: str, source_file: str, target_file: str) -> None:
+        if os.path.lexists(target_file):
+            os.remove(target_file)
+
+        if strategy == MATERIALIZE_HARDLINK:
+            os.link(source_file, target_file)
+            return None
+
+        with open(source_file, 'rb') as src, open(target_file, 'wb') as dst:
+            try:
+                if strategy == MATERIALIZE_REFLINK:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                else:
+                    remaining = os.fstat(src.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+            except OSError:
+                dst.close()
+                os.remove(target_file)
+                raise
+        return None
+
+    def report(self) -> None:
+        """输出各生成方式的文件数"""
+        if not self.stats:
+            return None
+        print("输出文件生成方式: {}".format(', '.join(
+            '{} {}个'.format(strategy, count) for strategy, count in sorted(self.stats.items()))))
+        return None
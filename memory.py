@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : memory.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : C编译的内存预算: 采样编译器子进程的常驻内存, 超出预算时暂缓提交新的编译任务
+"""
+import os.path
+import re
+import resource
+import threading
+from typing import List, Optional
+
+MEMORY_BUDGET_AUTO = 'auto'  # 按/proc/meminfo中的可用内存设置预算
+AUTO_BUDGET_RATIO = 0.8  # auto时预算占可用内存的比例
+
+# 无历史记录时, 按生成的.c文件大小估算C编译的峰值内存: 基础内存 + .c文件大小 * 系数
+DEFAULT_MEMORY_BASE = 128 * 1024 * 1024
+DEFAULT_MEMORY_PER_C_BYTE = 80
+# 按历史记录估算时的余量
+MEMORY_ESTIMATE_MARGIN = 1.2
+
+SAMPLE_INTERVAL = 0.05  # 常驻内存采样间隔(秒)
+
+_SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*$', re.I)
+_SIZE_UNITS = {'': 1024 * 1024, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def get_available_memory() -> Optional[int]:
+    """
+    系统可用内存(/proc/meminfo中的MemAvailable)
+
+    Returns:
+        size (int): 字节, 不支持时为None
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def parse_memory_size(value: Optional[str]) -> Optional[int]:
+    """
+    解析内存大小, 例如4G, 512M, 1.5GB; 无单位时为MB; auto为可用内存的80%
+
+    Args:
+        value (str):
+
+    Returns:
+        size (int): 字节, 为空时为None(不限制)
+    """
+    if value is None or value == '':
+        return None
+    if str(value).lower() == MEMORY_BUDGET_AUTO:
+        available = get_available_memory()
+        if available is None:
+            raise ValueError("无法读取可用内存, 请指定内存预算大小")
+        return int(available * AUTO_BUDGET_RATIO)
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError("无法解析的内存大小: {}".format(value))
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_memory_size(size: Optional[int]) -> str:
+    """格式化内存大小"""
+    if size is None:
+        return '不限'
+    for unit in ('G', 'M', 'K'):
+        if size >= _SIZE_UNITS[unit]:
+            return '{:.1f}{}'.format(size / _SIZE_UNITS[unit], unit)
+    return '{}B'.format(size)
+
+
+def _get_children(pid: int) -> List[int]:
+    """
+    进程的直接子进程, 优先读取/proc/<pid>/task/<tid>/children, 不支持时遍历/proc
+
+    Args:
+        pid (int):
+
+    Returns:
+        pids (list):
+    """
+    children = list()
+    task_dir = '/proc/{}/task'.format(pid)
+    try:
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, 'children')) as f:
+                children.extend(int(child) for child in f.read().split())
+        return children
+    except (OSError, ValueError):
+        pass
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry)) as f:
+                # 进程名称可能包含空格及括号, 从最后一个')'之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def get_descendants_rss(pid: int = None) -> int:
+    """
+    全部子孙进程(gcc, cc1, as, ld)的常驻内存之和
+
+    Args:
+        pid (int): 默认为当前进程
+
+    Returns:
+        rss (int): 字节
+    """
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    rss = 0
+    stack = _get_children(pid or os.getpid())
+    while stack:
+        child = stack.pop()
+        try:
+            with open('/proc/{}/statm'.format(child)) as f:
+                rss += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+        stack.extend(_get_children(child))
+    return rss
+
+
+class RssSampler(object):
+    """
+    在后台线程中采样当前进程子孙进程的常驻内存, 记录峰值
+
+        不支持/proc时, 使用getrusage(RUSAGE_CHILDREN)的ru_maxrss(已结束子进程中的最大值)
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """
+        Args:
+            interval (float): 采样间隔(秒)
+        """
+        self.interval = interval
+        self.peak = 0
+        self.supported = os.path.exists('/proc/self/statm')
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, get_descendants_rss())
+
+    def __enter__(self) -> 'RssSampler':
+        if self.supported:
+            self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            # ru_maxrss单位为KB(linux)
+            self.peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+        return None
+
+
+class MemoryBudget(object):
+    """
+    C编译的内存预算
+
+        提交编译任务前按预计峰值内存占用预算, 任务结束后释放;
+        预算不足时暂缓提交, 没有正在执行的任务时, 超出预算的任务单独执行, 避免无法继续
+    """
+
+    def __init__(self, budget: Optional[int], max_jobs: int):
+        """
+        Args:
+            budget (int): 内存预算(字节), 为None时不限制
+            max_jobs (int): 同时执行的任务数上限(C编译进程数)
+        """
+        self.budget = budget
+        self.max_jobs = max_jobs
+        self.in_use = 0
+        self.active = 0
+        self.peak_in_use = 0  # 同时占用预算的峰值
+        self._condition = threading.Condition()
+
+    def try_acquire(self, size: int) -> bool:
+        """
+        尝试占用预算
+
+        Args:
+            size (int): 预计峰值内存(字节)
+
+        Returns:
+            result (bool): 预算或进程数不足时为False
+        """
+        with self._condition:
+            if self.active >= self.max_jobs:
+                return False
+            if self.budget is not None and self.active and self.in_use + size > self.budget:
+                return False
+            self.in_use += size
+            self.active += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            return True
+
+    def release(self, size: int) -> None:
+        """释放预算, 唤醒等待的提交线程"""
+        with self._condition:
+            self.in_use -= size
+            self.active -= 1
+            self._condition.notify_all()
+
+    def wait(self, timeout: float) -> None:
+        """等待预算释放, 超时后返回"""
+        with self._condition:
+            self._condition.wait(timeout)
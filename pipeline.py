@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : pipeline.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : cythonize(生成.c文件)与C编译分离的两阶段流水线
+"""
+import hashlib
+import json
+import os.path
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from distutils import dir_util
+from distutils.core import setup
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# cythonize的导入必须为以下几行的末尾, 否则编译会出错
+from setuptools.command.build_ext import build_ext
+from setuptools.dist import Distribution
+from setuptools.extension import Extension
+from Cython.Build import cythonize
+from Cython.Build import Dependencies
+
+from build_cache import ObjectCache
+from memory import MemoryBudget, RssSampler, format_memory_size
+from profiles import BuildProfile
+from tracing import CATEGORY_MODULE, TraceSpan, get_file_size, make_span
+
+
+class CompileResult(NamedTuple):
+    """单个模块的编译结果"""
+    build_lib: str  # build/lib.xxx-cpython-xxx文件夹名称
+    so_file_name: str  # 编译文件的相对路径
+    cache_hit: Optional[bool] = None  # 是否命中C编译缓存, 未使用C编译缓存时为None
+    translate_seconds: float = 0.0  # cythonize耗时
+    compile_seconds: float = 0.0  # C编译耗时(含查找C编译缓存)
+    spans: Tuple[TraceSpan, ...] = ()  # 各阶段耗时记录: cythonize, C编译, 链接, C编译缓存
+    c_size: int = 0  # 生成的.c文件大小
+    peak_rss: int = 0  # C编译时编译器子进程的峰值常驻内存, 命中C编译缓存或在编译节点编译时为0
+
+
+class TimedBuildExt(build_ext):
+    """分别记录C编译及链接耗时的build_ext"""
+
+    def build_extension(self, ext):
+        self.spans = list()
+        compiler = self.compiler
+        compile_, link_shared_object = compiler.compile, compiler.link_shared_object
+
+        def timed_compile(sources, *args, **kwargs):
+            start = time.time()
+            objects = compile_(sources, *args, **kwargs)
+            self.spans.append(make_span('cc', CATEGORY_MODULE, start,
+                                        bytes_in=sum(get_file_size(source) for source in sources),
+                                        bytes_out=sum(get_file_size(obj) for obj in objects)))
+            return objects
+
+        def timed_link(objects, output_filename, *args, **kwargs):
+            start = time.time()
+            link_shared_object(objects, output_filename, *args, **kwargs)
+            self.spans.append(make_span('link', CATEGORY_MODULE, start,
+                                        bytes_in=sum(get_file_size(obj) for obj in objects),
+                                        bytes_out=get_file_size(output_filename)))
+
+        compiler.compile, compiler.link_shared_object = timed_compile, timed_link
+        try:
+            return super().build_extension(ext)
+        finally:
+            compiler.compile, compiler.link_shared_object = compile_, link_shared_object
+
+
+# 追加在生成的.c文件末尾, 记录生成时的Cython编译指令; 预处理时被忽略, 不影响C编译缓存
+DIRECTIVES_MARKER = '/* PythonCodeCompiling compiler_directives: {} */\n'
+
+
+def get_directives_marker(compiler_directives: dict, shared_utility: str = None) -> str:
+    """Cython编译指令(及共享工具模块)的标记"""
+    options = [compiler_directives, shared_utility] if shared_utility else compiler_directives
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return DIRECTIVES_MARKER.format(digest)
+
+
+def read_directives_marker(c_file_path: str) -> Optional[str]:
+    """读取.c文件末尾的Cython编译指令标记, 不存在时为None"""
+    try:
+        with open(c_file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - 128, 0))
+            last_line = f.read().decode('utf-8', errors='ignore').splitlines(keepends=True)[-1:]
+    except OSError:
+        return None
+    return last_line[0] if last_line else None
+
+
+def reset_dependency_tree() -> None:
+    """
+    清空Cython的依赖树缓存
+
+        cythonize在进程内缓存各文件的修改时间及依赖关系, 同一进程中再次编译(watch模式, 批量编译)时文件可能已变更,
+        需清空缓存才能判断出.c文件已过期; 之后fork的子进程继承清空后的状态
+    """
+    Dependencies._dep_tree = None
+
+
+def translate_py_file(py_file_path: str, compiler_directives: dict,
+                      shared_utility: str = None) -> Tuple[Extension, TraceSpan]:
+    """
+    cythonize阶段: 将python文件转换为.c文件, 可在子进程中执行
+
+        cythonize只按修改时间判断.c文件是否过期, 已有的.c文件由其他编译指令生成时强制重新转换
+
+    Args:
+        py_file_path (str): 待编译文件的绝对路径
+        compiler_directives (dict): Cython编译指令
+        shared_utility (str): 共享工具模块的完整模块名称, 为空时工具代码内嵌在各扩展模块中
+
+    Returns:
+        extension (Extension): 以.c文件为源文件的扩展模块
+        span (TraceSpan): cythonize耗时, 附带源文件及生成的.c文件大小
+    """
+    time_start = time.time()
+    marker = get_directives_marker(compiler_directives, shared_utility)
+    c_file_path = os.path.splitext(py_file_path)[0] + '.c'
+    force = os.path.exists(c_file_path) and read_directives_marker(c_file_path) != marker
+    options = dict(shared_utility_qualified_name=shared_utility) if shared_utility else dict()
+    extension = cythonize(
+        py_file_path,
+        compiler_directives=compiler_directives,
+        force=force,
+        **options
+    )[0]
+    for source in extension.sources:
+        if read_directives_marker(source) != marker:
+            with open(source, 'a') as f:
+                f.write(marker)
+    return extension, make_span('cythonize', CATEGORY_MODULE, time_start, bytes_in=get_file_size(py_file_path),
+                                bytes_out=sum(get_file_size(source) for source in extension.sources))
+
+
+def get_extension_file_name(extension: Extension) -> CompileResult:
+    """
+    获取扩展模块编译后的路径, 无需执行编译
+
+    Args:
+        extension (Extension): 扩展模块
+
+    Returns:
+        result (CompileResult):
+    """
+    dist_obj = Distribution(dict(ext_modules=[extension]))
+    build_ext_obj = dist_obj.get_command_obj(command='build_ext')
+    build_ext_obj.ensure_finalized()
+    return CompileResult(getattr(build_ext_obj, 'build_lib'), getattr(extension, '_file_name'))
+
+
+class ObjectCacheLookup(NamedTuple):
+    """C编译缓存的查找结果"""
+    object_cache: Optional[ObjectCache]  # 未使用C编译缓存时为None
+    key: Optional[str]  # 缓存键, 预处理失败时为None
+    result: Optional[CompileResult]  # 命中时的编译结果
+    spans: Tuple[TraceSpan, ...]
+    c_size: int  # .c文件大小
+
+
+def lookup_object_cache(extension: Extension, object_cache_dir: str = None) -> ObjectCacheLookup:
+    """
+    查找C编译缓存, 命中时将缓存的.so文件拷贝至build目录
+
+    Args:
+        extension (Extension): 已追加编译配置参数的扩展模块
+        object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+
+    Returns:
+        lookup (ObjectCacheLookup):
+    """
+    time_start = time.time()
+    c_size = sum(get_file_size(source) for source in extension.sources)
+    if not object_cache_dir:
+        return ObjectCacheLookup(None, None, None, (), c_size)
+    object_cache = ObjectCache(object_cache_dir)
+    key = object_cache.make_key(
+        extension.sources,
+        include_dirs=extension.include_dirs,
+        macros=extension.define_macros,
+        extra_args=[extension.extra_compile_args, extension.extra_link_args,
+                    extension.libraries, extension.library_dirs]
+    )
+    if not key:
+        return ObjectCacheLookup(object_cache, None, None, (), c_size)
+    result = get_extension_file_name(extension)
+    so_file = os.path.join(result.build_lib, result.so_file_name)
+    hit = object_cache.lookup(key, so_file)
+    spans = (make_span('object_cache', CATEGORY_MODULE, time_start, hit=hit, bytes_in=c_size,
+                       bytes_out=get_file_size(so_file) if hit else 0),)
+    if not hit:
+        return ObjectCacheLookup(object_cache, key, None, spans, c_size)
+    return ObjectCacheLookup(object_cache, key, result._replace(
+        cache_hit=True, compile_seconds=time.time() - time_start, spans=spans, c_size=c_size), spans, c_size)
+
+
+def clear_mkpath_cache() -> None:
+    """
+    清空distutils已创建文件夹的缓存
+
+        mkpath按路径缓存本进程已创建的文件夹, 不再检查是否存在; build文件夹被删除后(例如PGO两次编译之间)不会重新创建,
+        C编译报错can't create build/temp.xxx/xxx.o
+    """
+    path_created = getattr(dir_util, '_path_created', None)
+    if path_created is not None:
+        path_created.clear()
+    elif hasattr(dir_util, 'SkipRepeatAbsolutePaths'):
+        dir_util.SkipRepeatAbsolutePaths.clear()
+
+
+def compile_extension(extension: Extension, object_cache_dir: str = None,
+                      profile: BuildProfile = None) -> CompileResult:
+    """
+    C编译阶段: 编译并链接.c文件(build_ext), 可在子进程中执行
+
+    Args:
+        extension (Extension): 以.c文件为源文件的扩展模块
+        object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+        profile (BuildProfile): 编译配置, 为空时使用sysconfig的编译参数
+
+    Returns:
+        result (CompileResult):
+    """
+    time_start = time.time()
+    if profile is not None:
+        profile.apply(extension)
+
+    # 1.查找C编译缓存
+    lookup = lookup_object_cache(extension, object_cache_dir)
+    if lookup.result is not None:
+        return lookup.result
+    object_cache, key, spans, c_size = lookup.object_cache, lookup.key, list(lookup.spans), lookup.c_size
+
+    # 2.编译; build_ext按秒级修改时间判断是否过期, 同一秒内重新编译(watch模式)会被跳过, 是否编译已由缓存决定, 因此强制编译
+    clear_mkpath_cache()
+    with RssSampler() as sampler:
+        dist_obj: Distribution = setup(
+            script_args=['build_ext', '--force'],
+            ext_modules=[extension],
+            cmdclass={'build_ext': TimedBuildExt}
+        )
+    build_ext_obj = dist_obj.get_command_obj(command='build_ext')
+    build_lib = getattr(build_ext_obj, "build_lib")
+    extension_obj: Extension = getattr(build_ext_obj, 'extensions')[0]
+    so_file_name = getattr(extension_obj, '_file_name')
+
+    # 3.写入C编译缓存
+    if key:
+        object_cache.store(key, os.path.join(build_lib, so_file_name))
+    return CompileResult(build_lib, so_file_name, False if object_cache else None,
+                         compile_seconds=time.time() - time_start,
+                         spans=tuple(spans + getattr(build_ext_obj, 'spans', list())),
+                         c_size=c_size, peak_rss=sampler.peak)
+
+
+def compile_py_file(py_file_path: str, compiler_directives: dict, object_cache_dir: str = None,
+                    profile: BuildProfile = None, shared_utility: str = None) -> CompileResult:
+    """
+    在当前进程中依次执行cythonize及C编译
+
+    Args:
+        py_file_path (str): 待编译文件的绝对路径
+        compiler_directives (dict): Cython编译指令
+        object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+        profile (BuildProfile): 编译配置
+        shared_utility (str): 共享工具模块的完整模块名称
+
+    Returns:
+        result (CompileResult):
+    """
+    extension, span = translate_py_file(py_file_path, compiler_directives, shared_utility)
+    result = compile_extension(extension, object_cache_dir, profile)
+    return result._replace(translate_seconds=span.seconds, spans=(span,) + result.spans)
+
+
+class CompileExecutor(object):
+    """
+    C编译阶段的执行器接口
+
+        BuildPipeline通过执行器提交C编译, 默认在本机进程池中编译(LocalCompileExecutor),
+        也可分发至其他机器的编译节点(见remote.RemoteCompileExecutor)
+    """
+    max_workers: int = 1  # 可同时执行的C编译数
+
+    def submit(self, extension: Extension, object_cache_dir: str = None, profile: BuildProfile = None) -> Future:
+        """
+        提交C编译
+
+        Args:
+            extension (Extension): 以.c文件为源文件的扩展模块
+            object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+            profile (BuildProfile): 编译配置
+
+        Returns:
+            future (Future): 结果为CompileResult
+        """
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """等待已提交的C编译结束, 取消未开始的C编译"""
+        return None
+
+    def report(self) -> None:
+        """输出执行器的统计信息"""
+        return None
+
+
+class LocalCompileExecutor(CompileExecutor):
+    """在本机进程池中执行C编译"""
+
+    def __init__(self, max_workers: int):
+        """
+        Args:
+            max_workers (int): 进程数
+        """
+        self.max_workers = max(max_workers, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, extension: Extension, object_cache_dir: str = None, profile: BuildProfile = None) -> Future:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor.submit(compile_extension, extension, object_cache_dir, profile)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        return None
+
+
+class BuildPipeline(object):
+    """
+    两阶段编译流水线
+
+        cythonize进程池持续生成.c文件并放入队列, C编译进程池从队列中取出并编译,
+        C编译器处理第1个模块时, Cython可同时转换第2个模块;
+        两个阶段的进程数分别设置, 已转换但未开始编译的模块数不超过queue_size;
+        设置内存预算时, 按预计峰值内存提交C编译, 预算不足时暂缓提交, 优先提交队列中预算足够的模块;
+        C编译通过CompileExecutor提交, 未指定时在本机进程池中编译;
+        keep_going时单个模块cythonize或C编译失败不中断, 失败的模块记录在failures中
+    """
+
+    def __init__(self, translate_jobs: int, compile_jobs: int, queue_size: int = None,
+                 object_cache_dir: str = None, profile: BuildProfile = None, mem_budget: int = None,
+                 memory_estimator: Callable[[str, int], int] = None, shared_utility: str = None,
+                 compile_executor: CompileExecutor = None, keep_going: bool = False,
+                 on_compiled: Callable[[str, CompileResult], None] = None):
+        """
+        Args:
+            translate_jobs (int): cythonize阶段的进程数
+            compile_jobs (int): C编译阶段的进程数, 指定compile_executor时为执行器的max_workers
+            queue_size (int): 队列长度, 默认为C编译阶段进程数的2倍
+            object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+            profile (BuildProfile): 编译配置
+            mem_budget (int): C编译的内存预算(字节), 为空时不限制
+            memory_estimator (callable): (文件绝对路径, .c文件大小) -> 预计峰值内存(字节), 为空时按0估算
+            shared_utility (str): 共享工具模块的完整模块名称, 为空时不使用
+            compile_executor (CompileExecutor): C编译执行器, 由调用方关闭; 为空时每次运行创建本机进程池
+            keep_going (bool): 模块编译失败时是否继续编译其他模块
+            on_compiled (callable): (文件绝对路径, 编译结果) -> None, 每个模块编译成功后立即调用(在其他线程中)
+        """
+        self.translate_jobs = max(translate_jobs, 1)
+        self.compile_executor = compile_executor
+        self.compile_jobs = max(compile_executor.max_workers if compile_executor else compile_jobs, 1)
+        self.queue_size = queue_size or self.compile_jobs * 2
+        self.object_cache_dir = object_cache_dir
+        self.profile = profile
+        self.mem_budget = mem_budget
+        self.memory_estimator = memory_estimator
+        self.shared_utility = shared_utility
+        self.keep_going = keep_going
+        self.on_compiled = on_compiled
+        self.failures: Dict[str, BaseException] = dict()  # 编译失败的模块: 文件绝对路径 -> 异常
+
+    def run(self, py_file_paths: List[str], compiler_directives: Dict[str, dict]) -> Dict[str, CompileResult]:
+        """
+        编译python文件, 按py_file_paths的顺序提交cythonize
+
+        Args:
+            py_file_paths (list): 待编译文件的绝对路径
+            compiler_directives (dict): 文件绝对路径 -> Cython编译指令
+
+        Returns:
+            results (dict): 文件绝对路径 -> 编译结果
+        """
+        self.failures = dict()
+        if not py_file_paths:
+            return dict()
+
+        translated = queue.Queue()
+        # 已提交cythonize但未开始编译的模块数上限, 控制队列长度
+        slots = threading.Semaphore(self.queue_size + self.translate_jobs)
+        stopped = threading.Event()
+        compile_jobs = min(self.compile_jobs, len(py_file_paths))
+        budget = MemoryBudget(self.mem_budget, compile_jobs)
+
+        translate_executor = ProcessPoolExecutor(max_workers=min(self.translate_jobs, len(py_file_paths)))
+        compile_executor = self.compile_executor or LocalCompileExecutor(compile_jobs)
+
+        def produce():
+            for py_file_path in py_file_paths:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                future = translate_executor.submit(translate_py_file, py_file_path,
+                                                  compiler_directives[py_file_path], self.shared_utility)
+                future.add_done_callback(lambda f, path=py_file_path: translated.put((path, f)))
+
+        producer = threading.Thread(target=produce, name='cythonize-producer', daemon=True)
+        producer.start()
+
+        compile_futures: Dict[str, Future] = dict()
+        translate_spans: Dict[str, TraceSpan] = dict()
+        pending: List[Tuple[str, Extension, int]] = list()  # 已转换但未提交C编译: (文件, 扩展模块, 预计峰值内存)
+        held_back = set()  # 因内存预算暂缓提交的模块
+        received = 0
+        try:
+            while received < len(py_file_paths) or pending:
+                # 1.接收已转换的模块, 没有待提交的模块时阻塞等待
+                try:
+                    while received < len(py_file_paths):
+                        py_file_path, future = translated.get(block=not pending)
+                        received += 1
+                        try:
+                            extension, translate_spans[py_file_path] = future.result()
+                        except (Exception, SystemExit) as e:
+                            # cythonize失败(CompileError), setuptools的编译错误为SystemExit
+                            if not self.keep_going:
+                                raise
+                            self.failures[py_file_path] = e
+                            slots.release()
+                            continue
+                        estimate = 0
+                        if self.memory_estimator is not None:
+                            estimate = self.memory_estimator(py_file_path, sum(
+                                get_file_size(source) for source in extension.sources))
+                        pending.append((py_file_path, extension, estimate))
+                except queue.Empty:
+                    pass
+
+                # 2.按顺序提交预算足够的模块
+                for item in list(pending):
+                    py_file_path, extension, estimate = item
+                    if not budget.try_acquire(estimate):
+                        if budget.active < budget.max_jobs:
+                            held_back.add(py_file_path)
+                        continue
+                    future = compile_executor.submit(extension, self.object_cache_dir, self.profile)
+                    future.add_done_callback(lambda f, size=estimate: budget.release(size))
+                    if self.on_compiled is not None:
+                        future.add_done_callback(lambda f, path=py_file_path: self._notify(path, f))
+                    compile_futures[py_file_path] = future
+                    pending.remove(item)
+                    slots.release()
+                if pending:
+                    budget.wait(timeout=0.1)
+
+            results = dict()
+            for py_file_path in py_file_paths:
+                if py_file_path in self.failures:
+                    continue
+                try:
+                    span, result = translate_spans[py_file_path], compile_futures[py_file_path].result()
+                except (Exception, SystemExit) as e:
+                    if not self.keep_going:
+                        raise
+                    self.failures[py_file_path] = e
+                    continue
+                results[py_file_path] = result._replace(translate_seconds=span.seconds, spans=(span,) + result.spans)
+            if self.mem_budget is not None and results:
+                peak_rss = max(result.peak_rss for result in results.values())
+                print("内存预算: {}, 预计占用峰值: {}, 单个模块实际峰值: {}, 暂缓提交{}个模块".format(
+                    format_memory_size(self.mem_budget), format_memory_size(budget.peak_in_use),
+                    format_memory_size(peak_rss), len(held_back)))
+            return results
+        finally:
+            stopped.set()
+            slots.release()
+            translate_executor.shutdown(wait=True, cancel_futures=True)
+            if compile_executor is not self.compile_executor:
+                compile_executor.shutdown()
+
+    def _notify(self, py_file_path: str, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.on_compiled(py_file_path, future.result())
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : plan.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译计划及按预计耗时排序的编译调度
+"""
+import json
+import os.path
+from typing import Dict, List, Optional, Tuple
+
+from constants import HISTORY_DIR
+from memory import DEFAULT_MEMORY_BASE, DEFAULT_MEMORY_PER_C_BYTE, MEMORY_ESTIMATE_MARGIN
+
+ACTION_COMPILE = 'compile'  # 编译python文件
+ACTION_COPY_FILE = 'copy_file'  # 拷贝源文件
+ACTION_COPY_DIR = 'copy_dir'  # 拷贝源文件夹
+
+ACTION_DISPLAY_NAMES = {
+    ACTION_COMPILE: '编译',
+    ACTION_COPY_FILE: '拷贝文件',
+    ACTION_COPY_DIR: '拷贝文件夹',
+}
+
+# 无历史耗时记录时, 按源文件大小估算编译耗时(秒/字节)
+DEFAULT_SECONDS_PER_BYTE = 1e-4
+
+
+class BuildAction(object):
+    """编译计划中的单个操作"""
+    __slots__ = ('kind', 'name', 'reason', 'size')
+
+    def __init__(self, kind: str, name: str, reason: str, size: int = 0):
+        """
+        Args:
+            kind (str): 操作类型, 见ACTION_DISPLAY_NAMES
+            name (str): 文件/文件夹相对路径(相对于input目录)
+            reason (str): 选择该操作的原因或命中的规则
+            size (int): 源文件大小
+        """
+        self.kind = kind
+        self.name = name
+        self.reason = reason
+        self.size = size
+
+    def __repr__(self):
+        return '<BuildAction {} {}>'.format(self.kind, self.name)
+
+
+class BuildHistory(object):
+    """
+    各模块的历史编译耗时, 用于估算编译耗时
+
+    history = {
+        'xxx/xxx.py': dict(
+            seconds=1.2,  # 最近一次编译耗时(cythonize + C编译)
+            size=1024,  # 编译时的源文件大小
+            c_size=102400,  # 生成的.c文件大小, 未记录时不存在
+            peak_rss=104857600,  # C编译时编译器子进程的峰值常驻内存, 未记录时不存在
+        ),
+        ...
+    }
+    """
+
+    def __init__(self, project_name: str, history_dir: str = HISTORY_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            history_dir (str): 历史记录文件夹
+        """
+        self.history_path = os.path.join(history_dir, '{}.json'.format(project_name))
+        self.history: Dict[str, dict] = dict()
+        self._seconds_per_byte: Optional[float] = None
+        self._memory_model: Optional[Tuple[float, float]] = None
+        if os.path.exists(self.history_path):
+            try:
+                with open(self.history_path) as f:
+                    self.history = json.load(f)
+            except (ValueError, OSError):
+                self.history = dict()
+
+    @property
+    def seconds_per_byte(self) -> float:
+        """按历史记录估算的单位大小编译耗时"""
+        if self._seconds_per_byte is not None:
+            return self._seconds_per_byte
+        total_seconds = sum(item['seconds'] for item in self.history.values())
+        total_size = sum(item['size'] for item in self.history.values())
+        if not total_seconds or not total_size:
+            self._seconds_per_byte = DEFAULT_SECONDS_PER_BYTE
+        else:
+            self._seconds_per_byte = total_seconds / total_size
+        return self._seconds_per_byte
+
+    def estimate(self, name: str, size: int) -> float:
+        """
+        估算模块编译耗时: 优先使用历史耗时, 否则按源文件大小估算
+
+        Args:
+            name (str): 模块相对路径
+            size (int): 源文件大小
+
+        Returns:
+            seconds (float):
+        """
+        item = self.history.get(name)
+        if item:
+            return item['seconds']
+        return size * self.seconds_per_byte
+
+    def record(self, name: str, seconds: float, size: int, c_size: int = 0, peak_rss: int = 0) -> None:
+        """记录模块编译耗时, 生成的.c文件大小及C编译峰值内存"""
+        self.history[name] = dict(seconds=round(seconds, 3), size=size)
+        if c_size and peak_rss:
+            self.history[name].update(c_size=c_size, peak_rss=peak_rss)
+        self._seconds_per_byte = None
+        self._memory_model = None
+
+    @property
+    def memory_model(self) -> Tuple[float, float]:
+        """
+        按历史记录拟合C编译峰值内存: 峰值内存 = 基础内存 + .c文件大小 * 系数(最小二乘), 记录不足时使用默认值
+
+        Returns:
+            base (float): 基础内存(字节)
+            per_c_byte (float): 每字节.c文件的内存(字节)
+        """
+        if self._memory_model is not None:
+            return self._memory_model
+        points = [(item['c_size'], item['peak_rss']) for item in self.history.values()
+                  if item.get('c_size') and item.get('peak_rss')]
+        self._memory_model = (DEFAULT_MEMORY_BASE, DEFAULT_MEMORY_PER_C_BYTE)
+        if len(points) >= 2:
+            mean_x = sum(x for x, _ in points) / len(points)
+            mean_y = sum(y for _, y in points) / len(points)
+            variance = sum((x - mean_x) ** 2 for x, _ in points)
+            if variance > 0:
+                per_c_byte = sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+                if per_c_byte > 0:
+                    self._memory_model = (max(mean_y - per_c_byte * mean_x, 0.0), per_c_byte)
+        return self._memory_model
+
+    def estimate_memory(self, name: str, c_size: int) -> int:
+        """
+        估算模块C编译的峰值内存: 优先使用该模块的历史记录(按.c文件大小变化等比调整), 否则按拟合结果估算
+
+        Args:
+            name (str): 模块相对路径
+            c_size (int): 生成的.c文件大小
+
+        Returns:
+            size (int): 字节
+        """
+        item = self.history.get(name)
+        if item and item.get('c_size') and item.get('peak_rss'):
+            return int(item['peak_rss'] * max(1.0, c_size / item['c_size']) * MEMORY_ESTIMATE_MARGIN)
+        base, per_c_byte = self.memory_model
+        return int((base + c_size * per_c_byte) * MEMORY_ESTIMATE_MARGIN)
+
+    def save(self) -> None:
+        """写回历史记录"""
+        os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+        tmp_path = self.history_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.history, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.history_path)
+
+
+class BuildPlan(object):
+    """
+    编译计划
+
+        遍历项目时只记录待执行的操作及原因, 遍历结束后统一执行,
+        可在执行前输出(dry-run), 并按预计耗时由长到短调度编译
+    """
+
+    def __init__(self):
+        self.actions: List[BuildAction] = list()
+
+    def add(self, kind: str, name: str, reason: str, size: int = 0) -> BuildAction:
+        """
+        添加操作
+
+        Args:
+            kind (str): 操作类型
+            name (str): 文件/文件夹相对路径
+            reason (str): 选择该操作的原因或命中的规则
+            size (int): 源文件大小
+
+        Returns:
+            action (BuildAction):
+        """
+        action = BuildAction(kind, name, reason, size)
+        self.actions.append(action)
+        return action
+
+    def get_actions(self, kind: str) -> List[BuildAction]:
+        """获取指定类型的操作, 保持遍历顺序"""
+        return [action for action in self.actions if action.kind == kind]
+
+    @staticmethod
+    def schedule(actions: List[BuildAction], history: Optional[BuildHistory]) -> List[BuildAction]:
+        """
+        按预计耗时由长到短排序编译操作(最长作业优先), 缩短并行编译的关键路径
+
+        Args:
+            actions (list): 编译操作
+            history (BuildHistory): 历史编译耗时, 为空时按源文件大小排序
+
+        Returns:
+            actions (list):
+        """
+        if history is None:
+            return sorted(actions, key=lambda action: -action.size)
+        return sorted(actions, key=lambda action: -history.estimate(action.name, action.size))
+
+    def show(self, history: Optional[BuildHistory] = None) -> None:
+        """输出编译计划(dry-run)"""
+        width = max(len(name) for name in ACTION_DISPLAY_NAMES.values())
+        for action in self.actions:
+            print("[{}] {}  ({})".format(ACTION_DISPLAY_NAMES[action.kind].ljust(width), action.name, action.reason))
+
+        compile_actions = self.schedule(self.get_actions(ACTION_COMPILE), history)
+        if compile_actions:
+            print()
+            print("编译顺序(按预计耗时由长到短):")
+            for i, action in enumerate(compile_actions, 1):
+                seconds = history.estimate(action.name, action.size) if history else None
+                print("  {}. {}{}".format(i, action.name, '  预计{:.2f}秒'.format(seconds) if seconds else ''))
+
+        print()
+        print("编译计划: {}".format(', '.join('{}{}个'.format(display_name, len(self.get_actions(kind)))
+                                          for kind, display_name in ACTION_DISPLAY_NAMES.items())))
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : preflight.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译前预检: 并行解析待编译模块的AST, 检查已知无法编译的写法, 可将无法编译的模块改为拷贝源文件
+"""
+import ast
+import json
+import keyword
+import os.path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import Cython
+
+from constants import PREFLIGHT_DIR
+
+PREFLIGHT_OFF = 'off'  # 不预检
+PREFLIGHT_REPORT = 'report'  # 输出问题, 仍然编译
+PREFLIGHT_DEMOTE = 'demote'  # 输出问题, 存在错误的模块改为拷贝源文件
+PREFLIGHT_MODES = (PREFLIGHT_OFF, PREFLIGHT_REPORT, PREFLIGHT_DEMOTE)
+
+SEVERITY_ERROR = 'error'  # 编译会失败
+SEVERITY_WARNING = 'warning'  # 可以编译, 但与预期不一致
+
+# 检查项
+CHECK_SYNTAX = 'syntax-error'  # 语法错误
+CHECK_MODULE_NAME = 'module-name'  # 文件名不是合法的模块名称, 例如django迁移文件0001_initial.py
+CHECK_TUPLE_ANNOTATION = 'tuple-annotation'  # 类型注解为元组, 例如def test() -> (list, dict)
+CHECK_ANNOTATION_LITERAL = 'annotation-literal'  # 函数内变量/参数的类型注解与赋值的字面量不兼容, 例如x: int = 'a'
+
+# 检查规则变化时递增, 使缓存的检查结果失效
+PREFLIGHT_VERSION = 1
+# 待检查的模块数超过该值时并行解析
+PARALLEL_MIN_FILES = 16
+# 输出的问题数上限
+MAX_REPORTED_ISSUES = 50
+
+BUILTIN_TYPE_NAMES = frozenset(('int', 'float', 'complex', 'bool', 'str', 'bytes', 'bytearray', 'list', 'dict',
+                                'tuple', 'set', 'frozenset'))
+# 按注解类型编译时(annotation_typing), 赋值会报错的字面量类型(Cython 3.x)
+INCOMPATIBLE_LITERALS = {
+    'int': {'str', 'bytes', 'list', 'dict'},
+    'float': {'str', 'list', 'complex', 'none'},
+    'complex': {'str', 'list', 'none'},
+    'bool': {'float', 'list', 'complex', 'none'},
+    'str': {'bytes', 'list', 'dict'},
+    'bytes': {'str', 'list', 'dict'},
+    'bytearray': {'str', 'bytes', 'list', 'dict'},
+    'list': {'str', 'bytes', 'dict', 'set'},
+    'dict': {'str', 'bytes', 'list', 'set'},
+    'tuple': {'str', 'bytes', 'list', 'dict', 'set'},
+    'set': {'str', 'bytes', 'list', 'dict'},
+    'frozenset': {'str', 'bytes', 'list', 'dict', 'set'},
+}
+
+
+class PreflightIssue(NamedTuple):
+    """预检发现的问题"""
+    path: str  # 文件相对路径
+    line: int
+    col: int
+    check: str  # 检查项
+    severity: str  # error/warning
+    message: str
+
+    def __str__(self):
+        return '{}:{}:{} [{}] {}'.format(self.path, self.line, self.col, self.check, self.message)
+
+
+def _literal_kind(node: ast.AST) -> Optional[str]:
+    """字面量的类型, 非字面量为None"""
+    if isinstance(node, ast.Constant):
+        if node.value is None:
+            return 'none'
+        # bool为int的子类, 按类型名称判断
+        return type(node.value).__name__
+    if isinstance(node, ast.JoinedStr):
+        return 'str'
+    for kind, node_types in (('list', (ast.List, ast.ListComp)), ('dict', (ast.Dict, ast.DictComp)),
+                             ('set', (ast.Set, ast.SetComp)), ('tuple', (ast.Tuple,))):
+        if isinstance(node, node_types):
+            return kind
+    return None
+
+
+def _disables_annotation_typing(decorator: ast.AST) -> bool:
+    """@cython.annotation_typing(False)"""
+    return isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute) and \
+        decorator.func.attr == 'annotation_typing' and len(decorator.args) == 1 and \
+        isinstance(decorator.args[0], ast.Constant) and decorator.args[0].value is False
+
+
+class _PreflightVisitor(ast.NodeVisitor):
+    """遍历AST, 检查类型注解"""
+
+    def __init__(self, path: str, annotation_typing: bool):
+        self.path = path
+        self.issues: List[PreflightIssue] = list()
+        # 作用域: 函数内为当前函数是否按注解类型编译, 类及模块中为None
+        self.scopes: List[Optional[bool]] = [None]
+        self.annotation_typing = annotation_typing
+        self.tuple_severity = SEVERITY_ERROR if int(Cython.__version__.split('.')[0]) < 3 else SEVERITY_WARNING
+
+    def add(self, node: ast.AST, check: str, severity: str, message: str) -> None:
+        self.issues.append(PreflightIssue(self.path, node.lineno, node.col_offset + 1, check, severity, message))
+
+    def check_tuple_annotation(self, annotation: Optional[ast.AST], where: str) -> None:
+        if not isinstance(annotation, ast.Tuple):
+            return None
+        names = [elt.id for elt in annotation.elts if isinstance(elt, ast.Name)]
+        if self.tuple_severity == SEVERITY_ERROR and not BUILTIN_TYPE_NAMES.intersection(names):
+            return None
+        self.add(annotation, CHECK_TUPLE_ANNOTATION, self.tuple_severity,
+                 "{}为元组{}, 应改为tuple[...]或typing.Tuple[...]".format(where, ast.unparse(annotation)))
+        return None
+
+    def check_literal(self, annotation: Optional[ast.AST], value: Optional[ast.AST], where: str,
+                      allow_none: bool = False) -> None:
+        if not isinstance(annotation, ast.Name) or value is None:
+            return None
+        kind = _literal_kind(value)
+        if kind is None or (allow_none and kind == 'none'):
+            return None
+        if kind in INCOMPATIBLE_LITERALS.get(annotation.id, ()):
+            self.add(value, CHECK_ANNOTATION_LITERAL, SEVERITY_ERROR, "{}的类型注解为{}, 不能赋值为{}字面量".format(
+                where, annotation.id, kind))
+        return None
+
+    def visit_FunctionDef(self, node) -> None:
+        typed = self.annotation_typing and not any(_disables_annotation_typing(decorator)
+                                                   for decorator in node.decorator_list)
+        self.check_tuple_annotation(node.returns, '{}的返回类型注解'.format(node.name))
+        arguments = node.args
+        positional = arguments.posonlyargs + arguments.args
+        defaults = [None] * (len(positional) - len(arguments.defaults)) + arguments.defaults
+        for arg, default in list(zip(positional, defaults)) + list(zip(arguments.kwonlyargs, arguments.kw_defaults)):
+            self.check_tuple_annotation(arg.annotation, '参数{}的类型注解'.format(arg.arg))
+            if typed:
+                # 参数默认值为None时, 参数按python对象编译
+                self.check_literal(arg.annotation, default, '参数{}'.format(arg.arg), allow_none=True)
+        for arg in (arguments.vararg, arguments.kwarg):
+            if arg is not None:
+                self.check_tuple_annotation(arg.annotation, '参数{}的类型注解'.format(arg.arg))
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.scopes.append(typed)
+        for statement in node.body:
+            self.visit(statement)
+        self.scopes.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        # 类属性的类型注解不参与编译
+        self.scopes.append(None)
+        self.generic_visit(node)
+        self.scopes.pop()
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        if self.scopes[-1] and isinstance(node.target, ast.Name):
+            self.check_literal(node.annotation, node.value, '变量{}'.format(node.target.id))
+        self.generic_visit(node)
+
+
+def check_source(path: str, source: Union[str, bytes], annotation_typing: bool = True) -> List[PreflightIssue]:
+    """
+    检查python源码
+
+    Args:
+        path (str): 文件相对路径
+        source (str): 源码(str或bytes)
+        annotation_typing (bool): Cython编译指令annotation_typing, 为False时不按类型注解编译
+
+    Returns:
+        issues (list):
+    """
+    issues = list()
+    module = os.path.splitext(os.path.basename(path))[0]
+    if not module.isidentifier() or keyword.iskeyword(module):
+        issues.append(PreflightIssue(path, 1, 1, CHECK_MODULE_NAME, SEVERITY_ERROR,
+                                     "文件名{}不是合法的模块名称".format(os.path.basename(path))))
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        issues.append(PreflightIssue(path, e.lineno or 1, e.offset or 1, CHECK_SYNTAX, SEVERITY_ERROR,
+                                     "语法错误: {}".format(e.msg)))
+        return issues
+    except ValueError as e:
+        issues.append(PreflightIssue(path, 1, 1, CHECK_SYNTAX, SEVERITY_ERROR, "无法解析: {}".format(e)))
+        return issues
+    visitor = _PreflightVisitor(path, annotation_typing)
+    visitor.visit(tree)
+    return issues + sorted(visitor.issues, key=lambda issue: (issue.line, issue.col))
+
+
+def check_file(path: str, abs_path: str, annotation_typing: bool = True) -> List[PreflightIssue]:
+    """检查python文件, 可在子进程中执行"""
+    try:
+        with open(abs_path, 'rb') as f:
+            source = f.read()
+    except OSError as e:
+        return [PreflightIssue(path, 1, 1, CHECK_SYNTAX, SEVERITY_ERROR, "无法读取: {}".format(e))]
+    return check_source(path, source, annotation_typing)
+
+
+def _check_files(items: List[Tuple[str, str, bool]]) -> List[List[PreflightIssue]]:
+    return [check_file(*item) for item in items]
+
+
+class Preflight(object):
+    """
+    编译前预检
+
+        按文件大小及修改时间缓存各文件的检查结果, 只重新检查变更的文件;
+        待检查的模块较多时在进程池中并行解析
+
+    cache = {
+        'xxx/xxx.py': dict(
+            size=1024,
+            mtime_ns=1671600000000000000,
+            fingerprint='1:3.3.0:1',  # 检查规则版本, Cython版本, annotation_typing
+            issues=[[line, col, check, severity, message], ...],
+        ),
+        ...
+    }
+    """
+
+    def __init__(self, project_name: str, cache_dir: str = PREFLIGHT_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            cache_dir (str): 缓存文件夹
+        """
+        self.cache_path = os.path.join(cache_dir, '{}.json'.format(project_name))
+        self.cache: Dict[str, dict] = dict()
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    self.cache = json.load(f)
+            except (ValueError, OSError):
+                self.cache = dict()
+        self.checked = 0  # 本次重新检查的文件数
+
+    @staticmethod
+    def _fingerprint(annotation_typing: bool) -> str:
+        return '{}:{}:{}'.format(PREFLIGHT_VERSION, Cython.__version__, int(annotation_typing))
+
+    def scan(self, files: List[Tuple[str, str, int, int, bool]], jobs: int = 1) -> Dict[str, List[PreflightIssue]]:
+        """
+        检查待编译的模块
+
+        Args:
+            files (list): (相对路径, 绝对路径, 文件大小, 修改时间(ns), annotation_typing)
+            jobs (int): 进程数
+
+        Returns:
+            issues (dict): 相对路径 -> 问题, 只含存在问题的文件
+        """
+        results: Dict[str, List[PreflightIssue]] = dict()
+        stale = list()
+        for path, abs_path, size, mtime_ns, annotation_typing in files:
+            entry = self.cache.get(path)
+            if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns and \
+                    entry['fingerprint'] == self._fingerprint(annotation_typing):
+                results[path] = [PreflightIssue(path, *issue) for issue in entry['issues']]
+            else:
+                stale.append((path, abs_path, size, mtime_ns, annotation_typing))
+
+        items = [(path, abs_path, annotation_typing) for path, abs_path, _, _, annotation_typing in stale]
+        if jobs > 1 and len(items) > PARALLEL_MIN_FILES:
+            jobs = min(jobs, len(items))
+            chunks = [items[i::jobs] for i in range(jobs)]
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                checked = dict()
+                for chunk, chunk_issues in zip(chunks, executor.map(_check_files, chunks)):
+                    checked.update((item[0], issues) for item, issues in zip(chunk, chunk_issues))
+        else:
+            checked = {item[0]: check_file(*item) for item in items}
+
+        for path, abs_path, size, mtime_ns, annotation_typing in stale:
+            results[path] = checked[path]
+            self.cache[path] = dict(size=size, mtime_ns=mtime_ns, fingerprint=self._fingerprint(annotation_typing),
+                                    issues=[list(issue[1:]) for issue in checked[path]])
+        self.checked = len(stale)
+        return {path: issues for path, issues in results.items() if issues}
+
+    @staticmethod
+    def report(issues: Dict[str, List[PreflightIssue]], modules: int, demoted: List[str] = None) -> None:
+        """
+        输出预检结果
+
+        Args:
+            issues (dict): 相对路径 -> 问题
+            modules (int): 检查的模块数
+            demoted (list): 改为拷贝源文件的模块
+
+        Returns:
+
+        """
+        all_issues = [issue for path in sorted(issues) for issue in issues[path]]
+        errors = sum(issue.severity == SEVERITY_ERROR for issue in all_issues)
+        print("编译前预检: {}个模块, 错误{}个, 警告{}个{}".format(
+            modules, errors, len(all_issues) - errors,
+            ', {}个模块改为拷贝源文件'.format(len(demoted)) if demoted else ''))
+        for issue in all_issues[:MAX_REPORTED_ISSUES]:
+            print("  {}{}".format('错误: ' if issue.severity == SEVERITY_ERROR else '警告: ', issue))
+        if len(all_issues) > MAX_REPORTED_ISSUES:
+            print("  ...省略{}个".format(len(all_issues) - MAX_REPORTED_ISSUES))
+        return None
+
+    def save(self, paths: List[str] = None) -> None:
+        """
+        写回缓存
+
+        Args:
+            paths (list): 保留的文件, 为空时保留全部
+
+        Returns:
+
+        """
+        if paths is not None:
+            self.cache = {path: self.cache[path] for path in paths if path in self.cache}
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.cache, f, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : profiles.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 扩展模块的编译配置(编译优化级别, 调试信息, LTO, PGO)
+"""
+import glob
+import os.path
+import subprocess
+import sys
+from typing import NamedTuple, Optional, Tuple
+
+from setuptools.extension import Extension
+
+PROFILE_DEFAULT = 'default'  # 使用python解释器的编译参数(sysconfig), 通常为-O2 -g
+PROFILE_DEBUG = 'debug'
+PROFILE_RELEASE = 'release'
+PROFILE_LTO = 'lto'
+PROFILE_PGO = 'pgo'
+
+STRIP_LINK_ARG = '-s'  # 链接时去除符号表及调试信息
+
+PGO_STAGE_GENERATE = 'generate'  # 编译插桩的扩展模块, 运行时生成profile数据
+PGO_STAGE_USE = 'use'  # 使用profile数据重新编译
+
+
+class BuildProfile(NamedTuple):
+    """编译配置, 编译及链接参数追加在sysconfig的参数之后, 同名参数以此为准"""
+    name: str
+    extra_compile_args: Tuple[str, ...] = ()
+    extra_link_args: Tuple[str, ...] = ()
+    pgo: bool = False  # 是否两次编译: 插桩编译, 运行workload, 使用profile数据重新编译
+
+    def apply(self, extension: Extension) -> Extension:
+        """
+        将编译及链接参数追加至扩展模块
+
+        Args:
+            extension (Extension):
+
+        Returns:
+            extension (Extension):
+        """
+        extension.extra_compile_args = list(extension.extra_compile_args or list()) + list(self.extra_compile_args)
+        extension.extra_link_args = list(extension.extra_link_args or list()) + list(self.extra_link_args)
+        return extension
+
+    def with_pgo_stage(self, stage: str, profile_dir: str) -> 'BuildProfile':
+        """
+        PGO各阶段的编译配置
+
+        Args:
+            stage (str): PGO阶段, generate/use
+            profile_dir (str): profile数据(.gcda)文件夹
+
+        Returns:
+            profile (BuildProfile):
+        """
+        if stage == PGO_STAGE_GENERATE:
+            args = ('-fprofile-generate={}'.format(profile_dir),)
+            link_args = args
+        else:
+            # -fprofile-correction: 多进程/多线程workload的计数可能不一致; 未被执行的模块没有profile数据, 不告警
+            args = ('-fprofile-use={}'.format(profile_dir), '-fprofile-correction', '-Wno-missing-profile')
+            link_args = ('-fprofile-use={}'.format(profile_dir),)
+        return self._replace(name='{}:{}'.format(self.name, stage),
+                             extra_compile_args=self.extra_compile_args + args,
+                             extra_link_args=self.extra_link_args + link_args)
+
+    def with_strip(self) -> 'BuildProfile':
+        """链接时去除符号表及调试信息(-s), 模块初始化函数等动态符号不受影响"""
+        if STRIP_LINK_ARG in self.extra_link_args:
+            return self
+        return self._replace(name='{}+strip'.format(self.name), extra_link_args=self.extra_link_args + (STRIP_LINK_ARG,))
+
+    def to_dict(self) -> dict:
+        """编译及链接参数, 用于生成缓存键; 未追加参数时为空, 与未使用编译配置时的缓存键相同"""
+        if not self.extra_compile_args and not self.extra_link_args:
+            return dict()
+        return dict(extra_compile_args=list(self.extra_compile_args), extra_link_args=list(self.extra_link_args))
+
+
+_RELEASE_COMPILE_ARGS = ('-O3', '-g0', '-fvisibility=hidden', '-DNDEBUG')
+
+# 内置编译配置; -fvisibility=hidden不影响模块初始化函数PyInit_xxx(PyMODINIT_FUNC声明为导出符号)
+BUILD_PROFILES = {
+    PROFILE_DEFAULT: BuildProfile(PROFILE_DEFAULT),
+    PROFILE_DEBUG: BuildProfile(PROFILE_DEBUG, ('-O0', '-g3'), ('-g',)),
+    PROFILE_RELEASE: BuildProfile(PROFILE_RELEASE, _RELEASE_COMPILE_ARGS, (STRIP_LINK_ARG,)),
+    PROFILE_LTO: BuildProfile(PROFILE_LTO, _RELEASE_COMPILE_ARGS + ('-flto',), ('-O3', '-flto', STRIP_LINK_ARG)),
+    PROFILE_PGO: BuildProfile(PROFILE_PGO, _RELEASE_COMPILE_ARGS, (STRIP_LINK_ARG,), pgo=True),
+}
+
+
+def resolve_build_profile(name: Optional[str], custom_profiles: dict = None) -> BuildProfile:
+    """
+    按名称获取编译配置, 项目配置中的自定义编译配置优先
+
+        "build_profiles": {
+            "fast": {
+                "base": "lto",  // 在内置编译配置的基础上追加参数, 默认为default
+                "extra_compile_args": ["-march=native"],
+                "extra_link_args": [],
+                "pgo": false
+            }
+        }
+
+    Args:
+        name (str): 编译配置名称, 为空时为default
+        custom_profiles (dict): 项目配置中的自定义编译配置
+
+    Returns:
+        profile (BuildProfile):
+    """
+    name = name or PROFILE_DEFAULT
+    custom_profiles = custom_profiles or dict()
+    if name in custom_profiles:
+        config = custom_profiles[name]
+        base_name = config.get('base') or PROFILE_DEFAULT
+        if base_name == name or base_name not in BUILD_PROFILES:
+            raise ValueError("编译配置[{}]的base必须为内置编译配置: {}".format(name, ', '.join(BUILD_PROFILES)))
+        base = BUILD_PROFILES[base_name]
+        return BuildProfile(
+            name,
+            base.extra_compile_args + tuple(config.get('extra_compile_args') or ()),
+            base.extra_link_args + tuple(config.get('extra_link_args') or ()),
+            bool(config.get('pgo', base.pgo)),
+        )
+    if name not in BUILD_PROFILES:
+        raise ValueError("不支持的编译配置: {}, 可选: {}".format(name, ', '.join(sorted(
+            set(BUILD_PROFILES) | set(custom_profiles)))))
+    return BUILD_PROFILES[name]
+
+
+def run_pgo_workload(workload: str, output_dir: str, profile_dir: str) -> int:
+    """
+    以输出目录为PYTHONPATH运行workload脚本, 插桩的扩展模块在进程退出时写入profile数据
+
+    Args:
+        workload (str): workload脚本路径
+        output_dir (str): 输出目录, 其下为插桩编译后的项目
+        profile_dir (str): profile数据(.gcda)文件夹
+
+    Returns:
+        count (int): 生成的profile数据文件数, 未生成时抛出RuntimeError
+    """
+    if not os.path.exists(workload):
+        raise FileNotFoundError(workload)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path for path in (output_dir, env.get('PYTHONPATH')) if path)
+    print("运行PGO workload: [{}]".format(workload))
+    completed = subprocess.run([sys.executable, os.path.abspath(workload)], env=env)
+    if completed.returncode != 0:
+        raise RuntimeError("PGO workload执行失败, 退出码: {}".format(completed.returncode))
+    count = len(glob.glob(os.path.join(profile_dir, '**', '*.gcda'), recursive=True))
+    if not count:
+        # 例如workload导入的是源项目而不是输出目录中插桩编译的模块, 继续编译的结果不是PGO编译
+        raise RuntimeError("PGO workload未生成profile数据, 请确认workload导入的是输出目录[{}]中编译后的模块".format(
+            output_dir))
+    return count
@@ -0,0 +1,651 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : remote.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译节点: 将C编译分发至其他机器(或本机的其他进程), 编译节点接收预处理后的C文件及编译参数, 返回.so文件
+"""
+import copy
+import functools
+import json
+import os.path
+import platform
+import queue
+import re
+import shlex
+import socket
+import socketserver
+import struct
+import subprocess
+import sysconfig
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import click
+from setuptools.extension import Extension
+
+from build_cache import preprocess_c_file
+from pipeline import CompileExecutor, CompileResult, compile_extension, get_extension_file_name, lookup_object_cache
+from profiles import BuildProfile
+from tracing import CATEGORY_MODULE, make_span
+
+PROTOCOL_VERSION = 1
+DEFAULT_WORKER_HOST = '127.0.0.1'  # 默认只监听本机, 协议没有认证, 只能在可信网络中监听其他地址
+DEFAULT_WORKER_PORT = 8765
+CONNECT_TIMEOUT = 5  # 连接及握手超时(秒)
+COMPILE_TIMEOUT = 600  # 单个模块的编译超时(秒)
+MAX_HEADER_SIZE = 1024 * 1024
+MAX_PAYLOAD_SIZE = 1024 * 1024 * 1024  # 负载(压缩前及压缩后)上限: 预处理后的C文件, .so文件
+MAX_ERROR_SIZE = 8192  # 返回的编译错误输出上限(字节)
+
+# 消息类型
+MESSAGE_HELLO = 'hello'  # 握手: 编译节点返回工具链及进程数
+MESSAGE_COMPILE = 'compile'  # 编译: 负载为zlib压缩的预处理后的C文件
+MESSAGE_RESULT = 'result'  # 编译结果: 负载为zlib压缩的.so文件
+MESSAGE_ERROR = 'error'  # 编译失败或工具链不一致
+
+# 编译节点与本机需一致的工具链信息
+TOOLCHAIN_KEYS = ('abi', 'system', 'machine', 'compiler')
+# 依赖本机文件的编译参数(PGO的profile数据), 使用这些参数时在本机编译
+LOCAL_ONLY_ARG_PREFIXES = ('-fprofile-',)
+# 编译节点允许的编译/链接参数(完整匹配): 参数中不能包含路径, 不加载插件, 不向汇编器/预处理器传递参数;
+# 编译及链接在临时文件夹中执行, 不读写编译节点上的其他文件
+ALLOWED_ARG_PATTERN = re.compile('|'.join((
+    r'-O[0-3sgz]?|-Ofast',
+    r'-g[0-3]?|-ggdb[0-3]?',
+    r'-[DU][A-Za-z_]\w*(=[\w.+-]*)?',
+    r'-std=[\w+]+',
+    r'-f(?!plugin|profile-)[a-z][a-z0-9-]*(=[\w.,+-]+)?',
+    r'-m[a-z][a-z0-9-]*(=[\w.,+-]+)?',
+    r'-W[a-z][a-z0-9-]*(=[\w+-]+)?',
+    r'-Wl(,(?!-?-?plugin)[\w.=+-]+)+',
+    r'-s|-shared|-pthread|-pipe|-pg|-w',
+)))
+ALLOWED_LIBRARY_PATTERN = re.compile(r'[A-Za-z0-9_][\w.+-]*')
+
+_HEADER_LENGTH = struct.Struct('>I')
+
+
+class ProtocolError(Exception):
+    """消息格式错误或协议版本不一致"""
+
+
+#######################################################
+#                      消息格式                        #
+#######################################################
+def send_message(sock: socket.socket, header: dict, payload: bytes = b'') -> None:
+    """
+    发送消息: 4字节(大端)头部长度 + JSON头部 + 负载, 负载长度记录在头部的payload_size中
+
+    Args:
+        sock (socket):
+        header (dict): 消息头部, type为消息类型
+        payload (bytes): 负载
+
+    Returns:
+
+    """
+    data = json.dumps(dict(header, payload_size=len(payload))).encode('utf-8')
+    sock.sendall(_HEADER_LENGTH.pack(len(data)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = list()
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Tuple[dict, bytes]:
+    """
+    接收消息
+
+    Args:
+        sock (socket):
+
+    Returns:
+        header (dict): 消息头部
+        payload (bytes): 负载
+    """
+    size, = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+    if size > MAX_HEADER_SIZE:
+        raise ProtocolError("消息头部过大: {}".format(size))
+    try:
+        header = json.loads(_recv_exact(sock, size).decode('utf-8'))
+    except ValueError as e:
+        raise ProtocolError("无法解析的消息头部: {}".format(e))
+    payload_size = int(header.get('payload_size', 0))
+    if not 0 <= payload_size <= MAX_PAYLOAD_SIZE:
+        raise ProtocolError("消息负载过大: {}".format(payload_size))
+    return header, _recv_exact(sock, payload_size)
+
+
+def decompress_payload(data: bytes, max_size: int = MAX_PAYLOAD_SIZE) -> bytes:
+    """
+    解压负载, 解压后的大小不超过max_size
+
+    Args:
+        data (bytes): zlib压缩的负载
+        max_size (int): 解压后的大小上限
+
+    Returns:
+        data (bytes):
+    """
+    decompressor = zlib.decompressobj()
+    try:
+        result = decompressor.decompress(data, max_size)
+    except zlib.error as e:
+        raise ProtocolError("无法解压的负载: {}".format(e))
+    if decompressor.unconsumed_tail:
+        raise ProtocolError("解压后的负载超过上限: {}".format(max_size))
+    if not decompressor.eof:
+        raise ProtocolError("负载不完整")
+    return result
+
+
+#######################################################
+#                       工具链                         #
+#######################################################
+def _get_config_args(name: str) -> List[str]:
+    return shlex.split(sysconfig.get_config_var(name) or '')
+
+
+@functools.lru_cache(maxsize=None)
+def get_toolchain() -> Dict[str, str]:
+    """
+    本机的工具链信息: Python ABI标签(扩展模块后缀), 操作系统, CPU架构, C编译器版本
+
+    Returns:
+        toolchain (dict):
+    """
+    compiler = ''
+    try:
+        process = subprocess.run(_get_config_args('CC')[:1] + ['--version'], stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, check=True)
+        compiler = process.stdout.decode('utf-8', errors='replace').strip().split('\n')[0]
+    except (OSError, IndexError, subprocess.CalledProcessError):
+        pass
+    return dict(abi=sysconfig.get_config_var('EXT_SUFFIX') or '', system=platform.system(),
+                machine=platform.machine(), compiler=compiler)
+
+
+def check_toolchain(remote_toolchain: dict, local_toolchain: dict = None) -> Optional[str]:
+    """
+    检查编译节点的工具链是否与本机一致
+
+    Args:
+        remote_toolchain (dict): 编译节点的工具链信息
+        local_toolchain (dict): 本机的工具链信息, 默认为get_toolchain()
+
+    Returns:
+        reason (str): 不一致的原因, 一致时为None
+    """
+    local_toolchain = local_toolchain or get_toolchain()
+    for key in TOOLCHAIN_KEYS:
+        if remote_toolchain.get(key) != local_toolchain.get(key):
+            return "{}不一致: 本机[{}], 编译节点[{}]".format(key, local_toolchain.get(key), remote_toolchain.get(key))
+    return None
+
+
+def parse_worker_address(address: str) -> Tuple[str, int]:
+    """
+    解析编译节点地址
+
+    Args:
+        address (str): host:port, 省略host时为127.0.0.1
+
+    Returns:
+        host (str):
+        port (int):
+    """
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError("无法解析的编译节点地址: {}, 格式为host:port".format(address))
+    return host.strip('[]') or DEFAULT_WORKER_HOST, int(port)
+
+
+def check_remote_args(compile_args: List[str], link_args: List[str], libraries: List[str] = None,
+                      library_dirs: List[str] = None) -> Optional[str]:
+    """
+    检查编译参数是否可以在编译节点使用, 见ALLOWED_ARG_PATTERN
+
+    Args:
+        compile_args (list): 追加的编译参数
+        link_args (list): 追加的链接参数
+        libraries (list): 链接的库
+        library_dirs (list): 库文件夹, 为编译机上的路径, 不能在编译节点使用
+
+    Returns:
+        reason (str): 不能使用的原因, 可以使用时为None
+    """
+    if library_dirs:
+        return "编译节点不支持指定库文件夹: {}".format(library_dirs)
+    for arg in list(compile_args) + list(link_args):
+        if not isinstance(arg, str) or not ALLOWED_ARG_PATTERN.fullmatch(arg):
+            return "编译节点不允许的编译参数: {}".format(arg)
+    for library in libraries or list():
+        if not isinstance(library, str) or not ALLOWED_LIBRARY_PATTERN.fullmatch(library):
+            return "编译节点不允许的链接库: {}".format(library)
+    return None
+
+
+#######################################################
+#                       编译节点                        #
+#######################################################
+def compile_preprocessed_sources(sources: List[bytes], compile_args: List[str], link_args: List[str],
+                                 libraries: List[str] = None) -> bytes:
+    """
+    编译并链接预处理后的C文件, 编译及链接命令同build_ext: CC + CFLAGS + CCSHARED, LDSHARED
+
+        在临时文件夹中执行, 参数中的相对路径不会指向编译节点上的其他文件; 参数需先经过check_remote_args检查
+
+    Args:
+        sources (list): 预处理后的C文件内容
+        compile_args (list): 追加的编译参数
+        link_args (list): 追加的链接参数
+        libraries (list): 链接的库
+
+    Returns:
+        so (bytes): .so文件内容
+    """
+    compile_command = _get_config_args('CC') + _get_config_args('CFLAGS') + _get_config_args('CCSHARED')
+    with tempfile.TemporaryDirectory(prefix='pcc-worker-') as work_dir:
+        objects = list()
+        for index, source in enumerate(sources):
+            # .i后缀: 已预处理的C文件, 不再执行预处理
+            source_path = os.path.join(work_dir, '{}.i'.format(index))
+            with open(source_path, 'wb') as f:
+                f.write(source)
+            objects.append(os.path.join(work_dir, '{}.o'.format(index)))
+            subprocess.run(compile_command + list(compile_args) + ['-c', source_path, '-o', objects[-1]],
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True, timeout=COMPILE_TIMEOUT,
+                           cwd=work_dir)
+        so_path = os.path.join(work_dir, 'module.so')
+        subprocess.run(_get_config_args('LDSHARED') + objects + list(link_args) +
+                       ['-l{}'.format(library) for library in libraries or list()] + ['-o', so_path],
+                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True, timeout=COMPILE_TIMEOUT,
+                       cwd=work_dir)
+        with open(so_path, 'rb') as f:
+            return f.read()
+
+
+class BuildWorkerHandler(socketserver.BaseRequestHandler):
+    """处理一个客户端连接, 连接上依次处理多个请求"""
+    server: 'BuildWorkerServer'
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, ProtocolError, OSError, struct.error):
+                return None
+            try:
+                if header.get('version') != PROTOCOL_VERSION:
+                    send_message(self.request, dict(type=MESSAGE_ERROR, mismatch=True, message="协议版本不一致: {}, {}".
+                                                    format(header.get('version'), PROTOCOL_VERSION)))
+                elif header.get('type') == MESSAGE_HELLO:
+                    send_message(self.request, dict(type=MESSAGE_HELLO, version=PROTOCOL_VERSION,
+                                                    toolchain=self.server.toolchain, jobs=self.server.jobs))
+                elif header.get('type') == MESSAGE_COMPILE:
+                    self.handle_compile(header, payload)
+                else:
+                    send_message(self.request, dict(type=MESSAGE_ERROR, message="未知的消息类型: {}".format(
+                        header.get('type'))))
+            except OSError:
+                return None
+
+    def handle_compile(self, header: dict, payload: bytes) -> None:
+        """编译请求: 检查ABI标签及编译参数, 按进程数排队编译"""
+        reason = check_toolchain(header.get('toolchain', dict()), self.server.toolchain)
+        if reason:
+            send_message(self.request, dict(type=MESSAGE_ERROR, mismatch=True, message=reason))
+            return None
+        compile_args, link_args = header.get('compile_args') or list(), header.get('link_args') or list()
+        reason = check_remote_args(compile_args, link_args, header.get('libraries'), header.get('library_dirs'))
+        if reason:
+            send_message(self.request, dict(type=MESSAGE_ERROR, message=reason))
+            print("拒绝编译: {}, {}".format(header.get('module'), reason))
+            return None
+
+        try:
+            data = decompress_payload(payload)
+        except ProtocolError as e:
+            send_message(self.request, dict(type=MESSAGE_ERROR, message=str(e)))
+            return None
+        source_sizes = header.get('source_sizes') or list()
+        if sum(source_sizes) != len(data):
+            send_message(self.request, dict(type=MESSAGE_ERROR, message="负载大小与C文件大小不一致"))
+            return None
+        sources = list()
+        for size in source_sizes:
+            sources.append(data[:size])
+            data = data[size:]
+        time_start = time.time()
+        with self.server.slots:
+            try:
+                so = compile_preprocessed_sources(sources, compile_args, link_args, header.get('libraries'))
+            except subprocess.CalledProcessError as e:
+                output = (e.output or b'')[-MAX_ERROR_SIZE:].decode('utf-8', errors='replace')
+                send_message(self.request, dict(type=MESSAGE_ERROR, message=output))
+                print("编译失败: {}".format(header.get('module')))
+                return None
+            except subprocess.TimeoutExpired:
+                send_message(self.request, dict(type=MESSAGE_ERROR, message="编译超时"))
+                print("编译超时: {}".format(header.get('module')))
+                return None
+        send_message(self.request, dict(type=MESSAGE_RESULT, seconds=time.time() - time_start), zlib.compress(so))
+        print("编译完成: {}, 耗时: {:.2f}s".format(header.get('module'), time.time() - time_start))
+        return None
+
+
+class BuildWorkerServer(socketserver.ThreadingTCPServer):
+    """编译节点: 每个连接一个线程, 同时编译的模块数不超过jobs"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str, port: int, jobs: int = None):
+        """
+        Args:
+            host (str): 监听地址
+            port (int): 监听端口, 为0时由系统分配
+            jobs (int): 同时编译的模块数, 默认为CPU核数
+        """
+        self.jobs = jobs or os.cpu_count() or 1
+        self.slots = threading.BoundedSemaphore(self.jobs)
+        self.toolchain = get_toolchain()
+        super().__init__((host, port), BuildWorkerHandler)
+
+
+#######################################################
+#                       客户端                         #
+#######################################################
+class WorkerConnection(object):
+    """与编译节点的一个连接"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def request(self, header: dict, payload: bytes = b'', timeout: float = CONNECT_TIMEOUT) -> Tuple[dict, bytes]:
+        self.sock.settimeout(timeout)
+        send_message(self.sock, dict(header, version=PROTOCOL_VERSION), payload)
+        return recv_message(self.sock)
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class BuildWorker(object):
+    """编译节点: 握手结果, 空闲连接及统计"""
+
+    def __init__(self, address: str):
+        """
+        Args:
+            address (str): host:port
+        """
+        self.address = address
+        self.host, self.port = parse_worker_address(address)
+        self.jobs = 0
+        self.disabled: Optional[str] = None  # 停用原因
+        self.compiled = 0
+        self.seconds = 0.0
+        self._idle: List[WorkerConnection] = list()
+        self._lock = threading.Lock()
+
+    def handshake(self) -> Optional[str]:
+        """
+        握手并检查工具链
+
+        Returns:
+            reason (str): 无法使用的原因, 可以使用时为None
+        """
+        try:
+            connection = WorkerConnection(self.host, self.port)
+            header, _ = connection.request(dict(type=MESSAGE_HELLO))
+        except (OSError, ProtocolError, struct.error) as e:
+            return "无法连接: {}".format(e)
+        if header.get('type') != MESSAGE_HELLO:
+            connection.close()
+            return header.get('message') or "握手失败"
+        reason = check_toolchain(header.get('toolchain', dict()))
+        if reason:
+            connection.close()
+            return reason
+        self.jobs = max(int(header.get('jobs', 1)), 1)
+        self._idle.append(connection)
+        return None
+
+    def acquire(self) -> WorkerConnection:
+        """取出空闲连接, 没有时新建"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return WorkerConnection(self.host, self.port)
+
+    def release(self, connection: WorkerConnection) -> None:
+        with self._lock:
+            self._idle.append(connection)
+
+    def disable(self, reason: str) -> None:
+        if not self.disabled:
+            self.disabled = reason
+            print("编译节点[{}]已停用, 改为本机编译: {}".format(self.address, reason))
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._idle = self._idle, list()
+        for connection in connections:
+            connection.close()
+
+
+class RemoteCompileExecutor(CompileExecutor):
+    """
+    将C编译分发至编译节点, 与本机进程池同时编译
+
+        本机预处理C文件(保留行号标记, 编译错误仍定位至原文件), 编译节点只需相同的工具链, 无需Python头文件及项目文件;
+        握手时检查Python ABI标签, 操作系统, CPU架构及C编译器版本, 不一致的编译节点不使用;
+        编译节点无法连接或编译失败时在本机重新编译, 编译错误以本机输出为准;
+        C编译缓存在本机查找及写入, 命中时不发送至编译节点
+    """
+
+    def __init__(self, workers: List[str], local_jobs: int):
+        """
+        Args:
+            workers (list): 编译节点地址(host:port)
+            local_jobs (int): 本机C编译进程数, 同时用于回退编译
+        """
+        self.local_jobs = max(local_jobs, 1)
+        self.workers: List[BuildWorker] = list()
+        for address in workers:
+            worker = BuildWorker(address)
+            reason = worker.handshake()
+            if reason:
+                print("编译节点[{}]不可用, 不使用: {}".format(address, reason))
+                continue
+            print("编译节点[{}]: {}个进程".format(address, worker.jobs))
+            self.workers.append(worker)
+        self.max_workers = self.local_jobs + sum(worker.jobs for worker in self.workers)
+        self.local_compiled = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        # 编译槽位: None为本机进程, 否则为编译节点
+        self._slots: queue.Queue = queue.Queue()
+        for _ in range(self.local_jobs):
+            self._slots.put(None)
+        for worker in self.workers:
+            for _ in range(worker.jobs):
+                self._slots.put(worker)
+        # 在分发线程启动前创建本机进程: 分发线程执行subprocess(预处理)时fork出的进程会继承其管道, 导致subprocess一直阻塞
+        self._local = ProcessPoolExecutor(max_workers=self.local_jobs)
+        for future in [self._local.submit(os.getpid) for _ in range(self.local_jobs)]:
+            future.result()
+        self._dispatcher = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='remote-compile')
+
+    def submit(self, extension: Extension, object_cache_dir: str = None, profile: BuildProfile = None) -> Future:
+        return self._dispatcher.submit(self._compile, extension, object_cache_dir, profile)
+
+    def _compile(self, extension: Extension, object_cache_dir: str = None,
+                 profile: BuildProfile = None) -> CompileResult:
+        worker: Optional[BuildWorker] = self._slots.get()
+        try:
+            if worker is not None and not worker.disabled:
+                result = self._compile_remote(worker, extension, object_cache_dir, profile)
+                if result is not None:
+                    return result
+                with self._lock:
+                    self.fallbacks += 1
+            with self._lock:
+                self.local_compiled += 1
+            return self._local.submit(compile_extension, extension, object_cache_dir, profile).result()
+        finally:
+            # 停用的编译节点不再放回槽位
+            if worker is None or not worker.disabled:
+                self._slots.put(worker)
+
+    def _compile_remote(self, worker: BuildWorker, extension: Extension, object_cache_dir: str = None,
+                        profile: BuildProfile = None) -> Optional[CompileResult]:
+        """
+        在编译节点编译
+
+        Args:
+            worker (BuildWorker): 编译节点
+            extension (Extension): 以.c文件为源文件的扩展模块
+            object_cache_dir (str): C编译缓存文件夹
+            profile (BuildProfile): 编译配置
+
+        Returns:
+            result (CompileResult): 需要在本机编译时为None
+        """
+        time_start = time.time()
+        extension = copy.deepcopy(extension)
+        if profile is not None:
+            profile.apply(extension)
+        if any(arg.startswith(LOCAL_ONLY_ARG_PREFIXES) for arg in extension.extra_compile_args):
+            return None
+        if check_remote_args(extension.extra_compile_args, extension.extra_link_args, extension.libraries,
+                             extension.library_dirs):
+            return None
+        lookup = lookup_object_cache(extension, object_cache_dir)
+        if lookup.result is not None:
+            return lookup.result
+
+        # 1.本机预处理, 与build_ext相同的编译参数
+        preprocess_start = time.time()
+        sources = list()
+        for source in extension.sources:
+            output = preprocess_c_file(source, include_dirs=extension.include_dirs, macros=extension.define_macros,
+                                       extra_args=_get_config_args('CCSHARED') + extension.extra_compile_args,
+                                       line_markers=True)
+            if output is None:
+                return None
+            sources.append(output)
+        spans = list(lookup.spans)
+        spans.append(make_span('preprocess', CATEGORY_MODULE, preprocess_start, bytes_in=lookup.c_size,
+                               bytes_out=sum(len(source) for source in sources)))
+
+        # 2.发送至编译节点
+        remote_start = time.time()
+        header = dict(type=MESSAGE_COMPILE, module=extension.name, toolchain=get_toolchain(),
+                      source_sizes=[len(source) for source in sources],
+                      compile_args=list(extension.extra_compile_args), link_args=list(extension.extra_link_args),
+                      libraries=list(extension.libraries or list()))
+        payload = zlib.compress(b''.join(sources))
+        try:
+            connection = worker.acquire()
+            try:
+                response, data = connection.request(header, payload, timeout=COMPILE_TIMEOUT)
+            except BaseException:
+                connection.close()
+                raise
+            worker.release(connection)
+            if response.get('type') == MESSAGE_RESULT:
+                so = decompress_payload(data)
+        except (OSError, ProtocolError, struct.error) as e:
+            worker.disable("连接错误: {}".format(e))
+            return None
+        if response.get('type') != MESSAGE_RESULT:
+            if response.get('mismatch'):
+                worker.disable(response.get('message'))
+            else:
+                print("编译节点[{}]编译失败, 改为本机编译: {}".format(worker.address, extension.name))
+            return None
+
+        # 3.写入build目录及C编译缓存
+        result = get_extension_file_name(extension)
+        so_file = os.path.join(result.build_lib, result.so_file_name)
+        os.makedirs(os.path.dirname(so_file), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(so_file, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(so)
+        os.replace(tmp_path, so_file)
+        if lookup.key:
+            lookup.object_cache.store(lookup.key, so_file)
+        spans.append(make_span('remote_cc', CATEGORY_MODULE, remote_start, worker=worker.address,
+                               bytes_in=len(payload), bytes_out=len(data)))
+        with self._lock:
+            worker.compiled += 1
+            worker.seconds += time.time() - remote_start
+        return result._replace(cache_hit=False if lookup.object_cache else None,
+                               compile_seconds=time.time() - time_start, spans=tuple(spans), c_size=lookup.c_size)
+
+    def shutdown(self) -> None:
+        self._dispatcher.shutdown(wait=True, cancel_futures=True)
+        self._local.shutdown(wait=True, cancel_futures=True)
+        for worker in self.workers:
+            worker.close()
+        return None
+
+    def report(self) -> None:
+        """输出各编译节点的编译数"""
+        for worker in self.workers:
+            print("编译节点[{}]: 编译{}个模块, 耗时{:.2f}s{}".format(
+                worker.address, worker.compiled, worker.seconds,
+                ', 已停用({})'.format(worker.disabled) if worker.disabled else ''))
+        print("本机编译: {}个模块, 其中编译节点回退{}个".format(self.local_compiled, self.fallbacks))
+        return None
+
+
+#######################################################
+#                      命令行入口                       #
+#######################################################
+@click.command()
+@click.option('--host', type=str, default=DEFAULT_WORKER_HOST, show_default=True,
+              help="监听地址, 协议没有认证, 只在可信网络中监听其他地址")
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=DEFAULT_WORKER_PORT, show_default=True,
+              help="监听端口")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="同时编译的模块数, 默认为CPU核数")
+def worker(host: str, port: int, jobs: int):
+    """
+    编译节点: 接收预处理后的C文件, 编译并返回.so文件\n
+    需与编译机使用相同的Python版本(ABI标签), 操作系统, CPU架构及C编译器版本\n
+    例如: python remote.py --host 0.0.0.0 --port 8765 -j 8\n
+    编译机: python run.py /xxx/demo_proj demo_proj.json -w 192.168.1.10:8765\n
+    """
+    server = BuildWorkerServer(host, port, jobs)
+    toolchain = server.toolchain
+    print("编译节点已启动: {}:{}, {}个进程, ABI: {}, {}".format(host, server.server_address[1], server.jobs,
+                                                         toolchain['abi'], toolchain['compiler']))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    worker()
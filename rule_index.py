@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : rule_index.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译规则的预编译索引: 忽略/保留编译规则按字面子串或前缀匹配(包含正则表达式元字符的规则仍按re.search匹配),
+          Cython编译指令规则按路径分段匹配
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+# 正则表达式元字符('.'除外), 规则包含时仍作为正则表达式匹配, 其余规则按字面匹配
+REGEX_METACHARACTERS = frozenset('^$*+?{}[]\\|()')
+
+
+def is_regex_rule(rule: str) -> bool:
+    """规则是否包含正则表达式元字符('.'除外)"""
+    return not REGEX_METACHARACTERS.isdisjoint(rule)
+
+
+def split_rule_path(path: str) -> List[str]:
+    """
+    将规则或路径按'/'拆分为路径分段, 忽略首尾及重复的'/'
+
+    Args:
+        path (str): 规则或相对路径
+
+    Returns:
+        segments (list):
+    """
+    return [segment for segment in path.split('/') if segment]
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'rule')
+
+    def __init__(self):
+        self.children = dict()
+        self.rule: Optional[str] = None  # 以该节点结尾的规则
+
+
+class PathSegmentTrie(object):
+    """
+    路径分段前缀树
+
+        每个节点对应一个路径分段, 加载规则时构建一次,
+        判断路径时只需沿路径分段逐级查找, 与规则数量无关
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, segments: Iterable[str], rule: str) -> None:
+        """
+        插入规则
+
+        Args:
+            segments (iterable): 规则的路径分段
+            rule (str): 原始规则, 匹配时返回
+
+        Returns:
+
+        """
+        node = self.root
+        for segment in segments:
+            node = node.children.setdefault(segment, _TrieNode())
+        if node is self.root:
+            # 空规则
+            return None
+        if node.rule is None:
+            self.size += 1
+            node.rule = rule
+        return None
+
+    def match_prefix(self, segments: Iterable[str]) -> Optional[str]:
+        """
+        查找为路径前缀的规则(路径与规则相同或位于规则之下)
+
+        Args:
+            segments (iterable): 路径分段
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+            if node.rule is not None:
+                return node.rule
+        return None
+
+    def iter_prefix(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        按由短到长的顺序查找全部为路径前缀的规则
+
+        Args:
+            segments (iterable): 路径分段
+
+        Returns:
+            rule (str): 命中的规则
+        """
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return
+            if node.rule is not None:
+                yield node.rule
+
+    def match_prefix_or_ancestor(self, segments: Iterable[str]) -> Optional[str]:
+        """
+        查找与路径存在上下级关系的规则: 路径与规则相同, 位于规则之下, 或为规则的上级路径
+
+        Args:
+            segments (iterable): 路径分段
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+            if node.rule is not None:
+                return node.rule
+        if node is self.root:
+            return None
+        # 路径为规则的上级路径, 返回其下任意一条规则
+        while node.rule is None:
+            node = next(iter(node.children.values()))
+        return node.rule
+
+    def match_contains(self, segments: List[str]) -> Optional[str]:
+        """
+        查找在路径中连续出现的规则(从任意路径分段开始匹配)
+
+        Args:
+            segments (list): 路径分段
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        for i in range(len(segments)):
+            rule = self.match_prefix(segments[i:])
+            if rule is not None:
+                return rule
+        return None
+
+    def iter_contains(self, segments: List[str]) -> Iterator[Tuple[int, int, str]]:
+        """
+        查找全部在路径中连续出现的规则
+
+        Args:
+            segments (list): 路径分段
+
+        Returns:
+            start (int): 规则在路径中的起始分段
+            end (int): 规则在路径中的结束分段(不含)
+            rule (str): 命中的规则
+        """
+        for i in range(len(segments)):
+            node = self.root
+            for j in range(i, len(segments)):
+                node = node.children.get(segments[j])
+                if node is None:
+                    break
+                if node.rule is not None:
+                    yield i, j + 1, node.rule
+
+
+class SuffixRuleIndex(object):
+    """
+    文件规则索引
+
+        所有文件规则合并为一棵按路径分段倒序构建的前缀树,
+        路径以规则结尾且在'/'处对齐时命中, 例如'a.py'命中'x/a.py', 但不命中'x/data.py'
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        """
+        Args:
+            rules (iterable): 文件规则
+        """
+        self.trie = PathSegmentTrie()
+        for rule in rules:
+            self.trie.insert(reversed(split_rule_path(rule)), rule)
+
+    def __len__(self) -> int:
+        return len(self.trie)
+
+    def match(self, path: str) -> Optional[str]:
+        """
+        匹配文件路径
+
+        Args:
+            path (str): 相对路径
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        return self.trie.match_prefix(reversed(split_rule_path(path)))
+
+    def match_all(self, path: str) -> List[str]:
+        """
+        匹配文件路径, 返回全部命中的规则, 由短到长(由宽泛到具体)排列
+
+        Args:
+            path (str): 相对路径
+
+        Returns:
+            rules (list):
+        """
+        return list(self.trie.iter_prefix(reversed(split_rule_path(path))))
+
+
+class SubstringRuleIndex(object):
+    """
+    子串规则索引(Aho-Corasick自动机)
+
+        所有字面规则合并为一个自动机, 路径中包含任意规则时命中, 与re.search相同, 但规则按字面匹配, '.'不是通配符;
+        匹配耗时与路径长度成正比, 与规则数量无关;
+        包含正则表达式元字符的规则(例如'^demo/test_.*', 'a|b')预编译后逐条re.search, 在字面规则未命中时匹配
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        """
+        Args:
+            rules (iterable): 规则
+
+        Raises:
+            ValueError: 包含正则表达式元字符的规则不是有效的正则表达式
+        """
+        self.goto: List[Dict[str, int]] = [dict()]  # 状态 -> {字符: 下一状态}
+        self.fail: List[int] = [0]  # 状态 -> 失配时跳转的状态
+        self.output: List[Optional[str]] = [None]  # 状态 -> 以该状态结尾的规则(含失配链上的), 先加入的规则优先
+        self.patterns: List[Tuple[Pattern, str]] = list()  # 正则表达式规则
+        self.size = 0
+        for rule in rules:
+            if is_regex_rule(rule):
+                self._add_pattern(rule)
+            else:
+                self._insert(rule)
+        self._build()
+
+    def __len__(self) -> int:
+        return self.size + len(self.patterns)
+
+    def _add_pattern(self, rule: str) -> None:
+        try:
+            self.patterns.append((re.compile(rule), rule))
+        except re.error as e:
+            raise ValueError("编译规则包含正则表达式元字符, 但不是有效的正则表达式: {} ({})".format(rule, e))
+
+    def _insert(self, rule: str) -> None:
+        state = 0
+        for char in rule:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append(dict())
+                self.fail.append(0)
+                self.output.append(None)
+            state = next_state
+        if self.output[state] is None:
+            self.output[state] = rule
+            self.size += 1
+
+    def _build(self) -> None:
+        """按广度优先顺序计算失配跳转"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                if self.output[next_state] is None:
+                    self.output[next_state] = self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def match(self, path: str) -> Optional[str]:
+        """
+        匹配路径
+
+        Args:
+            path (str): 相对路径
+
+        Returns:
+            rule (str): 命中的规则(路径中最先结束的字面规则, 其次为最先加入的正则表达式规则), 未命中时为None
+        """
+        if self.output[0] is not None:
+            # 空规则命中任意路径
+            return self.output[0]
+        state = 0
+        for char in path:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state] is not None:
+                return self.output[state]
+        for pattern, rule in self.patterns:
+            if pattern.search(path):
+                return rule
+        return None
+
+
+class PrefixRuleIndex(object):
+    """
+    前缀规则索引: 按字符构建的前缀树, 路径以规则开头时命中, 与str.startswith相同
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        """
+        Args:
+            rules (iterable): 规则
+        """
+        self.trie = PathSegmentTrie()
+        self.empty_rule: Optional[str] = None  # 空规则命中任意路径
+        for rule in rules:
+            if rule:
+                self.trie.insert(rule, rule)
+            else:
+                self.empty_rule = rule
+
+    def __len__(self) -> int:
+        return len(self.trie) + (self.empty_rule is not None)
+
+    def match(self, path: str) -> Optional[str]:
+        """
+        查找为路径前缀的规则
+
+        Args:
+            path (str): 相对路径
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        if self.empty_rule is not None:
+            return self.empty_rule
+        return self.trie.match_prefix(path)
+
+    def match_prefix_or_extension(self, path: str) -> Optional[str]:
+        """
+        查找为路径前缀, 或以路径为前缀的规则
+
+        Args:
+            path (str): 相对路径
+
+        Returns:
+            rule (str): 命中的规则, 未命中时为None
+        """
+        if self.empty_rule is not None:
+            return self.empty_rule
+        return self.trie.match_prefix_or_ancestor(path)
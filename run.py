@@ -5,18 +5,78 @@
 @Date  : 2022/12/21
 @Desc  :
 """
-import time
+import os.path
+import sys
 
 import click
 
+from archive import ARCHIVE_FORMATS
 from base import PythonCodeCompilingBase
+from cli_options import parse_mem_budget_option, parse_workers_option
+from constants import DEFAULT_BUILD_CACHE_SIZE, OBJECT_CACHE_DIR, DEFAULT_OBJECT_CACHE_SIZE
+from materialize import MATERIALIZE_STRATEGIES, MATERIALIZE_COPY
+from preflight import PREFLIGHT_MODES, PREFLIGHT_REPORT
+from sync import SYNC_MODES, SYNC_MODE_COPY
+from verify import DEFAULT_THRESHOLD, verify_project
+from watch import DEFAULT_DEBOUNCE, watch_project
 
 
 @click.command()
 @click.argument('dir_path', nargs=1)
 @click.argument('project_config', nargs=1)
 @click.option('--cache/--no-cache', default=False, help="是否使用缓存")
-def python_code_compiling_tool(dir_path: str, project_config: str, cache: bool):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="C编译的进程数, 默认为CPU核数")
+@click.option('--translate-jobs', type=click.IntRange(min=1), default=None, help="cythonize的进程数, 默认与jobs相同")
+@click.option('--queue-size', type=click.IntRange(min=1), default=None,
+              help="已生成.c文件但未开始C编译的模块数上限, 默认为jobs的2倍")
+@click.option('--build-cache/--no-build-cache', default=True, help="是否复用未变更模块上次编译的.so文件")
+@click.option('--build-cache-size', type=click.IntRange(min=0), default=DEFAULT_BUILD_CACHE_SIZE // (1024 * 1024),
+              help="编译缓存总大小上限(MB)")
+@click.option('--object-cache/--no-object-cache', default=True, help="是否使用C编译缓存")
+@click.option('--object-cache-dir', type=click.Path(file_okay=False), default=OBJECT_CACHE_DIR,
+              help="C编译缓存文件夹, 可在多个项目之间共享")
+@click.option('--object-cache-size', type=click.IntRange(min=0), default=DEFAULT_OBJECT_CACHE_SIZE // (1024 * 1024),
+              help="C编译缓存总大小上限(MB)")
+@click.option('--sync', 'sync_mode', type=click.Choice(SYNC_MODES), default=SYNC_MODE_COPY,
+              help="源项目同步至input目录的方式")
+@click.option('--link-mode', 'materialize', type=click.Choice(MATERIALIZE_STRATEGIES), default=MATERIALIZE_COPY,
+              help="输出文件的生成方式, 不支持时回退为拷贝")
+@click.option('--dry-run', is_flag=True, default=False, help="只输出编译计划, 不执行编译")
+@click.option('--trace', 'trace_path', type=click.Path(dir_okay=False), default=None,
+              help="各阶段及各模块耗时的导出文件(Chrome trace-event格式)")
+@click.option('--top', type=click.IntRange(min=0), default=10, help="编译结束后输出的最慢模块数")
+@click.option('--profile', default=None, help="编译配置: default/debug/release/lto/pgo或项目配置中的自定义编译配置")
+@click.option('--pgo-workload', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="PGO编译时运行的workload脚本")
+@click.option('--mem-budget', default=None, callback=parse_mem_budget_option,
+              help="并行C编译的内存预算, 例如4G, 512M(无单位时为MB), auto为可用内存的80%")
+@click.option('--worker', '-w', 'workers', multiple=True, callback=parse_workers_option,
+              help="编译节点地址host:port, 可多次指定, 编译节点见remote.py")
+@click.option('--shared-utility', is_flag=True, default=False,
+              help="将Cython的工具代码编译为项目共享的扩展模块, 各模块不再内嵌(需要Cython>=3.1)")
+@click.option('--strip', is_flag=True, default=False, help="链接时去除扩展模块的符号表及调试信息")
+@click.option('--archive', 'archive_format', type=click.Choice(ARCHIVE_FORMATS), default=None,
+              help="编译结果直接写入归档文件(位于output目录)")
+@click.option('--output-tree/--no-output-tree', default=True, help="是否生成输出文件夹, 不生成时只生成归档文件")
+@click.option('--preflight', type=click.Choice(PREFLIGHT_MODES), default=PREFLIGHT_REPORT,
+              help="编译前预检: off不检查, report输出已知无法编译的写法, demote同时将存在错误的模块改为拷贝源文件")
+@click.option('--keep-going', is_flag=True, default=False, help="模块编译失败时继续编译其他模块, 结束后汇总失败的模块")
+@click.option('--resume', is_flag=True, default=False, help="按编译日志续编, 只重新编译上次失败及未完成的模块")
+@click.option('--verify', is_flag=True, default=False,
+              help="编译后在独立的子进程中导入全部模块, 对比源码与扩展模块的导入耗时, 内存及微基准测试")
+@click.option('--verify-threshold', type=click.FloatRange(min=0), default=DEFAULT_THRESHOLD,
+              help="编译后微基准测试耗时超出源码的比例上限, 超出时校验失败")
+@click.option('--watch', is_flag=True, default=False, help="编译后监听源项目, 文件变更时增量编译")
+@click.option('--watch-polling', is_flag=True, default=False, help="监听时使用轮询, 不使用inotify")
+@click.option('--watch-debounce', type=click.FloatRange(min=0), default=DEFAULT_DEBOUNCE,
+              help="最后一次文件变更后等待的时间(秒)")
+def python_code_compiling_tool(dir_path: str, project_config: str, cache: bool, jobs: int, translate_jobs: int,
+                               queue_size: int, build_cache: bool, build_cache_size: int, object_cache: bool,
+                               object_cache_dir: str, object_cache_size: int, sync_mode: str, materialize: str,
+                               dry_run: bool, trace_path: str, top: int, profile: str, pgo_workload: str,
+                               mem_budget: int, workers: list, shared_utility: bool, strip: bool, archive_format: str,
+                               output_tree: bool, preflight: str, keep_going: bool, resume: bool, verify: bool,
+                               verify_threshold: float, watch: bool, watch_polling: bool, watch_debounce: float):
     """
     python代码编译工具
 
@@ -24,6 +84,48 @@ def python_code_compiling_tool(dir_path: str, project_config: str, cache: bool):
 
         project_config (str): 待编译项目的编译规则json, 位于projects_config目录下\n
         cache (bool): 是否用缓存项目文件, 默认False, 即利用input文件下上次复制的项目文件, 加速编译\n
+        jobs (int): C编译的进程数, 默认为CPU核数, 与translate_jobs均为1时串行编译\n
+        translate_jobs (int): cythonize的进程数, 默认与jobs相同\n
+        queue_size (int): 已生成.c文件但未开始C编译的模块数上限, 默认为jobs的2倍\n
+        build_cache (bool): 是否复用未变更模块上次编译的.so文件, 默认True\n
+        build_cache_size (int): 编译缓存总大小上限(MB), 超出后按最近使用时间淘汰\n
+        object_cache (bool): 是否使用C编译缓存, 预处理后的C文件相同时跳过C编译, 默认True\n
+        object_cache_dir (str): C编译缓存文件夹, 可在多个项目及检出目录之间共享\n
+        object_cache_size (int): C编译缓存总大小上限(MB), 超出后按最近使用时间淘汰\n
+        sync_mode (str): 源项目同步至input目录的方式, 默认copy, 即由cache决定是否删除后整体拷贝;
+        mtime/checksum按文件大小及修改时间/内容哈希增量同步, 只拷贝变更的文件\n
+        materialize (str): 输出文件的生成方式(--link-mode), 默认copy; hardlink/reflink/copy_file_range跨文件系统或
+        不支持时自动回退为拷贝\n
+        dry_run (bool): 只输出编译计划(每个文件/文件夹的操作及命中的规则, 编译顺序), 不执行编译\n
+        trace_path (str): 各阶段(同步, 遍历, 拷贝, cythonize, C编译, 链接)及各模块耗时的导出文件(--trace),
+        Chrome trace-event格式, 可在chrome://tracing或Perfetto中查看\n
+        top (int): 编译结束后输出的最慢模块数, 默认10, 为0时不输出\n
+        profile (str): 编译配置, 默认使用项目配置中的build_profile; debug(-O0 -g3), release(-O3 -g0 -fvisibility=hidden),
+        lto(release + -flto), pgo(release + 插桩编译, 运行workload, 使用profile数据重新编译)\n
+        pgo_workload (str): PGO编译时运行的workload脚本, 以输出目录为PYTHONPATH, 默认使用项目配置中的pgo_workload\n
+        mem_budget (int): 并行C编译的内存预算, 按生成的.c文件大小及历史峰值内存估算各模块的内存占用,
+        超出预算时暂缓提交新的编译, 默认不限制\n
+        workers (list): 编译节点地址(--worker host:port, 可多次指定), C编译同时分发至编译节点及本机进程池;
+        编译节点(python remote.py)的Python ABI标签, 操作系统, CPU架构或C编译器版本与本机不一致, 无法连接或编译失败时在本机编译\n
+        shared_utility (bool): Cython的工具代码(类型检查, CyFunction, 生成器等)编译为项目共享的扩展模块<项目>._cyutility,
+        各模块从中导入, 不再各自内嵌, 并输出与不使用时的扩展模块大小对比; 项目根目录须为python包\n
+        strip (bool): 链接时去除扩展模块的符号表及调试信息(-s), release/lto/pgo编译配置已包含\n
+        archive_format (str): 编译结果直接写入的归档文件格式(--archive): wheel/tar.zst/zip, 位于output目录;
+        各文件生成后即并行压缩, 条目按路径排序, 修改时间统一, 相同的输入生成完全相同的归档文件; tar.zst需要安装zstandard\n
+        output_tree (bool): 是否生成output目录下的项目文件夹, 默认True; --no-output-tree时只生成归档文件\n
+        preflight (str): 编译前预检, 默认report: 并行解析待编译模块的AST, 输出已知无法编译的写法(文件名不是合法的模块名称,
+        语法错误, 类型注解与字面量不兼容, 元组类型注解)及行号; demote时存在错误的模块改为拷贝源文件, 不再编译; off不检查\n
+        keep_going (bool): 模块编译失败(cythonize或C编译)时继续编译其他模块, 失败的模块不输出, 编译结束后汇总并以退出码1退出,
+        存在失败的模块时不生成归档文件\n
+        resume (bool): 按编译日志(cache/journal/<项目>.jsonl, 每个模块编译完成后追加写入)续编: 不删除build文件夹,
+        跳过上次已完成且源文件, 编译依赖及编译指令未变更的模块, 只重新编译失败及未完成的模块; 编译环境或编译配置变化时重新编译\n
+        verify (bool): 编译后校验(python verify.py): 在独立的子进程中并行导入输出目录中的全部模块, 源码同样可以导入但编译后
+        无法导入时校验失败; 对比源码与扩展模块的冷启动导入耗时及内存增量, 执行项目配置中的微基准测试(benchmarks),
+        校验结果保存至cache/verify/<项目>.json, 校验失败时退出码为1\n
+        verify_threshold (float): 扩展模块的微基准测试耗时超出源码的比例上限, 默认0.1\n
+        watch (bool): 编译后进程常驻, 监听源项目(inotify, 不支持时轮询), 文件变更时只同步并编译变更的模块, Ctrl+C退出\n
+        watch_polling (bool): 监听时使用轮询, 适用于不支持inotify的文件系统(例如网络文件系统)\n
+        watch_debounce (float): 最后一次文件变更后等待的时间(秒), 合并编辑器保存时的多次写入, 默认0.3\n
 
         注:\n
         1.python项目名称必须符合Python变量命名规则\n
@@ -39,13 +141,52 @@ def python_code_compiling_tool(dir_path: str, project_config: str, cache: bool):
                 pass
 
     """
-    PythonCodeCompilingBase(
+    if not output_tree and not archive_format:
+        raise click.UsageError("--no-output-tree需要同时指定--archive")
+    if not output_tree and watch:
+        raise click.UsageError("--watch需要生成输出文件夹, 不能与--no-output-tree同时使用")
+    if not output_tree and verify:
+        raise click.UsageError("--verify需要生成输出文件夹, 不能与--no-output-tree同时使用")
+    compiler = PythonCodeCompilingBase(
         dir_path=dir_path,
         project_config=project_config,
         no_cache=not cache,
-    ).run()
-    print('60秒后自动退出')
-    time.sleep(60)
+        jobs=jobs,
+        translate_jobs=translate_jobs,
+        queue_size=queue_size,
+        build_cache=build_cache,
+        build_cache_size=build_cache_size * 1024 * 1024,
+        object_cache=object_cache,
+        object_cache_dir=os.path.abspath(object_cache_dir),
+        object_cache_size=object_cache_size * 1024 * 1024,
+        sync_mode=sync_mode,
+        materialize=materialize,
+        dry_run=dry_run,
+        trace_path=trace_path,
+        top=top,
+        profile=profile,
+        pgo_workload=pgo_workload,
+        mem_budget=mem_budget,
+        workers=workers,
+        archive_format=archive_format,
+        output_tree=output_tree,
+        shared_utility=shared_utility,
+        strip=strip,
+        preflight=preflight,
+        keep_going=keep_going,
+        resume=resume,
+    )
+    compiler.run()
+    if dry_run:
+        return None
+    if compiler.failures and not watch:
+        sys.exit(1)
+    if verify and not compiler.failures:
+        if not verify_project(dir_path, project_config, jobs=jobs, threshold=verify_threshold, top=top) and not watch:
+            sys.exit(1)
+    if watch:
+        watch_project(compiler, polling=watch_polling, debounce=watch_debounce)
+        return None
 
 
 if __name__ == '__main__':
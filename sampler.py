@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : sampler.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 采样分析器: 在workload进程中定时采样各线程的调用栈, 统计项目各模块的耗时; 只依赖标准库, 避免影响workload的导入
+"""
+import json
+import os.path
+import runpy
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from importlib.machinery import EXTENSION_SUFFIXES
+from typing import Optional
+
+DEFAULT_INTERVAL = 0.005  # 采样间隔(秒)
+MAX_FUNCTIONS = 200  # 结果中保留的函数数(按采样数排序)
+
+
+class SamplingProfiler(object):
+    """
+    基于sys._current_frames的采样分析器, 在后台线程中定时采样除自身外全部线程的调用栈
+
+        own: 栈顶帧属于该模块, 即正在执行该模块的代码(包括其直接调用的内置函数), 编译后可加速的部分, 用于排序
+        total: 调用栈中包含该模块, 包括其调用的标准库及第三方库, 只用于参考
+
+        支持线程CPU时钟时(Linux/macOS), 每次采样按线程在采样间隔内的CPU时间占比计数, sleep, IO及等待锁的线程不计入,
+        编译无法加速这部分耗时; 不支持时按采样次数计数
+    """
+
+    def __init__(self, tree_dir: str, interval: float = DEFAULT_INTERVAL):
+        """
+        Args:
+            tree_dir (str): 项目所在文件夹(项目文件夹的上级), 其下的python文件属于项目
+            interval (float): 采样间隔(秒)
+        """
+        self.tree_dir = os.path.join(os.path.realpath(tree_dir), '')
+        self.interval = interval
+        self.samples = 0  # 线程采样数
+        self.total_counts = Counter()  # 模块 -> 调用栈中包含该模块的采样数
+        self.function_counts = Counter()  # (模块, 函数, 行号) -> 栈顶采样数
+        self.cpu_clock = hasattr(time, 'pthread_getcpuclockid')  # 是否按CPU时间占比计数
+        self._cpu_times = dict()  # 线程 -> 上次采样时的CPU时间
+        self._last_sample = time.perf_counter()
+        self._names = dict()  # co_filename -> 模块相对路径, 不属于项目时为None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+
+    def _module_name(self, filename: str) -> Optional[str]:
+        """代码所属的项目模块(相对于tree_dir), 不属于项目时为None"""
+        try:
+            return self._names[filename]
+        except KeyError:
+            pass
+        path = os.path.realpath(filename)
+        name = None
+        if path.startswith(self.tree_dir) and path.endswith('.py'):
+            name = path[len(self.tree_dir):].replace(os.sep, '/')
+        self._names[filename] = name
+        return name
+
+    def sample(self) -> None:
+        """采样一次"""
+        current = threading.get_ident()
+        now = time.perf_counter()
+        elapsed, self._last_sample = now - self._last_sample, now
+        for ident, frame in sys._current_frames().items():
+            if ident == current:
+                continue
+            self.samples += 1
+            weight = self._cpu_weight(ident, elapsed)
+            if not weight:
+                continue
+            code = frame.f_code
+            name = self._module_name(code.co_filename)
+            if name is not None:
+                self.function_counts[(name, code.co_name, code.co_firstlineno)] += weight
+            names = set()
+            while frame is not None:
+                name = self._module_name(frame.f_code.co_filename)
+                if name is not None:
+                    names.add(name)
+                frame = frame.f_back
+            for name in names:
+                self.total_counts[name] += weight
+        return None
+
+    def _cpu_weight(self, ident: int, elapsed: float) -> float:
+        """线程在采样间隔内的CPU时间占比, 不支持线程CPU时钟时为1"""
+        if not self.cpu_clock:
+            return 1
+        try:
+            cpu_time = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except OSError:
+            # 线程已退出
+            return 0
+        last = self._cpu_times.get(ident)
+        self._cpu_times[ident] = cpu_time
+        if last is None or elapsed <= 0:
+            # 首次采样的线程没有上次的CPU时间, 按本次采样计数
+            return 1
+        return min(1.0, (cpu_time - last) / elapsed)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        # 记录已有线程的CPU时间, 首次采样即可按占比计数
+        for ident in sys._current_frames():
+            self._cpu_weight(ident, 0)
+        self._last_sample = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def result(self) -> dict:
+        """
+        采样结果
+
+        Returns:
+            result (dict): {
+                'interval': 0.005,
+                'samples': 1200,
+                'cpu_clock': True,
+                'modules': {'xxx/xxx.py': [own, total], ...},
+                'functions': [['xxx/xxx.py', 'func', 12, count], ...]
+            }
+        """
+        own_counts = Counter()
+        for (name, _, _), count in self.function_counts.items():
+            own_counts[name] += count
+        return dict(
+            interval=self.interval,
+            samples=self.samples,
+            cpu_clock=self.cpu_clock,
+            modules={name: [round(own_counts[name], 2), round(count, 2)] for name, count in self.total_counts.items()},
+            functions=[[name, function, line, round(count, 2)]
+                       for (name, function, line), count in self.function_counts.most_common(MAX_FUNCTIONS)],
+        )
+
+
+def count_loaded_modules(tree_dir: str) -> dict:
+    """已导入的项目模块数: 扩展模块(.so)及python源文件"""
+    tree_dir = os.path.join(os.path.realpath(tree_dir), '')
+    counts = dict(extension=0, source=0)
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if not path or not os.path.realpath(path).startswith(tree_dir):
+            continue
+        counts['extension' if path.endswith(tuple(EXTENSION_SUFFIXES)) else 'source'] += 1
+    return counts
+
+
+def run_workload(workload: str, tree_dir: str, result_path: str, interval: float = 0.0) -> int:
+    """
+    以tree_dir为首个导入路径运行workload脚本, 结果写入json文件
+
+    Args:
+        workload (str): workload脚本路径
+        tree_dir (str): 项目所在文件夹(源码或编译后的输出目录)
+        result_path (str): 结果json文件
+        interval (float): 采样间隔(秒), 为0时不采样, 只计时
+
+    Returns:
+        exit_code (int): workload的退出码
+    """
+    workload = os.path.abspath(workload)
+    # 与直接运行脚本一致, 脚本所在文件夹位于导入路径中, 但项目文件夹优先, 避免导入脚本旁的同名项目
+    sys.path[0] = os.path.dirname(workload)
+    sys.path.insert(0, tree_dir)
+    sys.argv = [workload]
+    profiler = SamplingProfiler(tree_dir, interval) if interval > 0 else None
+
+    exit_code = 0
+    time_start = time.perf_counter()
+    if profiler is not None:
+        profiler.start()
+    try:
+        runpy.run_path(workload, run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    seconds = time.perf_counter() - time_start
+    if profiler is not None:
+        profiler.stop()
+
+    result = profiler.result() if profiler is not None else dict()
+    result.update(exit_code=exit_code, seconds=seconds, loaded=count_loaded_modules(tree_dir))
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+    return exit_code
+
+
+if __name__ == '__main__':
+    # python sampler.py <workload> <tree_dir> <result_path> [interval]
+    sys.exit(run_workload(sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4]) if len(sys.argv) > 4 else 0.0))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : scanner.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 基于os.scandir的单次目录遍历, 生成可复用的文件/python包清单
+"""
+import os.path
+from typing import Dict, Iterator, List, Optional
+
+from constants import INPUT_DIR
+
+
+class FileEntry(object):
+    """文件清单项, 缓存scandir得到的stat信息"""
+    __slots__ = ('name', 'path', 'abs_path', 'size', 'mtime_ns')
+
+    def __init__(self, name: str, path: str, abs_path: str, size: int, mtime_ns: int):
+        """
+        Args:
+            name (str): 文件名称
+            path (str): 相对路径(相对于input目录)
+            abs_path (str): 绝对路径
+            size (int): 文件大小
+            mtime_ns (int): 修改时间(纳秒)
+        """
+        self.name = name
+        self.path = path
+        self.abs_path = abs_path
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+
+class DirectoryEntry(object):
+    """文件夹清单项"""
+    __slots__ = ('name', 'path', 'abs_path', 'files', 'dirs', 'abandoned')
+
+    def __init__(self, name: str, path: str, abs_path: str):
+        """
+        Args:
+            name (str): 文件夹名称
+            path (str): 相对路径(相对于input目录)
+            abs_path (str): 绝对路径
+        """
+        self.name = name
+        self.path = path
+        self.abs_path = abs_path
+        self.files: List[FileEntry] = list()
+        self.dirs: List[DirectoryEntry] = list()
+        # 遍历时忽略的文件/文件夹名称
+        self.abandoned: List[str] = list()
+
+    @property
+    def is_package(self) -> bool:
+        """是否为python包"""
+        return any(file.name == '__init__.py' for file in self.files)
+
+    def iter_files(self) -> Iterator[FileEntry]:
+        """递归遍历文件夹下的全部文件"""
+        for file in self.files:
+            yield file
+        for dir_ in self.dirs:
+            for file in dir_.iter_files():
+                yield file
+
+    def iter_dirs(self) -> Iterator['DirectoryEntry']:
+        """递归遍历文件夹下的全部子文件夹(包含自身)"""
+        yield self
+        for dir_ in self.dirs:
+            for sub_dir in dir_.iter_dirs():
+                yield sub_dir
+
+
+class ProjectInventory(object):
+    """
+    项目文件清单
+
+        一次遍历整个项目, 供文件遍历, 编译规则判断及文件拷贝共用, 避免重复遍历及stat
+    """
+
+    def __init__(self, dir_abs_path: str, abandoned_files: list = None, base_dir: str = INPUT_DIR):
+        """
+        Args:
+            dir_abs_path (str): 待遍历文件夹
+            abandoned_files (list): 不遍历的文件/文件夹
+            base_dir (str): 清单中相对路径的起始目录, 默认为input目录
+        """
+        if not os.path.exists(dir_abs_path):
+            raise FileNotFoundError(dir_abs_path)
+
+        self.abandoned_files = set(abandoned_files or list())
+        self.files: Dict[str, FileEntry] = dict()
+        self.dirs: Dict[str, DirectoryEntry] = dict()
+
+        dir_abs_path = dir_abs_path.rstrip('/\\')
+        path = dir_abs_path.split(base_dir.rstrip('/\\'))[-1].lstrip('/\\')
+        self.root = DirectoryEntry(os.path.basename(dir_abs_path), path, dir_abs_path)
+        self._scan(self.root)
+
+    def _scan(self, directory: DirectoryEntry) -> None:
+        """
+        使用os.scandir遍历文件夹
+
+        Args:
+            directory (DirectoryEntry): 待遍历文件夹
+
+        Returns:
+
+        """
+        self.dirs[directory.path] = directory
+        with os.scandir(directory.abs_path) as it:
+            entries = list(it)
+
+        for entry in entries:
+            if entry.name in self.abandoned_files:
+                directory.abandoned.append(entry.name)
+                continue
+            path = '{}/{}'.format(directory.path, entry.name) if directory.path else entry.name
+            if entry.is_dir():
+                directory.dirs.append(DirectoryEntry(entry.name, path, entry.path))
+            else:
+                stat = entry.stat()
+                file = FileEntry(entry.name, path, entry.path, stat.st_size, stat.st_mtime_ns)
+                directory.files.append(file)
+                self.files[path] = file
+
+        for dir_ in directory.dirs:
+            self._scan(dir_)
+
+    def get_dir(self, path: str) -> Optional[DirectoryEntry]:
+        """
+        获取文件夹清单项
+
+        Args:
+            path (str): 相对路径(相对于input目录)
+
+        Returns:
+            directory (DirectoryEntry):
+        """
+        return self.dirs.get(path.rstrip('/'))
+
+    def get_file(self, path: str) -> Optional[FileEntry]:
+        """
+        获取文件清单项
+
+        Args:
+            path (str): 相对路径(相对于input目录)
+
+        Returns:
+            file (FileEntry):
+        """
+        return self.files.get(path)
+
+    def is_python_package(self, path: str) -> bool:
+        """
+        是否为python包
+
+        Args:
+            path (str): 相对路径(相对于input目录)
+
+        Returns:
+            result (bool):
+        """
+        directory = self.get_dir(path)
+        return bool(directory and directory.is_package)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : shared_utility.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : Cython共享工具模块: 各扩展模块从同一个扩展模块中导入Cython的工具代码, 不再各自内嵌; 扩展模块大小对比
+"""
+import json
+import os.path
+import time
+from typing import Dict, Optional
+
+from setuptools.extension import Extension
+from Cython import Utils
+from Cython.Compiler.Main import CompilationOptions, default_options
+
+from constants import HISTORY_DIR, SHARED_UTILITY_DIR
+from memory import format_memory_size
+from pipeline import CompileResult, compile_extension
+from profiles import BuildProfile
+from tracing import CATEGORY_MODULE, get_file_size, make_span
+
+try:
+    from Cython.Build.SharedModule import generate_shared_module
+except ImportError:  # Cython < 3.1
+    generate_shared_module = None
+
+SHARED_UTILITY_MODULE_NAME = '_cyutility'  # 共享工具模块名称, 位于项目根目录的python包中
+SIZE_VARIANT_SHARED = 'shared'  # 使用共享工具模块时, 大小记录的变体后缀
+
+
+def get_shared_utility_name(project_name: str) -> str:
+    """
+    共享工具模块的完整模块名称
+
+    Args:
+        project_name (str): 项目名称(项目根目录的python包)
+
+    Returns:
+        name (str): 例如demo_proj._cyutility
+    """
+    if generate_shared_module is None:
+        raise ValueError("共享工具模块需要Cython>=3.1")
+    return '{}.{}'.format(project_name, SHARED_UTILITY_MODULE_NAME)
+
+
+def generate_shared_utility_source(cache_dir: str = SHARED_UTILITY_DIR) -> str:
+    """
+    生成共享工具模块的.c文件
+
+        内容只与Cython版本有关, 在各项目之间共享; 已由当前版本的Cython生成时直接复用
+
+    Args:
+        cache_dir (str): .c文件所在文件夹
+
+    Returns:
+        c_file_path (str):
+    """
+    c_file_path = os.path.join(os.path.abspath(cache_dir), '{}.c'.format(SHARED_UTILITY_MODULE_NAME))
+    if os.path.exists(c_file_path) and Utils.file_generated_by_this_cython(c_file_path):
+        return c_file_path
+    os.makedirs(os.path.dirname(c_file_path), exist_ok=True)
+    err, _ = generate_shared_module(CompilationOptions(default_options, shared_c_file_path=c_file_path,
+                                                       shared_utility_qualified_name=None))
+    if err:
+        if os.path.exists(c_file_path):
+            os.remove(c_file_path)
+        raise RuntimeError("共享工具模块生成失败: {}".format(c_file_path))
+    return c_file_path
+
+
+def compile_shared_utility(qualified_name: str, object_cache_dir: str = None,
+                           profile: BuildProfile = None) -> CompileResult:
+    """
+    生成并编译共享工具模块
+
+    Args:
+        qualified_name (str): 完整模块名称, 见get_shared_utility_name
+        object_cache_dir (str): C编译缓存文件夹, 为空时不使用缓存
+        profile (BuildProfile): 编译配置
+
+    Returns:
+        result (CompileResult):
+    """
+    time_start = time.time()
+    c_file_path = generate_shared_utility_source()
+    span = make_span('cythonize', CATEGORY_MODULE, time_start, bytes_out=get_file_size(c_file_path))
+    result = compile_extension(Extension(qualified_name, sources=[c_file_path]), object_cache_dir, profile)
+    return result._replace(translate_seconds=span.seconds, spans=(span,) + result.spans)
+
+
+def get_size_variant(profile: BuildProfile, shared_utility: bool) -> str:
+    """
+    扩展模块大小记录的变体名称: 编译配置名称(含+strip), 使用共享工具模块时追加+shared
+
+    Args:
+        profile (BuildProfile): 编译配置
+        shared_utility (bool): 是否使用共享工具模块
+
+    Returns:
+        variant (str): 例如default, default+strip+shared
+    """
+    return '{}+{}'.format(profile.name, SIZE_VARIANT_SHARED) if shared_utility else profile.name
+
+
+def get_baseline_variant(variant: str) -> str:
+    """对比的基准变体: 同一编译配置, 不使用共享工具模块, 不额外strip"""
+    return variant.split('+')[0]
+
+
+class ExtensionSizes(object):
+    """
+    各扩展模块在不同变体下的大小记录, 用于对比使用共享工具模块及strip前后的大小
+
+    sizes = {
+        'xxx/xxx.py': {'default': 183744, 'default+shared': 88960},
+        ...
+    }
+    """
+
+    def __init__(self, project_name: str, history_dir: str = HISTORY_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            history_dir (str): 历史记录文件夹
+        """
+        self.sizes_path = os.path.join(history_dir, '{}.sizes.json'.format(project_name))
+        self.sizes: Dict[str, Dict[str, int]] = dict()
+        if os.path.exists(self.sizes_path):
+            try:
+                with open(self.sizes_path) as f:
+                    self.sizes = json.load(f)
+            except (ValueError, OSError):
+                self.sizes = dict()
+
+    def record(self, name: str, variant: str, size: int) -> None:
+        """记录扩展模块大小"""
+        self.sizes.setdefault(name, dict())[variant] = size
+
+    def get(self, name: str, variant: str) -> Optional[int]:
+        return self.sizes.get(name, dict()).get(variant)
+
+    def report(self, names: list, variant: str, shared_utility_size: int = 0, top: int = 10) -> None:
+        """
+        输出本次编译的扩展模块大小, 及与基准变体的对比
+
+        Args:
+            names (list): 本次编译的模块
+            variant (str): 本次编译的变体
+            shared_utility_size (int): 共享工具模块大小, 未使用时为0
+            top (int): 输出的模块数(按减少的大小排序)
+
+        Returns:
+
+        """
+        baseline_variant = get_baseline_variant(variant)
+        total = sum(self.get(name, variant) or 0 for name in names) + shared_utility_size
+        print("扩展模块大小({}): {}个模块, 合计{}".format(variant, len(names), format_memory_size(total)))
+        if baseline_variant == variant:
+            return None
+
+        compared = [name for name in names if self.get(name, baseline_variant) is not None]
+        if not compared:
+            print("  无{}的大小记录, 不使用共享工具模块且不指定--strip编译一次后可对比".format(baseline_variant))
+            return None
+        rows = sorted(compared, key=lambda name: self.get(name, variant) - self.get(name, baseline_variant))
+        for name in rows[:top]:
+            before, after = self.get(name, baseline_variant), self.get(name, variant)
+            print("  {}  {} -> {} ({:+.1f}%)".format(name, format_memory_size(before), format_memory_size(after),
+                                                    (after - before) * 100 / before if before else 0))
+        before = sum(self.get(name, baseline_variant) for name in compared)
+        after = sum(self.get(name, variant) for name in compared)
+        print("  {}个模块: {} -> {}{}, 合计{} ({:+.1f}%){}".format(
+            len(compared), format_memory_size(before), format_memory_size(after),
+            ' + 共享工具模块{}'.format(format_memory_size(shared_utility_size)) if shared_utility_size else '',
+            format_memory_size(after + shared_utility_size),
+            (after + shared_utility_size - before) * 100 / before if before else 0,
+            ', 无{}记录的模块{}个'.format(baseline_variant, len(names) - len(compared)) if len(compared) < len(names)
+            else ''))
+        return None
+
+    def save(self) -> None:
+        """写回大小记录"""
+        os.makedirs(os.path.dirname(self.sizes_path), exist_ok=True)
+        tmp_path = self.sizes_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.sizes, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.sizes_path)
+
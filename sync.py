@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : sync.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 源项目至input目录的增量同步(类似rsync)
+"""
+import os.path
+import shutil
+from typing import List, Set
+
+from build_cache import hash_file
+from scanner import ProjectInventory, FileEntry
+
+SYNC_MODE_COPY = 'copy'  # 删除后整体拷贝
+SYNC_MODE_MTIME = 'mtime'  # 按文件大小及修改时间比较
+SYNC_MODE_CHECKSUM = 'checksum'  # 按文件大小及内容哈希比较
+SYNC_MODES = (SYNC_MODE_COPY, SYNC_MODE_MTIME, SYNC_MODE_CHECKSUM)
+
+
+class SyncResult(object):
+    """同步结果"""
+
+    def __init__(self):
+        self.copied: List[str] = list()  # 新增或变更的文件(相对于input目录)
+        self.deleted: List[str] = list()  # 删除的文件/文件夹(相对于input目录)
+        self.unchanged = 0  # 未变更的文件数
+
+    @property
+    def changed_files(self) -> Set[str]:
+        """新增, 变更或删除的文件"""
+        return set(self.copied) | set(self.deleted)
+
+    def __str__(self):
+        return "新增/变更{}个, 删除{}个, 未变更{}个".format(len(self.copied), len(self.deleted), self.unchanged)
+
+
+def _is_same_file(source: FileEntry, target: FileEntry, checksum: bool) -> bool:
+    """
+    比较源文件与目标文件是否相同
+
+    Args:
+        source (FileEntry): 源文件
+        target (FileEntry): 目标文件
+        checksum (bool): 是否比较内容哈希, 否则比较修改时间
+
+    Returns:
+        result (bool):
+    """
+    if source.size != target.size:
+        return False
+    if not checksum:
+        return source.mtime_ns == target.mtime_ns
+    if hash_file(source.abs_path) != hash_file(target.abs_path):
+        return False
+    if source.mtime_ns != target.mtime_ns:
+        # 内容相同, 同步修改时间, 供cythonize判断.c文件是否过期
+        os.utime(target.abs_path, ns=(source.mtime_ns, source.mtime_ns))
+    return True
+
+
+def _copy_file(source_file: str, target_file: str) -> None:
+    """
+    拷贝文件(保留修改时间), 先写入临时文件再替换, 不修改目标文件原有的inode
+
+    Args:
+        source_file (str): 源文件
+        target_file (str): 目标文件
+
+    Returns:
+
+    """
+    tmp_file = target_file + '.sync.tmp'
+    shutil.copy2(source_file, tmp_file)
+    os.replace(tmp_file, target_file)
+
+
+def _is_generated_file(path: str, source: ProjectInventory) -> bool:
+    """
+    是否为cythonize在input目录中生成的.c文件, 同步时保留, 供cythonize判断是否需要重新转换
+
+    Args:
+        path (str): 相对路径
+        source (ProjectInventory): 源项目清单
+
+    Returns:
+        result (bool):
+    """
+    return path.endswith('.c') and source.get_file(path[:-2] + '.py') is not None
+
+
+def sync_tree(source_dir: str, target_dir: str, abandoned_files: list = None,
+              checksum: bool = False) -> SyncResult:
+    """
+    将源项目增量同步至input目录: 只拷贝新增或变更的文件, 删除源项目中已不存在的文件
+
+    Args:
+        source_dir (str): 源项目文件夹
+        target_dir (str): input目录下的项目文件夹, 两者名称相同
+        abandoned_files (list): 不同步的文件/文件夹
+        checksum (bool): 是否按内容哈希比较, 否则按文件大小及修改时间比较
+
+    Returns:
+        result (SyncResult):
+    """
+    result = SyncResult()
+    source = ProjectInventory(source_dir, abandoned_files=abandoned_files,
+                              base_dir=os.path.dirname(source_dir.rstrip('/\\')))
+    if not os.path.exists(target_dir):
+        os.makedirs(target_dir)
+    target = ProjectInventory(target_dir, abandoned_files=abandoned_files,
+                              base_dir=os.path.dirname(target_dir.rstrip('/\\')))
+
+    # 1.删除源项目中已不存在的文件夹及文件
+    for path, directory in sorted(target.dirs.items()):
+        if path in source.dirs or not os.path.exists(directory.abs_path):
+            continue
+        shutil.rmtree(directory.abs_path)
+        result.deleted.extend(file.path for file in directory.iter_files())
+    for path, file in target.files.items():
+        if path in source.files or _is_generated_file(path, source) or not os.path.exists(file.abs_path):
+            continue
+        os.remove(file.abs_path)
+        result.deleted.append(path)
+
+    # 2.拷贝新增或变更的文件
+    for directory in source.root.iter_dirs():
+        target_sub_dir = os.path.join(target_dir, os.path.relpath(directory.abs_path, source.root.abs_path))
+        if directory.path not in target.dirs:
+            os.makedirs(target_sub_dir, exist_ok=True)
+        for file in directory.files:
+            target_file = target.get_file(file.path)
+            if target_file is not None and _is_same_file(file, target_file, checksum):
+                result.unchanged += 1
+                continue
+            _copy_file(file.abs_path, os.path.join(target_sub_dir, file.name))
+            result.copied.append(file.path)
+
+    return result
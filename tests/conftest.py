@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : conftest.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 测试公共配置: 项目模块位于仓库根目录, 加入导入路径; sandbox将input/output/build/cache等目录指向临时文件夹
+"""
+import glob
+import importlib
+import inspect
+import json
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import constants  # noqa: E402
+
+# 仓库根目录下的模块
+MODULES = sorted(os.path.basename(path)[:-3] for path in glob.glob(os.path.join(ROOT_DIR, '*.py')))
+
+
+def _patch_defaults(func, dirs: dict, monkeypatch) -> None:
+    """替换函数参数默认值中的目录"""
+    for attr in ('__defaults__', '__kwdefaults__'):
+        defaults = getattr(func, attr, None)
+        if isinstance(defaults, tuple) and any(value in dirs for value in defaults if isinstance(value, str)):
+            monkeypatch.setattr(func, attr, tuple(dirs.get(value, value) if isinstance(value, str) else value
+                                                  for value in defaults))
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    """
+    将constants中的目录(input/output/build/cache等)指向临时文件夹, 并以临时文件夹为工作目录(build_ext使用相对路径build/)
+
+        替换各模块导入的目录常量及函数参数的默认值; 返回临时文件夹
+    """
+    dirs = {value: value.replace(constants.BASE_DIR, str(tmp_path), 1) for name, value in vars(constants).items()
+            if name.endswith('_DIR') and name != 'BASE_DIR'}
+    for module_name in MODULES:
+        module = importlib.import_module(module_name)
+        for name, value in list(vars(module).items()):
+            if name.endswith('_DIR') and isinstance(value, str) and value in dirs:
+                monkeypatch.setattr(module, name, dirs[value])
+            elif inspect.isfunction(value) and value.__module__ == module_name:
+                _patch_defaults(value, dirs, monkeypatch)
+            elif inspect.isclass(value) and value.__module__ == module_name:
+                for member in vars(value).values():
+                    _patch_defaults(getattr(member, '__func__', member), dirs, monkeypatch)
+    # build_ext的编译结果位于工作目录下的build/
+    monkeypatch.setattr(importlib.import_module('base'), 'BASE_DIR', str(tmp_path))
+    for name in ('input', 'output', 'projects_config'):
+        os.makedirs(str(tmp_path / name), exist_ok=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write_project(root, files: dict, config: dict = None, name: str = 'proj') -> str:
+    """
+    在sandbox的input目录下生成项目及项目配置
+
+    Args:
+        root: sandbox临时文件夹
+        files (dict): 相对路径 -> 文件内容
+        config (dict): 项目配置(编译规则)
+        name (str): 项目名称
+
+    Returns:
+        project_config (str): 项目配置文件名称
+    """
+    for path, content in files.items():
+        file_path = os.path.join(str(root), 'input', name, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(content)
+    project_config = '{}.json'.format(name)
+    with open(os.path.join(str(root), 'projects_config', project_config), 'w') as f:
+        json.dump(config or dict(), f)
+    return project_config
+
+
+def build_project(root, files: dict, config: dict = None, name: str = 'proj', **kwargs):
+    """
+    生成项目并编译, 默认串行编译, 不使用编译缓存及C编译缓存
+
+    Args:
+        root: sandbox临时文件夹
+        files (dict): 相对路径 -> 文件内容
+        config (dict): 项目配置(编译规则)
+        name (str): 项目名称
+        kwargs: PythonCodeCompilingBase的其他参数
+
+    Returns:
+        compiler (PythonCodeCompilingBase):
+    """
+    from base import PythonCodeCompilingBase
+
+    project_config = write_project(root, files, config, name=name)
+    options = dict(jobs=1, translate_jobs=1, build_cache=False, object_cache=False)
+    options.update(kwargs)
+    compiler = PythonCodeCompilingBase(project_config, name, **options)
+    compiler.run()
+    return compiler
+
+
+def run_output(root, code: str) -> str:
+    """在新进程中以输出目录为工作目录执行代码(编译的扩展模块不能在测试进程中重复导入), 返回标准输出"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(str(root), 'output'),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_advisor.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译建议: 采样运行workload, 热点模块选择及保留编译规则
+"""
+import json
+import os.path
+
+from advisor import ModuleHotness, get_compilable_modules, make_reserved_rules, rank_modules, run_workload, \
+    select_hot_modules, write_project_config
+from constants import DEFAULT_IGNORED_FILES
+from scanner import ProjectInventory
+
+FILES = {
+    '__init__.py': '',
+    'hot.py': 'def spin(n):\n    total = 0\n    for i in range(n):\n        total += i * i\n    return total\n',
+    'cold.py': 'def noop():\n    return None\n',
+    'broken.py': 'def f():\n    x: int = "a"\n    while True:\n        pass\n',
+    'core/__init__.py': '',
+    'core/a.py': '',
+    'core/b.py': '',
+}
+
+WORKLOAD_SOURCE = '''
+import time
+from proj import cold, hot
+cold.noop()
+deadline = time.perf_counter() + 0.5
+while time.perf_counter() < deadline:
+    hot.spin(10000)
+'''
+
+
+def make_project(tmp_path) -> ProjectInventory:
+    for path, content in FILES.items():
+        file_path = tmp_path / 'proj' / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+    return ProjectInventory(str(tmp_path / 'proj'), abandoned_files=DEFAULT_IGNORED_FILES, base_dir=str(tmp_path))
+
+
+def test_sampled_workload_ranks_hot_module_first(tmp_path):
+    make_project(tmp_path)
+    workload = tmp_path / 'workload.py'
+    workload.write_text(WORKLOAD_SOURCE)
+    result = run_workload(str(workload), str(tmp_path), interval=0.005)
+    ranking = rank_modules(result, 'proj')
+    assert result['samples'] > 0
+    assert ranking[0].name == 'proj/hot.py'
+    assert all(item.name.startswith('proj/') for item in ranking)
+
+
+def test_select_hot_modules(tmp_path):
+    compilable = get_compilable_modules(make_project(tmp_path))
+    assert sorted(compilable) == ['proj/broken.py', 'proj/cold.py', 'proj/core/a.py', 'proj/core/b.py',
+                                  'proj/hot.py']
+    ranking = [ModuleHotness('proj/hot.py', 80, 90), ModuleHotness('proj/broken.py', 50, 50),
+               ModuleHotness('proj/core/a.py', 10, 10), ModuleHotness('proj/__init__.py', 5, 5),
+               ModuleHotness('proj/cold.py', 0.5, 1), ModuleHotness('proj/core/b.py', 0, 20)]
+    selected, skipped = select_hot_modules(ranking, 100, compilable, coverage=1.0, min_share=0.01)
+    assert selected == ['proj/hot.py', 'proj/core/a.py']
+    assert skipped['proj/broken.py'].startswith('预检错误')
+    assert skipped['proj/__init__.py'] == '__init__.py不编译'
+    assert skipped['proj/cold.py'] == '耗时占比低于1.0%'
+    assert 'proj/core/b.py' not in skipped
+
+    selected, skipped = select_hot_modules(ranking, 100, compilable, coverage=0.5)
+    assert selected == ['proj/hot.py'] and skipped['proj/core/a.py'] == '已覆盖50%的耗时'
+    assert select_hot_modules(ranking, 100, compilable, top=1)[0] == ['proj/hot.py']
+
+
+def test_reserved_rules_and_project_config(sandbox):
+    inventory = make_project(sandbox)
+    rules = make_reserved_rules(['proj/hot.py', 'proj/core/a.py', 'proj/core/b.py'], inventory)
+    assert rules == dict(type='reserved', reserved_files=['/proj/hot.py'], reserved_packages=['/proj/core'])
+    assert make_reserved_rules(['proj/core/a.py'], inventory)['reserved_files'] == ['/proj/core/a.py']
+
+    with open(os.path.join(str(sandbox), 'projects_config', 'base.json'), 'w') as f:
+        json.dump(dict(ignored_rules=dict(ignored_files=['x']), build_profile='release'), f)
+    config_path = write_project_config(rules, 'proj_advised.json', 'base.json')
+    with open(config_path) as f:
+        assert json.load(f) == dict(build_profile='release', reserved_rules=rules)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_archive.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 归档文件的可复现性
+"""
+import io
+import os.path
+import tarfile
+import zipfile
+
+import pytest
+
+import base
+from archive import ARCHIVE_FORMATS, ARCHIVE_TAR_ZST, ARCHIVE_WHEEL, DEFAULT_ARCHIVE_MTIME, ArchiveWriter, zstandard
+from base import PythonCodeCompilingBase
+
+FILES = {
+    'demo/__init__.py': b'',
+    'demo/pkg/mod.py': b'x = 1\n' * 100,
+    'demo/pkg/{}.py'.format('n' * 120): b'long name',
+    'demo/bin/run.sh': b'#!/bin/sh\n',
+}
+
+
+def make_source_files(tmp_path) -> dict:
+    source_files = dict()
+    for name, data in FILES.items():
+        path = tmp_path / 'src' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        source_files[name] = str(path)
+    os.chmod(source_files['demo/bin/run.sh'], 0o700)
+    return source_files
+
+
+def write_archive(path: str, archive_format: str, source_files: dict, names: list, jobs: int) -> bytes:
+    writer = ArchiveWriter(path, archive_format, jobs=jobs, project_name='demo')
+    for name in names:
+        writer.add_dir(os.path.dirname(name))
+        writer.add_file(name, source_files[name])
+    writer.add_bytes('demo/generated.py', 'print("生成的文件")\n')
+    writer.add_dir('demo/empty')
+    writer.close()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def read_members(path: str, archive_format: str) -> dict:
+    """归档文件中的文件 -> (内容, 权限位, 修改时间)"""
+    if archive_format == ARCHIVE_TAR_ZST:
+        with open(path, 'rb') as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).read()
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            return {member.name + ('/' if member.isdir() else ''): (
+                tar.extractfile(member).read() if member.isfile() else b'', member.mode, member.mtime)
+                for member in tar.getmembers()}
+    with zipfile.ZipFile(path) as zf:
+        return {info.filename: (zf.read(info), info.external_attr >> 16 & 0o777, info.date_time)
+                for info in zf.infolist()}
+
+
+@pytest.mark.parametrize('archive_format', ARCHIVE_FORMATS)
+def test_archive_is_reproducible(tmp_path, archive_format):
+    """条目加入顺序及压缩线程数不同时, 生成完全相同的归档文件"""
+    if archive_format == ARCHIVE_TAR_ZST and zstandard is None:
+        pytest.skip("未安装zstandard")
+    source_files = make_source_files(tmp_path)
+    names = sorted(FILES)
+    data = write_archive(str(tmp_path / 'a'), archive_format, source_files, names, jobs=1)
+    assert write_archive(str(tmp_path / 'b'), archive_format, source_files, names[::-1], jobs=4) == data
+
+    members = read_members(str(tmp_path / 'a'), archive_format)
+    for name, content in FILES.items():
+        assert members[name][0] == content
+    assert members['demo/generated.py'][0] == 'print("生成的文件")\n'.encode('utf-8')
+    assert members['demo/bin/run.sh'][1] == 0o755
+    assert members['demo/pkg/mod.py'][1] == 0o644
+    if archive_format == ARCHIVE_WHEEL:
+        assert 'demo-0.0.0.dist-info/RECORD' in members
+    else:
+        assert 'demo/empty/' in members
+    if archive_format == ARCHIVE_TAR_ZST:
+        assert {mtime for _, _, mtime in members.values()} == {DEFAULT_ARCHIVE_MTIME}
+
+
+def test_archive_mtime_from_source_date_epoch(tmp_path, monkeypatch):
+    source_files = make_source_files(tmp_path)
+    data = write_archive(str(tmp_path / 'a'), 'zip', source_files, sorted(FILES), jobs=1)
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', str(DEFAULT_ARCHIVE_MTIME + 86400))
+    assert write_archive(str(tmp_path / 'b'), 'zip', source_files, sorted(FILES), jobs=1) != data
+    assert read_members(str(tmp_path / 'b'), 'zip')['demo/__init__.py'][2] == (1980, 1, 2, 0, 0, 0)
+
+
+def test_no_output_tree_keeps_output_dir_untouched(tmp_path, monkeypatch):
+    """只生成归档文件时不删除及创建输出目录下的项目文件夹"""
+    monkeypatch.setattr(base, 'BUILD_DIR', str(tmp_path / 'build'))
+    output_dir = tmp_path / 'output' / 'demo'
+    PythonCodeCompilingBase._clean_build_dirs(str(output_dir), output_tree=False)
+    assert not output_dir.exists()
+
+    (output_dir / 'kept.txt').parent.mkdir(parents=True)
+    (output_dir / 'kept.txt').write_text('')
+    PythonCodeCompilingBase._clean_build_dirs(str(output_dir), output_tree=False)
+    assert (output_dir / 'kept.txt').exists()
+    PythonCodeCompilingBase._clean_build_dirs(str(output_dir))
+    assert output_dir.exists() and not (output_dir / 'kept.txt').exists()
+
+
+@pytest.mark.parametrize('archive_format', ARCHIVE_FORMATS)
+def test_members_are_spooled_before_close(tmp_path, archive_format):
+    """压缩内容写入暂存文件, 内存中只保留位置及大小, 不在关闭前累积全部压缩结果"""
+    if archive_format == ARCHIVE_TAR_ZST and zstandard is None:
+        pytest.skip("未安装zstandard")
+    data = os.urandom(256 * 1024)  # 不可压缩
+    writer = ArchiveWriter(str(tmp_path / 'a'), archive_format, jobs=2, project_name='demo')
+    for index in range(8):
+        writer.add_bytes('demo/blob{}.bin'.format(index), data)
+    members = [future.result() for future in writer.members.values()]
+    assert writer.spool.size >= len(data) * 8
+    assert all(not isinstance(value, bytes) or len(value) < 64 for member in members for value in member)
+    assert os.listdir(str(tmp_path)) == []  # 暂存文件创建后即删除
+    writer.close()
+    assert read_members(str(tmp_path / 'a'), archive_format)['demo/blob7.bin'][0] == data
+    assert os.listdir(str(tmp_path)) == ['a']
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_batch.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 批量编译: 清单校验及多个项目共享编译缓存
+"""
+import glob
+import json
+import os.path
+
+import pytest
+
+from batch import STATUS_OK, BatchBuild, load_manifest
+from build_cache import BuildCache
+from conftest import write_project
+
+MODULE_SOURCE = '''
+def add(a, b):
+    return a + b
+'''
+
+
+def write_manifest(root, projects: list, defaults: dict = None) -> str:
+    manifest_path = os.path.join(str(root), 'batch.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(dict(defaults=defaults or dict(), projects=projects), f)
+    return manifest_path
+
+
+def test_manifest_validation(tmp_path):
+    with pytest.raises(ValueError, match='未知参数'):
+        load_manifest(write_manifest(tmp_path, [dict(dir_path='a', project_config='a.json', unknown=1)]))
+    with pytest.raises(ValueError, match='命令行'):
+        load_manifest(write_manifest(tmp_path, [dict(dir_path='a', project_config='a.json', jobs=2)]))
+    with pytest.raises(ValueError, match='缺少参数'):
+        load_manifest(write_manifest(tmp_path, [dict(dir_path='a')]))
+    with pytest.raises(ValueError, match='项目名称相同'):
+        load_manifest(write_manifest(tmp_path, [dict(dir_path='x/a', project_config='a.json'),
+                                                dict(dir_path='y/a', project_config='b.json')]))
+    projects = load_manifest(write_manifest(tmp_path, [dict(dir_path='a', project_config='a.json')],
+                                            defaults=dict(keep_going=True)))
+    assert projects == [dict(dir_path='a', project_config='a.json', keep_going=True)]
+
+
+def test_batch_keeps_build_cache_entries_of_all_projects(sandbox):
+    """各项目的编译器分别写回编译缓存清单, 不覆盖其他项目的条目"""
+    projects = list()
+    for name in ('proj_a', 'proj_b'):
+        project_config = write_project(sandbox, {'__init__.py': '', 'mod.py': MODULE_SOURCE}, name=name)
+        projects.append(dict(dir_path=name, project_config=project_config))
+    manifest_path = write_manifest(sandbox, projects, defaults=dict(object_cache=False))
+
+    builder = BatchBuild(manifest_path, jobs=1, translate_jobs=1)
+    assert builder.run()
+    assert [project.status for project in builder.projects] == [STATUS_OK, STATUS_OK]
+    for project in builder.projects:
+        assert glob.glob(os.path.join(project.compiler.out_dir, 'mod.*.so')), project.name
+
+    names = {entry['name'] for entry in BuildCache().manifest['entries'].values()}
+    assert {'proj_a/mod.py', 'proj_b/mod.py'} <= names
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_benchmark.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 基准测试的合成项目及编译规则
+"""
+import glob
+import os.path
+
+from base import PythonCodeCompilingBase
+from benchmark import BENCHMARK_MODES, MODE_BUILD_CACHE, MODE_SERIAL, generate_project, generate_project_config, \
+    make_compiler_kwargs
+
+
+def read_tree(project_dir: str) -> dict:
+    results = dict()
+    for path in sorted(glob.glob(os.path.join(project_dir, '**', '*'), recursive=True)):
+        if os.path.isfile(path):
+            with open(path) as f:
+                results[os.path.relpath(path, project_dir)] = f.read()
+    return results
+
+
+def test_generated_project_is_reproducible(tmp_path):
+    names = generate_project(str(tmp_path / 'a'), packages=2, modules=3, depth=1, module_lines=40, seed=7)
+    assert names == ['pkg_0/mod_0.py', 'pkg_0/sub_1/mod_1.py', 'pkg_0/mod_2.py',
+                     'pkg_1/mod_0.py', 'pkg_1/sub_1/mod_1.py', 'pkg_1/mod_2.py']
+    tree = read_tree(str(tmp_path / 'a'))
+    assert 'pkg_1/data.json' in tree and 'pkg_1/sub_1/__init__.py' in tree
+    for name in names:
+        compile(tree[name], name, 'exec')
+        assert tree[name].count('\n') >= 40
+    generate_project(str(tmp_path / 'b'), packages=2, modules=3, depth=1, module_lines=40, seed=7)
+    assert read_tree(str(tmp_path / 'b')) == tree
+    generate_project(str(tmp_path / 'b'), packages=2, modules=3, depth=1, module_lines=40, seed=8)
+    assert read_tree(str(tmp_path / 'b')) != tree
+
+
+def test_generated_rules_do_not_match(sandbox):
+    """规则只衡量规则数对遍历的影响, 不改变编译的模块"""
+    names = generate_project(str(sandbox / 'input' / 'bench'), packages=1, modules=2, depth=1, module_lines=20)
+    project_config = generate_project_config('bench', rules=50, config_dir=str(sandbox / 'projects_config'))
+    compiler = PythonCodeCompilingBase(project_config, 'bench', dry_run=True)
+    compiler.run()
+    assert len(compiler.file_rule_parser.rules['IGNORED']['ignored_files']) == 25
+    assert sorted(action.name for action in compiler.plan.get_actions('compile')) == \
+        sorted('bench/' + name for name in names)
+
+
+def test_compiler_kwargs_per_mode(tmp_path):
+    for mode in BENCHMARK_MODES:
+        kwargs = make_compiler_kwargs(mode, jobs=4, work_dir=str(tmp_path))
+        assert kwargs['no_cache'] and kwargs['object_cache_dir'] == str(tmp_path / 'objects')
+    assert make_compiler_kwargs(MODE_SERIAL, 4, str(tmp_path))['jobs'] == 1
+    assert make_compiler_kwargs(MODE_BUILD_CACHE, 4, str(tmp_path))['build_cache']
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_build_cache.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译缓存: 缓存键及源文件哈希的复用
+"""
+import glob
+import os.path
+
+from build_cache import BuildCache, ObjectCache
+from conftest import build_project, run_output
+from sync import sync_tree
+
+NAME = 'proj/x.py'
+
+
+def write(path: str, content: str, mtime_ns: int = None) -> None:
+    with open(path, 'w') as f:
+        f.write(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def make_key(cache: BuildCache, input_dir: str, changed_files: set = None) -> str:
+    """与lookup_pending_files相同: 同步时未拷贝的文件视为未变更"""
+    unchanged = changed_files is not None and NAME not in changed_files
+    return cache.make_key(NAME, os.path.join(input_dir, 'x.py'), dict(), unchanged=unchanged)
+
+
+def test_key_depends_on_content_name_and_directives(tmp_path):
+    cache = BuildCache(cache_dir=str(tmp_path / 'cache'))
+    py_file = str(tmp_path / 'x.py')
+    write(py_file, 'def f():\n    return 1\n')
+    key = cache.make_key(NAME, py_file, dict())
+    assert key == cache.make_key(NAME, py_file, dict())
+    assert key != cache.make_key('proj/y.py', py_file, dict())
+    assert key != cache.make_key(NAME, py_file, dict(boundscheck=False))
+    assert key != cache.make_key(NAME, py_file, dict(), build_flags=dict(name='release'))
+    assert key != cache.make_key(NAME, py_file, dict(), depends={'proj/x.pxd': 'abc'})
+    write(py_file, 'def f():\n    return 2\n')
+    assert key != cache.make_key(NAME, py_file, dict())
+
+
+def test_unchanged_reuses_recorded_hash(tmp_path, monkeypatch):
+    cache = BuildCache(cache_dir=str(tmp_path / 'cache'))
+    py_file = str(tmp_path / 'x.py')
+    write(py_file, 'def f():\n    return 1\n')
+    key = cache.make_key(NAME, py_file, dict())
+
+    def fail(path):
+        raise AssertionError("未变更的文件不应重新计算哈希: {}".format(path))
+
+    monkeypatch.setattr('build_cache.hash_file', fail)
+    assert cache.make_key(NAME, py_file, dict(), unchanged=True) == key
+
+
+def test_legacy_manifest_hash_is_recomputed(tmp_path):
+    """旧版本清单中只记录了哈希, 不能直接复用"""
+    cache = BuildCache(cache_dir=str(tmp_path / 'cache'))
+    py_file = str(tmp_path / 'x.py')
+    write(py_file, 'def f():\n    return 1\n')
+    key = cache.make_key(NAME, py_file, dict())
+    cache.manifest['sources'][NAME] = '0' * 64
+    assert cache.make_key(NAME, py_file, dict(), unchanged=True) == key
+
+
+def test_failed_build_after_sync_does_not_reuse_stale_hash(tmp_path):
+    """同步后编译失败(缓存清单未写回), 修复后重新编译时, 同步未拷贝的变更文件按新内容生成缓存键"""
+    source_dir = tmp_path / 'source' / 'proj'
+    source_dir.mkdir(parents=True)
+    input_dir = str(tmp_path / 'input' / 'proj')
+    cache_dir = str(tmp_path / 'cache')
+    write(str(source_dir / 'x.py'), 'def f():\n    return "v1"\n', mtime_ns=1_000_000_000_000_000_000)
+
+    # 1.首次编译成功, 写回缓存清单
+    sync_tree(str(source_dir), input_dir)
+    cache = BuildCache(cache_dir=cache_dir)
+    key_v1 = make_key(cache, input_dir)
+    cache.save()
+
+    # 2.修改x.py(大小不变)后同步, 编译失败, 缓存清单未写回
+    write(str(source_dir / 'x.py'), 'def f():\n    return "v2"\n', mtime_ns=1_000_000_001_000_000_000)
+    result = sync_tree(str(source_dir), input_dir)
+    assert NAME in result.changed_files
+    make_key(BuildCache(cache_dir=cache_dir), input_dir, result.changed_files)
+
+    # 3.修复后重新编译: input目录中的x.py已是新内容, 本次同步未拷贝
+    result = sync_tree(str(source_dir), input_dir)
+    assert NAME not in result.changed_files
+    key = make_key(BuildCache(cache_dir=cache_dir), input_dir, result.changed_files)
+    assert key != key_v1
+    assert key == make_key(BuildCache(cache_dir=str(tmp_path / 'fresh')), input_dir)
+
+
+def test_lookup_does_not_rewrite_hardlinked_target(tmp_path):
+    """命中缓存时替换build文件夹中的.so文件, 不改写与之共享inode的输出文件(--link-mode hardlink)"""
+    build_lib_path = tmp_path / 'lib'
+    build_lib_path.mkdir()
+    so_file = str(build_lib_path / 'x.so')
+    output_file = str(tmp_path / 'output.so')
+
+    cache = BuildCache(cache_dir=str(tmp_path / 'cache'))
+    write(so_file, 'cached')
+    cache.store('key', NAME, str(build_lib_path), 'x.so')
+    write(so_file, 'loaded')
+    os.link(so_file, output_file)
+    assert cache.lookup('key', str(build_lib_path)) == 'x.so'
+    assert read(so_file) == 'cached'
+    assert read(output_file) == 'loaded'
+
+    object_cache = ObjectCache(cache_dir=str(tmp_path / 'objects'))
+    object_cache.store('key', so_file)
+    os.remove(so_file)
+    write(so_file, 'loaded')
+    os.remove(output_file)
+    os.link(so_file, output_file)
+    assert object_cache.lookup('key', so_file)
+    assert read(so_file) == 'cached'
+    assert read(output_file) == 'loaded'
+
+
+def test_save_merges_entries_of_other_compilers(tmp_path):
+    """多个编译器共享缓存文件夹(批量编译), 各自写回清单时保留其他编译器的条目"""
+    build_lib_path = tmp_path / 'lib'
+    build_lib_path.mkdir()
+    cache_dir = str(tmp_path / 'cache')
+    first, second = BuildCache(cache_dir=cache_dir), BuildCache(cache_dir=cache_dir)
+    for cache, key in ((first, 'key_a'), (second, 'key_b')):
+        write(str(build_lib_path / 'x.so'), key)
+        cache.store(key, NAME, str(build_lib_path), 'x.so')
+    first.save()
+    second.save()
+    assert set(BuildCache(cache_dir=cache_dir).manifest['entries']) == {'key_a', 'key_b'}
+
+    # 缓存文件不存在时删除的条目, 写回清单时不再合并
+    os.remove(first._object_path('key_a'))
+    third = BuildCache(cache_dir=cache_dir)
+    assert third.lookup('key_a', str(build_lib_path)) is None
+    third.save()
+    assert set(BuildCache(cache_dir=cache_dir).manifest['entries']) == {'key_b'}
+
+
+def test_rebuild_reuses_cached_modules(sandbox):
+    """再次编译时未变更的模块命中编译缓存, 只重新编译变更的模块"""
+    files = {'__init__.py': '', 'a.py': 'A = 1\n', 'b.py': 'B = 2\n'}
+    compiler = build_project(sandbox, files, build_cache=True)
+    assert (compiler.build_cache.hits, compiler.build_cache.misses) == (0, 2)
+
+    compiler = build_project(sandbox, files, build_cache=True)
+    assert (compiler.build_cache.hits, compiler.build_cache.misses) == (2, 0)
+    assert len(glob.glob(os.path.join(compiler.out_dir, '*.so'))) == 2
+
+    compiler = build_project(sandbox, dict(files, **{'b.py': 'B = 3\n'}), build_cache=True)
+    assert (compiler.build_cache.hits, compiler.build_cache.misses) == (1, 1)
+    assert run_output(sandbox, 'from proj import a, b\nprint(a.A, b.B)') == '1 3'
+
+
+def test_object_cache_skips_c_compiling(sandbox):
+    """不使用编译缓存时, 再次编译的.c文件预处理结果相同, 命中C编译缓存"""
+    files = {'__init__.py': '', 'a.py': 'A = 1\n', 'b.py': 'B = 2\n'}
+    compiler = build_project(sandbox, files, object_cache=True)
+    assert (compiler.object_cache.hits, compiler.object_cache.misses) == (0, 2)
+    compiler = build_project(sandbox, files, object_cache=True, jobs=2, translate_jobs=2)
+    assert (compiler.object_cache.hits, compiler.object_cache.misses) == (2, 0)
+    assert run_output(sandbox, 'from proj import a, b\nprint(a.A, b.B)') == '1 2'
+
+
+def test_object_cache_evicts_least_recently_used(tmp_path):
+    cache = ObjectCache(cache_dir=str(tmp_path / 'objects'), max_size=10)
+    so_file = str(tmp_path / 'x.so')
+    for index, key in enumerate(('aa01', 'bb02')):
+        write(so_file, '0123456789')
+        cache.store(key, so_file)
+        os.utime(cache._object_path(key), (index, index))
+    cache.evict()
+    assert not cache.lookup('aa01', so_file)
+    assert cache.lookup('bb02', so_file)
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_bundle.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : python包合并编译为一个扩展模块
+"""
+import glob
+import os.path
+
+from bundle import BUNDLE_IMPORTER_NAME, BUNDLE_INSTALL_STATEMENT, BUNDLE_MODULE_NAME, get_bundle_modules, \
+    inject_bundle_installer, split_bundle_members
+from conftest import build_project, run_output
+
+
+def test_split_members_with_duplicate_module_names():
+    members, others = split_bundle_members(['p/pkg/sub/a.py', 'p/pkg/a.py', 'p/pkg/b.py', 'p/pkg/_bundle.py'])
+    assert members == ['p/pkg/a.py', 'p/pkg/b.py']
+    assert others == ['p/pkg/_bundle.py', 'p/pkg/sub/a.py']
+    assert get_bundle_modules('p/pkg', ['p/pkg/a.py', 'p/pkg/sub/c.py']) == ['a', 'sub.c']
+
+
+def test_installer_after_docstring_and_future_imports():
+    source = '#!/usr/bin/env python\n"""文档"""\nfrom __future__ import annotations\nimport os'
+    assert inject_bundle_installer(source) == '#!/usr/bin/env python\n"""文档"""\n' \
+                                              'from __future__ import annotations\n' + \
+        BUNDLE_INSTALL_STATEMENT + 'import os\n'
+    assert inject_bundle_installer('') == BUNDLE_INSTALL_STATEMENT
+
+
+def test_amalgamated_package_imports_from_bundle(sandbox):
+    compiler = build_project(sandbox, {
+        '__init__.py': '',
+        'main.py': 'from proj.pkg.sub import b\n\ndef run():\n    return b.g()\n',
+        'pkg/__init__.py': '"""合并编译的python包"""\nNAME = "pkg"\n',
+        'pkg/a.py': 'def f():\n    return 1\n',
+        'pkg/sub/__init__.py': '',
+        'pkg/sub/a.py': 'def f():\n    return 10\n',
+        'pkg/sub/b.py': 'from proj.pkg import a\nfrom proj.pkg.sub import a as sub_a\n\n'
+                        'def g():\n    return a.f() + sub_a.f()\n',
+    }, dict(amalgamated_packages=['/proj/pkg']))
+    pkg_dir = os.path.join(compiler.out_dir, 'pkg')
+    assert glob.glob(os.path.join(pkg_dir, BUNDLE_MODULE_NAME + '.*.so'))
+    assert os.path.exists(os.path.join(pkg_dir, BUNDLE_IMPORTER_NAME + '.py'))
+    assert not glob.glob(os.path.join(pkg_dir, 'a.*'))
+    # 模块名称与合并编译的模块重复, 单独编译
+    assert glob.glob(os.path.join(pkg_dir, 'sub', 'a.*.so'))
+    assert not glob.glob(os.path.join(pkg_dir, 'sub', 'b.*'))
+    output = run_output(sandbox, 'from proj import main, pkg\nfrom proj.pkg.sub import b\n'
+                                 'print(main.run(), pkg.NAME, b.__file__.split("/")[-1].split(".")[0])')
+    assert output == '11 pkg {}'.format(BUNDLE_MODULE_NAME)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_copy_dir.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 直接拷贝的文件夹(非python包)与源项目一致
+"""
+import json
+import os.path
+
+import base
+from base import PythonCodeCompilingBase
+from scanner import ProjectInventory
+
+PROJECT = 'proj'
+
+
+def write(path, content: str = '') -> None:
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+def make_compiler(tmp_path, monkeypatch) -> PythonCodeCompilingBase:
+    input_dir, output_dir = tmp_path / 'input', tmp_path / 'output'
+    for name, path in (('INPUT_DIR', input_dir), ('OUTPUT_DIR', output_dir), ('BUILD_DIR', tmp_path / 'build'),
+                       ('PROJECT_CONFIG_DIR', tmp_path)):
+        monkeypatch.setattr(base, name, str(path))
+    (tmp_path / 'project.json').write_text(json.dumps(dict()))
+    write(input_dir / PROJECT / '__init__.py')
+    compiler = PythonCodeCompilingBase('project.json', PROJECT, dry_run=True, build_cache=False,
+                                       object_cache=False, preflight='off')
+    compiler.inventory = ProjectInventory(compiler.input_dir, abandoned_files=compiler.DEFAULT_IGNORED_FILES,
+                                          base_dir=str(input_dir))
+    return compiler
+
+
+def test_copy_dir_keeps_default_ignored_files(tmp_path, monkeypatch):
+    """默认忽略的文件/文件夹只在遍历的python包中忽略, 拷贝的文件夹中只忽略__pycache__"""
+    static_dir = tmp_path / 'input' / PROJECT / 'app'
+    write(static_dir / 'index.html')
+    write(static_dir / 'migrations' / '0001_initial.py')
+    write(static_dir / 'sub' / '.DS_Store')
+    write(static_dir / '__pycache__' / 'x.cpython-311.pyc')
+    compiler = make_compiler(tmp_path, monkeypatch)
+
+    compiler.copy_source_dir('{}/app'.format(PROJECT))
+    target_dir = tmp_path / 'output' / PROJECT / 'app'
+    assert os.path.exists(str(target_dir / 'index.html'))
+    assert os.path.exists(str(target_dir / 'migrations' / '0001_initial.py'))
+    assert os.path.exists(str(target_dir / 'sub' / '.DS_Store'))
+    assert not os.path.exists(str(target_dir / '__pycache__'))
+
+
+def test_copy_dir_uses_inventory(tmp_path, monkeypatch):
+    """清单中未忽略任何文件时按清单拷贝, 不再遍历源文件夹"""
+    static_dir = tmp_path / 'input' / PROJECT / 'app'
+    write(static_dir / 'index.html')
+    write(static_dir / '__pycache__' / 'x.cpython-311.pyc')
+    compiler = make_compiler(tmp_path, monkeypatch)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("不应重新遍历源文件夹")
+
+    monkeypatch.setattr(base, 'ProjectInventory', fail)
+    compiler.copy_source_dir('{}/app'.format(PROJECT))
+    assert os.path.exists(str(tmp_path / 'output' / PROJECT / 'app' / 'index.html'))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_depgraph.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 模块依赖关系图及按编译依赖判断需要重新编译的模块
+"""
+from conftest import build_project, run_output
+from depgraph import DEP_CIMPORT, DEP_IMPORT, DEP_INCLUDE, DependencyGraph, parse_cython_source, \
+    parse_python_source
+from scanner import ProjectInventory
+
+FILES = {
+    'proj/__init__.py': '',
+    'proj/mod.py': 'def twice(x):\n    return x * 2\n',
+    'proj/mod.pxd': 'from proj.types cimport number\ninclude "consts.pxi"\ncpdef number twice(number x)\n',
+    'proj/types.pxd': 'ctypedef long number\n',
+    'proj/consts.pxi': 'DEF LIMIT = 10\n',
+    'proj/other.py': 'from . import mod\nimport os\n',
+}
+
+
+def write_files(root, files: dict) -> None:
+    for path, content in files.items():
+        file_path = root / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+
+def test_parse_sources():
+    references = parse_python_source('import os\nfrom . import mod\nfrom ..pkg.x import y as z\n'
+                                     'from cython.cimports.proj.types import number\n', 'proj/sub/a.py')
+    assert references[DEP_IMPORT] == [['os'], ['proj.sub.mod', 'proj.sub'], ['proj.pkg.x.y', 'proj.pkg.x']]
+    assert references[DEP_CIMPORT] == [['proj.types.number', 'proj.types']]
+    assert parse_python_source('def f(:', 'proj/a.py')[DEP_IMPORT] == []
+
+    references = parse_cython_source('cimport numpy as np, proj.types\nfrom .c cimport (a, b)\n'
+                                     'include "x.pxi"\n', 'proj/sub/a.pyx')
+    assert references[DEP_CIMPORT] == [['numpy'], ['proj.types'], ['proj.sub.c.a', 'proj.sub.c.b', 'proj.sub.c']]
+    assert references[DEP_INCLUDE] == [['x.pxi']]
+
+
+def test_compile_dependencies_and_affected_modules(tmp_path):
+    write_files(tmp_path, FILES)
+    graph = DependencyGraph('proj', cache_dir=str(tmp_path / 'cache'))
+    inventory = ProjectInventory(str(tmp_path / 'proj'), base_dir=str(tmp_path))
+    assert graph.update(inventory) == 6
+    assert graph.get_compile_dependencies('proj/mod.py') == ['proj/consts.pxi', 'proj/mod.pxd', 'proj/types.pxd']
+    assert graph.get_compile_dependencies('proj/other.py') == []
+    assert graph.get_imports('proj/other.py') == ['proj/mod.py']
+    # python导入不是编译依赖
+    assert graph.affected({'proj/types.pxd'}) == {'proj/mod.pxd', 'proj/mod.py'}
+    assert graph.affected({'proj/mod.py'}) == set()
+
+    graph.save()
+    graph = DependencyGraph('proj', cache_dir=str(tmp_path / 'cache'))
+    assert graph.update(inventory) == 0
+
+    # 删除的文件按更新前的反向依赖查找
+    (tmp_path / 'proj' / 'types.pxd').unlink()
+    assert graph.update(ProjectInventory(str(tmp_path / 'proj'), base_dir=str(tmp_path))) == 0
+    assert graph.affected({'proj/types.pxd'}) == {'proj/mod.pxd', 'proj/mod.py'}
+
+
+def test_pxd_change_invalidates_build_cache(sandbox):
+    files = {path.split('/', 1)[1]: content for path, content in FILES.items()}
+    compiler = build_project(sandbox, files, build_cache=True)
+    assert compiler.build_cache.misses == 2
+    compiler = build_project(sandbox, files, build_cache=True)
+    assert (compiler.build_cache.hits, compiler.build_cache.misses) == (2, 0)
+
+    compiler = build_project(sandbox, dict(files, **{'types.pxd': 'ctypedef double number\n'}), build_cache=True)
+    assert (compiler.build_cache.hits, compiler.build_cache.misses) == (1, 1)
+    assert run_output(sandbox, 'from proj import mod\nprint(mod.twice(1.25))') == '2.5'
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_directives.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 按文件夹/文件配置的Cython编译指令
+"""
+import json
+
+import pytest
+
+import base
+from base import FileCompilingFilterRulesParser
+from conftest import build_project, run_output
+
+CONFIG = dict(compiler_directives={
+    'global': dict(language_level=3),
+    'packages': {'/proj': dict(boundscheck=False, wraparound=False), 'fast': dict(cdivision=True),
+                 '/proj/fast/sub': dict(wraparound=True)},
+    'files': {'/proj/fast/sub/mod.py': dict(boundscheck=True), 'mod.py': dict(embedsignature=True)},
+})
+
+SOURCE = 'def f(x, y=1):\n    """求和"""\n    return x + y\n'
+
+
+def make_parser(tmp_path, monkeypatch, config: dict) -> FileCompilingFilterRulesParser:
+    monkeypatch.setattr(base, 'PROJECT_CONFIG_DIR', str(tmp_path))
+    (tmp_path / 'project.json').write_text(json.dumps(config))
+    return FileCompilingFilterRulesParser('proj', 'project.json')
+
+
+def test_directives_merge_from_broad_to_specific(tmp_path, monkeypatch):
+    parser = make_parser(tmp_path, monkeypatch, CONFIG)
+    assert parser.get_compiler_directives('proj/a.py') == dict(language_level=3, boundscheck=False, wraparound=False)
+    assert parser.get_compiler_directives('proj/fast/sub/mod.py') == dict(
+        language_level=3, boundscheck=True, wraparound=True, cdivision=True, embedsignature=True)
+    assert parser.get_compiler_directives('proj/fast/sub/other_mod.py') == dict(
+        language_level=3, boundscheck=False, wraparound=True, cdivision=True)
+    # 按路径分段匹配, 不是子串匹配
+    assert parser.get_compiler_directives('proj/faster/mod.py') == dict(
+        language_level=3, boundscheck=False, wraparound=False, embedsignature=True)
+
+
+def test_unknown_directive_is_rejected(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match='no_such_directive'):
+        make_parser(tmp_path, monkeypatch, dict(compiler_directives=dict(files={'a.py': dict(no_such_directive=1)})))
+
+
+def test_changed_directives_regenerate_c_file(sandbox, capsys):
+    """只修改编译指令时, 已生成的.c文件过期, 重新cythonize"""
+    files = {'__init__.py': '', 'mod.py': SOURCE}
+    build_project(sandbox, files)
+    assert run_output(sandbox, 'from proj import mod\nprint(mod.f.__doc__)') == '求和'
+
+    compiler = build_project(sandbox, files, dict(compiler_directives=dict(files={'mod.py': dict(
+        embedsignature=True)})), dry_run=True)
+    assert 'Cython编译指令: embedsignature=True' in compiler.plan.actions[-1].reason
+    build_project(sandbox, files, dict(compiler_directives=dict(files={'mod.py': dict(embedsignature=True)})))
+    assert run_output(sandbox, 'from proj import mod\nprint(mod.f.__doc__.splitlines()[0])') == 'f(x, y=1)'
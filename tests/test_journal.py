@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_journal.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译日志: keep-going记录失败的模块, 续编时只重新编译失败及变更的模块
+"""
+import glob
+import json
+import os.path
+
+from base import PythonCodeCompilingBase
+from conftest import build_project, run_output
+from journal import EVENT_DONE, EVENT_FAILED, EVENT_FINISH, EVENT_RESUME, EVENT_START, BuildJournal
+
+FILES = {
+    '__init__.py': '',
+    'a.py': 'def f():\n    return 1\n',
+    'pkg/__init__.py': '',
+    'pkg/b.py': 'def g():\n    return 2\n',
+    'broken.py': 'def h(:\n    return 3\n',
+}
+
+
+def read_events(root) -> list:
+    with open(os.path.join(str(root), 'cache', 'journal', 'proj.jsonl'), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_load_skips_truncated_and_mismatched_records(tmp_path):
+    journal = BuildJournal('p', 'v1', journal_dir=str(tmp_path))
+    journal.record_done('p/a.py', 'sig-a', 'p/a.so')
+    journal.record_failed('p/b.py', 'sig-b', 'error')
+    journal.close()
+    with open(str(tmp_path / 'p.jsonl'), 'a') as f:
+        f.write('{"event": "done", "na')  # 中断时未写完的记录
+
+    (tmp_path / 'p').mkdir()
+    (tmp_path / 'p' / 'a.so').write_text('')
+    journal = BuildJournal('p', 'v1', resume=True, journal_dir=str(tmp_path))
+    assert list(journal.done) == ['p/a.py'] and list(journal.failed) == ['p/b.py']
+    assert journal.lookup('p/a.py', 'sig-a', str(tmp_path)) == 'p/a.so'
+    assert journal.lookup('p/a.py', 'changed', str(tmp_path)) is None
+    assert journal.resumed == 1
+    journal.close()
+
+    # 编译配置指纹不一致时不续编, 清空上次的记录
+    journal = BuildJournal('p', 'v2', resume=True, journal_dir=str(tmp_path))
+    assert not journal.done
+    journal.close()
+    with open(str(tmp_path / 'p.jsonl')) as f:
+        assert [json.loads(line)['event'] for line in f] == [EVENT_START]
+
+
+def test_keep_going_then_resume(sandbox, capsys):
+    compiler = build_project(sandbox, FILES, keep_going=True)
+    assert list(compiler.failures) == ['proj/broken.py']
+    assert not glob.glob(os.path.join(compiler.out_dir, 'broken*'))
+    assert run_output(sandbox, 'from proj import a; from proj.pkg import b; print(a.f() + b.g())') == '3'
+    events = read_events(sandbox)
+    assert {event['name'] for event in events if event['event'] == EVENT_DONE} == {'proj/a.py', 'proj/pkg/b.py'}
+    assert [event['name'] for event in events if event['event'] == EVENT_FAILED] == ['proj/broken.py']
+    assert events[-1] == dict(events[-1], event=EVENT_FINISH, failed=1)
+
+    with open(os.path.join(str(sandbox), 'input', 'proj', 'broken.py'), 'w') as f:
+        f.write('def h():\n    return 3\n')
+    capsys.readouterr()
+    compiler = PythonCodeCompilingBase('proj.json', 'proj', jobs=1, translate_jobs=1, build_cache=False,
+                                       object_cache=False, keep_going=True, resume=True)
+    compiler.run()
+    assert not compiler.failures
+    output = capsys.readouterr().out
+    assert '续编: 上次已完成2个模块, 失败1个' in output
+    assert '续编: 跳过2个已完成的模块' in output
+    events = read_events(sandbox)
+    resumed = events[[event['event'] for event in events].index(EVENT_RESUME) + 1:]
+    assert [event['name'] for event in resumed if event['event'] == EVENT_DONE] == ['proj/broken.py']
+    assert run_output(sandbox, 'from proj import a, broken; from proj.pkg import b; '
+                               'print(a.f() + b.g() + broken.h())') == '6'
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_materialize.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 输出文件的生成方式: 硬链接/reflink/copy_file_range, 不支持时回退为拷贝
+"""
+import os.path
+
+import pytest
+
+from conftest import build_project
+from materialize import MATERIALIZE_COPY, MATERIALIZE_COPY_FILE_RANGE, MATERIALIZE_HARDLINK, MATERIALIZE_REFLINK, \
+    Materializer
+
+
+def make_file(path, content: str) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.mark.parametrize('strategy', [MATERIALIZE_COPY, MATERIALIZE_HARDLINK, MATERIALIZE_COPY_FILE_RANGE])
+def test_materialize_replaces_target(tmp_path, strategy):
+    """覆盖已存在的目标文件时替换文件, 不写入与目标文件共享inode的其他文件"""
+    first = make_file(tmp_path / 'src' / 'first.txt', 'first')
+    second = make_file(tmp_path / 'src' / 'second.txt', 'second')
+    target = str(tmp_path / 'out.txt')
+    materializer = Materializer(strategy)
+    assert materializer.materialize(first, target) == strategy
+    assert os.path.samefile(first, target) == (strategy == MATERIALIZE_HARDLINK)
+    materializer.materialize(second, target)
+    with open(target) as f:
+        assert f.read() == 'second'
+    with open(first) as f:
+        assert f.read() == 'first'
+    assert materializer.stats[strategy] == 2
+
+
+def test_unsupported_strategy_falls_back_to_copy(tmp_path, monkeypatch):
+    """不支持时回退为拷贝, 同一对设备之后直接拷贝"""
+    source = make_file(tmp_path / 'src.txt', 'data')
+    materializer = Materializer(MATERIALIZE_REFLINK)
+    calls = list()
+
+    def unsupported(strategy, source_file, target_file):
+        calls.append(target_file)
+        raise OSError(95, 'Operation not supported')
+
+    monkeypatch.setattr(materializer, '_materialize', unsupported)
+    assert materializer.materialize(source, str(tmp_path / 'a.txt')) == MATERIALIZE_COPY
+    assert materializer.materialize(source, str(tmp_path / 'b.txt')) == MATERIALIZE_COPY
+    assert len(calls) == 1
+    assert (tmp_path / 'b.txt').read_text() == 'data'
+    with pytest.raises(ValueError):
+        Materializer('symlink')
+
+
+def test_build_with_hardlinks(sandbox, capsys):
+    compiler = build_project(sandbox, {'__init__.py': '', 'mod.py': 'X = 1\n', 'data/config.txt': 'key=value\n'},
+                             materialize=MATERIALIZE_HARDLINK)
+    assert os.path.samefile(os.path.join(compiler.out_dir, 'data', 'config.txt'),
+                            str(sandbox / 'input' / 'proj' / 'data' / 'config.txt'))
+    assert '输出文件生成方式: hardlink' in capsys.readouterr().out
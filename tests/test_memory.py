@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_memory.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : C编译的内存预算及峰值内存估算
+"""
+import glob
+import os.path
+
+import pytest
+
+from conftest import build_project, run_output
+from memory import DEFAULT_MEMORY_BASE, DEFAULT_MEMORY_PER_C_BYTE, MEMORY_ESTIMATE_MARGIN, MemoryBudget, \
+    format_memory_size, parse_memory_size
+from plan import BuildHistory
+
+
+def test_parse_and_format_memory_size():
+    assert parse_memory_size(None) is None and parse_memory_size('') is None
+    assert parse_memory_size('512') == 512 * 1024 ** 2
+    assert parse_memory_size('1.5GB') == int(1.5 * 1024 ** 3)
+    assert parse_memory_size('64k') == 64 * 1024
+    assert parse_memory_size('auto') > 0
+    with pytest.raises(ValueError):
+        parse_memory_size('4 apples')
+    assert format_memory_size(None) == '不限'
+    assert format_memory_size(3 * 1024 ** 3) == '3.0G'
+    assert format_memory_size(100) == '100B'
+
+
+def test_budget_holds_back_until_release():
+    """预算不足时暂缓, 没有正在执行的任务时超出预算的任务单独执行"""
+    budget = MemoryBudget(100, max_jobs=3)
+    assert budget.try_acquire(500)
+    assert not budget.try_acquire(1)
+    budget.release(500)
+    assert budget.try_acquire(60)
+    assert not budget.try_acquire(60)
+    assert budget.try_acquire(40)
+    assert (budget.in_use, budget.active, budget.peak_in_use) == (100, 2, 500)
+
+    unlimited = MemoryBudget(None, max_jobs=2)
+    assert unlimited.try_acquire(10 ** 12) and unlimited.try_acquire(10 ** 12)
+    assert not unlimited.try_acquire(1)
+
+
+def test_history_memory_model(tmp_path):
+    history = BuildHistory('proj', history_dir=str(tmp_path))
+    assert history.memory_model == (DEFAULT_MEMORY_BASE, DEFAULT_MEMORY_PER_C_BYTE)
+    history.record('proj/a.py', 1.0, 100, c_size=1000, peak_rss=3000)
+    history.record('proj/b.py', 1.0, 100, c_size=2000, peak_rss=5000)
+    assert history.memory_model == (1000.0, 2.0)
+    # 有该模块的历史记录时按.c文件大小等比调整, 不小于历史峰值
+    assert history.estimate_memory('proj/a.py', 500) == int(3000 * MEMORY_ESTIMATE_MARGIN)
+    assert history.estimate_memory('proj/a.py', 2000) == int(6000 * MEMORY_ESTIMATE_MARGIN)
+    assert history.estimate_memory('proj/c.py', 4000) == int(9000 * MEMORY_ESTIMATE_MARGIN)
+    history.save()
+    assert BuildHistory('proj', history_dir=str(tmp_path)).memory_model == (1000.0, 2.0)
+
+
+def test_build_within_tiny_budget(sandbox, capsys):
+    """预算小于单个模块时逐个编译, 全部模块编译完成并记录峰值内存"""
+    files = {'__init__.py': ''}
+    files.update({'m{}.py'.format(index): 'def f():\n    return {}\n'.format(index) for index in range(3)})
+    compiler = build_project(sandbox, files, jobs=2, mem_budget=1)
+    assert not compiler.failures
+    assert '暂缓提交' in capsys.readouterr().out
+    assert len(glob.glob(os.path.join(compiler.out_dir, 'm*.so'))) == 3
+    assert run_output(sandbox, 'from proj import m0, m1, m2; print(m0.f() + m1.f() + m2.f())') == '3'
+    history = BuildHistory('proj').history
+    assert all(history['proj/m{}.py'.format(index)]['peak_rss'] > 0 for index in range(3))
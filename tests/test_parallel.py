@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_parallel.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 并行编译: 输出与串行编译一致
+"""
+import os.path
+
+import pytest
+
+from conftest import build_project, run_output
+
+FILES = {
+    '__init__.py': '',
+    'a.py': 'def f():\n    return "a"\n',
+    'b.py': 'from proj.a import f\n\ndef g():\n    return f() + "b"\n',
+    'pkg/__init__.py': '',
+    'pkg/c.py': 'VALUE = sum(range(10))\n',
+    'data/config.json': '{}\n',
+}
+
+
+def list_output(out_dir: str) -> list:
+    """输出文件夹中的文件, 扩展模块只保留模块路径"""
+    names = list()
+    for root, _, files in os.walk(out_dir):
+        for file_name in files:
+            name = os.path.relpath(os.path.join(root, file_name), out_dir).replace(os.sep, '/')
+            if name.endswith('.so'):
+                name = name.split('.')[0] + '.so'
+            names.append(name)
+    return sorted(names)
+
+
+def test_parallel_output_matches_serial(sandbox):
+    serial = list_output(build_project(sandbox, FILES).out_dir)
+    assert serial == ['__init__.py', 'a.so', 'b.so', 'data/config.json', 'pkg/__init__.py', 'pkg/c.so']
+
+    compiler = build_project(sandbox, FILES, jobs=2, translate_jobs=2)
+    assert not compiler.failures
+    assert list_output(compiler.out_dir) == serial
+    assert run_output(sandbox, 'from proj import b, pkg\nfrom proj.pkg import c\n'
+                               'print(b.g(), c.VALUE, b.__file__.endswith(".so"))') == 'ab 45 True'
+
+
+def test_parallel_build_stops_on_failure(sandbox):
+    """未指定keep_going时, 任一模块编译失败即中断编译"""
+    files = dict(FILES, **{'broken.py': 'def f(:\n    pass\n'})
+    with pytest.raises((Exception, SystemExit)):
+        build_project(sandbox, files, jobs=2, translate_jobs=2)
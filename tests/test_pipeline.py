@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_pipeline.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : cythonize与C编译两阶段流水线
+"""
+import os.path
+import threading
+
+import pytest
+
+from conftest import write_project
+from pipeline import BuildPipeline
+
+FILES = {
+    '__init__.py': '',
+    'a.py': 'A = 1\n',
+    'b.py': 'def f(x):\n    return x * 2\n',
+    'c.py': 'class C(object):\n    pass\n',
+    'broken.py': 'def f(:\n    pass\n',
+}
+
+
+def make_paths(sandbox, names) -> list:
+    write_project(sandbox, FILES)
+    return [os.path.join(str(sandbox), 'input', 'proj', name) for name in names]
+
+
+def test_pipeline_compiles_and_keeps_going(sandbox):
+    """队列长度为1时仍可编译全部模块; keep_going时失败的模块记录在failures中, 不影响其他模块"""
+    paths = make_paths(sandbox, ('a.py', 'broken.py', 'b.py', 'c.py'))
+    compiled, lock = list(), threading.Lock()
+
+    def on_compiled(py_file_path, result):
+        with lock:
+            compiled.append(py_file_path)
+
+    pipeline = BuildPipeline(translate_jobs=1, compile_jobs=2, queue_size=1, keep_going=True,
+                             on_compiled=on_compiled)
+    results = pipeline.run(paths, {path: dict(language_level=3) for path in paths})
+    assert sorted(results) == sorted(paths[:1] + paths[2:])
+    assert list(pipeline.failures) == [paths[1]]
+    assert sorted(compiled) == sorted(results)
+    for result in results.values():
+        assert result.cache_hit is None
+        assert result.c_size > 0
+        assert os.path.exists(os.path.join(str(sandbox), result.build_lib, result.so_file_name))
+
+
+def test_pipeline_raises_without_keep_going(sandbox):
+    paths = make_paths(sandbox, ('a.py', 'broken.py'))
+    with pytest.raises((Exception, SystemExit)):
+        BuildPipeline(translate_jobs=1, compile_jobs=1).run(paths, {path: dict() for path in paths})
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_plan.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译计划(dry-run)及按预计耗时排序的编译调度
+"""
+import os.path
+
+from base import PythonCodeCompilingBase
+from conftest import write_project
+from plan import ACTION_COMPILE, ACTION_COPY_DIR, ACTION_COPY_FILE, BuildHistory, BuildPlan
+
+
+def test_dry_run_only_prints_plan(sandbox, capsys):
+    project_config = write_project(sandbox, {
+        '__init__.py': '', 'a.py': 'A = 1\n', 'settings.py': 'DEBUG = False\n', 'README.md': '',
+        'static/app.js': '', 'pkg/__init__.py': '', 'pkg/b.py': 'B = 2\n',
+    }, dict(ignored_rules=dict(ignored_files=['settings'], ignored_packages=[])))
+    compiler = PythonCodeCompilingBase(project_config, 'proj', jobs=1, translate_jobs=1, dry_run=True)
+    compiler.run()
+
+    kinds = {action.name: action.kind for action in compiler.plan.actions}
+    assert kinds['proj/a.py'] == kinds['proj/pkg/b.py'] == ACTION_COMPILE
+    assert kinds['proj/settings.py'] == kinds['proj/__init__.py'] == kinds['proj/README.md'] == ACTION_COPY_FILE
+    assert kinds['proj/static'] == ACTION_COPY_DIR
+    reasons = {action.name: action.reason for action in compiler.plan.actions}
+    assert reasons['proj/settings.py'] == '命中忽略编译规则: settings'
+
+    output = capsys.readouterr().out
+    assert '编译计划: 编译2个, 拷贝文件4个, 拷贝文件夹1个' in output
+    assert not os.path.exists(compiler.out_dir)
+    assert not os.path.exists(os.path.join(str(sandbox), 'build'))
+
+
+def test_schedule_longest_job_first(tmp_path):
+    plan = BuildPlan()
+    small = plan.add(ACTION_COMPILE, 'p/small.py', '', size=100)
+    large = plan.add(ACTION_COMPILE, 'p/large.py', '', size=10000)
+    slow = plan.add(ACTION_COMPILE, 'p/slow.py', '', size=10)
+    assert BuildPlan.schedule(plan.actions, None) == [large, small, slow]
+
+    history = BuildHistory('p', history_dir=str(tmp_path))
+    history.record('p/slow.py', seconds=5.0, size=10)
+    history.record('p/large.py', seconds=1.0, size=10000)
+    history.save()
+    history = BuildHistory('p', history_dir=str(tmp_path))
+    # 无记录的模块按历史记录的平均速度估算
+    assert history.estimate('p/small.py', 100) == 6.0 / 10010 * 100
+    assert BuildPlan.schedule(plan.actions, history) == [slow, large, small]
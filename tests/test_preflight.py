@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_preflight.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译前预检: 已知无法编译的写法, 检查结果缓存, demote模式改为拷贝源文件
+"""
+import glob
+import os.path
+
+from conftest import build_project, run_output
+from plan import ACTION_COPY_FILE
+from preflight import CHECK_ANNOTATION_LITERAL, CHECK_MODULE_NAME, CHECK_SYNTAX, CHECK_TUPLE_ANNOTATION, \
+    PREFLIGHT_DEMOTE, SEVERITY_ERROR, Preflight, check_source
+
+BAD_SOURCE = '''
+def parse(value):
+    count: int = 'zero'
+    return value, count
+'''
+
+
+def test_check_source():
+    issues = check_source('p/mod.py', BAD_SOURCE)
+    assert [(issue.line, issue.check, issue.severity) for issue in issues] == [
+        (3, CHECK_ANNOTATION_LITERAL, SEVERITY_ERROR)]
+    # 参数默认值为None, 模块级变量及关闭annotation_typing时不检查
+    assert check_source('p/mod.py', 'def f(x: int = None):\n    pass\ny: int = "a"\n') == []
+    assert check_source('p/mod.py', BAD_SOURCE, annotation_typing=False) == []
+    assert check_source('p/mod.py', 'def f() -> (list, dict):\n    pass\n')[0].check == CHECK_TUPLE_ANNOTATION
+    assert check_source('p/0001_initial.py', '')[0].check == CHECK_MODULE_NAME
+    assert check_source('p/mod.py', 'def f(:\n')[0].check == CHECK_SYNTAX
+
+
+def test_scan_reuses_cached_results(tmp_path):
+    source = tmp_path / 'mod.py'
+    source.write_text(BAD_SOURCE)
+    stat = os.stat(str(source))
+    files = [('p/mod.py', str(source), stat.st_size, stat.st_mtime_ns, True)]
+    preflight = Preflight('p', cache_dir=str(tmp_path / 'cache'))
+    issues = preflight.scan(files)
+    assert preflight.checked == 1 and list(issues) == ['p/mod.py']
+    preflight.save()
+
+    preflight = Preflight('p', cache_dir=str(tmp_path / 'cache'))
+    assert preflight.scan(files) == issues
+    assert preflight.checked == 0
+    # annotation_typing变化时重新检查
+    assert preflight.scan([files[0][:-1] + (False,)]) == dict()
+    assert preflight.checked == 1
+
+
+def test_demote_copies_source(sandbox, capsys):
+    compiler = build_project(sandbox, {'__init__.py': '', 'good.py': 'def f():\n    return 1\n',
+                                       'bad.py': BAD_SOURCE}, preflight=PREFLIGHT_DEMOTE)
+    assert not compiler.failures
+    actions = {action.name: action for action in compiler.plan.actions}
+    assert actions['proj/bad.py'].kind == ACTION_COPY_FILE
+    assert actions['proj/bad.py'].reason.startswith('预检错误')
+    assert '1个模块改为拷贝源文件' in capsys.readouterr().out
+    assert os.path.exists(os.path.join(compiler.out_dir, 'bad.py'))
+    assert glob.glob(os.path.join(compiler.out_dir, 'good.*.so'))
+    assert run_output(sandbox, 'from proj import bad, good; print(bad.parse(1), good.f())') == "(1, 'zero') 1"
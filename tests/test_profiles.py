@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_profiles.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译配置及PGO编译
+"""
+import glob
+import os.path
+
+import pytest
+
+from base import PythonCodeCompilingBase
+from conftest import write_project
+from profiles import PGO_STAGE_GENERATE, PGO_STAGE_USE, PROFILE_RELEASE, STRIP_LINK_ARG, resolve_build_profile, \
+    run_pgo_workload
+
+MODULE_SOURCE = '''
+def fib(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+'''
+
+WORKLOAD_SOURCE = '''
+from proj import mod
+assert mod.__file__.endswith('.so'), mod.__file__
+for _ in range(1000):
+    mod.fib(30)
+'''
+
+
+def test_resolve_custom_profile():
+    profile = resolve_build_profile('fast', dict(fast=dict(base='release', extra_compile_args=['-march=native'])))
+    assert profile.name == 'fast'
+    assert profile.extra_compile_args[-1] == '-march=native'
+    assert profile.extra_link_args == resolve_build_profile(PROFILE_RELEASE).extra_link_args
+    assert resolve_build_profile(None).to_dict() == dict()
+    with pytest.raises(ValueError):
+        resolve_build_profile('missing')
+    with pytest.raises(ValueError):
+        resolve_build_profile('fast', dict(fast=dict(base='fast')))
+
+
+def test_pgo_stages_and_strip():
+    profile = resolve_build_profile('pgo')
+    assert profile.pgo
+    generate = profile.with_pgo_stage(PGO_STAGE_GENERATE, '/tmp/pgo')
+    assert '-fprofile-generate=/tmp/pgo' in generate.extra_compile_args
+    assert '-fprofile-generate=/tmp/pgo' in generate.extra_link_args
+    assert '-fprofile-use=/tmp/pgo' in profile.with_pgo_stage(PGO_STAGE_USE, '/tmp/pgo').extra_compile_args
+    stripped = resolve_build_profile('debug').with_strip()
+    assert stripped.extra_link_args[-1] == STRIP_LINK_ARG
+    assert stripped.with_strip() is stripped
+
+
+def test_workload_without_profile_data_fails(tmp_path):
+    """workload未执行插桩的模块(例如导入了源项目)时不能继续编译"""
+    workload = tmp_path / 'workload.py'
+    workload.write_text('print("没有导入编译后的模块")\n')
+    with pytest.raises(RuntimeError, match='未生成profile数据'):
+        run_pgo_workload(str(workload), str(tmp_path), str(tmp_path / 'pgo'))
+
+
+def test_serial_pgo_build(sandbox):
+    """串行编译(jobs=1)时, 两次编译之间删除的build文件夹在第二次编译时重新创建"""
+    project_config = write_project(sandbox, {'__init__.py': '', 'mod.py': MODULE_SOURCE, 'pkg/__init__.py': '',
+                                             'pkg/sub.py': MODULE_SOURCE})
+    workload = sandbox / 'workload.py'
+    workload.write_text(WORKLOAD_SOURCE)
+    compiler = PythonCodeCompilingBase(project_config, 'proj', jobs=1, translate_jobs=1, profile='pgo',
+                                       pgo_workload=str(workload), build_cache=False, object_cache=False)
+    compiler.run()
+    assert not compiler.failures
+    assert glob.glob(str(sandbox / 'cache' / 'pgo' / 'proj' / '**' / '*.gcda'), recursive=True)
+    for name in ('mod', 'pkg/sub'):
+        assert glob.glob(os.path.join(compiler.out_dir, name + '.*.so')), name
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_remote.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译节点: 本机启动编译节点, 经RemoteCompileExecutor编译
+"""
+import importlib.util
+import os.path
+import threading
+import zlib
+
+import pytest
+from setuptools.extension import Extension
+
+from remote import MESSAGE_COMPILE, MESSAGE_ERROR, BuildWorkerServer, ProtocolError, RemoteCompileExecutor, \
+    WorkerConnection, decompress_payload, get_toolchain
+
+C_SOURCE = '''
+#include <Python.h>
+
+static PyObject *answer(PyObject *self, PyObject *args) {
+    return PyLong_FromLong(ANSWER);
+}
+
+static PyMethodDef methods[] = {{"answer", answer, METH_NOARGS, NULL}, {NULL, NULL, 0, NULL}};
+static struct PyModuleDef module = {PyModuleDef_HEAD_INIT, "%(name)s", NULL, -1, methods};
+
+PyMODINIT_FUNC PyInit_%(name)s(void) {
+    return PyModule_Create(&module);
+}
+'''
+
+
+@pytest.fixture
+def worker_server():
+    server = BuildWorkerServer('127.0.0.1', 0, jobs=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def make_extension(tmp_path, name: str) -> Extension:
+    c_file = tmp_path / '{}.c'.format(name)
+    c_file.write_text(C_SOURCE % dict(name=name))
+    return Extension(name, [str(c_file)], define_macros=[('ANSWER', '42')], extra_compile_args=['-O2'])
+
+
+def load_module(name: str, so_file: str):
+    spec = importlib.util.spec_from_file_location(name, so_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_compile_through_worker(tmp_path, monkeypatch, worker_server):
+    """本机及编译节点各一个槽位, 同时提交的两个模块分别在本机及编译节点编译"""
+    monkeypatch.chdir(tmp_path)
+    address = '127.0.0.1:{}'.format(worker_server.server_address[1])
+    executor = RemoteCompileExecutor([address], local_jobs=1)
+    try:
+        assert [worker.address for worker in executor.workers] == [address]
+        futures = {name: executor.submit(make_extension(tmp_path, name)) for name in ('mod_a', 'mod_b')}
+        results = {name: future.result() for name, future in futures.items()}
+    finally:
+        executor.shutdown()
+    worker = executor.workers[0]
+    assert (worker.compiled, executor.local_compiled, executor.fallbacks, worker.disabled) == (1, 1, 0, None)
+    for name, result in results.items():
+        module = load_module(name, os.path.join(result.build_lib, result.so_file_name))
+        assert module.answer() == 42
+
+
+def test_worker_rejects_disallowed_args(worker_server):
+    connection = WorkerConnection('127.0.0.1', worker_server.server_address[1])
+    try:
+        for compile_args, link_args in ((['-fplugin=evil'], []), ([], ['-Wl,-rpath,/tmp']), (['-B/tmp'], [])):
+            header, _ = connection.request(dict(
+                type=MESSAGE_COMPILE, module='evil', toolchain=get_toolchain(), source_sizes=[0],
+                compile_args=compile_args, link_args=link_args), zlib.compress(b''))
+            assert header['type'] == MESSAGE_ERROR
+            assert '不允许' in header['message']
+    finally:
+        connection.close()
+
+
+def test_decompress_payload_is_capped():
+    data = zlib.compress(b'0' * 10000)
+    assert decompress_payload(data) == b'0' * 10000
+    with pytest.raises(ProtocolError):
+        decompress_payload(data, max_size=100)
+    with pytest.raises(ProtocolError):
+        decompress_payload(data[:-4])
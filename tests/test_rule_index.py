@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_rule_index.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译规则索引及忽略/保留编译规则的匹配
+"""
+import json
+import random
+import re
+
+import pytest
+
+import base
+from base import FileCompilingFilterRulesParser
+from rule_index import PrefixRuleIndex, SubstringRuleIndex
+
+PROJECT = 'demo'
+
+
+def make_parser(tmp_path, monkeypatch, config: dict) -> FileCompilingFilterRulesParser:
+    monkeypatch.setattr(base, 'PROJECT_CONFIG_DIR', str(tmp_path))
+    (tmp_path / 'project.json').write_text(json.dumps(config))
+    return FileCompilingFilterRulesParser(PROJECT, 'project.json')
+
+
+class BaselineRules(object):
+    """早期版本逐条re.search及前缀比较的匹配方式, 规则按字面匹配(re.escape)"""
+
+    def __init__(self, parser: FileCompilingFilterRulesParser):
+        self.rules = parser.rules[parser.type]
+        self.extend = parser.reserved_package_rules_extend
+
+    def is_ignored_file(self, name):
+        return any(re.search(re.escape(rule), name) for rule in self.rules['ignored_files'])
+
+    def is_ignored_package(self, name):
+        name = name if name.endswith('/') else name + '/'
+        return any(re.search(re.escape(rule if rule.endswith('/') else rule + '/'), name)
+                   for rule in self.rules['ignored_packages'])
+
+    def is_reserved_file(self, name):
+        return any(re.search(re.escape(rule), name) for rule in self.rules['reserved_files']) or \
+            any(name.startswith(rule) for rule in self.rules['reserved_packages'])
+
+    def is_reserved_package(self, name):
+        return any(rule.startswith('{}/'.format(name)) or rule == name or name.startswith('{}/'.format(rule))
+                   for rule in self.rules['reserved_packages'] + self.extend)
+
+
+def test_substring_index():
+    index = SubstringRuleIndex(['a.py', 'settings', 'he', 'she', 'hers'])
+    assert len(index) == 5
+    assert index.match('demo/data.py') == 'a.py'
+    assert index.match('demo/conf/settings/base.py') == 'settings'
+    assert index.match('ushers') == 'she'
+    assert index.match('demo/a_py') is None
+    assert index.match('') is None
+    assert SubstringRuleIndex().match('demo/x.py') is None
+    assert SubstringRuleIndex(['']).match('demo/x.py') == ''
+
+
+def test_prefix_index():
+    index = PrefixRuleIndex(['demo/lib', 'demo/a/b/'])
+    assert index.match('demo/libx/z.py') == 'demo/lib'
+    assert index.match('demo/li') is None
+    assert index.match_prefix_or_extension('demo/a/') == 'demo/a/b/'
+    assert index.match_prefix_or_extension('demo/a/b/c/') == 'demo/a/b/'
+    assert index.match_prefix_or_extension('demo/x/') is None
+    assert PrefixRuleIndex(['']).match('demo/x.py') == ''
+
+
+def test_ignored_rules_match_substrings(tmp_path, monkeypatch):
+    parser = make_parser(tmp_path, monkeypatch, dict(ignored_rules=dict(
+        ignored_files=['settings', 'test_', 'a.py'], ignored_packages=['tests'])))
+    for name in ('demo/settings.py', 'demo/conf/settings/base.py', 'demo/test_a.py', 'demo/data.py'):
+        assert parser.is_ignored_file(name), name
+    assert not parser.is_ignored_file('demo/a_py.py')
+    assert not parser.is_ignored_file('demo/b.py')
+    assert parser.is_ignored_package('demo/mytests')
+    assert parser.is_ignored_package('demo/tests/unit')
+    assert not parser.is_ignored_package('demo/test')
+
+
+def test_reserved_rules_match_substrings_and_prefixes(tmp_path, monkeypatch):
+    parser = make_parser(tmp_path, monkeypatch, dict(reserved_rules=dict(
+        reserved_files=['core'], reserved_packages=['/demo/lib'])))
+    for name in ('demo/core.py', 'demo/core/x.py', 'demo/mycore.py', 'demo/libx/z.py', 'demo/lib/y.py'):
+        assert parser.is_reserved_file(name), name
+    assert not parser.is_reserved_file('demo/other.py')
+    assert parser.is_reserved_package('demo')
+    assert parser.is_reserved_package('demo/lib')
+    assert parser.is_reserved_package('demo/lib/sub')
+    assert not parser.is_reserved_package('demo/libx')
+
+
+def test_reserved_file_rule_reserves_parent_packages(tmp_path, monkeypatch):
+    parser = make_parser(tmp_path, monkeypatch, dict(reserved_rules=dict(
+        reserved_files=['/demo/a/b/c.py'], reserved_packages=[])))
+    assert parser.is_reserved_package('demo/a')
+    assert parser.is_reserved_package('demo/a/b')
+    assert not parser.is_reserved_package('demo/x')
+    assert parser.is_reserved_file('demo/a/b/c.py')
+    assert not parser.is_reserved_file('demo/a/b/d.py')
+
+
+def test_regex_rules_fall_back_to_re_search(tmp_path, monkeypatch):
+    """包含正则表达式元字符的规则与早期版本相同, 按re.search匹配; 其余规则按字面匹配"""
+    index = SubstringRuleIndex(['a.py', '^demo/test_.*', 'mig(rations)?/'])
+    assert len(index) == 3
+    assert index.match('demo/test_b.py') == '^demo/test_.*'
+    assert index.match('demo/x/test_b.py') is None
+    assert index.match('demo/migrations/0001.py') == 'mig(rations)?/'
+    assert index.match('demo/data.py') == 'a.py'
+    assert index.match('demo/a_py') is None
+
+    parser = make_parser(tmp_path, monkeypatch, dict(ignored_rules=dict(
+        ignored_files=['^demo/(settings|conf)\\.py$'], ignored_packages=['^demo/tests?'])))
+    assert parser.is_ignored_file('demo/settings.py')
+    assert parser.is_ignored_file('demo/conf.py')
+    assert not parser.is_ignored_file('demo/x/settings.py')
+    assert parser.is_ignored_package('demo/test')
+    assert parser.is_ignored_package('demo/tests/unit')
+    assert not parser.is_ignored_package('demo/testsx')
+    assert not parser.is_ignored_package('demo/x/tests')
+
+    parser = make_parser(tmp_path, monkeypatch, dict(reserved_rules=dict(
+        reserved_files=['core|api'], reserved_packages=[])))
+    assert parser.is_reserved_file('demo/api.py')
+    assert parser.is_reserved_file('demo/core/x.py')
+    assert not parser.is_reserved_file('demo/other.py')
+
+
+def test_invalid_regex_rule_is_rejected(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match='unclosed'):
+        make_parser(tmp_path, monkeypatch, dict(ignored_rules=dict(ignored_files=['(unclosed'])))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_baseline(tmp_path, monkeypatch, seed):
+    """随机规则及路径, 与逐条匹配的结果一致"""
+    rng = random.Random(seed)
+    words = ['a', 'b', 'lib', 'libx', 'core', 'mycore', 'test', 'tests', 'settings', 'x.py', 'a.py', 'data.py']
+
+    def make_path(depth):
+        return '/'.join([PROJECT] + [rng.choice(words) for _ in range(depth)])
+
+    def make_rule():
+        rule = make_path(rng.randint(1, 3))
+        kind = rng.random()
+        if kind < 0.3:
+            # 相对于项目根目录
+            return '/' + rule
+        if kind < 0.6:
+            # 相对于某个文件夹
+            return '/' + rule.split('/', 2)[-1]
+        # 文件/文件夹名称的一部分
+        name = rule.split('/')[-1]
+        return name[rng.randint(0, len(name) // 2):]
+
+    paths = [make_path(rng.randint(1, 4)) for _ in range(300)]
+    rules = dict(files=[make_rule() for _ in range(8)], packages=[make_rule() for _ in range(8)])
+
+    parser = make_parser(tmp_path, monkeypatch, dict(ignored_rules=dict(
+        ignored_files=rules['files'], ignored_packages=rules['packages'])))
+    baseline = BaselineRules(parser)
+    for path in paths:
+        assert parser.is_ignored_file(path) == baseline.is_ignored_file(path), path
+        assert parser.is_ignored_package(path) == baseline.is_ignored_package(path), path
+
+    parser = make_parser(tmp_path, monkeypatch, dict(reserved_rules=dict(
+        reserved_files=rules['files'], reserved_packages=rules['packages'])))
+    baseline = BaselineRules(parser)
+    for path in paths:
+        assert parser.is_reserved_file(path) == baseline.is_reserved_file(path), path
+        assert parser.is_reserved_package(path) == baseline.is_reserved_package(path), path
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_shared_utility.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : Cython共享工具模块及扩展模块大小对比
+"""
+import glob
+import os.path
+
+import pytest
+
+from conftest import build_project, run_output
+from profiles import resolve_build_profile
+from shared_utility import SHARED_UTILITY_MODULE_NAME, ExtensionSizes, generate_shared_module, get_baseline_variant, \
+    get_size_variant
+
+FILES = {
+    '__init__.py': '',
+    'a.py': 'def squares(n):\n    return [i * i for i in range(n)]\n',
+    'pkg/__init__.py': '',
+    'pkg/b.py': 'class Point(object):\n    def __init__(self, x):\n        self.x = x\n',
+}
+
+
+def test_size_variants(tmp_path, capsys):
+    profile = resolve_build_profile('release')
+    assert get_size_variant(profile, False) == 'release'
+    assert get_size_variant(profile, True) == 'release+shared'
+    assert get_baseline_variant('release+strip+shared') == 'release'
+
+    sizes = ExtensionSizes('proj', history_dir=str(tmp_path))
+    sizes.record('proj/a.py', 'release', 1000)
+    sizes.record('proj/a.py', 'release+shared', 400)
+    sizes.record('proj/b.py', 'release+shared', 300)
+    sizes.save()
+    sizes = ExtensionSizes('proj', history_dir=str(tmp_path))
+    assert sizes.get('proj/a.py', 'release+shared') == 400 and sizes.get('proj/b.py', 'release') is None
+    sizes.report(['proj/a.py', 'proj/b.py'], 'release+shared', shared_utility_size=100)
+    output = capsys.readouterr().out
+    assert 'proj/a.py' in output and '(-60.0%)' in output
+    assert '无release记录的模块1个' in output
+
+
+@pytest.mark.skipif(generate_shared_module is None, reason="共享工具模块需要Cython>=3.1")
+def test_shared_utility_build(sandbox, capsys):
+    """使用共享工具模块时各模块变小, 输出目录中包含共享工具模块, 编译结果可正常导入"""
+    build_project(sandbox, FILES)
+    compiler = build_project(sandbox, FILES, shared_utility=True)
+    assert not compiler.failures
+    assert '扩展模块大小(default+shared)' in capsys.readouterr().out
+    assert glob.glob(os.path.join(compiler.out_dir, SHARED_UTILITY_MODULE_NAME + '.*.so'))
+    assert run_output(sandbox, 'from proj import a, _cyutility\nfrom proj.pkg import b\n'
+                               'print(sum(a.squares(4)), b.Point(3).x)') == '14 3'
+
+    sizes = ExtensionSizes('proj')
+    assert sizes.sizes
+    for name, variants in sizes.sizes.items():
+        assert variants['default+shared'] < variants['default'], name
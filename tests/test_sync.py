@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_sync.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 源项目至input目录的增量同步
+"""
+import os.path
+
+from sync import sync_tree
+
+MTIME_NS = 1_000_000_000_000_000_000
+
+
+def write(path, content: str, mtime_ns: int = MTIME_NS) -> None:
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(str(path), 'w') as f:
+        f.write(content)
+    os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def read(path) -> str:
+    with open(str(path)) as f:
+        return f.read()
+
+
+def make_dirs(tmp_path):
+    source_dir = tmp_path / 'source' / 'proj'
+    target_dir = tmp_path / 'input' / 'proj'
+    write(source_dir / 'a.py', 'a = 1\n')
+    write(source_dir / 'pkg' / '__init__.py', '')
+    write(source_dir / 'pkg' / 'b.py', 'b = 1\n')
+    return source_dir, target_dir
+
+
+def test_initial_sync_copies_everything(tmp_path):
+    source_dir, target_dir = make_dirs(tmp_path)
+    result = sync_tree(str(source_dir), str(target_dir))
+    assert sorted(result.copied) == ['proj/a.py', 'proj/pkg/__init__.py', 'proj/pkg/b.py']
+    assert read(target_dir / 'pkg' / 'b.py') == 'b = 1\n'
+    assert os.stat(str(target_dir / 'a.py')).st_mtime_ns == MTIME_NS
+
+
+def test_resync_copies_only_changes(tmp_path):
+    source_dir, target_dir = make_dirs(tmp_path)
+    sync_tree(str(source_dir), str(target_dir))
+    write(source_dir / 'a.py', 'a = 2\n', mtime_ns=MTIME_NS + 10 ** 9)
+    write(source_dir / 'c.py', 'c = 1\n')
+    os.remove(str(source_dir / 'pkg' / 'b.py'))
+
+    result = sync_tree(str(source_dir), str(target_dir))
+    assert sorted(result.copied) == ['proj/a.py', 'proj/c.py']
+    assert result.deleted == ['proj/pkg/b.py']
+    assert result.unchanged == 1
+    assert result.changed_files == {'proj/a.py', 'proj/c.py', 'proj/pkg/b.py'}
+    assert read(target_dir / 'a.py') == 'a = 2\n'
+    assert not os.path.exists(str(target_dir / 'pkg' / 'b.py'))
+
+
+def test_removed_directory_is_deleted(tmp_path):
+    source_dir, target_dir = make_dirs(tmp_path)
+    sync_tree(str(source_dir), str(target_dir))
+    os.remove(str(source_dir / 'pkg' / '__init__.py'))
+    os.remove(str(source_dir / 'pkg' / 'b.py'))
+    os.rmdir(str(source_dir / 'pkg'))
+
+    result = sync_tree(str(source_dir), str(target_dir))
+    assert sorted(result.deleted) == ['proj/pkg/__init__.py', 'proj/pkg/b.py']
+    assert not os.path.exists(str(target_dir / 'pkg'))
+
+
+def test_generated_c_files_are_kept(tmp_path):
+    source_dir, target_dir = make_dirs(tmp_path)
+    sync_tree(str(source_dir), str(target_dir))
+    write(target_dir / 'a.c', '/* cythonize */')
+    write(target_dir / 'stale.c', '/* 源项目中没有stale.py */')
+
+    result = sync_tree(str(source_dir), str(target_dir))
+    assert os.path.exists(str(target_dir / 'a.c'))
+    assert result.deleted == ['proj/stale.c']
+
+
+def test_mtime_mode_misses_same_size_same_mtime_change(tmp_path):
+    """mtime模式只比较大小及修改时间, checksum模式比较内容"""
+    source_dir, target_dir = make_dirs(tmp_path)
+    sync_tree(str(source_dir), str(target_dir))
+    write(source_dir / 'a.py', 'a = 9\n')
+
+    assert sync_tree(str(source_dir), str(target_dir)).copied == []
+    result = sync_tree(str(source_dir), str(target_dir), checksum=True)
+    assert result.copied == ['proj/a.py']
+    assert read(target_dir / 'a.py') == 'a = 9\n'
+
+
+def test_abandoned_files_are_not_synced(tmp_path):
+    source_dir, target_dir = make_dirs(tmp_path)
+    write(source_dir / '__pycache__' / 'a.cpython-311.pyc', '')
+    sync_tree(str(source_dir), str(target_dir), abandoned_files=['__pycache__'])
+    assert not os.path.exists(str(target_dir / '__pycache__'))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_tracing.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 各阶段及各模块耗时统计, Chrome trace-event导出
+"""
+import json
+import os
+
+from conftest import build_project
+from tracing import CATEGORY_MODULE, Tracer, make_span
+
+
+def test_module_seconds_and_export(tmp_path):
+    tracer = Tracer()
+    with tracer.span('plan', actions=3):
+        pass
+    tracer.add(make_span('cc', CATEGORY_MODULE, 10.0, 12.0, module='p/a.py'),
+               make_span('link', CATEGORY_MODULE, 12.0, 12.5, module='p/a.py'),
+               make_span('cc', CATEGORY_MODULE, 10.0, 11.0, module='p/b.py'))
+    assert tracer.get_module_seconds() == {'p/a.py': 2.5, 'p/b.py': 1.0}
+
+    trace_path = str(tmp_path / 'trace' / 'build.json')
+    tracer.export(trace_path)
+    with open(trace_path) as f:
+        trace = json.load(f)
+    events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in events] == ['plan', 'cc', 'link', 'cc']
+    assert events[0]['args'] == dict(actions=3)
+    assert min(event['ts'] for event in events) == 0
+    assert events[2]['dur'] == 500000
+    metadata = [event for event in trace['traceEvents'] if event['ph'] == 'M']
+    assert metadata == [dict(name='process_name', ph='M', pid=os.getpid(), tid=0, args=dict(name='main'))]
+
+
+def test_build_exports_trace(sandbox, capsys):
+    trace_path = str(sandbox / 'trace.json')
+    build_project(sandbox, {'__init__.py': '', 'a.py': 'A = 1\n', 'b.py': 'B = 2\n'}, jobs=2, translate_jobs=2,
+                  trace_path=trace_path)
+    with open(trace_path) as f:
+        events = json.load(f)['traceEvents']
+    phases = {event['name'] for event in events if event.get('cat') == 'phase'}
+    assert {'prepare', 'scan', 'plan', 'compile', 'copy_so'} <= phases
+    for module in ('proj/a.py', 'proj/b.py'):
+        names = {event['name'] for event in events if event.get('args', dict()).get('module') == module}
+        assert {'cythonize', 'cc', 'link'} <= names, module
+    # 子进程的耗时记录按进程区分
+    assert any(event['args']['name'].startswith('worker-') for event in events if event['ph'] == 'M')
+    output = capsys.readouterr().out
+    assert '各阶段耗时:' in output and '最慢的2个模块:' in output
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_verify.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译结果校验: 逐个导入输出目录中的模块, 区分编译导致的错误, 微基准测试
+"""
+import glob
+import os.path
+
+from conftest import build_project, write_project
+from preflight import PREFLIGHT_DEMOTE
+from verify import OutputVerifier, get_module_names, load_benchmarks, verify_project
+
+FILES = {
+    '__init__.py': '',
+    'calc.py': 'def total(n):\n    return sum(range(n))\n',
+    'pkg/__init__.py': '',
+    'pkg/mod.py': 'VALUE = 1\n',
+    'needs_env.py': 'import missing_dependency_for_verify\n',
+    '0001_initial.py': '',
+}
+
+CONFIG = dict(benchmarks={'/proj/calc.py': ['total(100)']})
+
+
+def build(root):
+    """文件名不是合法模块名称的文件改为拷贝源文件"""
+    return build_project(root, FILES, CONFIG, preflight=PREFLIGHT_DEMOTE)
+
+
+def test_module_names_and_benchmarks(sandbox):
+    write_project(sandbox, FILES, CONFIG)
+    assert get_module_names(str(sandbox / 'input' / 'proj')) == [
+        'proj', 'proj.calc', 'proj.needs_env', 'proj.pkg', 'proj.pkg.mod']
+    assert load_benchmarks('proj.json', 'proj') == {'proj.calc': ['total(100)']}
+
+
+def test_verify_passes_then_detects_broken_module(sandbox, capsys):
+    compiler = build(sandbox)
+    source_dir = str(sandbox / 'input' / 'proj')
+    assert verify_project(source_dir, 'proj.json', repeat=1, jobs=2)
+    output = capsys.readouterr().out
+    assert '校验通过' in output and '源码同样无法导入(不影响校验结果): proj.needs_env' in output
+    assert os.path.exists(str(sandbox / 'cache' / 'verify' / 'proj.json'))
+
+    for so_file in glob.glob(os.path.join(compiler.out_dir, 'pkg', 'mod.*.so')):
+        os.remove(so_file)
+    verifier = OutputVerifier('proj', source_dir, benchmarks=dict(missing=['x']), repeat=1, jobs=2)
+    report = verifier.run()
+    modules = report['modules']
+    assert modules['proj.calc'] == dict(modules['proj.calc'], status='ok', compiled=True)
+    assert modules['proj.pkg.mod']['status'] == 'broken'
+    assert modules['proj.needs_env']['status'] == 'source_error'
+    assert [error.split(':')[0] for error in report['errors']] == ['微基准测试的模块不存在', '编译后无法导入']
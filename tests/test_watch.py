@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : test_watch.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 文件变更监听及增量编译
+"""
+import glob
+import os.path
+
+import pytest
+
+from conftest import build_project, run_output
+from watch import InotifyWatcher, PollingWatcher, is_ignored_path
+
+
+def test_ignored_paths():
+    ignored = {'__pycache__', '.git'}
+    assert is_ignored_path('proj/__pycache__/a.pyc', ignored)
+    assert is_ignored_path('proj/a.c', ignored)
+    assert is_ignored_path('proj/a.py.sync.tmp', ignored)
+    assert not is_ignored_path('proj/a.py', ignored)
+
+
+@pytest.mark.parametrize('watcher_class', [InotifyWatcher, PollingWatcher])
+def test_watcher_reports_changed_files(tmp_path, watcher_class):
+    project_dir = tmp_path / 'proj'
+    (project_dir / 'pkg').mkdir(parents=True)
+    (project_dir / 'a.py').write_text('A = 1\n')
+    (project_dir / 'b.py').write_text('B = 1\n')
+    kwargs = dict(interval=0.05) if watcher_class is PollingWatcher else dict()
+    try:
+        watcher = watcher_class(str(project_dir), ['__pycache__'], **kwargs)
+    except (OSError, AttributeError) as e:
+        pytest.skip("inotify不可用: {}".format(e))
+    try:
+        (project_dir / 'a.py').write_text('A = 22\n')
+        (project_dir / 'b.py').unlink()
+        (project_dir / 'pkg' / 'c.py').write_text('C = 1\n')
+        (project_dir / 'a.c').write_text('')
+        changed = watcher.wait(debounce=0.1)
+    finally:
+        watcher.close()
+    assert {'proj/a.py', 'proj/b.py', 'proj/pkg/c.py'} <= changed
+    assert 'proj/a.c' not in changed
+
+
+def test_rebuild_only_changed_modules(sandbox, capsys):
+    files = {'__init__.py': '', 'a.py': 'A = 1\n', 'b.py': 'B = 1\n', 'c.py': 'C = 1\n', 'conf.txt': 'v1'}
+    compiler = build_project(sandbox, files)
+    input_dir = sandbox / 'input' / 'proj'
+    (input_dir / 'b.py').write_text('B = 2\n')
+    (input_dir / 'c.py').unlink()
+    (input_dir / 'd.py').write_text('D = 4\n')
+    (input_dir / 'conf.txt').write_text('v2')
+    a_so = glob.glob(os.path.join(compiler.out_dir, 'a.*.so'))[0]
+    a_mtime = os.stat(a_so).st_mtime_ns
+    capsys.readouterr()
+
+    compiler.rebuild({'proj/b.py', 'proj/c.py', 'proj/d.py', 'proj/conf.txt'})
+    output = capsys.readouterr().out
+    assert '增量编译: 变更4个文件, 编译2个模块' in output
+    assert os.stat(a_so).st_mtime_ns == a_mtime
+    assert not glob.glob(os.path.join(compiler.out_dir, 'c.*'))
+    with open(os.path.join(compiler.out_dir, 'conf.txt')) as f:
+        assert f.read() == 'v2'
+    assert run_output(sandbox, 'from proj import a, b, d\nprint(a.A, b.B, d.D)') == '1 2 4'
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : tracing.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译各阶段及各模块的耗时统计, 可导出为Chrome trace-event格式
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+CATEGORY_PHASE = 'phase'  # 编译阶段: 同步, 遍历, 拷贝, 编译...
+CATEGORY_MODULE = 'module'  # 单个模块: cythonize, C编译, 链接
+
+
+class TraceSpan(NamedTuple):
+    """一段耗时记录, 可在子进程中生成后返回主进程"""
+    name: str
+    cat: str
+    start: float  # 开始时间(time.time())
+    end: float  # 结束时间(time.time())
+    pid: int  # 进程id, 即worker id
+    tid: int = 0  # 线程id
+    args: dict = dict()  # 附加信息: 模块名称, 输入/输出字节数等
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+def make_span(name: str, cat: str, start: float, end: float = None, **args) -> TraceSpan:
+    """
+    生成当前进程/线程的耗时记录
+
+    Args:
+        name (str): 名称
+        cat (str): 类别
+        start (float): 开始时间
+        end (float): 结束时间, 默认为当前时间
+        **args: 附加信息
+
+    Returns:
+        span (TraceSpan):
+    """
+    return TraceSpan(name, cat, start, time.time() if end is None else end, os.getpid(),
+                     threading.get_ident(), args)
+
+
+class Tracer(object):
+    """耗时统计"""
+
+    def __init__(self):
+        self.spans: List[TraceSpan] = list()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = CATEGORY_PHASE, **args):
+        """
+        统计代码块耗时
+
+            with tracer.span('plan'):
+                ...
+
+        Args:
+            name (str): 名称
+            cat (str): 类别
+            **args: 附加信息
+        """
+        start = time.time()
+        try:
+            yield args
+        finally:
+            self.add(make_span(name, cat, start, **args))
+
+    def add(self, *spans: TraceSpan) -> None:
+        """添加耗时记录, 例如子进程返回的记录"""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def get_module_seconds(self) -> Dict[str, float]:
+        """
+        各模块耗时(cythonize + C编译 + 链接)
+
+        Returns:
+            seconds (dict): 模块相对路径 -> 耗时
+        """
+        results = dict()
+        for span in self.spans:
+            module = span.args.get('module')
+            if span.cat == CATEGORY_MODULE and module:
+                results[module] = results.get(module, 0.0) + span.seconds
+        return results
+
+    def summary(self, top: int = 10) -> None:
+        """
+        输出各阶段耗时及最慢的模块
+
+        Args:
+            top (int): 输出的最慢模块数
+
+        Returns:
+
+        """
+        phases = [span for span in self.spans if span.cat == CATEGORY_PHASE]
+        if phases:
+            print("各阶段耗时:")
+            for span in phases:
+                print("  {:<16}{:.3f}秒".format(span.name, span.seconds))
+
+        module_seconds = self.get_module_seconds()
+        if module_seconds and top:
+            print("最慢的{}个模块:".format(min(top, len(module_seconds))))
+            slowest = sorted(module_seconds.items(), key=lambda item: -item[1])[:top]
+            for module, seconds in slowest:
+                details = ', '.join('{} {:.3f}秒'.format(span.name, span.seconds) for span in self.spans
+                                    if span.cat == CATEGORY_MODULE and span.args.get('module') == module)
+                print("  {:.3f}秒  {}  ({})".format(seconds, module, details))
+
+    def export(self, trace_path: str) -> None:
+        """
+        导出为Chrome trace-event格式的json, 可在chrome://tracing或Perfetto中查看
+
+        Args:
+            trace_path (str): 导出文件路径
+
+        Returns:
+
+        """
+        origin = min((span.start for span in self.spans), default=0.0)
+        events = list()
+        for pid in sorted({span.pid for span in self.spans}):
+            events.append(dict(name='process_name', ph='M', pid=pid, tid=0,
+                               args=dict(name='main' if pid == os.getpid() else 'worker-{}'.format(pid))))
+        for span in self.spans:
+            events.append(dict(
+                name=span.name,
+                cat=span.cat,
+                ph='X',
+                ts=round((span.start - origin) * 1e6, 1),
+                dur=round(span.seconds * 1e6, 1),
+                pid=span.pid,
+                tid=span.tid,
+                args=span.args,
+            ))
+
+        trace_dir = os.path.dirname(os.path.abspath(trace_path))
+        os.makedirs(trace_dir, exist_ok=True)
+        with open(trace_path, 'w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+        print("耗时统计已导出: [{}]".format(trace_path))
+
+
+def get_file_size(file_path: Optional[str]) -> int:
+    """文件大小, 文件不存在时为0"""
+    try:
+        return os.path.getsize(file_path) if file_path else 0
+    except OSError:
+        return 0
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : verify.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 编译结果校验: 在独立的子进程中并行导入输出目录中的各模块, 与源码对比导入耗时, 内存占用及微基准测试耗时
+"""
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.machinery import EXTENSION_SUFFIXES
+from typing import Dict, List, Sequence, Tuple
+
+import click
+
+from constants import OUTPUT_DIR, PROJECT_CONFIG_DIR, VERIFY_DIR, DEFAULT_IGNORED_FILES
+from memory import format_memory_size
+from scanner import ProjectInventory
+
+VARIANT_COMPILED = 'compiled'  # 输出目录
+VARIANT_SOURCE = 'source'  # 源项目
+
+DEFAULT_REPEAT = 3  # 导入耗时的测量次数, 结果取中位数
+DEFAULT_THRESHOLD = 0.1  # 编译后微基准测试耗时超出源码的比例上限, 超出时校验失败
+DEFAULT_TIMEOUT = 120  # 单次导入(含微基准测试)的超时时间(秒)
+
+# 在独立的子进程中导入模块: 测量导入耗时及内存增量, 导入后在模块的命名空间中执行微基准测试
+IMPORT_PROBE = r'''
+import importlib, json, os, sys, time, timeit, traceback
+
+
+def get_rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def format_error(e):
+    return ''.join(traceback.format_exception_only(type(e), e)).strip()
+
+
+tree_dir, name, result_path, statements = sys.argv[1], sys.argv[2], sys.argv[3], json.loads(sys.argv[4])
+sys.path.insert(0, tree_dir)
+result = dict()
+rss = get_rss_kb()
+time_start = time.perf_counter()
+try:
+    module = importlib.import_module(name)
+except BaseException as e:
+    result['error'] = format_error(e)
+else:
+    result['seconds'] = time.perf_counter() - time_start
+    result['rss_kb'] = get_rss_kb() - rss
+    result['file'] = getattr(module, '__file__', None) or ''
+    benchmarks = result['benchmarks'] = dict()
+    for statement in statements:
+        try:
+            timer = timeit.Timer(statement, globals=vars(module))
+            number, _ = timer.autorange()
+            benchmarks[statement] = dict(seconds=min(timer.repeat(3, number)) / number)
+        except BaseException as e:
+            benchmarks[statement] = dict(error=format_error(e))
+with open(result_path, 'w') as f:
+    json.dump(result, f)
+'''
+
+
+def get_module_names(source_dir: str) -> List[str]:
+    """
+    源项目中的全部模块(含python包), 输出目录中同名模块为编译后的扩展模块或拷贝的源文件
+
+    Args:
+        source_dir (str): 源项目文件夹
+
+    Returns:
+        names (list): 完整模块名称, 例如demo_proj.pkg.mod
+    """
+    source_dir = os.path.abspath(source_dir).rstrip('/\\')
+    inventory = ProjectInventory(source_dir, abandoned_files=DEFAULT_IGNORED_FILES,
+                                 base_dir=os.path.dirname(source_dir))
+    names = list()
+    for path, file in inventory.files.items():
+        if not file.name.endswith('.py'):
+            continue
+        parts = path[:-len('.py')].split('/')
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        if all(part.isidentifier() for part in parts):
+            names.append('.'.join(parts))
+    return sorted(names)
+
+
+def load_benchmarks(project_config: str, project_name: str) -> Dict[str, List[str]]:
+    """
+    项目配置中的微基准测试, 在模块的命名空间中以timeit执行
+
+        "benchmarks": {
+            "/demo_proj/pkg/mod.py": ["func(1000)", "Model(3).scale(2.0)"],
+            ...
+        }
+
+    Args:
+        project_config (str): 项目配置文件名称
+        project_name (str): 项目名称
+
+    Returns:
+        benchmarks (dict): 完整模块名称 -> 语句
+    """
+    with open(os.path.join(PROJECT_CONFIG_DIR, project_config)) as f:
+        config = json.load(f).get('benchmarks') or dict()
+    results = dict()
+    for path, statements in config.items():
+        path = path.lstrip('/')
+        if not path.startswith('{}/'.format(project_name)):
+            path = '{}/{}'.format(project_name, path)
+        parts = path[:-len('.py')].split('/') if path.endswith('.py') else path.split('/')
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        results['.'.join(parts)] = list(statements)
+    return results
+
+
+def probe_module(tree_dir: str, name: str, statements: Sequence[str] = (), pycache_dir: str = None,
+                 timeout: int = DEFAULT_TIMEOUT) -> dict:
+    """
+    在新的python进程中导入模块(tree_dir为首个导入路径)
+
+    Args:
+        tree_dir (str): 项目所在文件夹
+        name (str): 完整模块名称
+        statements (list): 微基准测试语句
+        pycache_dir (str): .pyc文件夹(PYTHONPYCACHEPREFIX), 避免在输出目录及源项目中生成__pycache__
+        timeout (int): 超时时间(秒)
+
+    Returns:
+        result (dict): 导入失败时为{'error': ...}, 否则为{'seconds', 'rss_kb', 'file', 'benchmarks'}
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path for path in (tree_dir, env.get('PYTHONPATH')) if path)
+    if pycache_dir:
+        # .pyc写入单独的文件夹, 源码导入耗时与实际部署(已有.pyc)一致
+        env['PYTHONPYCACHEPREFIX'] = pycache_dir
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+    fd, result_path = tempfile.mkstemp(prefix='verify_', suffix='.json')
+    os.close(fd)
+    try:
+        try:
+            completed = subprocess.run([sys.executable, '-c', IMPORT_PROBE, tree_dir, name, result_path,
+                                        json.dumps(list(statements))], cwd=tree_dir, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return dict(error='导入超时({}秒)'.format(timeout))
+        if completed.returncode != 0:
+            stderr = completed.stderr.decode(errors='replace').strip().splitlines()
+            return dict(error='进程异常退出, 退出码: {}{}'.format(
+                completed.returncode, ', {}'.format(stderr[-1]) if stderr else ''))
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def is_compiled(result: dict) -> bool:
+    """模块是否从扩展模块导入"""
+    return result.get('file', '').endswith(tuple(EXTENSION_SUFFIXES))
+
+
+class OutputVerifier(object):
+    """
+    编译结果校验
+
+        1.输出目录中逐个导入全部模块(每个模块一个新进程, 并行执行), 导入失败且源码可以导入的模块为编译导致的错误;
+        2.从扩展模块导入的模块, 源码及输出目录交替导入repeat次, 对比导入耗时及内存增量(取中位数);
+        3.配置了微基准测试的模块, 分别在源码及输出目录中执行, 扩展模块编译后耗时超出源码threshold比例时校验失败
+    """
+
+    def __init__(self, project_name: str, source_dir: str, output_dir: str = OUTPUT_DIR,
+                 benchmarks: Dict[str, List[str]] = None, repeat: int = DEFAULT_REPEAT,
+                 threshold: float = DEFAULT_THRESHOLD, jobs: int = None, verify_dir: str = VERIFY_DIR):
+        """
+        Args:
+            project_name (str): 项目名称
+            source_dir (str): 源项目文件夹
+            output_dir (str): 输出目录, 其下为编译后的项目
+            benchmarks (dict): 微基准测试, 见load_benchmarks
+            repeat (int): 导入耗时的测量次数
+            threshold (float): 编译后微基准测试耗时超出源码的比例上限
+            jobs (int): 并行的进程数, 默认为CPU核数
+            verify_dir (str): 校验结果及.pyc文件夹
+        """
+        self.project_name = project_name
+        self.source_dir = os.path.abspath(source_dir).rstrip('/\\')
+        self.trees = {
+            VARIANT_COMPILED: os.path.abspath(output_dir),
+            VARIANT_SOURCE: os.path.dirname(self.source_dir),
+        }
+        if not os.path.isdir(os.path.join(self.trees[VARIANT_COMPILED], project_name)):
+            raise FileNotFoundError(os.path.join(self.trees[VARIANT_COMPILED], project_name))
+        self.benchmarks = benchmarks or dict()
+        self.repeat = repeat
+        self.threshold = threshold
+        self.jobs = jobs or os.cpu_count() or 1
+        self.report_path = os.path.join(verify_dir, '{}.json'.format(project_name))
+        self.pycache_dir = os.path.join(verify_dir, 'pycache')
+        self.errors: List[str] = list()  # 导致校验失败的问题
+
+    def _probe_all(self, tasks: List[Tuple[str, str, Sequence[str]]]) -> List[dict]:
+        """并行导入, tasks为(变体, 模块, 微基准测试语句)"""
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            return list(executor.map(lambda task: probe_module(self.trees[task[0]], task[1], task[2],
+                                                               pycache_dir=self.pycache_dir), tasks))
+
+    def run(self) -> dict:
+        """
+        执行校验
+
+        Returns:
+            report (dict):
+        """
+        time_start = time.time()
+        self.errors = list()
+        names = get_module_names(self.source_dir)
+        for name in self.benchmarks:
+            if name not in names:
+                self.errors.append("微基准测试的模块不存在: {}".format(name))
+
+        # 1.输出目录中导入全部模块, 同时生成源文件的.pyc; 导入失败的模块在源码中导入, 区分编译导致的错误
+        checks = dict(zip(names, self._probe_all([(VARIANT_COMPILED, name, ()) for name in names])))
+        failed = [name for name in names if 'error' in checks[name]]
+        sources = dict(zip(failed, self._probe_all([(VARIANT_SOURCE, name, ()) for name in failed])))
+        modules = dict()
+        for name in names:
+            result = checks[name]
+            if 'error' not in result:
+                modules[name] = dict(status='ok', compiled=is_compiled(result))
+            elif 'error' in sources[name]:
+                modules[name] = dict(status='source_error', error=result['error'])
+            else:
+                modules[name] = dict(status='broken', error=result['error'])
+                self.errors.append("编译后无法导入: {}, {}".format(name, result['error']))
+
+        # 2.扩展模块的导入耗时及内存增量, 首轮预热(生成源码的.pyc)不计入
+        compiled = [name for name in names if modules[name].get('compiled')]
+        timings = {name: {VARIANT_COMPILED: list(), VARIANT_SOURCE: list()} for name in compiled}
+        for i in range(self.repeat + 1):
+            tasks = [(variant, name, ()) for name in compiled for variant in (VARIANT_SOURCE, VARIANT_COMPILED)]
+            for (variant, name, _), result in zip(tasks, self._probe_all(tasks)):
+                if i and 'error' not in result:
+                    timings[name][variant].append(result)
+        for name in compiled:
+            for variant, results in timings[name].items():
+                if results:
+                    modules[name]['{}_import_seconds'.format(variant)] = statistics.median(
+                        result['seconds'] for result in results)
+                    modules[name]['{}_rss_kb'.format(variant)] = statistics.median(
+                        result['rss_kb'] for result in results)
+
+        # 3.微基准测试
+        benchmarks = [name for name in names if name in self.benchmarks and modules[name]['status'] == 'ok']
+        tasks = [(variant, name, self.benchmarks[name]) for name in benchmarks
+                 for variant in (VARIANT_SOURCE, VARIANT_COMPILED)]
+        results = dict(((variant, name), result) for (variant, name, _), result in zip(tasks, self._probe_all(tasks)))
+        for name in benchmarks:
+            rows = modules[name]['benchmarks'] = dict()
+            for statement in self.benchmarks[name]:
+                source = results[(VARIANT_SOURCE, name)].get('benchmarks', dict()).get(statement, dict())
+                compiled_ = results[(VARIANT_COMPILED, name)].get('benchmarks', dict()).get(statement, dict())
+                error = compiled_.get('error') or source.get('error') or \
+                    results[(VARIANT_COMPILED, name)].get('error') or results[(VARIANT_SOURCE, name)].get('error')
+                if error:
+                    rows[statement] = dict(error=error)
+                    self.errors.append("微基准测试执行失败: {}: {}, {}".format(name, statement, error))
+                    continue
+                rows[statement] = dict(source_seconds=source['seconds'], compiled_seconds=compiled_['seconds'],
+                                       speedup=source['seconds'] / compiled_['seconds'])
+                # 未编译的模块两次执行的是同一份源码, 差异只是测量误差
+                if modules[name]['compiled'] and compiled_['seconds'] > source['seconds'] * (1 + self.threshold):
+                    self.errors.append("微基准测试变慢: {}: {}, {:.3g}秒 -> {:.3g}秒".format(
+                        name, statement, source['seconds'], compiled_['seconds']))
+
+        return dict(project=self.project_name, time=time_start, seconds=round(time.time() - time_start, 4),
+                    repeat=self.repeat, threshold=self.threshold, modules=modules, errors=self.errors)
+
+    @staticmethod
+    def print_report(report: dict, top: int = 10) -> None:
+        """输出校验结果: 导入情况, 导入耗时及内存对比, 微基准测试, 导致失败的问题"""
+        modules = report['modules']
+        counts = dict()
+        for item in modules.values():
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        compiled = [name for name, item in modules.items() if 'compiled_import_seconds' in item and
+                    'source_import_seconds' in item]
+        print("校验{}个模块: 导入成功{}个(扩展模块{}个), 编译后无法导入{}个, 源码同样无法导入{}个, 耗时{:.1f}秒".format(
+            len(modules), counts.get('ok', 0), sum(1 for item in modules.values() if item.get('compiled')),
+            counts.get('broken', 0), counts.get('source_error', 0), report['seconds']))
+        for name, item in sorted(modules.items()):
+            if item['status'] == 'source_error':
+                print("  源码同样无法导入(不影响校验结果): {}, {}".format(name, item['error']))
+
+        if compiled:
+            source = sum(modules[name]['source_import_seconds'] for name in compiled)
+            after = sum(modules[name]['compiled_import_seconds'] for name in compiled)
+            print("扩展模块冷启动导入耗时(含依赖, 中位数): 源码{:.1f}毫秒 -> 编译后{:.1f}毫秒 ({:+.1f}%), 内存增量{} -> {}".format(
+                source * 1000, after * 1000, (after - source) * 100 / source if source else 0,
+                format_memory_size(sum(modules[name]['source_rss_kb'] for name in compiled) * 1024),
+                format_memory_size(sum(modules[name]['compiled_rss_kb'] for name in compiled) * 1024)))
+            rows = sorted(compiled, key=lambda name: modules[name]['source_import_seconds'] -
+                          modules[name]['compiled_import_seconds'])
+            for name in rows[:top]:
+                item = modules[name]
+                print("  {:8.2f}毫秒 -> {:8.2f}毫秒  {:>9} -> {:>9}  {}".format(
+                    item['source_import_seconds'] * 1000, item['compiled_import_seconds'] * 1000,
+                    format_memory_size(item['source_rss_kb'] * 1024),
+                    format_memory_size(item['compiled_rss_kb'] * 1024), name))
+
+        for name, item in sorted(modules.items()):
+            for statement, row in item.get('benchmarks', dict()).items():
+                if 'error' in row:
+                    continue
+                print("微基准测试: {}: {}  {:.3g}秒 -> {:.3g}秒, 加速{:.2f}倍{}".format(
+                    name, statement, row['source_seconds'], row['compiled_seconds'], row['speedup'],
+                    '' if item['compiled'] else ' (未编译)'))
+
+        if report['errors']:
+            print("校验失败:")
+            for error in report['errors']:
+                print("  {}".format(error))
+        else:
+            print("校验通过")
+
+    def save(self, report: dict) -> None:
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print("校验结果已保存: [{}]".format(self.report_path))
+
+
+def verify_project(source_dir: str, project_config: str = None, output_dir: str = OUTPUT_DIR,
+                   repeat: int = DEFAULT_REPEAT, threshold: float = DEFAULT_THRESHOLD, jobs: int = None,
+                   top: int = 10) -> bool:
+    """
+    校验编译结果, 输出并保存校验结果
+
+    Args:
+        source_dir (str): 源项目文件夹
+        project_config (str): 项目配置文件名称, 从中读取微基准测试(benchmarks)
+        output_dir (str): 输出目录
+        repeat (int): 导入耗时的测量次数
+        threshold (float): 编译后微基准测试耗时超出源码的比例上限
+        jobs (int): 并行的进程数
+        top (int): 输出的模块数
+
+    Returns:
+        result (bool): 是否通过
+    """
+    project_name = os.path.basename(os.path.abspath(source_dir).rstrip('/\\'))
+    benchmarks = load_benchmarks(project_config, project_name) if project_config else None
+    verifier = OutputVerifier(project_name, source_dir, output_dir, benchmarks=benchmarks, repeat=repeat,
+                              threshold=threshold, jobs=jobs)
+    report = verifier.run()
+    verifier.print_report(report, top=top)
+    verifier.save(report)
+    return not report['errors']
+
+
+@click.command()
+@click.argument('dir_path', nargs=1, type=click.Path(exists=True, file_okay=False))
+@click.argument('project_config', nargs=1, required=False)
+@click.option('--output-dir', type=click.Path(exists=True, file_okay=False), default=OUTPUT_DIR,
+              help="输出目录, 其下为编译后的项目")
+@click.option('--repeat', type=click.IntRange(min=1), default=DEFAULT_REPEAT, help="导入耗时的测量次数, 结果取中位数")
+@click.option('--threshold', type=click.FloatRange(min=0), default=DEFAULT_THRESHOLD,
+              help="编译后微基准测试耗时超出源码的比例上限, 超出时校验失败")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help="并行的进程数, 默认为CPU核数")
+@click.option('--top', type=click.IntRange(min=0), default=10, help="输出的模块数")
+def verify(dir_path: str, project_config: str, output_dir: str, repeat: int, threshold: float, jobs: int, top: int):
+    """
+    编译结果校验
+
+        在独立的子进程中并行导入输出目录中的全部模块, 对比源码与扩展模块的冷启动导入耗时及内存增量,
+        执行项目配置中的微基准测试(benchmarks); 编译后无法导入或微基准测试变慢时退出码为1\n
+    """
+    if not verify_project(dir_path, project_config, output_dir, repeat=repeat, threshold=threshold, jobs=jobs,
+                          top=top):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    verify()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : watch.py
+@Author: Sanbom
+@Date  : 2026/10/17
+@Desc  : 监听源项目文件变更(inotify, 不支持时轮询), 增量编译变更的模块
+"""
+import ctypes
+import ctypes.util
+import os.path
+import select
+import struct
+import time
+from typing import Dict, Optional, Set
+
+from scanner import ProjectInventory
+
+# linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct('iIII')  # struct inotify_event: wd, mask, cookie, len
+
+DEFAULT_DEBOUNCE = 0.3  # 最后一次变更后等待的时间(秒), 合并编辑器保存时的多次写入
+DEFAULT_POLL_INTERVAL = 1.0  # 轮询间隔(秒)
+
+
+def is_ignored_path(path: str, ignored_files: Set[str]) -> bool:
+    """
+    是否为不需要处理的变更: 忽略的文件/文件夹, 同步的临时文件, cythonize生成的.c文件
+
+    Args:
+        path (str): 相对路径
+        ignored_files (set): 忽略的文件/文件夹名称
+
+    Returns:
+        result (bool):
+    """
+    if any(segment in ignored_files for segment in path.split('/')):
+        return True
+    return path.endswith('.sync.tmp') or path.endswith('.c') or path.endswith('.tmp')
+
+
+class PollingWatcher(object):
+    """轮询监听: 按间隔对比文件大小及修改时间"""
+
+    def __init__(self, dir_abs_path: str, ignored_files: list = None, interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            dir_abs_path (str): 监听的文件夹
+            ignored_files (list): 忽略的文件/文件夹名称
+            interval (float): 轮询间隔(秒)
+        """
+        self.dir_abs_path = dir_abs_path.rstrip('/\\')
+        self.ignored_files = set(ignored_files or list())
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        inventory = ProjectInventory(self.dir_abs_path, abandoned_files=self.ignored_files,
+                                     base_dir=os.path.dirname(self.dir_abs_path))
+        return {path: (file.size, file.mtime_ns) for path, file in inventory.files.items()
+                if not is_ignored_path(path, self.ignored_files)}
+
+    def wait(self, debounce: float = DEFAULT_DEBOUNCE) -> Optional[Set[str]]:
+        """
+        等待文件变更
+
+        Args:
+            debounce (float): 最后一次变更后等待的时间(秒)
+
+        Returns:
+            changed (set): 变更的文件(相对于监听文件夹的上级文件夹)
+        """
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._scan()
+            changed = {path for path in set(snapshot) | set(self.snapshot)
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        return None
+
+
+class InotifyWatcher(object):
+    """inotify监听(linux), 递归监听全部子文件夹, 新建的子文件夹自动加入监听"""
+
+    def __init__(self, dir_abs_path: str, ignored_files: list = None):
+        """
+        Args:
+            dir_abs_path (str): 监听的文件夹
+            ignored_files (list): 忽略的文件/文件夹名称
+        """
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("找不到libc")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("不支持inotify")
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.dir_abs_path = dir_abs_path.rstrip('/\\')
+        self.base_dir = os.path.dirname(self.dir_abs_path)
+        self.ignored_files = set(ignored_files or list())
+        self.watches: Dict[int, str] = dict()  # watch描述符 -> 文件夹绝对路径
+        self._add_watch_recursive(self.dir_abs_path)
+
+    def _add_watch_recursive(self, dir_abs_path: str) -> Set[str]:
+        """
+        递归监听文件夹
+
+        Args:
+            dir_abs_path (str): 文件夹绝对路径
+
+        Returns:
+            files (set): 文件夹下已存在的文件(相对路径), 新建文件夹时其中的文件可能早于监听创建
+        """
+        files = set()
+        for root, dirs, file_names in os.walk(dir_abs_path):
+            dirs[:] = [dir_ for dir_ in dirs if dir_ not in self.ignored_files]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, "监听文件夹失败: {}: {}".format(root, os.strerror(errno)))
+            self.watches[wd] = root
+            for file_name in file_names:
+                files.add(self._relative_path(os.path.join(root, file_name)))
+        return files
+
+    def _relative_path(self, abs_path: str) -> str:
+        return os.path.relpath(abs_path, self.base_dir).replace(os.sep, '/')
+
+    def _read_events(self) -> Optional[Set[str]]:
+        """
+        读取已到达的事件
+
+        Returns:
+            changed (set): 变更的文件, 事件队列溢出时为None
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+                abs_path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if name in self.ignored_files:
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(abs_path):
+                        changed |= self._add_watch_recursive(abs_path)
+                    else:
+                        # 删除或移出的文件夹, 由同步时的全量对比处理其中的文件
+                        changed.add(self._relative_path(abs_path) + '/')
+                    continue
+                changed.add(self._relative_path(abs_path))
+
+    def wait(self, debounce: float = DEFAULT_DEBOUNCE) -> Optional[Set[str]]:
+        """
+        等待文件变更, 首个事件到达后继续收集, 直到debounce时间内没有新事件
+
+        Args:
+            debounce (float): 最后一次变更后等待的时间(秒)
+
+        Returns:
+            changed (set): 变更的文件(相对于监听文件夹的上级文件夹), 事件队列溢出时为None
+        """
+        changed = set()
+        timeout = None
+        while True:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                if changed:
+                    return changed
+                timeout = None
+                continue
+            events = self._read_events()
+            if events is None:
+                return None
+            changed |= {path for path in events if not is_ignored_path(path, self.ignored_files)}
+            if changed:
+                timeout = debounce
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(dir_abs_path: str, ignored_files: list = None, polling: bool = False,
+                   interval: float = DEFAULT_POLL_INTERVAL):
+    """
+    创建文件变更监听器, 不支持inotify时使用轮询
+
+    Args:
+        dir_abs_path (str): 监听的文件夹
+        ignored_files (list): 忽略的文件/文件夹名称
+        polling (bool): 是否强制使用轮询
+        interval (float): 轮询间隔(秒)
+
+    Returns:
+        watcher (InotifyWatcher|PollingWatcher):
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(dir_abs_path, ignored_files)
+        except (OSError, AttributeError) as e:
+            print("inotify不可用({}), 使用轮询监听".format(e))
+    return PollingWatcher(dir_abs_path, ignored_files, interval=interval)
+
+
+def watch_project(compiler, polling: bool = False, debounce: float = DEFAULT_DEBOUNCE,
+                  interval: float = DEFAULT_POLL_INTERVAL) -> None:
+    """
+    监听源项目, 文件变更后增量编译, 直至Ctrl+C退出
+
+        进程常驻, Cython及setuptools只导入一次; 首次全量编译需在调用前完成(compiler.run())
+
+    Args:
+        compiler (PythonCodeCompilingBase): 已完成首次编译的编译器
+        polling (bool): 是否强制使用轮询
+        debounce (float): 最后一次变更后等待的时间(秒)
+        interval (float): 轮询间隔(秒)
+
+    Returns:
+
+    """
+    watcher = create_watcher(compiler.source_dir, compiler.DEFAULT_IGNORED_FILES, polling=polling, interval=interval)
+    print("监听文件变更: [{}] ({}), Ctrl+C退出".format(compiler.source_dir, type(watcher).__name__))
+    try:
+        while True:
+            changed_files = watcher.wait(debounce)
+            if changed_files is None:
+                print("文件变更事件溢出, 按全部文件变更处理")
+            else:
+                print("检测到{}个文件变更: {}".format(len(changed_files), ', '.join(sorted(changed_files)[:10])))
+            print(">" * 50)
+            try:
+                compiler.rebuild(changed_files)
+            except Exception as e:
+                # 编译错误(例如语法错误)不退出, 等待下一次修改
+                print("增量编译失败: {}: {}".format(type(e).__name__, e))
+            print(">" * 50)
+    except KeyboardInterrupt:
+        print("已退出监听")
+    finally:
+        watcher.close()
+    return None